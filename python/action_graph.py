@@ -0,0 +1,197 @@
+"""Dependency-ordered execution of SBERT Router actions.
+
+Each action is a node that names the nodes it must run after. Nodes whose
+dependencies are satisfied are submitted to a shared thread pool, so
+independent work (e.g. memory recall) overlaps with ordered work (PTZ moves
+followed by capture). A node is submitted only once its dependencies have
+finished, so a small pool never deadlocks on waiting nodes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Sequence, TypeVar
+
+
+T = TypeVar("T")
+
+# 各actionの待ち上限に足す余裕（秒）。action側のtimeoutを優先させる。
+DEFAULT_TIMEOUT_GRACE_SEC = 1.0
+
+
+@dataclass(frozen=True)
+class ActionNode(Generic[T]):
+    name: str
+    run: Callable[[], T]
+    timeout_sec: float
+    after: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class NodeOutcome(Generic[T]):
+    name: str
+    result: T | None
+    error: str | None
+    started_at: float
+    finished_at: float
+
+    @property
+    def elapsed_sec(self) -> float:
+        return max(0.0, self.finished_at - self.started_at)
+
+
+@dataclass(frozen=True)
+class GraphRun(Generic[T]):
+    outcomes: dict[str, NodeOutcome[T]]
+    started_at: float
+    finished_at: float
+    critical_path: tuple[str, ...]
+
+    @property
+    def elapsed_sec(self) -> float:
+        return max(0.0, self.finished_at - self.started_at)
+
+    @property
+    def sequential_sec(self) -> float:
+        """Time the same nodes would have taken when run one after another."""
+        return sum(outcome.elapsed_sec for outcome in self.outcomes.values())
+
+    def describe_critical_path(self) -> str:
+        return " -> ".join(
+            f"{name}({self.outcomes[name].elapsed_sec:.2f}s)"
+            for name in self.critical_path
+        )
+
+
+def run_action_graph(
+    nodes: Sequence[ActionNode[T]],
+    executor: ThreadPoolExecutor,
+    *,
+    timeout_grace_sec: float = DEFAULT_TIMEOUT_GRACE_SEC,
+) -> GraphRun[T]:
+    by_name = {node.name: node for node in nodes}
+    if len(by_name) != len(nodes):
+        raise ValueError("action names must be unique")
+    order = _topological_order(nodes, by_name)
+
+    started_at = time.monotonic()
+    futures: dict[str, Future[NodeOutcome[T]]] = {node.name: Future() for node in nodes}
+    waiting = {node.name: set(node.after) for node in nodes}
+    dependents: dict[str, list[str]] = {node.name: [] for node in nodes}
+    for node in nodes:
+        for dependency in node.after:
+            dependents[dependency].append(node.name)
+    lock = threading.Lock()
+
+    def launch(name: str) -> None:
+        node = by_name[name]
+
+        def task() -> None:
+            node_started = time.monotonic()
+            try:
+                result = node.run()
+                error = None
+            except Exception as exc:
+                result, error = None, str(exc) or type(exc).__name__
+            futures[name].set_result(
+                NodeOutcome(
+                    name=name,
+                    result=result,
+                    error=error,
+                    started_at=node_started,
+                    finished_at=time.monotonic(),
+                )
+            )
+
+        executor.submit(task)
+
+    def on_done(name: str) -> None:
+        ready: list[str] = []
+        with lock:
+            for dependent in dependents[name]:
+                waiting[dependent].discard(name)
+                if not waiting[dependent]:
+                    ready.append(dependent)
+        for dependent in ready:
+            launch(dependent)
+
+    for name, future in futures.items():
+        future.add_done_callback(lambda _future, name=name: on_done(name))
+    for node in nodes:
+        if not node.after:
+            launch(node.name)
+
+    # 依存元のtimeoutを積み上げた締切までに終わらなければ、そのactionは失敗扱い。
+    deadlines: dict[str, float] = {}
+    outcomes: dict[str, NodeOutcome[T]] = {}
+    for name in order:
+        node = by_name[name]
+        deadlines[name] = (
+            max((deadlines[dependency] for dependency in node.after), default=started_at)
+            + node.timeout_sec
+            + timeout_grace_sec
+        )
+        try:
+            outcomes[name] = futures[name].result(
+                timeout=max(0.0, deadlines[name] - time.monotonic())
+            )
+        except TimeoutError:
+            now = time.monotonic()
+            outcomes[name] = NodeOutcome(
+                name=name,
+                result=None,
+                error=f"timed out after {node.timeout_sec:.1f}s",
+                started_at=now,
+                finished_at=now,
+            )
+    finished_at = time.monotonic()
+    return GraphRun(
+        outcomes=outcomes,
+        started_at=started_at,
+        finished_at=finished_at,
+        critical_path=_critical_path(by_name, outcomes),
+    )
+
+
+def _topological_order(
+    nodes: Sequence[ActionNode[T]],
+    by_name: dict[str, ActionNode[T]],
+) -> list[str]:
+    order: list[str] = []
+    state: dict[str, int] = {}
+
+    def visit(name: str) -> None:
+        mark = state.get(name)
+        if mark == 2:
+            return
+        if mark == 1:
+            raise ValueError(f"action graph has a cycle at {name}")
+        state[name] = 1
+        for dependency in by_name[name].after:
+            if dependency not in by_name:
+                raise ValueError(f"{name} depends on unknown action {dependency}")
+            visit(dependency)
+        state[name] = 2
+        order.append(name)
+
+    for node in nodes:
+        visit(node.name)
+    return order
+
+
+def _critical_path(
+    by_name: dict[str, ActionNode[T]],
+    outcomes: dict[str, NodeOutcome[T]],
+) -> tuple[str, ...]:
+    if not outcomes:
+        return ()
+    # 最後に終わったnodeから、最後に終わった依存元をたどる。
+    name = max(outcomes, key=lambda key: outcomes[key].finished_at)
+    path = [name]
+    while by_name[name].after:
+        name = max(by_name[name].after, key=lambda key: outcomes[key].finished_at)
+        path.append(name)
+    return tuple(reversed(path))
@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 import signal
 import subprocess
+import wave
 from enum import Enum
 from pathlib import Path
 from typing import Protocol, Sequence
@@ -16,6 +17,36 @@ class PromptStatus(str, Enum):
     TIMED_OUT = "TIMED_OUT"
 
 
+def audio_duration_sec(audio_path: Path, *, ffprobe_bin: str = "ffprobe") -> float | None:
+    """Length of a prompt file in seconds; WAV is read directly, others via ffprobe."""
+    try:
+        with wave.open(str(audio_path), "rb") as reader:
+            return reader.getnframes() / float(reader.getframerate())
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        pass
+    try:
+        result = subprocess.run(
+            [
+                ffprobe_bin,
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "default=noprint_wrappers=1:nokey=1",
+                str(audio_path),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=5.0,
+            check=False,
+        )
+        duration = float(result.stdout.strip())
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return None
+    return duration if result.returncode == 0 and duration >= 0.0 else None
+
+
 class PromptPlayer(Protocol):
     def start(self, audio_path: Path, *, now: float) -> None: ...
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Capture latency: ``view/scripts/capture`` vs in-process ``frame_capture``.
+
+A local stand-in for go2rtc serves one synthetic camera-sized JPEG from
+``/api/frame.jpeg``; both paths fetch it, letterbox to 640x480 and save it.
+The script path needs ``curl`` and ``ffmpeg`` on PATH and is skipped
+otherwise::
+
+    python benchmarks/capture_bench.py --runs 20 --source-size 2560x1440
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+CAPTURE_SCRIPT = (
+    PYTHON_DIR.parent / "workspace" / ".codex" / "skills" / "view" / "scripts" / "capture"
+)
+
+
+def synthetic_frame(width: int, height: int) -> bytes:
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    # ノイズだけだとJPEGが極端に重くなるので、なだらかな模様に少し混ぜる。
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 12, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+def serve(frame: bytes) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(frame)))
+            self.end_headers()
+            self.wfile.write(frame)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def report(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:12} {statistics.median(latencies) * 1000:>8.1f} "
+        f"{p95 * 1000:>8.1f} {min(latencies) * 1000:>8.1f}"
+    )
+
+
+def bench_script(runs: int, port: int, media: Path) -> list[float] | None:
+    if shutil.which("curl") is None or shutil.which("ffmpeg") is None:
+        return None
+    env = {
+        **os.environ,
+        "GO2RTC_HOST": "127.0.0.1",
+        "GO2RTC_API_PORT": str(port),
+        "WORKSPACE_MEDIA": str(media),
+    }
+    latencies = []
+    for index in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [str(CAPTURE_SCRIPT), "-o", f"script_{index}.jpg"],
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def bench_inprocess(runs: int, port: int, media: Path) -> list[float]:
+    from frame_capture import CaptureSettings, FrameCapture
+
+    capture = FrameCapture(
+        CaptureSettings(host="127.0.0.1", api_port=port, media_dir=media)
+    )
+    latencies = []
+    try:
+        for index in range(runs):
+            started = time.perf_counter()
+            capture.capture(Path(f"inprocess_{index}.jpg"))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        capture.close()
+    return latencies
+
+
+def main() -> int:
+    sys.path.insert(0, str(PYTHON_DIR))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--source-size", default="2560x1440")
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.source_size.lower().split("x"))
+
+    frame = synthetic_frame(width, height)
+    server = serve(frame)
+    port = server.server_address[1]
+    print(f"source {width}x{height} jpeg={len(frame) / 1024:.0f}KiB runs={args.runs}")
+    print(f"{'path':12} {'p50_ms':>8} {'p95_ms':>8} {'min_ms':>8}")
+    try:
+        with tempfile.TemporaryDirectory(prefix="capture-bench-") as tmp:
+            media = Path(tmp)
+            script = bench_script(args.runs, port, media)
+            if script is None:
+                print(f"{'script':12} skipped (curl and ffmpeg are required)")
+            else:
+                report("script", script)
+            report("in-process", bench_inprocess(args.runs, port, media))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
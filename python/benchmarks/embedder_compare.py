@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Compare SBERT Router embedder backends (torch vs ONNX).
+
+Each backend runs in its own interpreter so load time and RSS are not
+polluted by the other one::
+
+    python benchmarks/embedder_compare.py --backends torch onnx --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+
+# (発話, 期待flags)。既定templateで判定できる代表的な言い回し。
+LABELED_QUERIES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("右を向いて", ("move_camera_right",)),
+    ("カメラを左に向けて", ("move_camera_left",)),
+    ("ちょっと上を向いて", ("move_camera_up",)),
+    ("下に向けてくれる", ("move_camera_down",)),
+    ("カメラを初期化して", ("move_camera_calibrate",)),
+    ("今何が見える", ("capture_image",)),
+    ("目の前の様子を教えて", ("capture_image",)),
+    ("右を向いて何が見える", ("move_camera_right", "capture_image")),
+    ("前に話したことをまとめて", ("recall_memory",)),
+    ("前に言ったっけ", ("recall_memory",)),
+    ("今日はいい天気だね", ()),
+    ("おはよう", ()),
+)
+
+
+def _percentile(values: list[float], ratio: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(ratio * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_worker(backend: str, repeat: int) -> dict[str, object]:
+    sys.path.insert(0, str(PYTHON_DIR))
+    from intent_router import (
+        IntentRouter,
+        RouterSettings,
+        build_embedder,
+        build_intents_from_env,
+    )
+    from stt_manager import read_rss_mb
+
+    rss_before = read_rss_mb() or 0.0
+    settings = replace(
+        RouterSettings.from_env(),
+        enabled=True,
+        dry_run=True,
+        backend=backend,
+        embedding_cache=False,
+    )
+    started = time.perf_counter()
+    embedder = build_embedder(settings)
+    load_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    router = IntentRouter(settings, build_intents_from_env(settings), embedder)
+    templates_sec = time.perf_counter() - started
+
+    router.route("ウォームアップ")
+    latencies: list[float] = []
+    decisions: dict[str, list[str]] = {}
+    correct = 0
+    for text, expected in LABELED_QUERIES:
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            decision = router.route(text)
+            latencies.append(time.perf_counter() - started)
+        decisions[text] = list(decision.flags)
+        correct += tuple(decision.flags) == expected
+    return {
+        "backend": backend,
+        "load_ms": round(load_sec * 1000.0, 1),
+        "template_encode_ms": round(templates_sec * 1000.0, 1),
+        "rss_mb": round((read_rss_mb() or 0.0) - rss_before, 1),
+        "route_p50_ms": round(statistics.median(latencies) * 1000.0, 2),
+        "route_p95_ms": round(_percentile(latencies, 0.95) * 1000.0, 2),
+        "accuracy": round(correct / len(LABELED_QUERIES), 3),
+        "decisions": decisions,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--repeat", type=int, default=10, help="routes per query")
+    parser.add_argument("--worker", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.repeat), ensure_ascii=False))
+        return 0
+
+    results: list[dict[str, object]] = []
+    for backend in args.backends:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--worker",
+                backend,
+                "--repeat",
+                str(args.repeat),
+            ],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+            check=False,
+        )
+        if completed.returncode != 0:
+            tail = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{backend}: failed: {tail}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(
+        f"{'backend':8} {'load_ms':>9} {'tmpl_ms':>9} {'rss_mb':>8} "
+        f"{'p50_ms':>8} {'p95_ms':>8} {'accuracy':>9}"
+    )
+    for result in results:
+        print(
+            f"{result['backend']:8} {result['load_ms']:>9} "
+            f"{result['template_encode_ms']:>9} {result['rss_mb']:>8} "
+            f"{result['route_p50_ms']:>8} {result['route_p95_ms']:>8} "
+            f"{result['accuracy']:>9}"
+        )
+    if len(results) >= 2:
+        base = results[0]["decisions"]
+        for other in results[1:]:
+            agree = sum(
+                base[text] == other["decisions"][text]  # type: ignore[index]
+                for text, _ in LABELED_QUERIES
+            )
+            print(
+                f"flag agreement {results[0]['backend']} vs {other['backend']}: "
+                f"{agree}/{len(LABELED_QUERIES)}"
+            )
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
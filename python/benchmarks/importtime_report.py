@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Cold import time report for listend entry points.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+summarises the slowest imports::
+
+    python benchmarks/importtime_report.py listend intent_router --top 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = (
+    "torch",
+    "faster_whisper",
+    "silero_vad",
+    "sentence_transformers",
+    "transformers",
+    "onnxruntime",
+)
+
+_LINE_RE = re.compile(
+    r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<name>.*)$"
+)
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+@dataclass(frozen=True)
+class ImportReport:
+    entry: str
+    total_ms: float
+    module_count: int
+    heavy_modules: tuple[str, ...]
+    slowest: tuple[ImportRecord, ...]
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """Parse ``-X importtime`` output; the header and other lines are ignored."""
+    records: list[ImportRecord] = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match is None:
+            continue
+        raw_name = match.group("name")
+        name = raw_name.lstrip()
+        # 先頭の1空白は区切り、以降2空白ごとにネストが1段深くなる。
+        depth = max(0, (len(raw_name) - len(name) - 1) // 2)
+        records.append(
+            ImportRecord(
+                module=name,
+                depth=depth,
+                self_us=int(match.group("self")),
+                cumulative_us=int(match.group("cumulative")),
+            )
+        )
+    return records
+
+
+def build_report(entry: str, records: list[ImportRecord], *, top: int) -> ImportReport:
+    entry_records = [
+        record for record in records if record.module == entry and record.depth == 0
+    ]
+    total_us = entry_records[-1].cumulative_us if entry_records else 0
+    imported = {record.module for record in records}
+    heavy = tuple(
+        module
+        for module in HEAVY_MODULES
+        if module in imported
+    )
+    slowest = tuple(
+        sorted(
+            (record for record in records if record.module != entry),
+            key=lambda record: record.cumulative_us,
+            reverse=True,
+        )[: max(0, top)]
+    )
+    return ImportReport(
+        entry=entry,
+        total_ms=total_us / 1000.0,
+        module_count=len(imported),
+        heavy_modules=heavy,
+        slowest=slowest,
+    )
+
+
+def measure(entry: str, *, top: int = 10, python: str = sys.executable) -> ImportReport:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (str(PYTHON_DIR), env.get("PYTHONPATH", "")) if path
+    )
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=PYTHON_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        tail = completed.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {entry} failed: {tail[0]}")
+    return build_report(entry, parse_importtime(completed.stderr), top=top)
+
+
+def format_report(report: ImportReport) -> str:
+    lines = [
+        f"{report.entry}: total_ms={report.total_ms:.1f} modules={report.module_count} "
+        f"heavy={','.join(report.heavy_modules) or '-'}"
+    ]
+    for record in report.slowest:
+        lines.append(
+            f"  {record.cumulative_us / 1000.0:8.1f} ms  "
+            f"(self {record.self_us / 1000.0:6.1f} ms)  "
+            f"{'  ' * record.depth}{record.module}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["listend", "intent_router"])
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="fail above this")
+    parser.add_argument("--json", action="store_true", help="emit JSON")
+    args = parser.parse_args()
+
+    reports = [measure(module, top=args.top) for module in args.modules]
+    if args.json:
+        print(
+            json.dumps(
+                [asdict(report) for report in reports],
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+    else:
+        print("\n\n".join(format_report(report) for report in reports))
+
+    if args.budget_ms > 0:
+        over = [report for report in reports if report.total_ms > args.budget_ms]
+        for report in over:
+            print(
+                f"over budget: {report.entry} {report.total_ms:.1f}ms > "
+                f"{args.budget_ms:.1f}ms",
+                file=sys.stderr,
+            )
+        return 1 if over else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
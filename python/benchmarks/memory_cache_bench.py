@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""recall_memory latency: SemanticMemory API vs ``memory_cache`` read-through.
+
+The SemanticMemory container is replaced by the stub server used by the tests,
+sleeping ``--rtt-ms`` per request to stand in for its CPU query embedding and
+search. A synthetic workload asks about a pool of remembered facts, with
+``--repeat`` of the queries going back to a fact that was already recalled
+once. Both paths answer the same queries; the cached path fills the index from
+the remote responses exactly as listend does (outside the timed section, since
+listend fills it in the background).
+
+Embeddings come from a character-bigram hash by default so the script runs
+anywhere; ``--sbert`` uses the Router model configured in the environment
+(``YATAGARASU_SBERT_*``), which is what the hit rate should be judged on::
+
+    python benchmarks/memory_cache_bench.py --queries 200 --rtt-ms 80
+    python benchmarks/memory_cache_bench.py --sbert --min-score 0.85
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+
+SUBJECTS = ("飼い猫", "母", "会社の上司", "自転車", "実家", "友人の田中", "車", "妹")
+ATTRIBUTES = ("名前", "誕生日", "好きな食べ物", "色", "住所", "趣味")
+VALUES = ("ミケ", "三月三日", "鮭の塩焼き", "青", "横浜", "将棋", "ポチ", "十月", "カレー", "赤")
+QUESTIONS = ("{subject}の{attribute}は何だっけ", "{subject}の{attribute}を覚えてる？")
+
+
+class BigramEncoder:
+    """Deterministic stand-in for the SBERT model (no torch required)."""
+
+    def encode(self, texts):
+        import numpy as np
+
+        rows = np.zeros((len(texts), 256), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = text.split(": ", 1)[-1]
+            for pair in zip(text, text[1:]):
+                rows[row, zlib.crc32("".join(pair).encode("utf-8")) % 256] += 1.0
+        return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-6)
+
+
+def workload(queries: int, repeat: float, seed: int) -> list[tuple[str, str]]:
+    """(query, document that answers it) pairs."""
+    rng = random.Random(seed)
+    facts = [
+        f"{subject}の{attribute}は{VALUES[(index * 7 + offset) % len(VALUES)]}"
+        for index, subject in enumerate(SUBJECTS)
+        for offset, attribute in enumerate(ATTRIBUTES)
+    ]
+    rng.shuffle(facts)
+    asked: list[str] = []
+    pairs = []
+    for _ in range(queries):
+        fresh = [fact for fact in facts if fact not in asked]
+        if asked and (rng.random() < repeat or not fresh):
+            fact = rng.choice(asked)
+        else:
+            fact = fresh[0]
+            asked.append(fact)
+        subject, rest = fact.split("の", 1)
+        attribute = rest.split("は", 1)[0]
+        question = rng.choice(QUESTIONS).format(subject=subject, attribute=attribute)
+        pairs.append((question, fact))
+    return pairs
+
+
+def answer(server, document: str) -> None:
+    server.responses["/api/mcp/recall_memory"] = [
+        (
+            200,
+            {
+                "status": "success",
+                "count": 1,
+                "memories": [{"document": document, "score": 0.9}],
+            },
+        )
+    ]
+
+
+def report(label: str, latencies: list[float]) -> None:
+    if not latencies:
+        print(f"{label:12} {'-':>8} {'-':>8} {'-':>8}")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:12} {statistics.median(latencies) * 1000:>8.2f} "
+        f"{p95 * 1000:>8.2f} {statistics.mean(latencies) * 1000:>8.2f}"
+    )
+
+
+def main() -> int:
+    sys.path.insert(0, str(PYTHON_DIR))
+    sys.path.insert(0, str(PYTHON_DIR / "tests"))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=float, default=0.6)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--sbert", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from memory_cache import DEFAULT_MIN_SCORE, MemoryVectorCache, memory_documents
+    from memory_stub import MemoryServer
+    from semantic_memory import MemorySettings, SemanticMemoryClient
+
+    if args.sbert:
+        from intent_router import IntentRouter
+
+        encoder = IntentRouter.from_env()
+        if encoder is None:
+            print("SBERT Router is disabled or has no templates", file=sys.stderr)
+            return 1
+        model = encoder.settings.model_name
+        min_score = DEFAULT_MIN_SCORE if args.min_score is None else args.min_score
+    else:
+        encoder = BigramEncoder()
+        model = "bigram"
+        # bigram は言い換えでスコアが大きく下がるので、既定の閾値では殆ど当たらない。
+        min_score = 0.6 if args.min_score is None else args.min_score
+
+    pairs = workload(args.queries, args.repeat, args.seed)
+    server = MemoryServer()
+    server.delay_sec = args.rtt_ms / 1000.0
+    client = SemanticMemoryClient(MemorySettings(api_url=server.api_url, timeout_sec=10.0))
+    remote: list[float] = []
+    cached: list[float] = []
+    hit_latencies: list[float] = []
+    hits = correct = 0
+    try:
+        for question, document in pairs:
+            answer(server, document)
+            started = time.perf_counter()
+            client.recall(question)
+            remote.append(time.perf_counter() - started)
+
+        with tempfile.TemporaryDirectory(prefix="memory-cache-bench-") as tmp:
+            cache = MemoryVectorCache(
+                Path(tmp), encoder, model_name=model, revision="bench", min_score=min_score
+            )
+            for question, document in pairs:
+                answer(server, document)
+                started = time.perf_counter()
+                local = cache.lookup(question)
+                if local is None:
+                    recalled = client.recall(question)
+                    cached.append(time.perf_counter() - started)
+                    cache.add(memory_documents(recalled.payload), source="recall")
+                    continue
+                elapsed = time.perf_counter() - started
+                cached.append(elapsed)
+                hit_latencies.append(elapsed)
+                hits += 1
+                correct += local.memories[0][0] == document
+    finally:
+        client.close()
+        server.close()
+
+    repeats = sum(
+        1 for index, (_, document) in enumerate(pairs)
+        if any(document == earlier for _, earlier in pairs[:index])
+    )
+    print(
+        f"encoder={model} queries={len(pairs)} repeats={repeats} "
+        f"rtt={args.rtt_ms:.0f}ms min_score={min_score:.2f}"
+    )
+    print(
+        f"hit_rate={hits / len(pairs):.1%} (of repeats {hits / max(1, repeats):.1%}) "
+        f"hit_precision={correct / max(1, hits):.1%}"
+    )
+    print(f"{'path':12} {'p50_ms':>8} {'p95_ms':>8} {'mean_ms':>8}")
+    report("remote", remote)
+    report("cached", cached)
+    report("cache-hit", hit_latencies)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Command latency of the pytapo worker vs the in-process ONVIF backend.
+
+Both paths run locally without a camera: the pytapo worker is started with a
+fake ``pytapo`` module and the ONVIF client talks to the stub SOAP server used
+by the tests, so the numbers isolate the process hop, JSON/SOAP framing and
+startup cost. Add ``--rtt-ms`` to simulate the camera's network round trip on
+both sides::
+
+    python benchmarks/ptz_backend_bench.py --moves 50 --rtt-ms 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+
+FAKE_PYTAPO_DELAY = """
+import os, time
+
+class Tapo:
+    def __init__(self, host, user, password):
+        time.sleep(float(os.environ.get("FAKE_TAPO_RTT_SEC", "0")))
+
+    def moveMotor(self, x, y):
+        time.sleep(float(os.environ.get("FAKE_TAPO_RTT_SEC", "0")))
+        return {"error_code": 0}
+
+    def calibrateMotor(self):
+        return {"error_code": 0}
+"""
+
+
+def rss_kb(pid: int) -> int | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def summarize(label: str, startup_sec: float, latencies: list[float], rss: int | None) -> None:
+    p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+    rss_text = f"{rss / 1024:.1f}" if rss is not None else "-"
+    print(
+        f"{label:8} {startup_sec * 1000:>10.1f} "
+        f"{statistics.median(latencies) * 1000:>8.2f} {p95 * 1000:>8.2f} {rss_text:>11}"
+    )
+
+
+def bench_pytapo(moves: int, rtt_sec: float, workdir: Path) -> None:
+    from listend import PtzWorker
+
+    package = workdir / "site" / "pytapo"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text(FAKE_PYTAPO_DELAY, encoding="utf-8")
+    os.environ["PYTHONPATH"] = str(package.parent)
+    os.environ["FAKE_TAPO_RTT_SEC"] = str(rtt_sec)
+    os.environ.setdefault("TAPO_PASSWORD", "bench")
+
+    worker = PtzWorker(workdir, workdir)
+    worker.python = Path(sys.executable)
+    worker.script = (
+        PYTHON_DIR.parent
+        / "workspace"
+        / ".codex"
+        / "skills"
+        / "move-camera"
+        / "scripts"
+        / "ptz_worker"
+    )
+    try:
+        started = time.perf_counter()
+        worker.start(10.0)
+        startup = time.perf_counter() - started
+        latencies = []
+        for index in range(moves):
+            action = "move_camera_right" if index % 2 else "move_camera_left"
+            started = time.perf_counter()
+            worker.execute(action, 10.0)
+            latencies.append(time.perf_counter() - started)
+        rss = rss_kb(worker.proc.pid) if worker.proc is not None else None
+    finally:
+        worker.stop()
+    summarize("pytapo", startup, latencies, rss)
+
+
+def bench_onvif(moves: int, rtt_sec: float) -> None:
+    from onvif_ptz import OnvifPtzClient, OnvifSettings
+    from onvif_stub import StubOnvifServer
+
+    class DelayedStub(StubOnvifServer):
+        def respond(self, root):
+            time.sleep(rtt_sec)
+            return super().respond(root)
+
+    with DelayedStub() as server:
+        client = OnvifPtzClient(
+            OnvifSettings(url=server.url, username="camera", password="secret")
+        )
+        try:
+            started = time.perf_counter()
+            client.connect()
+            startup = time.perf_counter() - started
+            latencies = []
+            for index in range(moves):
+                started = time.perf_counter()
+                client.move(45 if index % 2 else -45, 0)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            client.close()
+    # in-processなので追加の常駐プロセスは無い。
+    summarize("onvif", startup, latencies, 0)
+
+
+def main() -> int:
+    sys.path.insert(0, str(PYTHON_DIR))
+    sys.path.insert(0, str(PYTHON_DIR / "tests"))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--moves", type=int, default=30)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    rtt_sec = args.rtt_ms / 1000.0
+
+    print(f"{'backend':8} {'startup_ms':>10} {'p50_ms':>8} {'p95_ms':>8} {'extra_rss_mb':>11}")
+    with tempfile.TemporaryDirectory(prefix="ptz-bench-") as tmp:
+        bench_pytapo(args.moves, rtt_sec, Path(tmp))
+    bench_onvif(args.moves, rtt_sec)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
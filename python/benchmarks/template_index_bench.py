@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Recall vs latency of the SBERT Router template indexes.
+
+Uses synthetic clustered, normalised embeddings so large catalogues can be
+measured without loading a model::
+
+    python benchmarks/template_index_bench.py --sizes 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+
+
+def synthetic_templates(
+    count: int,
+    *,
+    dim: int,
+    clusters: int,
+    seed: int,
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    rows = centers[rng.integers(0, clusters, size=count)] + 0.35 * rng.normal(
+        size=(count, dim)
+    )
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def measure(index, queries: np.ndarray) -> tuple[list[float], list[np.ndarray]]:
+    latencies: list[float] = []
+    results: list[np.ndarray] = []
+    for query in queries:
+        started = time.perf_counter()
+        scores = index.scores(query)
+        latencies.append(time.perf_counter() - started)
+        results.append(scores)
+    return latencies, results
+
+
+def recall(exact: list[np.ndarray], approx: list[np.ndarray], threshold: float) -> tuple[float, float]:
+    top1 = sum(
+        int(np.argmax(a)) == int(np.argmax(e)) for e, a in zip(exact, approx)
+    ) / max(1, len(exact))
+    wanted = found = 0
+    for e, a in zip(exact, approx):
+        above = e >= threshold
+        wanted += int(above.sum())
+        found += int((above & (a >= threshold)).sum())
+    return top1, (found / wanted if wanted else 1.0)
+
+
+def main() -> int:
+    sys.path.insert(0, str(PYTHON_DIR))
+    from template_index import ExactTemplateIndex, IvfTemplateIndex
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[4, 8, 16, 32])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    print(
+        f"{'templates':>9} {'index':10} {'build_ms':>9} {'p50_ms':>8} "
+        f"{'p95_ms':>8} {'top1':>6} {'thr_recall':>10}"
+    )
+    for size in args.sizes:
+        templates = synthetic_templates(
+            size, dim=args.dim, clusters=max(8, size // 50), seed=size
+        )
+        keys = [f"t{row}" for row in range(size)]
+        rng = np.random.default_rng(size + 1)
+        picks = templates[rng.integers(0, size, size=args.queries)]
+        queries = picks + 0.05 * rng.normal(size=picks.shape)
+        queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(
+            np.float32
+        )
+
+        exact = ExactTemplateIndex(keys, templates)
+        exact_latency, exact_scores = measure(exact, queries)
+        print(
+            f"{size:>9} {'exact':10} {0.0:>9.1f} "
+            f"{statistics.median(exact_latency) * 1000:>8.3f} "
+            f"{np.percentile(exact_latency, 95) * 1000:>8.3f} {1.0:>6.3f} {1.0:>10.3f}"
+        )
+        started = time.perf_counter()
+        ivf = IvfTemplateIndex(keys, templates)
+        build_ms = (time.perf_counter() - started) * 1000
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            latency, scores = measure(ivf, queries)
+            top1, thr_recall = recall(exact_scores, scores, args.threshold)
+            print(
+                f"{size:>9} {f'ivf/{nprobe}':10} {build_ms:>9.1f} "
+                f"{statistics.median(latency) * 1000:>8.3f} "
+                f"{np.percentile(latency, 95) * 1000:>8.3f} "
+                f"{top1:>6.3f} {thr_recall:>10.3f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
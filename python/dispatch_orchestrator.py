@@ -0,0 +1,929 @@
+#!/usr/bin/env python3
+"""One conversation turn in-process: memory, agent CLI, speech, memory save.
+
+``bin/yatagarasu`` re-parses ``.env`` with ``sed`` on every turn, resolves the
+agent CLI with ``command -v`` and an nvm glob, then runs
+``recall-context.sh``, the agent, ``zunda | tapovoice`` and ``memorize.sh``
+strictly one after another, and nothing reports where the time went.
+``DispatchOrchestrator`` runs the same stages with the same prompt and
+arguments, but:
+
+- engine resolution is cached per (engine, PATH, HOME)
+- SemanticMemory and VOICEVOX go over pooled keep-alive connections
+- the memory context is fetched while the engine is resolved, and the
+  conversation is saved (or spooled) while the reply is being spoken
+- every turn returns per-stage timings and logs them on one line
+- with ``YATAGARASU_TTS_STREAMING=true``, codex (``--json``) and claude
+  (``--output-format stream-json``) replies are read as they are generated
+  and spoken sentence by sentence; time-to-first-audio is reported apart
+  from the total. opencode has no event stream and is spoken as a whole
+
+listend uses it with ``LISTEND_DISPATCH_MODE=inprocess``. ``bin/yatagarasu``
+stays the default and the compatibility path for other callers. As a CLI it
+takes the same options as ``bin/yatagarasu``::
+
+    python dispatch_orchestrator.py "今日の天気は？"
+    echo "こんにちは" | python dispatch_orchestrator.py -e claude -m sonnet --timings
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterator, Mapping
+
+from memory_spool import MemorySpool, resolve_spool_path
+from semantic_memory import (
+    MemorySettings,
+    SemanticMemoryClient,
+    SemanticMemoryError,
+    load_env_file,
+)
+from speech_output import (
+    SentenceSplitter,
+    SpeechError,
+    VoicevoxClient,
+    VoiceSettings,
+    concat_wav,
+    play_wav,
+    split_phrases,
+    wav_duration,
+)
+
+
+ENGINES = ("codex", "claude", "opencode")
+STREAMING_ENGINES = ("codex", "claude")
+CODEX_REASONING_EFFORTS = ("low", "medium", "high", "xhigh")
+CLAUDE_MODEL_NAMES = ("haiku", "sonnet", "opus")
+DEFAULT_AGENT_TIMEOUT_SEC = 180.0
+DEFAULT_PLAYBACK_TIMEOUT_SEC = 30.0
+MEMORY_CONTEXT_PREAMBLE = (
+    "以下は過去の会話の記憶と関連知識です。"
+    "これらを参考にしつつ、現在のプロンプトに応答してください。"
+)
+# bin/yatagarasu が子プロセスに渡さない変数（listendからの受け渡し専用）。
+_HANDOFF_ENV = (
+    "YATAGARASU_MEMORY_PROMPT",
+    "YATAGARASU_SKIP_MEMORY_RECALL",
+    "YATAGARASU_MEMORY_CONTEXT_FILE",
+)
+
+
+class DispatchError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class DispatchSettings:
+    cwd: Path
+    bin_dir: Path
+    engine: str = "auto"
+    model: str = ""
+    codex_model: str = ""
+    codex_profile: str = ""
+    codex_reasoning_effort: str = ""
+    codex_bypass_sandbox: bool = False
+    speaker: str = "68"
+    memory_enabled: bool = True
+    tts_streaming: bool = False
+    timeout_sec: float = DEFAULT_AGENT_TIMEOUT_SEC
+    playback_timeout_sec: float = DEFAULT_PLAYBACK_TIMEOUT_SEC
+
+    @classmethod
+    def from_env(cls, cwd: Path | None = None) -> "DispatchSettings":
+        """Same variables and defaults as ``bin/yatagarasu``."""
+        workspace = os.getenv("YATAGARASU_CWD", "").strip()
+        return cls(
+            cwd=cwd or (Path(workspace) if workspace else Path.cwd()),
+            bin_dir=Path(__file__).resolve().parents[1] / "bin",
+            engine=os.getenv("YATAGARASU_ENGINE", "").strip() or "auto",
+            model=os.getenv("YATAGARASU_MODEL", "").strip(),
+            codex_model=os.getenv("YATAGARASU_CODEX_MODEL", "").strip(),
+            codex_profile=os.getenv("YATAGARASU_CODEX_PROFILE", "").strip(),
+            codex_reasoning_effort=os.getenv("YATAGARASU_CODEX_REASONING_EFFORT", "").strip(),
+            # bin/yatagarasu と同じく "false" 以外はバイパス扱い。
+            codex_bypass_sandbox=os.getenv("YATAGARASU_CODEX_BYPASS_SANDBOX", "false").strip()
+            != "false",
+            speaker=os.getenv("SPEAKER_ID", "").strip() or "68",
+            memory_enabled=os.getenv("YATAGARASU_MEMORY_ENABLED", "true").strip() == "true",
+            tts_streaming=os.getenv("YATAGARASU_TTS_STREAMING", "false").strip() == "true",
+        )
+
+    @property
+    def zunda_cmd(self) -> Path:
+        return self.bin_dir / "zunda"
+
+    @property
+    def tapovoice_cmd(self) -> Path:
+        return self.bin_dir / "tapovoice"
+
+
+@dataclass(frozen=True)
+class DispatchRequest:
+    prompt: str
+    # Routerが制御プロンプトへ変換した場合も、記憶の検索と保存には元の発話を使う。
+    memory_prompt: str = ""
+    skip_memory_recall: bool = False
+    # listendが先行取得した記憶コンテキスト（YAML）。Noneなら自分で取得する。
+    memory_context: str | None = None
+
+
+@dataclass(frozen=True)
+class DispatchResult:
+    ok: bool
+    response: str
+    engine: str
+    stages: dict[str, float]
+    total_sec: float
+    error: str = ""
+    # bin/yatagarasu が YATAGARASU_MEMORY_WARNING: として出していた警告。
+    memory_warnings: tuple[str, ...] = ()
+    # ターン開始から最初の音声を tapovoice に渡すまで。発話しなかった場合は None。
+    first_audio_sec: float | None = None
+    streamed: bool = False
+
+    def format_stages(self) -> str:
+        stages = " ".join(
+            f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.stages.items()
+        )
+        if self.first_audio_sec is None:
+            return stages
+        return f"first_audio={self.first_audio_sec * 1000:.0f}ms {stages}"
+
+    def to_json_dict(self) -> dict[str, object]:
+        return {
+            "ok": self.ok,
+            "engine": self.engine,
+            "total_ms": round(self.total_sec * 1000),
+            "first_audio_ms": (
+                None if self.first_audio_sec is None else round(self.first_audio_sec * 1000)
+            ),
+            "streamed": self.streamed,
+            "stages_ms": {name: round(elapsed * 1000) for name, elapsed in self.stages.items()},
+            "error": self.error,
+            "memory_warnings": list(self.memory_warnings),
+        }
+
+
+@dataclass
+class StageTimer:
+    started: float = field(default_factory=time.monotonic)
+    stages: dict[str, float] = field(default_factory=dict)
+    first_audio: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def mark_first_audio(self) -> None:
+        with self._lock:
+            if self.first_audio is None:
+                self.first_audio = time.monotonic() - self.started
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+@dataclass(frozen=True)
+class AgentEngine:
+    name: str
+    path: Path
+
+
+def search_path(env: Mapping[str, str]) -> str:
+    """PATH with ``~/.local/bin`` in front, as ``bin/yatagarasu`` exports it."""
+    path = env.get("PATH", "")
+    local_bin = f"{env.get('HOME', '')}/.local/bin"
+    if os.path.isdir(local_bin) and local_bin not in path.split(os.pathsep):
+        path = f"{local_bin}{os.pathsep}{path}"
+    return path
+
+
+@functools.lru_cache(maxsize=16)
+def resolve_engine(engine: str, path: str, home: str) -> AgentEngine:
+    if engine != "auto" and engine not in ENGINES:
+        raise DispatchError(f"未対応のエンジンです: {engine}")
+    for name in ENGINES if engine == "auto" else (engine,):
+        found = shutil.which(name, path=path)
+        if found:
+            return AgentEngine(name, Path(found))
+        if name == "codex" and home:
+            for candidate in sorted(Path(home).glob(".nvm/versions/node/*/bin/codex")):
+                if os.access(candidate, os.X_OK):
+                    return AgentEngine(name, candidate)
+    if engine == "auto":
+        raise DispatchError("codex / claude / opencode のいずれも見つかりません。")
+    raise DispatchError(f"{engine} コマンドが見つかりません。")
+
+
+def agent_env(
+    settings: DispatchSettings, engine: AgentEngine, base: Mapping[str, str]
+) -> dict[str, str]:
+    env = {key: value for key, value in base.items() if key not in _HANDOFF_ENV}
+    env["YATAGARASU_CWD"] = str(settings.cwd)
+    path = search_path(base)
+    # nvm配下で見つけたcodexは、node本体も同じディレクトリから引けるようにする。
+    if str(engine.path.parent) not in path.split(os.pathsep):
+        path = f"{engine.path.parent}{os.pathsep}{path}"
+    env["PATH"] = path
+    env.setdefault(
+        "UV_CACHE_DIR", f"{base.get('TMPDIR') or '/tmp'}/yatagarasu-uv-cache"
+    )
+    return env
+
+
+def build_prompt(prompt: str, memory_context: str) -> str:
+    context = memory_context.rstrip("\n")
+    if not context.strip():
+        return prompt
+    return f"\n{MEMORY_CONTEXT_PREAMBLE}\n\n{context}\n\n---\n現在のプロンプト: {prompt}"
+
+
+def agent_argv(
+    settings: DispatchSettings,
+    engine: AgentEngine,
+    prompt: str,
+    output_file: Path | None = None,
+    *,
+    stream: bool = False,
+) -> tuple[list[str], list[str]]:
+    """(argv, warnings) for one agent run; codex writes its reply to ``output_file``.
+
+    ``stream`` asks codex/claude for JSON Lines events on stdout (see ``AgentStream``).
+    """
+    warnings: list[str] = []
+    if engine.name == "claude":
+        argv = [
+            str(engine.path),
+            "-p",
+            prompt,
+            "--model",
+            settings.model or "haiku",
+            "--allowedTools",
+            "Read,Edit,Bash",
+            "--permission-mode",
+            "bypassPermissions",
+        ]
+        if stream:
+            # print モードの stream-json は --verbose が必須。途中の文字列は partial message で届く。
+            argv += ["--output-format", "stream-json", "--verbose", "--include-partial-messages"]
+        return argv, warnings
+    if engine.name == "opencode":
+        return [str(engine.path), "run", prompt], warnings
+
+    codex_model = settings.codex_model
+    if not codex_model and settings.model:
+        if settings.model in CLAUDE_MODEL_NAMES:
+            warnings.append(
+                f"Codex CLIではClaudeモデル名 '{settings.model}' を使わず、"
+                "Codex CLIの既定モデルを使用します。"
+            )
+        else:
+            codex_model = settings.model
+    argv = [str(engine.path), "exec", "-C", str(settings.cwd)]
+    if settings.codex_bypass_sandbox:
+        argv.append("--dangerously-bypass-approvals-and-sandbox")
+    else:
+        argv += ["--sandbox", "workspace-write"]
+    argv += ["--color", "never"]
+    if settings.codex_profile:
+        argv += ["--profile", settings.codex_profile]
+    effort = settings.codex_reasoning_effort
+    if effort in CODEX_REASONING_EFFORTS:
+        argv += ["-c", f'model_reasoning_effort="{effort}"']
+    elif effort:
+        warnings.append(f"未対応のCodex推論強度 '{effort}' は無視します。")
+    if codex_model:
+        argv += ["-m", codex_model]
+    if stream:
+        argv.append("--json")
+    if output_file is not None:
+        argv += ["-o", str(output_file)]
+    argv.append(prompt)
+    return argv, warnings
+
+
+class AgentStream:
+    """Reply text from ``codex exec --json`` / ``claude -p --output-format stream-json`` lines.
+
+    ``feed`` returns the text that became speakable with that line. Delta
+    events are used when the CLI sends them; a completed message is only
+    used when no delta of it was seen, so nothing is spoken twice.
+    """
+
+    def __init__(self, engine: str) -> None:
+        self.engine = engine
+        self.final = ""
+        self.error = ""
+        self._parts: list[str] = []
+        self._in_delta = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts).strip()
+
+    def feed(self, line: str) -> str:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return ""
+        if not isinstance(event, dict):
+            return ""
+        if self.engine == "claude":
+            return self._claude(event)
+        return self._codex(event)
+
+    def _codex(self, event: dict) -> str:
+        item = event.get("item")
+        if event.get("type") == "item.completed" and isinstance(item, dict):
+            if item.get("type") == "agent_message":
+                return self._message(item.get("text"))
+            return ""
+        # 旧形式の codex exec --json: {"msg": {"type": "agent_message_delta", ...}}
+        msg = event.get("msg")
+        if not isinstance(msg, dict):
+            return ""
+        if msg.get("type") == "agent_message_delta":
+            return self._delta(msg.get("delta"))
+        if msg.get("type") == "agent_message":
+            return self._message(msg.get("message"))
+        if msg.get("type") == "error":
+            self.error = str(msg.get("message") or "")
+        return ""
+
+    def _claude(self, event: dict) -> str:
+        kind = event.get("type")
+        if kind == "stream_event":
+            inner = event.get("event")
+            if not isinstance(inner, dict):
+                return ""
+            delta = inner.get("delta")
+            if inner.get("type") == "content_block_delta" and isinstance(delta, dict):
+                if delta.get("type") == "text_delta":
+                    return self._delta(delta.get("text"))
+            return ""
+        if kind == "assistant":
+            message = event.get("message")
+            content = message.get("content") if isinstance(message, dict) else None
+            if not isinstance(content, list):
+                return ""
+            text = "".join(
+                block.get("text", "")
+                for block in content
+                if isinstance(block, dict) and block.get("type") == "text"
+            )
+            return self._message(text)
+        if kind == "result":
+            if event.get("is_error"):
+                self.error = str(event.get("result") or event.get("subtype") or "error")
+            elif isinstance(event.get("result"), str):
+                self.final = event["result"].strip()
+        return ""
+
+    def _delta(self, text: object) -> str:
+        if not isinstance(text, str) or not text:
+            return ""
+        if not self._in_delta and self._parts:
+            text = "\n" + text
+        self._in_delta = True
+        self._parts.append(text)
+        return text
+
+    def _message(self, text: object) -> str:
+        if self._in_delta:
+            # この発言は delta で受け取り済み。次の発言との区切りだけ入れる。
+            self._in_delta = False
+            return ""
+        if not isinstance(text, str) or not text.strip():
+            return ""
+        text = text.strip()
+        if self._parts:
+            text = "\n" + text
+        self._parts.append(text)
+        return text
+
+
+class _SpeechPipeline:
+    """Synthesizes and plays sentences in order on one thread.
+
+    ``tapovoice`` returns as soon as go2rtc accepts the WAV, so the next
+    sentence is held until the previous one has finished playing (its WAV
+    duration); the following sentence is synthesized in the meantime.
+    """
+
+    def __init__(
+        self,
+        orchestrator: "DispatchOrchestrator",
+        env: dict[str, str],
+        timer: StageTimer,
+    ) -> None:
+        self._orchestrator = orchestrator
+        self._env = env
+        self._timer = timer
+        self._sentences: queue.Queue[str | None] = queue.Queue()
+        self._cancelled = threading.Event()
+        self._busy_until = 0.0
+        self.sentences = 0
+        self._thread = threading.Thread(target=self._run, name="dispatch-speech", daemon=True)
+        self._thread.start()
+
+    def say(self, sentence: str) -> None:
+        self._sentences.put(sentence)
+
+    def finish(self, *, cancel: bool = False) -> None:
+        if cancel:
+            self._cancelled.set()
+        self._sentences.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        orchestrator = self._orchestrator
+        voice = orchestrator.voice
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None or self._cancelled.is_set():
+                return
+            phrases = split_phrases(sentence)
+            try:
+                with self._timer.stage("synthesis"):
+                    audio = concat_wav(
+                        voice.synthesize_all(phrases), voice.settings.phrase_interval_sec
+                    )
+            except SpeechError as exc:
+                logging.warning("streamed synthesis failed; falling back to zunda: %s", exc)
+                self._wait_turn()
+                self._timer.mark_first_audio()
+                with self._timer.stage("playback"):
+                    orchestrator._speak_with_zunda(sentence, self._env)
+                continue
+            self._wait_turn()
+            if self._cancelled.is_set():
+                return
+            self._timer.mark_first_audio()
+            self.sentences += 1
+            try:
+                with self._timer.stage("playback"):
+                    play_wav(
+                        [str(orchestrator.settings.tapovoice_cmd)],
+                        audio,
+                        timeout=orchestrator.settings.playback_timeout_sec,
+                    )
+            except SpeechError as exc:
+                logging.warning("dispatch playback failed: %s", exc)
+                continue
+            self._busy_until = time.monotonic() + wav_duration(audio)
+
+    def _wait_turn(self) -> None:
+        remaining = self._busy_until - time.monotonic()
+        if remaining > 0:
+            self._cancelled.wait(remaining)
+
+
+class DispatchOrchestrator:
+    """Runs turns; thread-safe, but listend only ever runs one at a time."""
+
+    def __init__(
+        self,
+        settings: DispatchSettings,
+        *,
+        memory: SemanticMemoryClient | None = None,
+        spool: MemorySpool | None = None,
+        voice: VoicevoxClient | None = None,
+    ) -> None:
+        self.settings = settings
+        self.memory = memory
+        self.spool = spool
+        self.voice = voice or VoicevoxClient(VoiceSettings.from_env(settings.speaker))
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dispatch")
+
+    def close(self) -> None:
+        """Release the VOICEVOX pool; memory clients stay with whoever passed them in."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.voice.close()
+
+    def run(self, request: DispatchRequest, env: Mapping[str, str] | None = None) -> DispatchResult:
+        timer = StageTimer()
+        memory_warnings: list[str] = []
+        base_env = dict(os.environ if env is None else env)
+        memory_prompt = request.memory_prompt or request.prompt
+        use_memory = self.settings.memory_enabled and self.memory is not None
+
+        context = ""
+        context_future: Future[str] | None = None
+        if use_memory and not request.skip_memory_recall:
+            if request.memory_context is not None:
+                context = request.memory_context
+            else:
+                context_future = self._executor.submit(self._fetch_context, memory_prompt, timer)
+
+        try:
+            with timer.stage("engine"):
+                engine = self._resolve_engine(base_env)
+        except DispatchError as exc:
+            if context_future is not None:
+                context_future.cancel()
+            return self._result(timer, False, "", "", str(exc), memory_warnings)
+
+        if context_future is not None:
+            try:
+                context = context_future.result()
+            except (SemanticMemoryError, OSError) as exc:
+                logging.warning("dispatch memory context failed: %s", exc)
+                memory_warnings.append("SemanticMemoryから会話文脈を取得できませんでした。")
+
+        env_for_agent = agent_env(self.settings, engine, base_env)
+        prompt = build_prompt(request.prompt, context)
+        speech: _SpeechPipeline | None = None
+        if self.settings.tts_streaming and engine.name in STREAMING_ENGINES:
+            speech = _SpeechPipeline(self, env_for_agent, timer)
+        try:
+            with timer.stage("agent"):
+                if speech is None:
+                    response = self._run_agent(engine, prompt, env_for_agent)
+                else:
+                    response = self._stream_agent(engine, prompt, env_for_agent, speech)
+        except DispatchError as exc:
+            if speech is not None:
+                # bin/yatagarasu と同じく、失敗したターンの続きは喋らない。
+                speech.finish(cancel=True)
+            return self._result(
+                timer, False, "", engine.name, str(exc), memory_warnings, speech is not None
+            )
+
+        save_future: Future[None] | None = None
+        if use_memory and response:
+            conversation = f"[user]{memory_prompt}\n[agent]{response}"
+            save_future = self._executor.submit(self._save, conversation, timer)
+        if speech is None:
+            self._speak(response, env_for_agent, timer)
+        else:
+            speech.finish()
+        if save_future is not None:
+            try:
+                save_future.result()
+            except (SemanticMemoryError, OSError, sqlite3.Error) as exc:
+                logging.warning("dispatch memory save failed: %s", exc)
+                memory_warnings.append("SemanticMemoryへ会話を保存できませんでした。")
+        return self._result(
+            timer, True, response, engine.name, "", memory_warnings, speech is not None
+        )
+
+    def _result(
+        self,
+        timer: StageTimer,
+        ok: bool,
+        response: str,
+        engine: str,
+        error: str,
+        memory_warnings: list[str],
+        streamed: bool = False,
+    ) -> DispatchResult:
+        result = DispatchResult(
+            ok=ok,
+            response=response,
+            engine=engine,
+            stages=dict(timer.stages),
+            total_sec=timer.elapsed(),
+            error=error,
+            memory_warnings=tuple(memory_warnings),
+            first_audio_sec=timer.first_audio,
+            streamed=streamed,
+        )
+        logging.info(
+            "dispatch stages ok=%s engine=%s streamed=%s total=%.2fs %s",
+            ok,
+            engine or "-",
+            streamed,
+            result.total_sec,
+            result.format_stages(),
+        )
+        return result
+
+    def _resolve_engine(self, env: Mapping[str, str]) -> AgentEngine:
+        engine = resolve_engine(self.settings.engine, search_path(env), env.get("HOME", ""))
+        if not os.access(engine.path, os.X_OK):
+            # CLIの更新などで消えた場合はキャッシュを捨てて探し直す。
+            resolve_engine.cache_clear()
+            engine = resolve_engine(self.settings.engine, search_path(env), env.get("HOME", ""))
+        return engine
+
+    def _fetch_context(self, query: str, timer: StageTimer) -> str:
+        assert self.memory is not None
+        with timer.stage("memory_context"):
+            return self.memory.retrieve(query).to_yaml()
+
+    def _save(self, conversation: str, timer: StageTimer) -> None:
+        with timer.stage("memory_save"):
+            if self.spool is not None:
+                self.spool.enqueue(conversation)
+            else:
+                assert self.memory is not None
+                self.memory.save(conversation)
+
+    def _run_agent(
+        self,
+        engine: AgentEngine,
+        prompt: str,
+        env: dict[str, str],
+    ) -> str:
+        output_file: Path | None = None
+        if engine.name == "codex":
+            fd, name = tempfile.mkstemp(prefix="yatagarasu-codex-", suffix=".txt")
+            os.close(fd)
+            output_file = Path(name)
+        argv, argv_warnings = agent_argv(self.settings, engine, prompt, output_file)
+        for warning in argv_warnings:
+            logging.warning("dispatch: %s", warning)
+        try:
+            result = subprocess.run(
+                argv,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                env=env,
+                cwd=self.settings.cwd,
+                timeout=self.settings.timeout_sec,
+                check=False,
+            )
+            if result.returncode != 0:
+                detail = "\n".join(
+                    result.stderr.decode("utf-8", errors="replace").splitlines()[-20:]
+                )
+                raise DispatchError(
+                    f"{engine.name} の応答生成に失敗しました rc={result.returncode}: {detail}"
+                )
+            if output_file is not None:
+                return output_file.read_text(encoding="utf-8", errors="replace").rstrip("\n")
+            return result.stdout.decode("utf-8", errors="replace").rstrip("\n")
+        except subprocess.TimeoutExpired as exc:
+            raise DispatchError(
+                f"{engine.name} の応答が {self.settings.timeout_sec:.0f}秒以内に返りませんでした"
+            ) from exc
+        except OSError as exc:
+            resolve_engine.cache_clear()
+            raise DispatchError(f"{engine.name} を起動できませんでした: {exc}") from exc
+        finally:
+            if output_file is not None:
+                output_file.unlink(missing_ok=True)
+
+    def _stream_agent(
+        self,
+        engine: AgentEngine,
+        prompt: str,
+        env: dict[str, str],
+        speech: _SpeechPipeline,
+    ) -> str:
+        """``_run_agent`` that hands every finished sentence to ``speech`` as it arrives."""
+        output_file: Path | None = None
+        if engine.name == "codex":
+            fd, name = tempfile.mkstemp(prefix="yatagarasu-codex-", suffix=".txt")
+            os.close(fd)
+            output_file = Path(name)
+        argv, argv_warnings = agent_argv(self.settings, engine, prompt, output_file, stream=True)
+        for warning in argv_warnings:
+            logging.warning("dispatch: %s", warning)
+        stream = AgentStream(engine.name)
+        splitter = SentenceSplitter()
+        timed_out = threading.Event()
+        try:
+            with tempfile.TemporaryFile() as stderr:
+                try:
+                    process = subprocess.Popen(
+                        argv,
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.PIPE,
+                        stderr=stderr,
+                        env=env,
+                        cwd=self.settings.cwd,
+                    )
+                except OSError as exc:
+                    resolve_engine.cache_clear()
+                    raise DispatchError(f"{engine.name} を起動できませんでした: {exc}") from exc
+
+                def kill() -> None:
+                    timed_out.set()
+                    process.kill()
+
+                watchdog = threading.Timer(self.settings.timeout_sec, kill)
+                watchdog.start()
+                try:
+                    assert process.stdout is not None
+                    for raw in process.stdout:
+                        text = stream.feed(raw.decode("utf-8", errors="replace"))
+                        for sentence in splitter.feed(text):
+                            speech.say(sentence)
+                    returncode = process.wait()
+                finally:
+                    watchdog.cancel()
+                    if process.poll() is None:
+                        process.kill()
+                        process.wait()
+                if timed_out.is_set():
+                    raise DispatchError(
+                        f"{engine.name} の応答が {self.settings.timeout_sec:.0f}秒以内に返りませんでした"
+                    )
+                if returncode != 0 or stream.error:
+                    stderr.seek(0)
+                    lines = stderr.read().decode("utf-8", errors="replace").splitlines()
+                    detail = "\n".join(lines[-20:]) or stream.error
+                    raise DispatchError(
+                        f"{engine.name} の応答生成に失敗しました rc={returncode}: {detail}"
+                    )
+            response = stream.text
+            if not response:
+                # イベントに本文が無かった場合は最終応答（codex -o / claude result）をまとめて喋る。
+                response = stream.final
+                if not response and output_file is not None:
+                    response = output_file.read_text(encoding="utf-8", errors="replace").strip()
+                for sentence in splitter.feed(response):
+                    speech.say(sentence)
+            for sentence in splitter.flush():
+                speech.say(sentence)
+            return response
+        finally:
+            if output_file is not None:
+                output_file.unlink(missing_ok=True)
+
+    def _speak(
+        self,
+        text: str,
+        env: dict[str, str],
+        timer: StageTimer,
+    ) -> None:
+        phrases = split_phrases(text)
+        if not phrases:
+            return
+        try:
+            with timer.stage("synthesis"):
+                chunks = self.voice.synthesize_all(phrases)
+                audio = concat_wav(chunks, self.voice.settings.phrase_interval_sec)
+        except SpeechError as exc:
+            logging.warning("in-process synthesis failed; falling back to zunda: %s", exc)
+            timer.mark_first_audio()
+            with timer.stage("playback"):
+                self._speak_with_zunda(text, env)
+            return
+        timer.mark_first_audio()
+        try:
+            with timer.stage("playback"):
+                play_wav(
+                    [str(self.settings.tapovoice_cmd)],
+                    audio,
+                    timeout=self.settings.playback_timeout_sec,
+                )
+        except SpeechError as exc:
+            logging.warning("dispatch playback failed: %s", exc)
+
+    def _speak_with_zunda(self, text: str, env: dict[str, str]) -> None:
+        """``printf '%s\\n' "$RESPONSE" | zunda --stdout -s SPEAKER | tapovoice``"""
+        try:
+            zunda = subprocess.Popen(
+                [str(self.settings.zunda_cmd), "--stdout", "-s", self.settings.speaker],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=env,
+            )
+            try:
+                tapovoice = subprocess.Popen(
+                    [str(self.settings.tapovoice_cmd)],
+                    stdin=zunda.stdout,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=env,
+                )
+            finally:
+                assert zunda.stdout is not None
+                zunda.stdout.close()
+            assert zunda.stdin is not None
+            zunda.stdin.write(f"{text}\n".encode("utf-8"))
+            zunda.stdin.close()
+            deadline = self.settings.playback_timeout_sec + self.voice.settings.timeout_sec
+            returncode = tapovoice.wait(timeout=deadline)
+            zunda.wait(timeout=deadline)
+        except (OSError, subprocess.TimeoutExpired) as exc:
+            logging.warning("dispatch zunda fallback failed: %s", exc)
+            return
+        if returncode != 0:
+            logging.warning("dispatch zunda fallback failed: tapovoice rc=%s", returncode)
+
+
+def _load_default_env(cwd: Path) -> None:
+    """workspace/.env を優先し、無ければプロジェクト直下の .env を読む（既存の環境変数が優先）。"""
+    project_root = Path(__file__).resolve().parents[1]
+    for env_path in (cwd / ".env", project_root / ".env"):
+        if env_path.is_file():
+            load_env_file(env_path)
+            return
+
+
+def _read_memory_context(path: str) -> str | None:
+    """listend が先行取得した記憶コンテキスト。空か読めなければ自分で取得する。"""
+    if not path:
+        return None
+    try:
+        context = Path(path).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    return context or None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run one Yatagarasu turn in-process")
+    parser.add_argument("text", nargs="*", help="prompt (default: stdin)")
+    parser.add_argument("-e", "--engine", help="auto, codex, claude or opencode")
+    parser.add_argument("-m", "--model")
+    parser.add_argument("-s", "--speaker")
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--timings", action="store_true", help="print stage timings as JSON")
+    args = parser.parse_args(argv)
+
+    workspace = os.getenv("YATAGARASU_CWD", "").strip()
+    cwd = Path(workspace) if workspace else Path.cwd()
+    os.environ["YATAGARASU_CWD"] = str(cwd)
+    _load_default_env(cwd)
+    prompt = " ".join(args.text) if args.text else ("" if sys.stdin.isatty() else sys.stdin.read())
+    if not prompt.strip():
+        print("エラー: プロンプトが空です。", file=sys.stderr)
+        return 1
+
+    settings = DispatchSettings.from_env(cwd)
+    settings = replace(
+        settings,
+        engine=args.engine or settings.engine,
+        model=args.model or settings.model,
+        speaker=args.speaker or settings.speaker,
+        memory_enabled=settings.memory_enabled and not args.no_memory,
+    )
+    memory: SemanticMemoryClient | None = None
+    spool: MemorySpool | None = None
+    if settings.memory_enabled:
+        try:
+            memory = SemanticMemoryClient(MemorySettings.from_env())
+            raw_spool = os.getenv("YATAGARASU_MEMORY_SPOOL", "").strip()
+            if raw_spool:
+                spool = MemorySpool(
+                    resolve_spool_path(raw_spool),
+                    dedup_window_sec=memory.settings.dedup_window_sec,
+                )
+        except (ValueError, OSError, sqlite3.Error) as exc:
+            print(f"警告: 記憶機能を無効化します: {exc}", file=sys.stderr)
+    orchestrator = DispatchOrchestrator(settings, memory=memory, spool=spool)
+    try:
+        result = orchestrator.run(
+            DispatchRequest(
+                prompt=prompt,
+                memory_prompt=os.environ.pop("YATAGARASU_MEMORY_PROMPT", ""),
+                skip_memory_recall=os.environ.pop("YATAGARASU_SKIP_MEMORY_RECALL", "") == "true",
+                memory_context=_read_memory_context(
+                    os.environ.pop("YATAGARASU_MEMORY_CONTEXT_FILE", "")
+                ),
+            )
+        )
+    finally:
+        orchestrator.close()
+        if memory is not None:
+            memory.close()
+        if spool is not None:
+            spool.close()
+    for warning in result.memory_warnings:
+        print(f"YATAGARASU_MEMORY_WARNING: {warning}", file=sys.stderr)
+    if args.timings:
+        print(json.dumps(result.to_json_dict(), ensure_ascii=False), file=sys.stderr)
+    if not result.ok:
+        print(f"エラー: {result.error}", file=sys.stderr)
+        return 1
+    # bin/yatagarasu と同じく、呼び出し元が指定した場合は応答本文を書き出す。
+    response_file = os.getenv("YATAGARASU_RESPONSE_FILE", "").strip()
+    if response_file:
+        try:
+            Path(response_file).write_text(f"{result.response}\n", encoding="utf-8")
+        except OSError as exc:
+            logging.warning("response file write failed: %s", exc)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    raise SystemExit(main())
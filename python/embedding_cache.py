@@ -0,0 +1,175 @@
+"""Content-addressed on-disk cache of SBERT template embeddings.
+
+Every template row is keyed by ``sha256(model, revision, normalize, text)``.
+Rows live in one memory-mapped ``embeddings.npy`` per model namespace with a
+JSON index next to it, so a restart only encodes templates that are new or
+changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Protocol, Sequence
+
+import numpy as np
+
+
+INDEX_VERSION = 1
+
+
+class _Encoder(Protocol):
+    def encode(self, texts: Iterable[str]) -> np.ndarray: ...
+
+
+def default_cache_dir() -> Path:
+    base = os.getenv("XDG_CACHE_HOME", "").strip()
+    root = Path(base) if base else Path.home() / ".cache"
+    return root / "yatagarasu" / "sbert"
+
+
+def atomic_write(path: Path, write: Callable[[BinaryIO], object]) -> None:
+    """Write through a temporary file in the same directory, then rename over ``path``."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            write(handle)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        model_name: str,
+        revision: str,
+        normalize: bool = True,
+    ) -> None:
+        self.model_name = model_name
+        self.revision = revision
+        self.normalize = normalize
+        namespace = hashlib.sha256(
+            f"{model_name}\0{revision}\0{int(normalize)}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.directory = directory / namespace
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    @property
+    def embeddings_path(self) -> Path:
+        return self.directory / "embeddings.npy"
+
+    def key(self, text: str) -> str:
+        raw = "\0".join(
+            (self.model_name, self.revision, str(int(self.normalize)), text)
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def encode(self, embedder: _Encoder, texts: Sequence[str]) -> np.ndarray:
+        """Return embeddings for ``texts``, encoding only cache misses."""
+        values = list(texts)
+        if not values:
+            return embedder.encode(values)
+        with self._lock:
+            keys = [self.key(text) for text in values]
+            rows, stored = self._load()
+            missing: dict[str, str] = {}
+            for key, text in zip(keys, values):
+                if key not in rows and key not in missing:
+                    missing[key] = text
+            hits = len(values) - sum(1 for key in keys if key in missing)
+            if missing:
+                encoded = np.asarray(
+                    embedder.encode(list(missing.values())),
+                    dtype=np.float32,
+                )
+                rows, stored = self._append(rows, stored, list(missing), encoded)
+            self.hits += hits
+            self.misses += len(values) - hits
+            logging.info(
+                "SBERT embedding cache hits=%d misses=%d entries=%d path=%s",
+                hits,
+                len(values) - hits,
+                len(rows),
+                self.directory,
+            )
+            assert stored is not None
+            return np.asarray(stored[[rows[key] for key in keys]], dtype=np.float32)
+
+    def _load(self) -> tuple[dict[str, int], np.ndarray | None]:
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            stored = np.load(self.embeddings_path, mmap_mode="r")
+        except FileNotFoundError:
+            return {}, None
+        except (OSError, ValueError) as exc:
+            logging.warning("SBERT embedding cache unreadable; rebuilding: %s", exc)
+            return {}, None
+        keys = index.get("keys") if isinstance(index, dict) else None
+        if (
+            not isinstance(keys, list)
+            or index.get("version") != INDEX_VERSION
+            or stored.ndim != 2
+            or stored.shape[0] != len(keys)
+        ):
+            logging.warning("SBERT embedding cache index mismatch; rebuilding")
+            return {}, None
+        return {str(key): row for row, key in enumerate(keys)}, stored
+
+    def _append(
+        self,
+        rows: dict[str, int],
+        stored: np.ndarray | None,
+        keys: list[str],
+        encoded: np.ndarray,
+    ) -> tuple[dict[str, int], np.ndarray]:
+        if stored is not None and stored.shape[1:] != encoded.shape[1:]:
+            logging.warning(
+                "SBERT embedding dimension changed %s -> %s; rebuilding cache",
+                stored.shape[1:],
+                encoded.shape[1:],
+            )
+            rows, stored = {}, None
+        combined = encoded if stored is None else np.concatenate([stored, encoded])
+        ordered = sorted(rows, key=rows.__getitem__) + keys
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # npy → index の順に置き換える。途中で落ちても行数不一致で再構築される。
+            atomic_write(
+                self.embeddings_path,
+                lambda handle: np.save(handle, combined),
+            )
+            atomic_write(
+                self.index_path,
+                lambda handle: handle.write(
+                    json.dumps(
+                        {
+                            "version": INDEX_VERSION,
+                            "model": self.model_name,
+                            "revision": self.revision,
+                            "normalize": self.normalize,
+                            "keys": ordered,
+                        }
+                    ).encode("utf-8")
+                ),
+            )
+            stored_rows = np.load(self.embeddings_path, mmap_mode="r")
+        except OSError as exc:
+            # キャッシュは最適化なので、書けなくてもRouterの起動は止めない。
+            logging.warning("SBERT embedding cache write failed: %s", exc)
+            stored_rows = combined
+        return {key: row for row, key in enumerate(ordered)}, stored_rows
@@ -0,0 +1,829 @@
+#!/usr/bin/env python3
+"""In-process camera frame capture for the ``view`` action.
+
+Replaces the curl + ffmpeg pipeline of ``view/scripts/capture`` inside
+listend:
+
+- go2rtc ``/api/frame.jpeg`` is fetched over one keep-alive HTTP connection.
+- The JPEG is decoded in Pillow draft mode (DCT-domain downscaling, so a 2K
+  frame is decoded at 1/2 or 1/4 size), letterboxed to the configured size
+  and encoded once.
+- When the frame API fails, frames come from one persistent ffmpeg RTSP
+  decoder that already scales and letterboxes; it stops after an idle period.
+  With Pillow it emits near-lossless JPEGs that are encoded once here.
+- Optionally a ``FramePrefetcher`` keeps the newest rendered frame while a
+  session is active, so ``capture()`` only writes a file. PTZ moves
+  invalidate it until the camera has settled.
+- Each frame gets a difference hash. When it is within a few bits of the
+  previous capture, the previous file is reported again so the agent can
+  reuse its earlier observation instead of reading another image.
+- The letterboxed pixels are kept next to the first encode. When the JPEG is
+  over the byte budget, each smaller candidate (lower quality first, then
+  lower resolution) is one encode of those pixels, not a re-encode of the
+  JPEG.
+
+Pillow is a project dependency. If it is missing anyway, a warning is logged
+once, the frame API result is letterboxed by a single ffmpeg call and frame
+reuse is off. The saved path is reported in the same format as the script
+(``画像を保存しました: <path> (<W>x<H>)``)::
+
+    python frame_capture.py -o photo.jpg
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import io
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+
+DEFAULT_STREAM = "tapo_tc70"
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 480
+DEFAULT_QUALITY = 85
+DEFAULT_TIMEOUT_SEC = 5.0
+DEFAULT_RTSP_FPS = 2.0
+DEFAULT_RTSP_IDLE_SEC = 30.0
+DEFAULT_PREFETCH_INTERVAL_SEC = 1.0
+DEFAULT_PREFETCH_MAX_AGE_SEC = 2.0
+# latest() に起こされた取得でも、直前の取得からこれだけは空ける。
+PREFETCH_MIN_GAP_SEC = 0.05
+DEFAULT_MAX_BYTES = 80 * 1024
+DEFAULT_REUSE_DISTANCE = 10
+DEFAULT_REUSE_TTL_SEC = 60.0
+# 予算超過時に試す品質と縮小率。品質を先に下げ、足りなければ解像度を下げる。
+BUDGET_QUALITIES = (70, 55, 40)
+BUDGET_SCALES = (1.0, 0.75, 0.5)
+DHASH_SIZE = 16
+# 再利用したフレームの保存メッセージに付ける。listendはこれで再利用を判定する。
+REUSED_NOTE = "前回と同じ画像を再利用しました"
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+
+class CaptureError(RuntimeError):
+    pass
+
+
+_pillow_warned = False
+
+
+def _pillow_image():
+    """``PIL.Image``, or None (logged once) when Pillow is not installed."""
+    global _pillow_warned
+    try:
+        from PIL import Image
+    except ImportError as exc:
+        if not _pillow_warned:
+            _pillow_warned = True
+            logging.warning(
+                "Pillowがないためffmpegで縮小し、同一画像の再利用を無効にします: %s", exc
+            )
+        return None
+    return Image
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def _env_positive_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer: {raw}") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0: {raw}")
+    return value
+
+
+def _env_non_negative_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer: {raw}") from exc
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0: {raw}")
+    return value
+
+
+def _env_positive_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number: {raw}") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0: {raw}")
+    return value
+
+
+@dataclass(frozen=True)
+class CaptureSettings:
+    host: str = "localhost"
+    api_port: int = 1984
+    rtsp_port: int = 8554
+    frame_api_enabled: bool = True
+    stream: str = DEFAULT_STREAM
+    width: int = DEFAULT_WIDTH
+    height: int = DEFAULT_HEIGHT
+    quality: int = DEFAULT_QUALITY
+    media_dir: Path = Path("media")
+    timeout_sec: float = DEFAULT_TIMEOUT_SEC
+    rtsp_fps: float = DEFAULT_RTSP_FPS
+    rtsp_idle_sec: float = DEFAULT_RTSP_IDLE_SEC
+    prefetch_enabled: bool = False
+    prefetch_interval_sec: float = DEFAULT_PREFETCH_INTERVAL_SEC
+    prefetch_max_age_sec: float = DEFAULT_PREFETCH_MAX_AGE_SEC
+    max_bytes: int = DEFAULT_MAX_BYTES
+    reuse_enabled: bool = True
+    reuse_distance: int = DEFAULT_REUSE_DISTANCE
+    reuse_ttl_sec: float = DEFAULT_REUSE_TTL_SEC
+
+    @classmethod
+    def from_env(cls, workspace_path: Path) -> "CaptureSettings":
+        """Read the same variables as ``view/scripts/capture``."""
+        quality = _env_positive_int("QUALITY", DEFAULT_QUALITY)
+        if quality > 100:
+            raise ValueError(f"QUALITY must be 1-100: {quality}")
+        media = os.getenv("WORKSPACE_MEDIA", "").strip()
+        return cls(
+            host=os.getenv("GO2RTC_HOST", "localhost").strip() or "localhost",
+            api_port=_env_positive_int("GO2RTC_API_PORT", 1984),
+            rtsp_port=_env_positive_int("GO2RTC_RTSP_PORT", 8554),
+            frame_api_enabled=_env_bool("GO2RTC_FRAME_API_ENABLED", True),
+            stream=os.getenv("STREAM", DEFAULT_STREAM).strip() or DEFAULT_STREAM,
+            width=_env_positive_int("WIDTH", DEFAULT_WIDTH),
+            height=_env_positive_int("HEIGHT", DEFAULT_HEIGHT),
+            quality=quality,
+            media_dir=Path(media).expanduser() if media else workspace_path / "media",
+            timeout_sec=_env_positive_float(
+                "YATAGARASU_CAPTURE_TIMEOUT_SEC", DEFAULT_TIMEOUT_SEC
+            ),
+            rtsp_fps=_env_positive_float("YATAGARASU_CAPTURE_RTSP_FPS", DEFAULT_RTSP_FPS),
+            rtsp_idle_sec=_env_positive_float(
+                "YATAGARASU_CAPTURE_RTSP_IDLE_SEC", DEFAULT_RTSP_IDLE_SEC
+            ),
+            prefetch_enabled=_env_bool("YATAGARASU_FRAME_PREFETCH", False),
+            prefetch_interval_sec=_env_positive_float(
+                "YATAGARASU_FRAME_PREFETCH_INTERVAL_SEC", DEFAULT_PREFETCH_INTERVAL_SEC
+            ),
+            prefetch_max_age_sec=_env_positive_float(
+                "YATAGARASU_FRAME_PREFETCH_MAX_AGE_SEC", DEFAULT_PREFETCH_MAX_AGE_SEC
+            ),
+            max_bytes=_env_non_negative_int("YATAGARASU_CAPTURE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            reuse_enabled=_env_bool("YATAGARASU_CAPTURE_REUSE", True),
+            reuse_distance=_env_non_negative_int(
+                "YATAGARASU_CAPTURE_REUSE_DISTANCE", DEFAULT_REUSE_DISTANCE
+            ),
+            reuse_ttl_sec=_env_positive_float(
+                "YATAGARASU_CAPTURE_REUSE_TTL_SEC", DEFAULT_REUSE_TTL_SEC
+            ),
+        )
+
+    @property
+    def frame_path(self) -> str:
+        return "/api/frame.jpeg?" + urllib.parse.urlencode({"src": self.stream})
+
+    @property
+    def rtsp_url(self) -> str:
+        return f"rtsp://{self.host}:{self.rtsp_port}/{self.stream}?video"
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    path: Path
+    width: int
+    height: int
+    source: str
+    size_bytes: int
+    elapsed_sec: float
+    quality: int = DEFAULT_QUALITY
+    phash: int | None = None
+    captured_at: float = 0.0
+    reused: bool = False
+    distance: int | None = None
+
+    @property
+    def message(self) -> str:
+        message = f"画像を保存しました: {self.path} ({self.width}x{self.height})"
+        return f"{message} {REUSED_NOTE}" if self.reused else message
+
+
+@dataclass(frozen=True)
+class RenderedFrame:
+    """A letterboxed frame: the JPEG at the configured quality and its pixels."""
+
+    data: bytes
+    # Pillow の Image。Pillow が無い時（ffmpeg で縮小した時）は None。
+    image: Any = None
+
+
+@dataclass(frozen=True)
+class EncodedFrame:
+    data: bytes
+    width: int
+    height: int
+    quality: int
+
+
+def ffmpeg_qscale(quality: int) -> int:
+    """Map a 1-100 JPEG quality to ffmpeg's mjpeg ``-q:v`` (2 best .. 31 worst)."""
+    quality = max(1, min(100, quality))
+    return round(2 + (100 - quality) * 29 / 99)
+
+
+def letterbox_filter(width: int, height: int) -> str:
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+def letterbox_image(data: bytes, width: int, height: int) -> Any:
+    """Decode ``data`` fitted inside width x height on a black canvas; None without Pillow."""
+    Image = _pillow_image()
+    if Image is None:
+        return None
+    try:
+        image = Image.open(io.BytesIO(data))
+        # JPEGはDCT段階で1/2, 1/4, 1/8に縮小してデコードできる。
+        image.draft("RGB", (width, height))
+        image = image.convert("RGB")
+    except Exception as exc:
+        raise CaptureError(f"invalid JPEG frame: {exc}") from exc
+    scale = min(width / image.width, height / image.height)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.BILINEAR)
+    if size != (width, height):
+        canvas = Image.new("RGB", (width, height))
+        canvas.paste(image, ((width - size[0]) // 2, (height - size[1]) // 2))
+        image = canvas
+    return image
+
+
+def encode_jpeg(image: Any, quality: int) -> bytes:
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=quality)
+    return output.getvalue()
+
+
+def render_frame(data: bytes, width: int, height: int, quality: int) -> RenderedFrame:
+    """Letterbox ``data`` and encode it once, keeping the pixels for budget fitting."""
+    image = letterbox_image(data, width, height)
+    if image is None:
+        return RenderedFrame(_letterbox_with_ffmpeg(data, width, height, quality))
+    return RenderedFrame(encode_jpeg(image, quality), image)
+
+
+def letterbox_jpeg(data: bytes, width: int, height: int, quality: int) -> bytes:
+    """Fit ``data`` inside width x height on a black canvas and encode once."""
+    return render_frame(data, width, height, quality).data
+
+
+def dhash(data: bytes, size: int = DHASH_SIZE) -> int | None:
+    """Difference hash of a JPEG (``size * size`` bits); None without Pillow."""
+    Image = _pillow_image()
+    if Image is None:
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft("L", (size * 4, size * 4))
+        image = image.convert("L").resize((size + 1, size), Image.Resampling.BOX)
+    except Exception as exc:
+        raise CaptureError(f"invalid JPEG frame: {exc}") from exc
+    pixels = image.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for column in range(size):
+            value = (value << 1) | (pixels[offset + column] < pixels[offset + column + 1])
+    return value
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
+
+
+def fit_jpeg_budget(
+    frame: RenderedFrame, width: int, height: int, quality: int, max_bytes: int
+) -> EncodedFrame:
+    """Fit a rendered frame into ``max_bytes`` (0 disables).
+
+    Quality drops first; resolution only when the lowest quality still does
+    not fit. Every candidate is a single encode of the frame's pixels, so
+    JPEG losses do not compound. When nothing fits, the smallest attempt is
+    returned.
+    """
+    encoded = EncodedFrame(frame.data, width, height, quality)
+    if max_bytes <= 0 or len(frame.data) <= max_bytes:
+        return encoded
+    qualities = [value for value in BUDGET_QUALITIES if value < quality]
+    for scale in BUDGET_SCALES:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = frame.image
+        if image is not None and size != image.size:
+            image = image.resize(size, _pillow_image().Resampling.BILINEAR)
+        for value in qualities if scale == 1.0 else [quality, *qualities]:
+            if image is None:
+                # Pillow が無い時だけ、保存済みJPEGを ffmpeg で縮小し直す。
+                data = _letterbox_with_ffmpeg(frame.data, size[0], size[1], value)
+            else:
+                data = encode_jpeg(image, value)
+            candidate = EncodedFrame(data, size[0], size[1], value)
+            if len(candidate.data) < len(encoded.data):
+                encoded = candidate
+            if len(candidate.data) <= max_bytes:
+                return candidate
+    logging.warning(
+        "画像をバイト予算内に収められませんでした: bytes=%d budget=%d",
+        len(encoded.data),
+        max_bytes,
+    )
+    return encoded
+
+
+def _letterbox_with_ffmpeg(data: bytes, width: int, height: int, quality: int) -> bytes:
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-i",
+                "pipe:0",
+                "-frames:v",
+                "1",
+                "-vf",
+                letterbox_filter(width, height),
+                "-q:v",
+                str(ffmpeg_qscale(quality)),
+                "-f",
+                "image2pipe",
+                "-c:v",
+                "mjpeg",
+                "pipe:1",
+            ],
+            input=data,
+            capture_output=True,
+            timeout=DEFAULT_TIMEOUT_SEC,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise CaptureError(f"ffmpeg resize failed: {exc}") from exc
+    if result.returncode != 0 or not result.stdout:
+        raise CaptureError(
+            f"ffmpeg resize failed: {result.stderr.decode(errors='replace').strip()}"
+        )
+    return result.stdout
+
+
+class Go2rtcFrameClient:
+    """GET ``/api/frame.jpeg`` over a reused HTTP/1.1 connection."""
+
+    def __init__(self, settings: CaptureSettings) -> None:
+        self.settings = settings
+        self._connection: http.client.HTTPConnection | None = None
+        self._lock = threading.Lock()
+
+    def fetch(self) -> bytes:
+        with self._lock:
+            return self._fetch()
+
+    def _fetch(self) -> bytes:
+        # go2rtc再起動などで切れた持続接続は1回だけ張り直す。
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(
+                    self.settings.host,
+                    self.settings.api_port,
+                    timeout=self.settings.timeout_sec,
+                )
+            try:
+                self._connection.request("GET", self.settings.frame_path)
+                response = self._connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                self.close()
+                if attempt == 1:
+                    raise CaptureError(f"go2rtc frame API failed: {exc}") from exc
+                continue
+            if response.status != 200:
+                raise CaptureError(f"go2rtc frame API returned HTTP {response.status}")
+            if not data.startswith(JPEG_SOI):
+                raise CaptureError("go2rtc frame API did not return a JPEG")
+            return data
+        raise CaptureError("go2rtc frame API failed")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class RtspFrameDecoder:
+    """Persistent ffmpeg RTSP decoder that keeps the newest letterboxed JPEG."""
+
+    def __init__(self, settings: CaptureSettings) -> None:
+        self.settings = settings
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._thread: threading.Thread | None = None
+        self._condition = threading.Condition()
+        self._latest: bytes | None = None
+        self._latest_at = 0.0
+        self._last_used = 0.0
+        self._error = ""
+
+    def argv(self) -> list[str]:
+        return [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-rtsp_transport",
+            "tcp",
+            "-i",
+            self.settings.rtsp_url,
+            "-an",
+            "-vf",
+            f"fps={self.settings.rtsp_fps:g},"
+            + letterbox_filter(self.settings.width, self.settings.height),
+            "-q:v",
+            str(ffmpeg_qscale(self._source_quality())),
+            "-f",
+            "image2pipe",
+            "-c:v",
+            "mjpeg",
+            "pipe:1",
+        ]
+
+    def _source_quality(self) -> int:
+        # Pillow があれば後段で1回だけエンコードするので、ffmpegの出力はほぼ無劣化にする。
+        return 100 if _pillow_image() is not None else self.settings.quality
+
+    def latest(self, timeout: float) -> bytes:
+        """Return a frame decoded after this call started."""
+        requested_at = time.monotonic()
+        with self._condition:
+            self._last_used = requested_at
+            self._ensure_running()
+            deadline = requested_at + timeout
+            while self._latest is None or self._latest_at < requested_at:
+                if self._proc is None:
+                    raise CaptureError(f"RTSP decoder stopped: {self._error or 'no frame'}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CaptureError(f"no RTSP frame within {timeout:.1f}s")
+                self._condition.wait(remaining)
+            return self._latest
+
+    def close(self) -> None:
+        with self._condition:
+            proc = self._proc
+            self._proc = None
+            self._condition.notify_all()
+        if proc is not None:
+            _terminate(proc)
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _ensure_running(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        try:
+            self._proc = subprocess.Popen(
+                self.argv(),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as exc:
+            self._proc = None
+            raise CaptureError(f"ffmpeg start failed: {exc}") from exc
+        logging.info("RTSP frame decoder started: %s", self.settings.rtsp_url)
+        self._thread = threading.Thread(
+            target=self._read_frames,
+            args=(self._proc,),
+            name="frame-capture-rtsp",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _read_frames(self, proc: subprocess.Popen[bytes]) -> None:
+        assert proc.stdout is not None
+        buffer = bytearray()
+        while True:
+            chunk = proc.stdout.read1(65536)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+            # mjpegの各フレームはSOI..EOI。0xFFはエントロピー符号内でエスケープされる。
+            while True:
+                start = buffer.find(JPEG_SOI)
+                end = buffer.find(JPEG_EOI, start + 2) if start >= 0 else -1
+                if start < 0 or end < 0:
+                    break
+                frame = bytes(buffer[start : end + 2])
+                del buffer[: end + 2]
+                with self._condition:
+                    self._latest = frame
+                    self._latest_at = time.monotonic()
+                    self._condition.notify_all()
+            with self._condition:
+                idle = time.monotonic() - self._last_used
+                if self._proc is not proc or idle > self.settings.rtsp_idle_sec:
+                    break
+        stderr = ""
+        if proc.poll() is not None and proc.stderr is not None:
+            stderr = proc.stderr.read().decode(errors="replace").strip()
+        _terminate(proc)
+        with self._condition:
+            if self._proc is proc:
+                self._proc = None
+                self._error = stderr
+            self._condition.notify_all()
+        logging.info("RTSP frame decoder stopped%s", f": {stderr}" if stderr else "")
+
+
+def _terminate(proc: subprocess.Popen[bytes]) -> None:
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=1)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait(timeout=1)
+
+
+class FramePrefetcher:
+    """Refresh the newest rendered frame in the background while active."""
+
+    def __init__(
+        self,
+        fetch: Callable[[], RenderedFrame],
+        *,
+        interval_sec: float = DEFAULT_PREFETCH_INTERVAL_SEC,
+        max_age_sec: float = DEFAULT_PREFETCH_MAX_AGE_SEC,
+    ) -> None:
+        self.fetch = fetch
+        self.interval_sec = interval_sec
+        self.max_age_sec = max_age_sec
+        self.hits = 0
+        self.misses = 0
+        self._condition = threading.Condition()
+        self._frame: RenderedFrame | None = None
+        self._frame_at = 0.0
+        self._not_before = 0.0
+        self._last_attempt = float("-inf")
+        self._attempts = 0
+        self._wanted = False
+        self._active = False
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def set_active(self, active: bool) -> None:
+        with self._condition:
+            if active == self._active:
+                return
+            self._active = active
+            if not active:
+                self._frame = None
+            elif self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="frame-prefetch", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+
+    def invalidate(self, not_before: float) -> None:
+        """Drop the cached frame; only frames fetched after ``not_before`` count."""
+        with self._condition:
+            self._frame = None
+            self._not_before = max(self._not_before, not_before)
+            self._condition.notify_all()
+
+    def latest(self, timeout: float) -> RenderedFrame | None:
+        """Return a fresh frame, waiting for one refresh at most; None on a miss."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if not self._active:
+                return None
+            attempts = self._attempts
+            while not self._fresh(time.monotonic()):
+                remaining = deadline - time.monotonic()
+                # 起こした取得が失敗したら待たずに呼び出し側の直接取得へ回す。
+                if remaining <= 0 or self._attempts > attempts or not self._active:
+                    self.misses += 1
+                    return None
+                self._wanted = True
+                self._condition.notify_all()
+                self._condition.wait(remaining)
+            self.hits += 1
+            return self._frame
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _fresh(self, now: float) -> bool:
+        return self._frame is not None and now - self._frame_at <= self.max_age_sec
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    if not self._active:
+                        self._condition.wait()
+                        continue
+                    gap = PREFETCH_MIN_GAP_SEC if self._wanted else self.interval_sec
+                    due = max(self._last_attempt + gap, self._not_before)
+                    if now >= due:
+                        break
+                    self._condition.wait(due - now)
+                self._wanted = False
+                self._last_attempt = now
+            try:
+                frame: RenderedFrame | None = self.fetch()
+            except (CaptureError, OSError) as exc:
+                logging.debug("frame prefetch failed: %s", exc)
+                frame = None
+            with self._condition:
+                self._attempts += 1
+                # 取得中にPTZ移動で無効化された場合、そのフレームは捨てる。
+                if frame is not None and self._active and now >= self._not_before:
+                    self._frame = frame
+                    self._frame_at = now
+                self._condition.notify_all()
+
+
+class FrameCapture:
+    def __init__(self, settings: CaptureSettings) -> None:
+        self.settings = settings
+        self.frame_api = Go2rtcFrameClient(settings)
+        self.rtsp = RtspFrameDecoder(settings)
+        self.prefetcher: FramePrefetcher | None = None
+        if settings.prefetch_enabled and settings.frame_api_enabled:
+            self.prefetcher = FramePrefetcher(
+                self._render_frame_api,
+                interval_sec=settings.prefetch_interval_sec,
+                max_age_sec=settings.prefetch_max_age_sec,
+            )
+        self.previous: CapturedFrame | None = None
+        self.captures = 0
+        self.reuse_hits = 0
+        self.bytes_total = 0
+
+    def set_prefetch_active(self, active: bool) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.set_active(active)
+
+    def invalidate(self, not_before: float) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.invalidate(not_before)
+
+    def capture(self, output: Path | None = None) -> CapturedFrame:
+        """Save one frame; unnamed captures of an unchanged scene reuse the last file."""
+        started = time.monotonic()
+        rendered = None
+        if self.prefetcher is not None:
+            rendered = self.prefetcher.latest(self.settings.timeout_sec)
+        rendered, source = (rendered, "prefetch") if rendered is not None else self._grab()
+        phash = dhash(rendered.data) if self.settings.reuse_enabled else None
+        self.captures += 1
+        if output is None:
+            reused = self._reuse(phash, source, started)
+            if reused is not None:
+                self.reuse_hits += 1
+                return reused
+        settings = self.settings
+        encoded = fit_jpeg_budget(
+            rendered, settings.width, settings.height, settings.quality, settings.max_bytes
+        )
+        path = self._output_path(output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{path.name}.tmp")
+        temp.write_bytes(encoded.data)
+        temp.replace(path)
+        self.bytes_total += len(encoded.data)
+        frame = CapturedFrame(
+            path=path,
+            width=encoded.width,
+            height=encoded.height,
+            source=source,
+            size_bytes=len(encoded.data),
+            elapsed_sec=time.monotonic() - started,
+            quality=encoded.quality,
+            phash=phash,
+            captured_at=started,
+        )
+        if output is None:
+            self.previous = frame
+        return frame
+
+    def close(self) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        self.frame_api.close()
+        self.rtsp.close()
+
+    def _reuse(self, phash: int | None, source: str, started: float) -> CapturedFrame | None:
+        previous = self.previous
+        if phash is None or previous is None or previous.phash is None:
+            return None
+        if started - previous.captured_at > self.settings.reuse_ttl_sec:
+            return None
+        distance = hamming_distance(phash, previous.phash)
+        if distance > self.settings.reuse_distance or not previous.path.exists():
+            return None
+        return replace(
+            previous,
+            source=source,
+            elapsed_sec=time.monotonic() - started,
+            reused=True,
+            distance=distance,
+        )
+
+    def _render_frame_api(self) -> RenderedFrame:
+        return self._render(self.frame_api.fetch())
+
+    def _render(self, data: bytes) -> RenderedFrame:
+        settings = self.settings
+        return render_frame(data, settings.width, settings.height, settings.quality)
+
+    def _grab(self) -> tuple[RenderedFrame, str]:
+        if self.settings.frame_api_enabled:
+            try:
+                return self._render_frame_api(), "frame_api"
+            except CaptureError as exc:
+                logging.warning(
+                    "go2rtc frame APIから画像を取得できませんでした。RTSPへフォールバックします: %s",
+                    exc,
+                )
+        return self._render(self.rtsp.latest(self.settings.timeout_sec)), "rtsp"
+
+    def _output_path(self, output: Path | None) -> Path:
+        if output is None:
+            stamp = time.strftime("%Y%m%d_%H%M%S")
+            return self.settings.media_dir / f"capture_{stamp}.jpg"
+        return output if output.is_absolute() else self.settings.media_dir / output
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="capture one letterboxed camera frame")
+    parser.add_argument("-o", "--output", type=Path)
+    parser.add_argument(
+        "--workspace",
+        type=Path,
+        default=Path(os.getenv("YATAGARASU_CWD", Path(__file__).resolve().parents[1] / "workspace")),
+    )
+    args = parser.parse_args()
+
+    capture = FrameCapture(CaptureSettings.from_env(args.workspace))
+    try:
+        frame = capture.capture(args.output)
+    except CaptureError as exc:
+        print(f"エラー: go2rtcから画像を取得できませんでした: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        capture.close()
+    print(frame.message, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -14,17 +14,24 @@ import logging
 import os
 import re
 import unicodedata
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
-from typing import Iterable, Protocol
+from typing import Any, Iterable, Protocol, Sequence
 
 import numpy as np
 
+from embedding_cache import EmbeddingCache, default_cache_dir
+from template_index import ExactTemplateIndex, IvfTemplateIndex, TemplateIndex
+from term_matcher import TermMatcher
+
 
 DEFAULT_MODEL = "cl-nagoya/ruri-v3-70m"
 DEFAULT_HIGH_THRESHOLD = 0.78
 DEFAULT_MIDDLE_THRESHOLD = 0.68
 DEFAULT_TOP_K = 5
+DEFAULT_IVF_NPROBE = 8
+# これ未満のtemplate数では全件matmulの方が速いため、IVF指定時もexactを使う。
+DEFAULT_IVF_MIN_TEMPLATES = 2048
 ROUTER_VERSION = "1"
 
 ACTION_ORDER = (
@@ -55,6 +62,15 @@ class RouterSettings:
     high_threshold: float
     middle_threshold: float
     top_k: int
+    model_revision: str = ""
+    embedding_cache: bool = True
+    cache_dir: str = ""
+    backend: str = "torch"
+    onnx_dir: str = ""
+    onnx_int8: bool = True
+    index: str = "exact"
+    ivf_nprobe: int = DEFAULT_IVF_NPROBE
+    ivf_min_templates: int = DEFAULT_IVF_MIN_TEMPLATES
 
     @classmethod
     def from_env(cls) -> "RouterSettings":
@@ -74,6 +90,20 @@ class RouterSettings:
                 "YATAGARASU_SBERT_MIDDLE_THRESHOLD", DEFAULT_MIDDLE_THRESHOLD
             ),
             top_k=max(1, env_int("YATAGARASU_SBERT_TOP_K", DEFAULT_TOP_K)),
+            model_revision=os.getenv("YATAGARASU_SBERT_MODEL_REVISION", "").strip(),
+            embedding_cache=env_bool("YATAGARASU_SBERT_EMBEDDING_CACHE", True),
+            cache_dir=os.getenv("YATAGARASU_SBERT_CACHE_DIR", "").strip(),
+            backend=os.getenv("YATAGARASU_SBERT_BACKEND", "torch").strip().lower()
+            or "torch",
+            onnx_dir=os.getenv("YATAGARASU_SBERT_ONNX_DIR", "").strip(),
+            onnx_int8=env_bool("YATAGARASU_SBERT_ONNX_INT8", True),
+            index=os.getenv("YATAGARASU_SBERT_INDEX", "exact").strip().lower()
+            or "exact",
+            ivf_nprobe=max(1, env_int("YATAGARASU_SBERT_IVF_NPROBE", DEFAULT_IVF_NPROBE)),
+            ivf_min_templates=max(
+                0,
+                env_int("YATAGARASU_SBERT_IVF_MIN_TEMPLATES", DEFAULT_IVF_MIN_TEMPLATES),
+            ),
         )
 
 
@@ -135,6 +165,20 @@ class RouterDecision:
             "llm_instructions": list(self.llm_instructions),
         }
 
+    @classmethod
+    def from_json_dict(cls, payload: dict[str, Any]) -> "RouterDecision":
+        return cls(
+            enabled=bool(payload["enabled"]),
+            dry_run=bool(payload["dry_run"]),
+            original_text=str(payload["original_text"]),
+            high_hits=tuple(IntentHit(**hit) for hit in payload["high_hits"]),
+            middle_hits=tuple(IntentHit(**hit) for hit in payload["middle_hits"]),
+            top_hits=tuple(IntentHit(**hit) for hit in payload["top_hits"]),
+            flags=tuple(payload["flags"]),
+            requires_llm=bool(payload["requires_llm"]),
+            llm_instructions=tuple(payload["llm_instructions"]),
+        )
+
 
 @dataclass(frozen=True)
 class TemplateEntry:
@@ -148,7 +192,15 @@ class Embedder(Protocol):
 
 
 class SentenceTransformerEmbedder:
-    def __init__(self, model_name: str, device: str, offline: bool) -> None:
+    normalize = True
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str,
+        offline: bool,
+        revision: str = "",
+    ) -> None:
         try:
             from sentence_transformers import SentenceTransformer
         except Exception as exc:  # pragma: no cover - environment dependent
@@ -162,7 +214,9 @@ class SentenceTransformerEmbedder:
             model_name,
             device=device,
             local_files_only=offline,
+            revision=revision or None,
         )
+        self.revision = revision or resolve_model_revision(model_name)
 
     def encode(self, texts: Iterable[str]) -> np.ndarray:
         values = list(texts)
@@ -170,7 +224,7 @@ class SentenceTransformerEmbedder:
             return np.empty((0, 0), dtype=np.float32)
         embeddings = self._model.encode(
             values,
-            normalize_embeddings=True,
+            normalize_embeddings=self.normalize,
             show_progress_bar=False,
         )
         return np.asarray(embeddings, dtype=np.float32)
@@ -182,18 +236,17 @@ class IntentRouter:
         settings: RouterSettings,
         intents: tuple[IntentDefinition, ...],
         embedder: Embedder,
+        embedding_cache: EmbeddingCache | None = None,
     ) -> None:
+        if settings.index not in {"exact", "ivf"}:
+            raise ValueError(
+                f"YATAGARASU_SBERT_INDEX must be exact or ivf: {settings.index}"
+            )
         self.settings = settings
-        self.intents = intents
         self.embedder = embedder
-        self.entries = tuple(
-            TemplateEntry(intent=intent, template=template)
-            for intent in intents
-            for template in intent.templates
-        )
-        self._template_embeddings = self.embedder.encode(
-            entry.template for entry in self.entries
-        )
+        self._embedding_cache = embedding_cache
+        self._template_index: TemplateIndex | None = None
+        self._load_intents(intents)
         logging.info(
             "SBERT Router ready: intents=%d templates=%d model=%s dry_run=%s",
             len(self.intents),
@@ -202,6 +255,48 @@ class IntentRouter:
             self.settings.dry_run,
         )
 
+    def update_intents(self, intents: tuple[IntentDefinition, ...]) -> None:
+        """Swap the intent catalogue; unchanged templates are not re-encoded."""
+        self._load_intents(intents)
+        logging.info(
+            "SBERT Router intents updated: intents=%d templates=%d",
+            len(self.intents),
+            len(self.entries),
+        )
+
+    def _load_intents(self, intents: tuple[IntentDefinition, ...]) -> None:
+        self.intents = intents
+        self.entries = tuple(
+            TemplateEntry(intent=intent, template=template)
+            for intent in intents
+            for template in intent.templates
+        )
+        template_texts = [entry.template for entry in self.entries]
+        if self._embedding_cache is None:
+            self._template_embeddings = self.embedder.encode(template_texts)
+        else:
+            self._template_embeddings = self._embedding_cache.encode(
+                self.embedder, template_texts
+            )
+        use_ivf = (
+            self.settings.index == "ivf"
+            and len(self.entries) >= max(1, self.settings.ivf_min_templates)
+        )
+        index = self._template_index
+        if use_ivf and isinstance(index, IvfTemplateIndex):
+            index.sync(template_texts, self._template_embeddings)
+        elif use_ivf:
+            self._template_index = IvfTemplateIndex(
+                template_texts,
+                self._template_embeddings,
+                nprobe=self.settings.ivf_nprobe,
+            )
+        else:
+            self._template_index = ExactTemplateIndex(
+                template_texts, self._template_embeddings
+            )
+        self._build_scoring_index()
+
     @classmethod
     def from_env(cls) -> "IntentRouter | None":
         settings = RouterSettings.from_env()
@@ -212,25 +307,40 @@ class IntentRouter:
         if not intents:
             logging.warning("SBERT Router enabled but no intent templates are configured")
             return None
-        embedder = SentenceTransformerEmbedder(
-            settings.model_name,
-            settings.device,
-            settings.offline,
+        embedder = build_embedder(settings)
+        return cls(
+            settings=settings,
+            intents=intents,
+            embedder=embedder,
+            embedding_cache=build_embedding_cache(settings, embedder),
         )
-        return cls(settings=settings, intents=intents, embedder=embedder)
 
     def route(self, text: str) -> RouterDecision:
-        original_text = " ".join(text.split()).strip()
-        if not original_text:
-            return empty_decision(self.settings, original_text)
-        if len(self.entries) == 0:
-            return empty_decision(self.settings, original_text)
+        return self.route_batch([text])[0]
 
-        query_embedding = self.embedder.encode([original_text])
-        if query_embedding.size == 0:
-            return empty_decision(self.settings, original_text)
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Raw sentence embeddings from the loaded model (for memory_cache)."""
+        return np.asarray(self.embedder.encode(list(texts)), dtype=np.float32)
 
-        scores = np.matmul(self._template_embeddings, query_embedding[0])
+    def route_batch(self, texts: Sequence[str]) -> list[RouterDecision]:
+        """Route several utterances with a single ``encode()`` call."""
+        originals = [" ".join(text.split()).strip() for text in texts]
+        decisions = [empty_decision(self.settings, text) for text in originals]
+        if len(self.entries) == 0:
+            return decisions
+        pending = [index for index, text in enumerate(originals) if text]
+        if not pending:
+            return decisions
+
+        query_embeddings = self.embedder.encode([originals[index] for index in pending])
+        if query_embeddings.size == 0:
+            return decisions
+        for row, index in enumerate(pending):
+            decisions[index] = self._decide(originals[index], query_embeddings[row])
+        return decisions
+
+    def _decide(self, original_text: str, query_embedding: np.ndarray) -> RouterDecision:
+        scores = self._template_index.scores(query_embedding)
         best_by_intent = self._best_hits_by_intent(scores, original_text)
         raw_high_hits = tuple(
             hit for hit in best_by_intent if hit.score >= self._threshold_for(hit.intent_id)
@@ -264,56 +374,184 @@ class IntentRouter:
             llm_instructions=llm_instructions,
         )
 
-    def _threshold_for(self, intent_id: str) -> float:
+    def _build_scoring_index(self) -> None:
+        """Precompute gate automaton and the template → intent segments."""
+        term_ids: dict[str, int] = {}
+
+        def term_id(term: str) -> int:
+            return term_ids.setdefault(normalize_for_gate(term), len(term_ids))
+
+        # 定義ごとの gate を term id 集合へ変換（正規化は起動時の1回だけ）。
+        self._gate_any: list[frozenset[int]] = []
+        self._gate_groups: list[tuple[frozenset[int], ...]] = []
+        self._order_terms: list[tuple[int, ...]] = []
+        for intent in self.intents:
+            self._gate_any.append(frozenset(term_id(term) for term in intent.gate_terms))
+            self._gate_groups.append(
+                tuple(
+                    frozenset(term_id(term) for term in group)
+                    for group in intent.gate_required_groups
+                )
+            )
+            order_terms = intent.gate_terms
+            if intent.gate_required_groups:
+                order_terms = tuple(
+                    term for group in intent.gate_required_groups for term in group
+                )
+            self._order_terms.append(tuple(term_id(term) for term in order_terms))
+        self._term_matcher = TermMatcher(tuple(term_ids))
+
+        # intent_id ごとに template 行を連続区間へ並べ替える（同点時は先頭行を優先）。
+        group_ids: dict[str, int] = {}
+        definition_index = {id(intent): index for index, intent in enumerate(self.intents)}
+        self._entry_definition = np.asarray(
+            [definition_index[id(entry.intent)] for entry in self.entries],
+            dtype=np.intp,
+        )
+        entry_groups = np.asarray(
+            [
+                group_ids.setdefault(entry.intent.intent_id, len(group_ids))
+                for entry in self.entries
+            ],
+            dtype=np.intp,
+        )
+        self._group_intent_ids = tuple(group_ids)
+        self._entry_order = np.argsort(entry_groups, kind="stable")
+        counts = np.bincount(entry_groups, minlength=len(group_ids))
+        self._group_starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        self._group_of_sorted = entry_groups[self._entry_order]
+
+        # route() の閾値判定は intent_id の最初の定義に従う。
+        self._intent_threshold: dict[str, float] = {}
+        self._intent_allow_middle: dict[str, bool] = {}
         for intent in self.intents:
-            if intent.intent_id == intent_id:
-                return intent.threshold
-        return self.settings.high_threshold
+            self._intent_threshold.setdefault(intent.intent_id, intent.threshold)
+            self._intent_allow_middle.setdefault(intent.intent_id, intent.allow_middle)
+
+    def _threshold_for(self, intent_id: str) -> float:
+        return self._intent_threshold.get(intent_id, self.settings.high_threshold)
 
     def _allows_middle(self, intent_id: str) -> bool:
-        for intent in self.intents:
-            if intent.intent_id == intent_id:
-                return intent.allow_middle
-        return True
+        return self._intent_allow_middle.get(intent_id, True)
 
     def _best_hits_by_intent(
         self, scores: np.ndarray, original_text: str
     ) -> tuple[IntentHit, ...]:
         gated_text = normalize_for_gate(original_text)
-        best: dict[str, tuple[TemplateEntry, float]] = {}
-        for entry, score_value in zip(self.entries, scores):
-            if not gate_matches(
-                gated_text,
-                entry.intent.gate_terms,
-                entry.intent.gate_required_groups,
-            ):
+        positions = self._term_matcher.first_positions(gated_text)
+        matched = positions.keys()
+        definition_ok = np.asarray(
+            [
+                (not gate_any or not gate_any.isdisjoint(matched))
+                and all(not group.isdisjoint(matched) for group in groups)
+                for gate_any, groups in zip(self._gate_any, self._gate_groups)
+            ],
+            dtype=bool,
+        )
+        masked = np.where(
+            definition_ok[self._entry_definition],
+            np.asarray(scores, dtype=np.float64),
+            -np.inf,
+        )[self._entry_order]
+        group_max = np.maximum.reduceat(masked, self._group_starts)
+        is_max = masked == group_max[self._group_of_sorted]
+        positions_in_order = np.where(is_max, np.arange(masked.size), masked.size)
+        best_sorted = np.minimum.reduceat(positions_in_order, self._group_starts)
+
+        hits: list[IntentHit] = []
+        for group, score in enumerate(group_max):
+            if not score >= self.settings.middle_threshold:
                 continue
-            score = float(score_value)
-            current = best.get(entry.intent.intent_id)
-            if current is None or score > current[1]:
-                best[entry.intent.intent_id] = (entry, score)
-
-        hits = [
-            IntentHit(
-                intent_id=entry.intent.intent_id,
-                category=entry.intent.category,
-                score=round(score, 6),
-                level=level_for_score(
-                    score,
-                    threshold=entry.intent.threshold,
-                    middle_threshold=self.settings.middle_threshold,
-                ),
-                order_index=order_index_for_intent(gated_text, entry.intent),
-                matched_template=entry.template,
-                requires_llm=entry.intent.requires_llm,
-                llm_instruction=entry.intent.llm_instruction,
+            entry_index = int(self._entry_order[best_sorted[group]])
+            entry = self.entries[entry_index]
+            order_positions = [
+                positions[term]
+                for term in self._order_terms[int(self._entry_definition[entry_index])]
+                if term in positions
+            ]
+            score = float(scores[entry_index])
+            hits.append(
+                IntentHit(
+                    intent_id=entry.intent.intent_id,
+                    category=entry.intent.category,
+                    score=round(score, 6),
+                    level=level_for_score(
+                        score,
+                        threshold=entry.intent.threshold,
+                        middle_threshold=self.settings.middle_threshold,
+                    ),
+                    order_index=min(order_positions, default=10**9),
+                    matched_template=entry.template,
+                    requires_llm=entry.intent.requires_llm,
+                    llm_instruction=entry.intent.llm_instruction,
+                )
             )
-            for entry, score in best.values()
-            if score >= self.settings.middle_threshold
-        ]
         return tuple(sorted(hits, key=lambda hit: (-hit.score, hit.intent_id)))
 
 
+def resolve_model_revision(model_name: str) -> str:
+    """Return the commit hash of the cached Hugging Face snapshot.
+
+    Without an explicit revision the embedding cache must still notice when
+    the model files are updated, so the snapshot directory name is used.
+    """
+    local_path = Path(model_name).expanduser()
+    if local_path.is_dir():
+        config = local_path / "config.json"
+        target = config if config.exists() else local_path
+        return f"local-{target.stat().st_mtime_ns}"
+    try:
+        from huggingface_hub import snapshot_download
+
+        snapshot = snapshot_download(model_name, local_files_only=True)
+    except Exception:
+        return "unresolved"
+    return Path(snapshot).name
+
+
+def sbert_cache_root(settings: RouterSettings) -> Path:
+    if settings.cache_dir:
+        return Path(settings.cache_dir).expanduser()
+    return default_cache_dir()
+
+
+def onnx_export_dir(settings: RouterSettings) -> Path:
+    if settings.onnx_dir:
+        return Path(settings.onnx_dir).expanduser()
+    return sbert_cache_root(settings) / "onnx" / settings.model_name.replace("/", "--")
+
+
+def build_embedder(settings: RouterSettings) -> Embedder:
+    if settings.backend == "torch":
+        return SentenceTransformerEmbedder(
+            settings.model_name,
+            settings.device,
+            settings.offline,
+            settings.model_revision,
+        )
+    if settings.backend == "onnx":
+        from onnx_embedder import OnnxEmbedder
+
+        return OnnxEmbedder.load(onnx_export_dir(settings), int8=settings.onnx_int8)
+    raise ValueError(
+        f"YATAGARASU_SBERT_BACKEND must be torch or onnx: {settings.backend}"
+    )
+
+
+def build_embedding_cache(
+    settings: RouterSettings,
+    embedder: Embedder,
+) -> EmbeddingCache | None:
+    if not settings.embedding_cache:
+        return None
+    return EmbeddingCache(
+        sbert_cache_root(settings),
+        model_name=settings.model_name,
+        revision=str(getattr(embedder, "revision", settings.model_revision)),
+        normalize=bool(getattr(embedder, "normalize", True)),
+    )
+
+
 def env_bool(name: str, default: bool) -> bool:
     value = os.getenv(name, "").strip().lower()
     if not value:
@@ -798,22 +1036,29 @@ def main() -> int:
     parser.add_argument("--top-k", type=int, default=None, help="top candidate count")
     parser.add_argument("--no-model", action="store_true", help="do not load SBERT model")
     parser.add_argument("--list-intents", action="store_true", help="list intent definitions")
+    parser.add_argument(
+        "--batch",
+        type=Path,
+        default=None,
+        help="evaluate a labelled JSONL corpus ({text, flags[, intents]} per line)",
+    )
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per encode call")
+    parser.add_argument(
+        "--sweep", action="store_true", help="sweep high/middle thresholds in --batch mode"
+    )
+    parser.add_argument(
+        "--min-f1",
+        type=float,
+        default=0.0,
+        help="exit 1 when flag micro F1 is below this value in --batch mode",
+    )
     args = parser.parse_args()
 
     workspace = resolve_workspace_path()
     load_env_file(workspace / ".env")
     settings = RouterSettings.from_env()
     if args.top_k is not None:
-        settings = RouterSettings(
-            enabled=settings.enabled,
-            dry_run=settings.dry_run,
-            model_name=settings.model_name,
-            device=settings.device,
-            offline=settings.offline,
-            high_threshold=settings.high_threshold,
-            middle_threshold=settings.middle_threshold,
-            top_k=max(1, args.top_k),
-        )
+        settings = replace(settings, top_k=max(1, args.top_k))
     intents = build_intents_from_env(settings)
 
     if args.list_intents or args.no_model:
@@ -831,18 +1076,29 @@ def main() -> int:
         )
         return 0
 
-    if not args.text:
-        parser.error("text is required unless --list-intents or --no-model is used")
+    if not args.text and args.batch is None:
+        parser.error("text is required unless --batch, --list-intents or --no-model is used")
 
+    embedder = build_embedder(settings)
     router = IntentRouter(
         settings=settings,
         intents=intents,
-        embedder=SentenceTransformerEmbedder(
-            settings.model_name,
-            settings.device,
-            settings.offline,
-        ),
+        embedder=embedder,
+        embedding_cache=build_embedding_cache(settings, embedder),
     )
+    if args.batch is not None:
+        from router_eval import run_batch
+
+        return run_batch(
+            args.batch,
+            settings,
+            embedder,
+            router,
+            batch_size=max(1, args.batch_size),
+            sweep=args.sweep,
+            min_f1=args.min_f1,
+            as_json=args.json,
+        )
     decision = router.route(args.text)
     print(json.dumps(decision.to_json_dict(), ensure_ascii=False, indent=2))
     return 0
@@ -15,6 +15,7 @@ RTSP音声を常時監視し、以下を実行する。
 from __future__ import annotations
 
 import logging
+import functools
 import json
 import math
 import os
@@ -22,24 +23,27 @@ import re
 import select
 import shlex
 import signal
+import sqlite3
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import unicodedata
 import urllib.error
 import urllib.parse
 import urllib.request
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable
 
 import numpy as np
-import torch
-from faster_whisper import WhisperModel
-from silero_vad import get_speech_timestamps, load_silero_vad
 
-from audio_prompt import PromptStatus, TapovoiceFilePromptPlayer
+from action_graph import ActionNode, run_action_graph
+from audio_prompt import PromptStatus, TapovoiceFilePromptPlayer, audio_duration_sec
+from dispatch_orchestrator import DispatchOrchestrator, DispatchRequest, DispatchSettings
+from frame_capture import REUSED_NOTE, CaptureError, CaptureSettings, FrameCapture
 from intent_router import IntentRouter, RouterDecision
 from listen_state import (
     ListenSession,
@@ -47,6 +51,21 @@ from listen_state import (
     SessionAction,
     SessionDecision,
 )
+from memory_cache import LocalRecall, MemoryVectorCache, memory_documents
+from memory_spool import MemorySpoolWorker
+from onvif_ptz import RELATIVE_MOVES, OnvifError, OnvifPtzClient
+from ptz_motion import PtzMotionModel
+from router_daemon import RouterClient, RouterDaemonError
+from semantic_memory import (
+    MemoryContext,
+    MemorySettings,
+    SavedMemory,
+    SemanticMemoryClient,
+    SemanticMemoryError,
+)
+from speech_span import crop_to_span, find_speech_span, plan_split_ranges
+from startup import StartupError, StartupTasks
+from stt_manager import SttModelManager
 from wakeword import (
     LiveKitWakeBackend,
     SttWakeBackend,
@@ -55,14 +74,37 @@ from wakeword import (
 )
 from wake_latency import WakeLatencyTracker, elapsed_ms, format_ms
 
+# torch / faster_whisper / silero_vad は import だけで1秒以上かかるため、
+# 利用するbackendの読込時まで遅延させる（doctor等のCLIを軽く保つ）。
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
 DEFAULT_AUDIO_FILTER = "highpass=f=120,lowpass=f=5000"
 DEFAULT_SEGMENT_END_SILENCE_CHUNKS = 5
 # VADが一時的にFalseになっても発話継続とみなす猶予チャンク数
 DEFAULT_VAD_HANGOVER_CHUNKS = 6
 # これ未満の音量セグメントは文字起こししない（無音ハルシネーション抑制）
 DEFAULT_MIN_TRANSCRIBE_RMS_DBFS = -50.0
+# STTへ渡す前に、VAD発話区間の前後へ残す余白（ミリ秒）
+DEFAULT_STT_SPEECH_PAD_MS = 240
 # ReazonSpeech k2 は ~30秒程度が入力上限のため、長尺は分割処理する。
 DEFAULT_REAZON_MAX_SEGMENT_SEC = 28.0
+# 長尺分割時、上限手前のこの秒数の範囲でVAD確率が最も低い位置を分割点にする。
+DEFAULT_REAZON_SPLIT_SEARCH_SEC = 6.0
+# timeout設定のないRouter actionの待ち上限（秒）
+DEFAULT_ROUTER_ACTION_TIMEOUT_SEC = 10.0
+# 投機実行するPTZ動作に必要な最低score（Routerのhigh閾値より厳しめ）。
+DEFAULT_SPECULATIVE_MIN_SCORE = 0.85
+# セグメントにこれらが含まれる場合は言い直しの可能性があるため投機実行しない。
+SPECULATIVE_VETO_TERMS = (
+    "やめ",
+    "じゃなく",
+    "違う",
+    "ちがう",
+    "待って",
+    "まって",
+    "逆",
+)
 RECENT_RECALL_TERMS = (
     "さっき",
     "先ほど",
@@ -264,12 +306,19 @@ class ListendSettings:
     reazon_device: str
     reazon_precision: str
     reazon_language: str
+    reazon_decode_workers: int
     wake: WakeSettings
     wake_words: tuple[str, ...]
     wake_prompt_word: str
     stop_words: tuple[str, ...]
     vad_threshold: float
     min_segment_sec: float
+    stt_trim_silence: bool
+    stt_speech_pad_ms: int
+    stt_idle_unload_sec: float
+    stt_rss_budget_mb: float
+    speculative_routing: bool
+    speculative_min_score: float
     off_transcribe_cooldown_sec: float
     wake_suppression_sec: float
     silence_timeout_sec: float
@@ -280,6 +329,7 @@ class ListendSettings:
     channels: int
     dispatch_cmd: str
     dispatch_timeout_sec: float
+    dispatch_mode: str
     wake_ack_word: str
     standby_word: str
     wake_ack_speaker_id: str
@@ -347,6 +397,11 @@ class ListendSettings:
         dispatch_cmd = os.getenv("LISTEND_DISPATCH_CMD", "").strip()
         if not dispatch_cmd:
             dispatch_cmd = str((workspace_path.parent / "bin" / "yatagarasu").resolve())
+        dispatch_mode = os.getenv("LISTEND_DISPATCH_MODE", "process").strip().lower() or "process"
+        if dispatch_mode not in {"process", "inprocess"}:
+            raise ValueError(
+                f"LISTEND_DISPATCH_MODE must be 'process' or 'inprocess': {dispatch_mode}"
+            )
 
         wake_ack_word = os.getenv("LISTEND_WAKE_ACK_WORD", "").strip()
         standby_word = os.getenv("LISTEND_STANDBY_WORD", "待機します。").strip()
@@ -582,12 +637,39 @@ class ListendSettings:
             reazon_device=os.getenv("LISTEND_REAZON_DEVICE", "cpu").strip() or "cpu",
             reazon_precision=reazon_precision,
             reazon_language=reazon_language,
+            reazon_decode_workers=env_int_strict(
+                "LISTEND_REAZON_DECODE_WORKERS",
+                2,
+                minimum=1,
+            ),
             wake=wake_settings,
             wake_words=wake_words,
             wake_prompt_word=wake_prompt_word,
             stop_words=stop_words,
             vad_threshold=env_float("LISTEND_VAD_THRESHOLD", 0.5),
             min_segment_sec=env_float("LISTEND_MIN_SEGMENT_SEC", 0.35),
+            stt_trim_silence=env_bool_strict("LISTEND_STT_TRIM_SILENCE", True),
+            stt_speech_pad_ms=env_int_strict(
+                "LISTEND_STT_SPEECH_PAD_MS",
+                DEFAULT_STT_SPEECH_PAD_MS,
+                minimum=0,
+            ),
+            stt_idle_unload_sec=env_float_strict(
+                "LISTEND_STT_IDLE_UNLOAD_SEC",
+                0.0,
+                minimum=0.0,
+            ),
+            stt_rss_budget_mb=env_float_strict(
+                "LISTEND_STT_RSS_BUDGET_MB",
+                0.0,
+                minimum=0.0,
+            ),
+            speculative_routing=env_bool_strict("LISTEND_SPECULATIVE_ROUTING", False),
+            speculative_min_score=env_float_strict(
+                "LISTEND_SPECULATIVE_MIN_SCORE",
+                DEFAULT_SPECULATIVE_MIN_SCORE,
+                minimum=0.0,
+            ),
             off_transcribe_cooldown_sec=env_float(
                 "LISTEND_OFF_TRANSCRIBE_COOLDOWN_SEC", 0.0
             ),
@@ -600,6 +682,7 @@ class ListendSettings:
             channels=channels,
             dispatch_cmd=dispatch_cmd,
             dispatch_timeout_sec=env_float("LISTEND_DISPATCH_TIMEOUT_SEC", 20.0),
+            dispatch_mode=dispatch_mode,
             wake_ack_word=wake_ack_word,
             standby_word=standby_word,
             wake_ack_speaker_id=wake_ack_speaker_id,
@@ -632,13 +715,31 @@ class RouterExecutionResult:
     image_path: str | None
     recall_text: str | None
     errors: tuple[str, ...]
+    image_reused: bool = False
+
+
+@dataclass(frozen=True)
+class SpeculativeMove:
+    action: str
+    started_at: float
+    # (実行結果, 完了時刻 monotonic)
+    future: "Future[tuple[ActionResult, float]]"
 
 
 @dataclass(frozen=True)
 class PreparedDispatch:
     text: str
     skip_memory_recall: bool = False
+    # 新しく撮影した画像のパス。応答をその画像の観察結果として覚えておく。
+    observe_image: str | None = None
+
 
+# 同一画像の再利用時にプロンプトへ添える、前回の観察結果の最大文字数。
+IMAGE_OBSERVATION_MAX_CHARS = 1000
+
+
+# 1回のworker要求にまとめたPTZ actionのgraph node名は、action名をこれで連結する。
+PTZ_NODE_SEPARATOR = "+"
 
 PTZ_ACTIONS = frozenset(
     {
@@ -649,6 +750,8 @@ PTZ_ACTIONS = frozenset(
         "move_camera_down",
     }
 )
+# キャリブレーションは全可動域を動くため、確定前の投機実行からは外す。
+SPECULATIVE_ACTIONS = PTZ_ACTIONS - {"move_camera_calibrate"}
 
 
 class PtzWorker:
@@ -657,61 +760,209 @@ class PtzWorker:
         self.script = skill_root / "move-camera" / "scripts" / "ptz_worker"
         self.python = skill_root / "move-camera" / ".venv" / "bin" / "python"
         self.proc: subprocess.Popen[str] | None = None
+        try:
+            self.motion: PtzMotionModel | None = (
+                PtzMotionModel.from_env()
+                if env_bool_strict("YATAGARASU_PTZ_MOTION_MODEL", True)
+                else None
+            )
+        except ValueError as exc:
+            logging.warning("PTZ motion model disabled; using fixed settle: %s", exc)
+            self.motion = None
+        # 直近の移動が止まると見込まれる時刻と、その見積もり秒数。
+        self.motion_until = 0.0
+        self.last_motion_sec = 0.0
+        # worker起動時（またはキャリブレーション後）を原点としたpan/tiltの推定値。
+        self.position: tuple[float, float] | None = None
+        self._position_request_id = 0
+        self._next_request_id = 0
+        # 起動・書き込み・停止を直列化する。応答待ちの間は保持しない。
+        self._lock = threading.Lock()
+        # 応答待ちの要求（id → Future）。読み取りスレッドがidごとに結果を届ける。
+        self._pending: dict[int, Future[dict[str, object]]] = {}
+        self._pending_lock = threading.Lock()
+        # 移動はONVIFで直接送り、キャリブレーションだけpytapo workerを使う。
+        self.onvif: OnvifPtzClient | None = None
+        self._onvif_moved = False
+        backend = os.getenv("YATAGARASU_PTZ_BACKEND", "pytapo").strip().lower()
+        if backend == "onvif":
+            try:
+                self.onvif = OnvifPtzClient.from_env(self.motion or PtzMotionModel())
+            except ValueError as exc:
+                logging.warning("ONVIF PTZ backend disabled; using pytapo worker: %s", exc)
+        elif backend != "pytapo":
+            logging.warning("unknown YATAGARASU_PTZ_BACKEND=%s; using pytapo worker", backend)
+
+    def start(self, timeout: float) -> bool:
+        """Connect the configured backend ahead of the first command."""
+        if self.onvif is None:
+            return self._ensure_started(timeout)
+        with self._lock:
+            try:
+                self.onvif.connect()
+            except OnvifError as exc:
+                logging.warning("ONVIF PTZ connect failed: %s", exc)
+                return False
+        return True
 
     def execute(self, action: str, timeout: float) -> ActionResult:
+        return self.execute_many((action,), timeout)[0]
+
+    def execute_many(
+        self, actions: Iterable[str], timeout: float
+    ) -> list[ActionResult]:
+        """Send several PTZ actions as one request; the worker merges the moves.
+
+        Requests are pipelined: the next one can be written while earlier ones
+        are still waiting for their answers, which arrive by request id.
+        """
+        actions = tuple(actions)
         started = time.monotonic()
-        if not self._ensure_started(timeout):
-            return ActionResult(
-                action=action,
-                ok=False,
-                stdout="",
-                stderr="PTZ worker is not available",
-                elapsed_sec=time.monotonic() - started,
-            )
 
-        proc = self.proc
-        if proc is None or proc.stdin is None:
-            self.stop()
-            return ActionResult(
-                action=action,
-                ok=False,
-                stdout="",
-                stderr="PTZ worker stdin is not available",
-                elapsed_sec=time.monotonic() - started,
-            )
+        def failed(stderr: str) -> list[ActionResult]:
+            return [
+                ActionResult(
+                    action=action,
+                    ok=False,
+                    stdout="",
+                    stderr=stderr,
+                    elapsed_sec=time.monotonic() - started,
+                )
+                for action in actions
+            ]
+
+        with self._lock:
+            if self.onvif is not None and all(action in RELATIVE_MOVES for action in actions):
+                self._onvif_moved = True
+                return self._payload_results(
+                    actions, self.onvif.execute(actions), time.monotonic() - started
+                )
+            self._onvif_moved = False
+            if not self._ensure_started(timeout):
+                return failed("PTZ worker is not available")
+
+            proc = self.proc
+            if proc is None or proc.stdin is None:
+                self.stop()
+                return failed("PTZ worker stdin is not available")
+
+            self._next_request_id += 1
+            request_id = self._next_request_id
+            future: Future[dict[str, object]] = Future()
+            with self._pending_lock:
+                self._pending[request_id] = future
+            try:
+                proc.stdin.write(
+                    json.dumps({"id": request_id, "actions": list(actions)}) + "\n"
+                )
+                proc.stdin.flush()
+            except Exception as exc:
+                self.stop()
+                return failed(str(exc))
 
         try:
-            proc.stdin.write(json.dumps({"action": action}) + "\n")
-            proc.stdin.flush()
-            payload = self._read_payload(timeout)
-        except Exception as exc:
-            self.stop()
-            return ActionResult(
-                action=action,
-                ok=False,
-                stdout="",
-                stderr=str(exc),
-                elapsed_sec=time.monotonic() - started,
+            payload = future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+        except TimeoutError:
+            with self._lock:
+                self.stop()
+            return failed(f"PTZ worker timed out after {timeout:.1f}s")
+        except RuntimeError as exc:
+            return failed(str(exc))
+
+        with self._lock:
+            if self.onvif is not None and "move_camera_calibrate" in actions and payload.get("ok"):
+                # キャリブレーション後はホーム位置に戻るため、ONVIF側の推定位置も原点にする。
+                self.onvif.pan = self.onvif.tilt = 0.0
+            return self._payload_results(
+                actions, payload, time.monotonic() - started, request_id
             )
 
-        if not payload:
-            self.stop()
-            return ActionResult(
-                action=action,
-                ok=False,
-                stdout="",
-                stderr=f"PTZ worker timed out after {timeout:.1f}s",
-                elapsed_sec=time.monotonic() - started,
+    def _payload_results(
+        self,
+        actions: tuple[str, ...],
+        payload: dict[str, object],
+        elapsed: float,
+        request_id: int = 0,
+    ) -> list[ActionResult]:
+        position = payload.get("position")
+        # 並行した要求の応答が前後しても、後に送った要求の位置を残す。
+        if isinstance(position, dict) and request_id >= self._position_request_id:
+            self._position_request_id = request_id
+            self.position = (
+                float(position.get("pan", 0.0)),
+                float(position.get("tilt", 0.0)),
+            )
+        items = payload.get("results")
+        if not isinstance(items, list):
+            # 要求全体が拒否された場合は共通のエラーを各actionへ返す。
+            items = [payload for _ in actions]
+        by_action = {
+            str(item.get("action", "")): item
+            for item in items
+            if isinstance(item, dict)
+        }
+        results: list[ActionResult] = []
+        # まとめて送った移動は1回分として見積もり、要求全体の待ち時間を1度だけ設定する。
+        estimate = 0.0
+        moved = False
+        coalesced_left = 0
+        for action in actions:
+            item = by_action.get(action, payload)
+            ok = bool(item.get("ok"))
+            if ok and coalesced_left > 0:
+                coalesced_left -= 1
+            elif ok:
+                moved = True
+                estimate += self._motion_estimate_sec(action, item)
+                coalesced = item.get("coalesced")
+                coalesced_left = int(coalesced) - 1 if isinstance(coalesced, int) else 0
+            results.append(
+                ActionResult(
+                    action=action,
+                    ok=ok,
+                    stdout=str(item.get("stdout", "")).strip(),
+                    stderr=str(item.get("stderr", "")).strip(),
+                    elapsed_sec=elapsed,
+                )
             )
+        if moved:
+            self._record_motion(estimate)
+        return results
 
-        ok = bool(payload.get("ok"))
-        return ActionResult(
-            action=action,
-            ok=ok,
-            stdout=str(payload.get("stdout", "")).strip(),
-            stderr=str(payload.get("stderr", "")).strip(),
-            elapsed_sec=time.monotonic() - started,
-        )
+    def wait_for_motion(self) -> float:
+        """Wait until the last move has stopped; return the wait.
+
+        With the ONVIF backend the camera's move status is polled, otherwise
+        the wait is the remaining motion-model estimate.
+        """
+        remaining = max(0.0, self.motion_until - time.monotonic())
+        if self.onvif is not None and self._onvif_moved:
+            with self._lock:
+                try:
+                    return self.onvif.wait_idle(min_sec=remaining, max_sec=remaining + 2.0)
+                except OnvifError as exc:
+                    logging.warning("ONVIF PTZ status failed; using estimate: %s", exc)
+                    remaining = max(0.0, self.motion_until - time.monotonic())
+        if remaining > 0:
+            time.sleep(remaining)
+        return remaining
+
+    def _record_motion(self, estimate: float) -> None:
+        self.last_motion_sec = estimate
+        # 先に送った移動の見込み（キャリブレーション等）より早く終わったことにはしない。
+        self.motion_until = max(self.motion_until, time.monotonic() + estimate)
+
+    def _motion_estimate_sec(self, action: str, payload: dict[str, object]) -> float:
+        fixed = env_float("YATAGARASU_SBERT_MOVE_SETTLE_SEC", 0.5)
+        if self.motion is None:
+            return fixed
+        if action == "move_camera_calibrate":
+            return self.motion.calibrate_sec
+        x, y = payload.get("x"), payload.get("y")
+        if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+            # 角度を返さない旧workerでは従来の固定待ちにする。
+            return fixed
+        return self.motion.move_sec(float(x), float(y))
 
     def _ensure_started(self, timeout: float) -> bool:
         if self.proc is not None and self.proc.poll() is None:
@@ -733,12 +984,47 @@ class PtzWorker:
         payload = self._read_payload(timeout)
         if payload and payload.get("type") == "ready" and payload.get("ok"):
             logging.info("PTZ worker ready")
+            threading.Thread(
+                target=self._read_responses,
+                args=(self.proc,),
+                name="ptz-worker-reader",
+                daemon=True,
+            ).start()
             return True
         error = payload.get("error") if payload else "startup timeout"
         logging.warning("PTZ worker startup failed: %s", error)
         self.stop()
         return False
 
+    def _read_responses(self, proc: subprocess.Popen[str]) -> None:
+        """Hand each response line to the request with the same id until EOF."""
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("invalid PTZ worker response: %s", line.strip())
+                continue
+            if not isinstance(payload, dict):
+                continue
+            with self._pending_lock:
+                future = self._pending.pop(payload.get("id"), None)
+            if future is None:
+                # タイムアウトで諦めた要求への遅れた応答。
+                logging.debug("dropping stale PTZ worker response id=%s", payload.get("id"))
+                continue
+            future.set_result(payload)
+        # stop() 済みなら待ち要求は失敗にしてある（再起動後の要求には触れない）。
+        if self.proc is proc:
+            self._fail_pending("PTZ worker exited")
+
+    def _fail_pending(self, reason: str) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
     def _read_payload(self, timeout: float) -> dict[str, object]:
         proc = self.proc
         if proc is None or proc.stdout is None:
@@ -758,8 +1044,11 @@ class PtzWorker:
         return payload if isinstance(payload, dict) else {}
 
     def stop(self) -> None:
+        if self.onvif is not None:
+            self.onvif.close()
         proc = self.proc
         self.proc = None
+        self._fail_pending("PTZ worker stopped")
         if proc is None:
             return
         if proc.poll() is not None:
@@ -791,7 +1080,11 @@ class ListendService:
         self.in_segment = False
         self.trailing_silence_chunks = 0
         self.segment_buffer = bytearray()
+        self.segment_vad_probs: list[float] = []
         self.vad_hangover_remaining = 0
+        self.last_vad_probability = 0.0
+        self.stt_input_sec_total = 0.0
+        self.stt_trimmed_sec_total = 0.0
 
         self.last_voice_at = time.monotonic()
         self.session_text_chunks: list[str] = []
@@ -808,13 +1101,25 @@ class ListendService:
             activity_hold_sec=settings.wake.speech_hold_sec
         )
 
-        self.vad_model = load_silero_vad()
-        self.whisper_model: WhisperModel | None = None
-        self.reazon_model: object | None = None
+        self.vad_model: object | None = None
+        self.stt_models: SttModelManager | None = None
         self.reazon_audio_from_numpy: object | None = None
         self.reazon_transcribe: object | None = None
-        self._init_stt_backend()
-        self.wake_backend = self._init_wake_backend()
+        self._reazon_executor: ThreadPoolExecutor | None = None
+        self._speculative_executor: ThreadPoolExecutor | None = None
+        self._action_executor: ThreadPoolExecutor | None = None
+        self._frame_capture: FrameCapture | None = None
+        self._image_observation: tuple[str, str] | None = None
+        self._memory_client: SemanticMemoryClient | None = None
+        self._memory_executor: ThreadPoolExecutor | None = None
+        self._memory_spool_worker: MemorySpoolWorker | None = None
+        self._memory_cache: MemoryVectorCache | None = None
+        self._dispatch_orchestrator: DispatchOrchestrator | None = None
+        self._speculative_moves: list[SpeculativeMove] = []
+        self.speculative_runs = 0
+        self.speculative_saved_ms_total = 0.0
+        self.wake_backend: WakeBackend | None = None
+        self.intent_router: IntentRouter | RouterClient | None = None
         self.wake_activity_gate = WakeActivityGate(
             settings.wake.activity_rms_dbfs
         )
@@ -823,16 +1128,88 @@ class ListendService:
             tapovoice_argv,
             timeout_sec=self.settings.wake.prompt_timeout_sec,
         )
-        self.intent_router = self._init_intent_router()
         skill_root = self.settings.workspace_path / ".codex" / "skills"
         self.ptz_worker = PtzWorker(skill_root, self.settings.workspace_path)
-        if self.intent_router is not None and not self.intent_router.settings.dry_run:
-            self.ptz_worker._ensure_started(env_float("YATAGARASU_SBERT_MOVE_TIMEOUT_SEC", 8.0))
+
+        # モデル読込は互いに独立しているため並列に進め、各利用箇所は
+        # 自分に必要なphaseだけを待つ（音声取込: vad/wake、初回STT: stt、
+        # 初回dispatch: router/ptz）。
+        self.startup = StartupTasks()
+        self.startup.submit("vad", self._load_vad_model)
+        self.startup.submit("wake", self._load_wake_backend)
+        self.startup.submit("stt", self._init_stt_backend)
+        self.startup.submit("router", self._load_intent_router)
+        self.startup.submit("ptz", self._start_ptz_worker, after=("router",))
+        self.startup.submit("memory_spool", self._start_memory_spool)
+        self.startup.submit("memory_cache", self._load_memory_cache, after=("router",))
 
     @property
     def state(self) -> ListenState:
         return self.session.state
 
+    def _load_vad_model(self) -> None:
+        from silero_vad import load_silero_vad
+
+        self.vad_model = load_silero_vad()
+
+    def _load_wake_backend(self) -> None:
+        self.wake_backend = self._init_wake_backend()
+
+    def _load_intent_router(self) -> None:
+        self.intent_router = self._init_intent_router()
+
+    def _start_ptz_worker(self) -> None:
+        if self.intent_router is None or self.intent_router.settings.dry_run:
+            return
+        self.ptz_worker.start(env_float("YATAGARASU_SBERT_MOVE_TIMEOUT_SEC", 8.0))
+
+    def _start_memory_spool(self) -> None:
+        """Flush conversations that bin/yatagarasu queued in YATAGARASU_MEMORY_SPOOL."""
+        try:
+            worker = MemorySpoolWorker.from_env()
+        except (ValueError, OSError, sqlite3.Error) as exc:
+            logging.warning("memory spool disabled: %s", exc)
+            return
+        if worker is None:
+            return
+        backlog = worker.spool.backlog()
+        logging.info(
+            "memory spool started path=%s backlog=%d failed=%d",
+            worker.spool.path,
+            backlog.pending,
+            backlog.failed,
+        )
+        worker.on_saved = self._cache_saved_memory
+        worker.start()
+        self._memory_spool_worker = worker
+
+    def _load_memory_cache(self) -> None:
+        """Local index answering recall_memory with the Router's SBERT model."""
+        if not env_bool_strict("YATAGARASU_MEMORY_CACHE", False):
+            return
+        router = self.intent_router
+        if router is None:
+            logging.warning("memory cache disabled: SBERT Router is not available")
+            return
+        if isinstance(router, IntentRouter):
+            revision = str(getattr(router.embedder, "revision", router.settings.model_revision))
+        else:
+            revision = router.settings.model_revision
+        try:
+            cache = MemoryVectorCache.from_env(
+                router, model_name=router.settings.model_name, revision=revision
+            )
+        except (ValueError, RouterDaemonError) as exc:
+            logging.warning("memory cache disabled: %s", exc)
+            return
+        logging.info(
+            "memory cache ready entries=%d min_score=%.2f path=%s",
+            len(cache),
+            cache.min_score,
+            cache.directory,
+        )
+        self._memory_cache = cache
+
     def _init_wake_backend(self) -> WakeBackend:
         if self.settings.wake.backend == "stt":
             return SttWakeBackend()
@@ -857,21 +1234,53 @@ class ListendService:
 
     def _init_stt_backend(self) -> None:
         if self.settings.stt_backend == "faster-whisper":
-            self._init_whisper_backend()
-            return
-        if self.settings.stt_backend == "reazonspeech-k2":
-            self._init_reazonspeech_backend()
-            return
-        raise RuntimeError(f"unsupported STT backend: {self.settings.stt_backend}")
+            loader = self._load_whisper_model
+            name = self.settings.whisper_model
+        elif self.settings.stt_backend == "reazonspeech-k2":
+            loader = self._init_reazonspeech_backend()
+            name = f"reazonspeech-k2/{self.settings.reazon_language}"
+        else:
+            raise RuntimeError(f"unsupported STT backend: {self.settings.stt_backend}")
+
+        # OFF中にSTTを使う互換wake backendでは常駐させる。
+        resident = self.settings.wake.backend == "stt"
+        self.stt_models = SttModelManager(
+            loader,
+            name=name,
+            idle_unload_sec=0.0 if resident else self.settings.stt_idle_unload_sec,
+            rss_budget_mb=0.0 if resident else self.settings.stt_rss_budget_mb,
+            reload_deadline_sec=self._wake_prompt_window_sec(),
+        )
+        # 起動時の読込は他のモデルと競合して遅いので、常駐化の判定は再読込で行う。
+        self.stt_models.acquire("startup")
 
-    def _init_whisper_backend(self) -> None:
-        self.whisper_model = WhisperModel(
+    def _wake_prompt_window_sec(self) -> float:
+        """ウェイク検出からON遷移までに確保できる最短時間。"""
+        wake = self.settings.wake
+        # 標準の「はい」はMP3なので、ffmpegと同じ場所のffprobeで長さを測る。
+        ffmpeg_bin = Path(self.settings.ffmpeg_bin)
+        ffprobe_bin = (
+            str(ffmpeg_bin.with_name("ffprobe")) if ffmpeg_bin.parent != Path(".") else "ffprobe"
+        )
+        prompt_sec = audio_duration_sec(wake.prompt_audio_path, ffprobe_bin=ffprobe_bin)
+        if prompt_sec is None:
+            logging.warning(
+                "wake prompt duration unknown; stt reload window uses guard only: %s",
+                wake.prompt_audio_path,
+            )
+            prompt_sec = 0.0
+        return prompt_sec + wake.prompt_guard_sec
+
+    def _load_whisper_model(self) -> WhisperModel:
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
             self.settings.whisper_model,
             device=self.settings.whisper_device,
             compute_type=self.settings.whisper_compute_type,
         )
 
-    def _init_reazonspeech_backend(self) -> None:
+    def _init_reazonspeech_backend(self) -> Callable[[], object]:
         try:
             from reazonspeech.k2.asr import audio_from_numpy, load_model, transcribe
         except Exception as exc:  # pragma: no cover - import可否は環境依存
@@ -882,13 +1291,21 @@ class ListendService:
 
         self.reazon_audio_from_numpy = audio_from_numpy
         self.reazon_transcribe = transcribe
-        self.reazon_model = load_model(
+        return lambda: load_model(
             device=self.settings.reazon_device,
             precision=self.settings.reazon_precision,
             language=self.settings.reazon_language,
         )
 
-    def _init_intent_router(self) -> IntentRouter | None:
+    def _init_intent_router(self) -> IntentRouter | RouterClient | None:
+        if os.getenv("YATAGARASU_SBERT_ROUTER_SOCKET", "").strip():
+            try:
+                return RouterClient.from_env()
+            except RouterDaemonError as exc:
+                # daemonが居なくても発話処理は止めず、従来どおり自前でロードする。
+                logging.warning(
+                    "SBERT Router daemon unavailable; loading in-process: %s", exc
+                )
         try:
             return IntentRouter.from_env()
         except Exception as exc:
@@ -900,9 +1317,40 @@ class ListendService:
         self.ptz_worker.stop()
 
     def close(self) -> None:
+        self.startup.shutdown()
         self.prompt_player.close()
-        self.wake_backend.close()
+        if self.wake_backend is not None:
+            self.wake_backend.close()
         self.ptz_worker.stop()
+        if isinstance(self.intent_router, RouterClient):
+            self.intent_router.close()
+        if self._reazon_executor is not None:
+            self._reazon_executor.shutdown(wait=False, cancel_futures=True)
+            self._reazon_executor = None
+        if self._speculative_executor is not None:
+            self._speculative_executor.shutdown(wait=False, cancel_futures=True)
+            self._speculative_executor = None
+        if self._action_executor is not None:
+            self._action_executor.shutdown(wait=False, cancel_futures=True)
+            self._action_executor = None
+        if self._frame_capture is not None:
+            self._frame_capture.close()
+            self._frame_capture = None
+        if self._memory_executor is not None:
+            self._memory_executor.shutdown(wait=False, cancel_futures=True)
+            self._memory_executor = None
+        if self._memory_spool_worker is not None:
+            self._memory_spool_worker.stop()
+            self._memory_spool_worker = None
+        if self._memory_client is not None:
+            self._memory_client.close()
+            self._memory_client = None
+        if self._memory_cache is not None:
+            self._memory_cache.flush()
+            self._memory_cache = None
+        if self._dispatch_orchestrator is not None:
+            self._dispatch_orchestrator.close()
+            self._dispatch_orchestrator = None
 
     def _resolve_transports(self) -> list[str]:
         """auto モードの場合にフォールバック候補リストを返す。
@@ -921,6 +1369,7 @@ class ListendService:
         read_unit = max(1024, chunk_bytes // 2)
 
         reconnect_attempts = 0
+        audio_ready_logged = False
         while not self.stop_requested:
             # --- ffmpeg 起動（auto ならフォールバック試行） ---
             ffmpeg_proc: subprocess.Popen[bytes] | None = None
@@ -984,6 +1433,24 @@ class ListendService:
                 time.sleep(self.settings.reconnect_delay_sec)
                 continue
 
+            # RTSP接続・probeはモデル読込と並行して済ませ、音声処理の直前で
+            # VADとwakeの準備完了だけを待つ。
+            try:
+                self.startup.wait("vad", "wake")
+            except StartupError as exc:
+                logging.error("%s", exc)
+                self._stop_ffmpeg(ffmpeg_proc)
+                self._cleanup_temp_log(ffmpeg_stderr_log)
+                return 2
+            if not audio_ready_logged:
+                audio_ready_logged = True
+                logging.info(
+                    "startup audio ready since_start_ms=%.1f stt_ready=%s router_ready=%s",
+                    (time.monotonic() - self.startup.started_at) * 1000.0,
+                    self.startup.ready("stt"),
+                    self.startup.ready("router"),
+                )
+
             self._reset_for_audio_connection(time.monotonic())
 
             # --- メインオーディオ読み取りループ ---
@@ -1013,7 +1480,9 @@ class ListendService:
                         logging.info(
                             (
                                 "heartbeat: state=%s chunks=%d total=%d "
-                                "buffered=%d wake_inferences=%d wake_dropped=%d"
+                                "buffered=%d wake_inferences=%d wake_dropped=%d "
+                                "stt_input_sec=%.1f stt_trimmed_sec=%.1f "
+                                "stt_model=%s"
                             ),
                             self.state,
                             chunks_since_heartbeat,
@@ -1021,6 +1490,13 @@ class ListendService:
                             len(read_buffer),
                             self.wake_backend.inference_count,
                             self.wake_backend.dropped_count,
+                            self.stt_input_sec_total,
+                            self.stt_trimmed_sec_total,
+                            (
+                                "n/a"
+                                if self.stt_models is None
+                                else self.stt_models.status
+                            ),
                         )
                         last_heartbeat_at = now
                         chunks_since_heartbeat = 0
@@ -1067,6 +1543,9 @@ class ListendService:
                 logging.info(
                     "resetting RTSP audio consumer to discard buffered system speech"
                 )
+            except StartupError as exc:
+                logging.error("%s", exc)
+                return 2
             except Exception as exc:
                 if self.stop_requested:
                     break
@@ -1300,6 +1779,11 @@ class ListendService:
                 now=now,
             )
             detection = self.wake_backend.poll(now=now)
+            if self.stt_models is not None:
+                if self.wake_backend.wake_candidate_active:
+                    self.stt_models.preload("wake candidate")
+                elif detection is None:
+                    self.stt_models.maybe_unload(now=now)
             if detection is not None:
                 trace = self.wake_latency.on_detection(
                     detection,
@@ -1366,7 +1850,12 @@ class ListendService:
                 self._apply_session_decision(self.session.on_livekit_wake(now), now)
             return
 
-        self._feed_segment(chunk, has_speech=has_speech, now=now)
+        self._feed_segment(
+            chunk,
+            has_speech=has_speech,
+            now=now,
+            vad_probability=self.last_vad_probability,
+        )
 
     def _reset_for_audio_connection(self, now: float) -> None:
         decision = self.session.on_reconnect(now)
@@ -1379,14 +1868,25 @@ class ListendService:
         self.wake_latency.reset()
         if decision.action is not SessionAction.NONE:
             logging.info("state transition: -> OFF (%s)", decision.reason)
+            self._set_frame_prefetch(False)
 
-    def _feed_segment(self, chunk: bytes, *, has_speech: bool, now: float) -> None:
+    def _feed_segment(
+        self,
+        chunk: bytes,
+        *,
+        has_speech: bool,
+        now: float,
+        vad_probability: float | None = None,
+    ) -> None:
+        if vad_probability is None:
+            vad_probability = 1.0 if has_speech else 0.0
         if has_speech:
             self.last_voice_at = now
             self.session.on_voice_detected(now)
             self.in_segment = True
             self.trailing_silence_chunks = 0
             self.segment_buffer.extend(chunk)
+            self.segment_vad_probs.append(vad_probability)
             self.vad_hangover_remaining = DEFAULT_VAD_HANGOVER_CHUNKS
             return
 
@@ -1396,6 +1896,7 @@ class ListendService:
                 self.last_voice_at = now
                 self.trailing_silence_chunks = 0
                 self.segment_buffer.extend(chunk)
+                self.segment_vad_probs.append(vad_probability)
                 logging.debug(
                     "chunk treated as speech by hangover remaining=%d",
                     self.vad_hangover_remaining,
@@ -1403,6 +1904,7 @@ class ListendService:
                 return
             self.trailing_silence_chunks += 1
             self.segment_buffer.extend(chunk)
+            self.segment_vad_probs.append(vad_probability)
             if self.trailing_silence_chunks >= self.settings.segment_end_silence_chunks:
                 self._finalize_segment()
             return
@@ -1502,8 +2004,12 @@ class ListendService:
         if action is SessionAction.START_PROMPT:
             self._reset_audio_session()
             self.wake_backend.reset_audio()
+            if self.stt_models is not None:
+                # prompt再生とguardの間に読込を済ませ、命令の文字起こしを待たせない。
+                self.stt_models.preload("wake detected")
             self._handled_prompt_status = PromptStatus.RUNNING
             logging.info("state transition: OFF -> WAKING (%s)", decision.reason)
+            self._set_frame_prefetch(True)
             self.wake_latency.on_prompt_start_requested(now=now)
             try:
                 self.prompt_player.start(
@@ -1552,6 +2058,7 @@ class ListendService:
         if action is SessionAction.ENTER_ON:
             self._reset_audio_session()
             logging.info("state transition: -> ON (%s)", decision.reason)
+            self._set_frame_prefetch(True)
             return
 
         if action is SessionAction.ENTER_OFF:
@@ -1560,6 +2067,7 @@ class ListendService:
             self.wake_backend.reset_audio()
             self.wake_latency.reset()
             logging.info("state transition: -> OFF (%s)", decision.reason)
+            self._set_frame_prefetch(False)
             if "stop word detected" in decision.reason:
                 self._play_standby_word()
                 self.last_system_audio_at = time.monotonic()
@@ -1576,13 +2084,17 @@ class ListendService:
         self.in_segment = False
         self.trailing_silence_chunks = 0
         self.segment_buffer.clear()
+        self.segment_vad_probs.clear()
         self.vad_hangover_remaining = 0
         self.session_text_chunks.clear()
+        self._speculative_moves.clear()
         self.wake_ack_pending = False
 
     def _finalize_segment(self) -> None:
         raw = bytes(self.segment_buffer)
+        vad_probs = tuple(self.segment_vad_probs)
         self.segment_buffer.clear()
+        self.segment_vad_probs.clear()
         self.in_segment = False
         self.trailing_silence_chunks = 0
         self.vad_hangover_remaining = 0
@@ -1631,7 +2143,8 @@ class ListendService:
             )
             return
 
-        transcription = self._transcribe(raw)
+        stt_audio, stt_vad_probs = self._crop_segment_to_speech(raw, vad_probs)
+        transcription = self._transcribe(stt_audio, stt_vad_probs)
         if not transcription:
             if self._debug_enabled():
                 logging.debug("[listend chunk-empty] transcription is empty")
@@ -1691,6 +2204,8 @@ class ListendService:
             logging.info("wake word detected while ON; wake ack suppressed (temporary)")
 
         self._append_session_text(transcription)
+        if self.settings.speculative_routing:
+            self._route_speculatively(transcription)
 
     def _flush_before_exit(self) -> None:
         if self.in_segment and self.segment_buffer:
@@ -1709,22 +2224,133 @@ class ListendService:
         if not text:
             return False
         logging.info("dispatch session (%s): %s", reason, text)
+        # 記憶の取得をルーティング・Router action・wake ackと並行して始めておく。
+        memory_future = self._start_memory_prefetch(text)
         prepared = self._prepare_dispatch(text)
         if prepared is None:
             logging.info("dispatch completed by SBERT Router without LLM")
             return False
         if not self._play_wake_ack():
             logging.warning("wake ack was not completed before dispatch; continuing")
+        memory_context = None
+        if memory_future is not None and not prepared.skip_memory_recall:
+            memory_context = self._await_memory_prefetch(memory_future)
         self._dispatch(
             prepared.text,
             memory_text=text,
             skip_memory_recall=prepared.skip_memory_recall,
+            observe_image=prepared.observe_image,
+            memory_context=memory_context,
         )
         # エージェント発話後のタイムスタンプを更新（ループ防止用）
         self.last_wake_ack_at = time.monotonic()
         self.last_system_audio_at = self.last_wake_ack_at
         return True
 
+    def _start_memory_prefetch(self, text: str) -> Future[tuple[MemoryContext, float]] | None:
+        if not env_bool_strict("YATAGARASU_MEMORY_ENABLED", True):
+            return None
+        if not env_bool_strict("YATAGARASU_MEMORY_PREFETCH", True):
+            return None
+        try:
+            client = self._memory()
+        except ValueError as exc:
+            logging.warning("memory prefetch disabled: %s", exc)
+            return None
+
+        def retrieve() -> tuple[MemoryContext, float]:
+            context = client.retrieve(text)
+            finished_at = time.monotonic()
+            self._fill_memory_cache(
+                [memory.document for memory in context.related], "retrieve"
+            )
+            return context, finished_at
+
+        return self._memory_pool().submit(retrieve)
+
+    def _memory_pool(self) -> ThreadPoolExecutor:
+        if self._memory_executor is None:
+            self._memory_executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="listend-memory",
+            )
+        return self._memory_executor
+
+    def _fill_memory_cache(self, documents: list[str], source: str) -> None:
+        """Encode new documents into the memory cache after the current memory job."""
+        cache = self._memory_cache
+        if cache is None or not documents:
+            return
+
+        def add() -> None:
+            try:
+                added = cache.add(documents, source=source)
+            except (RouterDaemonError, RuntimeError, ValueError) as exc:
+                logging.warning("memory cache fill failed: %s", exc)
+                return
+            if added:
+                logging.info(
+                    "memory cache filled source=%s added=%d entries=%d",
+                    source,
+                    added,
+                    len(cache),
+                )
+
+        try:
+            self._memory_pool().submit(add)
+        except RuntimeError:
+            # 終了処理でpoolが閉じた後に来た分は捨てる。
+            pass
+
+    def _cache_saved_memory(self, saved: SavedMemory) -> None:
+        if saved.document:
+            self._fill_memory_cache([saved.document], "save")
+
+    def _lookup_memory_cache(self, query: str, limit: int) -> LocalRecall | None:
+        """Recall answered locally, or None to ask SemanticMemory."""
+        cache = self._memory_cache
+        if cache is None:
+            return None
+        try:
+            local = cache.lookup(query, limit=limit)
+        except (RouterDaemonError, RuntimeError, ValueError) as exc:
+            logging.warning("memory cache lookup failed: %s", exc)
+            return None
+        if local is None:
+            return None
+        logging.info(
+            "memory cache hit count=%d best=%.3f hits=%d misses=%d",
+            local.count,
+            local.best_score,
+            cache.hits,
+            cache.misses,
+        )
+        return local
+
+    def _await_memory_prefetch(
+        self, future: Future[tuple[MemoryContext, float]]
+    ) -> str | None:
+        """YAML for bin/yatagarasu, or None to let it fetch the context itself."""
+        waited_from = time.monotonic()
+        timeout = env_float("YATAGARASU_MEMORY_PREFETCH_TIMEOUT_SEC", 3.0)
+        try:
+            context, finished_at = future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            logging.warning("memory prefetch timed out after waiting %.2fs", timeout)
+            return None
+        except (SemanticMemoryError, OSError) as exc:
+            logging.warning("memory prefetch failed: %s", exc)
+            return None
+        waited = max(0.0, finished_at - waited_from)
+        logging.info(
+            "memory prefetch ready recent=%d related=%d waited_ms=%.0f",
+            len(context.recent),
+            len(context.related),
+            waited * 1000.0,
+        )
+        return context.to_yaml()
+
     def _emit_chunk_debug(
         self,
         state: ListenState,
@@ -1759,6 +2385,9 @@ class ListendService:
         return logging.getLogger().isEnabledFor(logging.DEBUG)
 
     def _has_speech(self, pcm: np.ndarray) -> bool:
+        # VAD読込済みなら sys.modules 参照だけで済む。
+        import torch
+
         audio = pcm.astype(np.float32) / 32768.0
         tensor = torch.from_numpy(audio)
         # ストリーミングVAD: モデルを直接呼び出して確率値を取得。
@@ -1770,6 +2399,8 @@ class ListendService:
             ).item()
         except Exception:
             # フォールバック: get_speech_timestamps を使用
+            from silero_vad import get_speech_timestamps
+
             try:
                 timestamps = get_speech_timestamps(
                     tensor,
@@ -1784,12 +2415,52 @@ class ListendService:
                     self.vad_model,
                     sampling_rate=self.settings.sample_rate,
                 )
+            self.last_vad_probability = 1.0 if timestamps else 0.0
             return bool(timestamps)
+        self.last_vad_probability = float(speech_prob)
         return speech_prob >= self.settings.vad_threshold
 
-    def _transcribe(self, raw_audio: bytes) -> str:
+    def _crop_segment_to_speech(
+        self,
+        raw_audio: bytes,
+        vad_probs: tuple[float, ...],
+    ) -> tuple[bytes, tuple[float, ...]]:
+        """VAD hangover と末尾無音を落とし、発話区間＋余白だけをSTTへ渡す。"""
+        total_sec = self._segment_duration_sec(raw_audio)
+        cropped = raw_audio
+        cropped_probs = vad_probs
+        if self.settings.stt_trim_silence and vad_probs:
+            pad_chunks = math.ceil(
+                self.settings.stt_speech_pad_ms / max(1, self.settings.chunk_ms)
+            )
+            span = find_speech_span(
+                vad_probs,
+                threshold=self.settings.vad_threshold,
+                pad_chunks=pad_chunks,
+            )
+            cropped = crop_to_span(raw_audio, span)
+            if cropped is not raw_audio:
+                cropped_probs = vad_probs[span.start_chunk : span.end_chunk]
+        kept_sec = self._segment_duration_sec(cropped)
+        self.stt_input_sec_total += kept_sec
+        self.stt_trimmed_sec_total += total_sec - kept_sec
+        logging.debug(
+            "stt trim segment_sec=%.2f kept_sec=%.2f trimmed_sec=%.2f total_trimmed_sec=%.1f",
+            total_sec,
+            kept_sec,
+            total_sec - kept_sec,
+            self.stt_trimmed_sec_total,
+        )
+        return cropped, cropped_probs
+
+    def _transcribe(
+        self,
+        raw_audio: bytes,
+        vad_probs: tuple[float, ...] = (),
+    ) -> str:
+        self.startup.wait("stt")
         if self.settings.stt_backend == "reazonspeech-k2":
-            return self._transcribe_reazonspeech(raw_audio)
+            return self._transcribe_reazonspeech(raw_audio, vad_probs)
         return self._transcribe_faster_whisper(raw_audio)
 
     def _transcribe_faster_whisper(self, raw_audio: bytes) -> str:
@@ -1833,7 +2504,11 @@ class ListendService:
             logging.debug("transcribe recovered by permissive retry")
         return text
 
-    def _transcribe_reazonspeech(self, raw_audio: bytes) -> str:
+    def _transcribe_reazonspeech(
+        self,
+        raw_audio: bytes,
+        vad_probs: tuple[float, ...] = (),
+    ) -> str:
         if not raw_audio:
             return ""
         audio_i16 = np.frombuffer(raw_audio, dtype=np.int16)
@@ -1845,34 +2520,54 @@ class ListendService:
         if max_samples <= 0 or audio_f32.size <= max_samples:
             return self._run_reazonspeech_transcribe(audio_f32)
 
+        chunk_samples = int(self.settings.sample_rate * self.settings.chunk_ms / 1000)
+        ranges = plan_split_ranges(
+            vad_probs,
+            total_samples=audio_f32.size,
+            chunk_samples=chunk_samples,
+            max_samples=max_samples,
+            search_chunks=round(
+                DEFAULT_REAZON_SPLIT_SEARCH_SEC * 1000 / max(1, self.settings.chunk_ms)
+            ),
+        )
         logging.debug(
-            "reazonspeech split: %.2fs by %.2fs",
+            "reazonspeech split: %.2fs into %s",
             audio_f32.size / float(self.settings.sample_rate),
-            DEFAULT_REAZON_MAX_SEGMENT_SEC,
+            ", ".join(
+                f"{(end - start) / float(self.settings.sample_rate):.2f}s"
+                for start, end in ranges
+            ),
         )
-        texts: list[str] = []
-        start = 0
-        while start < audio_f32.size:
-            end = min(audio_f32.size, start + max_samples)
-            chunk_text = self._run_reazonspeech_transcribe(audio_f32[start:end])
-            if chunk_text:
-                texts.append(chunk_text)
-            start = end
-        return " ".join(texts).strip()
+        slices = [audio_f32[start:end] for start, end in ranges]
+        workers = min(self.settings.reazon_decode_workers, len(slices))
+        if workers <= 1:
+            texts = [self._run_reazonspeech_transcribe(chunk) for chunk in slices]
+        else:
+            if self._reazon_executor is None:
+                self._reazon_executor = ThreadPoolExecutor(
+                    max_workers=self.settings.reazon_decode_workers,
+                    thread_name_prefix="reazonspeech-decode",
+                )
+            # map は入力順で結果を返すため、並列decode後もテキスト順序は保たれる。
+            texts = list(
+                self._reazon_executor.map(self._run_reazonspeech_transcribe, slices)
+            )
+        return " ".join(text for text in texts if text).strip()
 
     def _run_reazonspeech_transcribe(self, audio_f32: np.ndarray) -> str:
         if audio_f32.size == 0:
             return ""
         if (
-            self.reazon_model is None
+            self.stt_models is None
             or self.reazon_audio_from_numpy is None
             or self.reazon_transcribe is None
         ):
             logging.error("reazonspeech backend is not initialized")
             return ""
         try:
+            model = self.stt_models.acquire()
             audio_data = self.reazon_audio_from_numpy(audio_f32, self.settings.sample_rate)
-            result = self.reazon_transcribe(self.reazon_model, audio_data)
+            result = self.reazon_transcribe(model, audio_data)
         except Exception as exc:
             logging.warning("reazonspeech transcribe failed: %s", exc)
             return ""
@@ -1882,16 +2577,17 @@ class ListendService:
         return str(text).strip()
 
     def _run_transcribe(self, audio_f32: np.ndarray, kwargs: dict[str, object]) -> str:
-        if self.whisper_model is None:
+        if self.stt_models is None:
             logging.error("faster-whisper backend is not initialized")
             return ""
+        whisper_model = self.stt_models.acquire()
 
         # initial_promptでウェイクワードをモデルに伝えて検出率向上（設定でON/OFF可能）
         if self.settings.whisper_initial_prompt_enabled and self.settings.wake_words and "initial_prompt" not in kwargs:
             wake_prompt = "、".join(self.settings.wake_words)
             kwargs["initial_prompt"] = f"次の単語を聞き取ってください: {wake_prompt}"
 
-        segments, _ = self.whisper_model.transcribe(audio_f32, **kwargs)
+        segments, _ = whisper_model.transcribe(audio_f32, **kwargs)
         texts = [
             segment.text.strip()
             for segment in segments
@@ -1968,25 +2664,50 @@ class ListendService:
         return normalized
 
     def _prepare_dispatch(self, text: str) -> PreparedDispatch | None:
+        self.startup.wait("router")
         router = self.intent_router
         if router is None:
             return PreparedDispatch(text=text)
 
-        decision = router.route(text)
+        # 投機実行が無ければ、ここから移動が始まっていた。
+        session_ended_at = time.monotonic()
+        try:
+            decision = router.route(text)
+        except RouterDaemonError as exc:
+            logging.warning("SBERT Router daemon request failed; dispatching original text: %s", exc)
+            return PreparedDispatch(text=text)
         self._log_router_decision(decision)
+        speculative = self._collect_speculative_moves(session_ended_at)
         if not decision.has_router_hit:
-            return PreparedDispatch(text=text)
+            if not speculative:
+                return PreparedDispatch(text=text)
+            # 投機実行済みの移動をLLMに再実行させないよう、実行結果を添えて渡す。
+            return PreparedDispatch(
+                text=self._build_router_control_prompt(
+                    decision,
+                    RouterExecutionResult(
+                        completed_without_llm=False,
+                        executed_actions=speculative,
+                        image_path=None,
+                        recall_text=None,
+                        errors=(),
+                    ),
+                )
+            )
 
         if decision.dry_run:
             logging.info("SBERT Router dry-run; dispatching original text")
             return PreparedDispatch(text=text)
 
-        result = self._execute_router_decision(decision)
+        if speculative:
+            decision = without_actions(decision, {item.action for item in speculative})
+        result = self._execute_router_decision(decision, prior_actions=speculative)
         if result.completed_without_llm:
             return None
         return PreparedDispatch(
             text=self._build_router_control_prompt(decision, result),
             skip_memory_recall=result.image_path is not None,
+            observe_image=None if result.image_reused else result.image_path,
         )
 
     def _log_router_decision(self, decision: RouterDecision) -> None:
@@ -2012,29 +2733,164 @@ class ListendService:
             ) or "-"
             logging.debug("SBERT Router top=[%s]", top)
 
+    def _route_speculatively(self, segment_text: str) -> None:
+        """Run safe PTZ moves for a finalized ON segment before the session ends."""
+        if self.state != ListenState.ON or not self.startup.ready("router"):
+            return
+        router = self.intent_router
+        if router is None or router.settings.dry_run:
+            return
+        veto_hit, veto_word = self._match_word(
+            segment_text,
+            (*self.settings.stop_words, *SPECULATIVE_VETO_TERMS),
+        )
+        if veto_hit:
+            logging.info("speculative routing skipped: veto word=%s", veto_word)
+            return
+        try:
+            decision = router.route(segment_text)
+        except RouterDaemonError as exc:
+            logging.warning("speculative routing failed: %s", exc)
+            return
+        # 別のセグメントで同じ移動を頼まれた場合（「右」→「もう一回右」）も毎回実行する。
+        # セッション全体の最終判定との重複は _prepare_dispatch で除く。
+        actions = self._speculative_actions(decision)
+        if not actions:
+            return
+        if self._speculative_executor is None:
+            # 1 workerで順序を保ち、音声ループはPTZ完了を待たない。
+            self._speculative_executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="listend-speculative",
+            )
+        for action in actions:
+            logging.info(
+                "speculative routing: executing %s before session end (%s)",
+                action,
+                segment_text,
+            )
+            self._speculative_moves.append(
+                SpeculativeMove(
+                    action=action,
+                    started_at=time.monotonic(),
+                    future=self._speculative_executor.submit(
+                        self._execute_speculative_action,
+                        action,
+                        decision,
+                    ),
+                )
+            )
+
+    def _speculative_actions(self, decision: RouterDecision) -> tuple[str, ...]:
+        if (
+            not decision.high_hits
+            or decision.middle_hits
+            or decision.requires_llm
+            or decision.dry_run
+        ):
+            return ()
+        if any(
+            hit.category != "move"
+            or hit.score < self.settings.speculative_min_score
+            for hit in decision.high_hits
+        ):
+            return ()
+        if not all(action in SPECULATIVE_ACTIONS for action in decision.flags):
+            return ()
+        return decision.flags
+
+    def _execute_speculative_action(
+        self, action: str, decision: RouterDecision
+    ) -> tuple[ActionResult, float]:
+        self.startup.wait("ptz")
+        result = self._execute_router_action(action, decision)
+        return result, time.monotonic()
+
+    def _collect_speculative_moves(self, session_ended_at: float) -> tuple[ActionResult, ...]:
+        """Wait for this session's speculative moves and return the successful ones."""
+        moves = list(self._speculative_moves)
+        self._speculative_moves.clear()
+        if self._speculative_executor is not None:
+            # 取り消し済みセッションの移動も含め、PTZ workerが空くのを待つ。
+            self._speculative_executor.submit(lambda: None).result()
+        if not moves:
+            return ()
+        results: list[ActionResult] = []
+        completed_at: float | None = None
+        for move in moves:
+            try:
+                result, finished_at = move.future.result()
+            except Exception as exc:
+                logging.warning("speculative %s failed: %s", move.action, exc)
+                continue
+            if result.ok:
+                results.append(result)
+                completed_at = max(finished_at, completed_at or finished_at)
+        # 短縮できたのはセッション終了時点で既に済んでいた分だけ（1セッション1回、失敗分は数えない）。
+        # 移動に要した時間より長くは短縮されない。
+        saved_ms = 0.0
+        if completed_at is not None:
+            work_sec = completed_at - min(move.started_at for move in moves)
+            saved_ms = max(0.0, min(session_ended_at - completed_at, work_sec)) * 1000.0
+        self.speculative_runs += 1
+        self.speculative_saved_ms_total += saved_ms
+        logging.info(
+            "speculative routing executed=[%s] saved_ms=%.0f total_runs=%d total_saved_ms=%.0f",
+            ", ".join(result.action for result in results) or "-",
+            saved_ms,
+            self.speculative_runs,
+            self.speculative_saved_ms_total,
+        )
+        return tuple(results)
+
     def _execute_router_decision(
-        self, decision: RouterDecision
+        self,
+        decision: RouterDecision,
+        prior_actions: tuple[ActionResult, ...] = (),
     ) -> RouterExecutionResult:
-        actions: list[ActionResult] = []
+        actions: list[ActionResult] = list(prior_actions)
         errors: list[str] = []
         image_path: str | None = None
+        image_reused = False
         recall_text: str | None = None
 
-        for index, action in enumerate(decision.flags):
-            result = self._execute_router_action(action, decision)
+        graph = run_action_graph(
+            self._build_action_graph(decision),
+            self._router_action_pool(),
+        )
+        if graph.outcomes:
+            logging.info(
+                "SBERT action graph elapsed=%.2fs sequential=%.2fs critical_path=%s",
+                graph.elapsed_sec,
+                graph.sequential_sec,
+                graph.describe_critical_path(),
+            )
+        results: dict[str, ActionResult] = {}
+        for name, outcome in graph.outcomes.items():
+            for result in outcome.result or ():
+                results[result.action] = result
+            for action in graph_node_actions(name):
+                results.setdefault(
+                    action,
+                    ActionResult(
+                        action=action,
+                        ok=False,
+                        stdout="",
+                        stderr=outcome.error or "action did not run",
+                        elapsed_sec=outcome.elapsed_sec,
+                    ),
+                )
+        for action in decision.flags:
+            result = results[action]
             actions.append(result)
             if not result.ok:
                 errors.append(f"{action}: {result.stderr or result.stdout}")
                 continue
             if action == "capture_image":
                 image_path = self._extract_capture_path(result.stderr)
+                image_reused = REUSED_NOTE in result.stderr
             if action == "recall_memory":
                 recall_text = result.stdout.strip()
-            if action in PTZ_ACTIONS and index < len(decision.flags) - 1:
-                settle_sec = env_float("YATAGARASU_SBERT_MOVE_SETTLE_SEC", 0.5)
-                if settle_sec > 0:
-                    logging.info("SBERT PTZ settle wait %.2fs", settle_sec)
-                    time.sleep(settle_sec)
 
         completed_without_llm = (
             bool(actions)
@@ -2049,28 +2905,236 @@ class ListendService:
             image_path=image_path,
             recall_text=recall_text,
             errors=tuple(errors),
+            image_reused=image_reused,
         )
 
-    def _execute_router_action(
-        self, action: str, decision: RouterDecision
-    ) -> ActionResult:
-        if action in PTZ_ACTIONS:
-            timeout = env_float("YATAGARASU_SBERT_MOVE_TIMEOUT_SEC", 8.0)
-            result = self.ptz_worker.execute(action, timeout)
+    def _build_action_graph(
+        self, decision: RouterDecision
+    ) -> list[ActionNode[tuple[ActionResult, ...]]]:
+        """PTZ moves go to the worker as one request, capture follows them, others start at once."""
+        specs = self._router_action_specs(decision)
+        flags = tuple(dict.fromkeys(decision.flags))
+        ptz_actions = tuple(action for action in flags if action in PTZ_ACTIONS)
+        nodes: list[ActionNode[tuple[ActionResult, ...]]] = []
+        camera_tail: str | None = None
+        for action in flags:
+            if action in PTZ_ACTIONS and action != ptz_actions[0]:
+                continue
+            name = (
+                PTZ_NODE_SEPARATOR.join(ptz_actions) if action in PTZ_ACTIONS else action
+            )
+            after: tuple[str, ...] = ()
+            settle_first = False
+            if action in PTZ_ACTIONS or action == "capture_image":
+                if camera_tail is not None:
+                    after = (camera_tail,)
+                    settle_first = camera_tail != "capture_image"
+                camera_tail = name
+            if action in PTZ_ACTIONS:
+                run = functools.partial(self._run_graph_moves, ptz_actions, settle_first)
+                timeout = env_float("YATAGARASU_SBERT_MOVE_TIMEOUT_SEC", 8.0)
+            else:
+                run = functools.partial(
+                    self._run_graph_action, action, decision, settle_first
+                )
+                timeout = specs.get(action, ([], DEFAULT_ROUTER_ACTION_TIMEOUT_SEC))[1]
+            nodes.append(ActionNode(name=name, run=run, timeout_sec=timeout, after=after))
+        return nodes
+
+    def _wait_for_ptz_settle(self) -> None:
+        waited = self.ptz_worker.wait_for_motion()
+        logging.info(
+            "SBERT PTZ settle waited %.2fs (motion estimate %.2fs, fixed setting %.2fs)",
+            waited,
+            self.ptz_worker.last_motion_sec,
+            env_float("YATAGARASU_SBERT_MOVE_SETTLE_SEC", 0.5),
+        )
+
+    def _run_graph_moves(
+        self, actions: tuple[str, ...], settle_first: bool
+    ) -> tuple[ActionResult, ...]:
+        if settle_first:
+            self._wait_for_ptz_settle()
+        self.startup.wait("ptz")
+        return tuple(self._execute_ptz_actions(actions))
+
+    def _run_graph_action(
+        self, action: str, decision: RouterDecision, settle_first: bool
+    ) -> tuple[ActionResult, ...]:
+        if settle_first:
+            self._wait_for_ptz_settle()
+        return (self._execute_router_action(action, decision),)
+
+    def _router_action_pool(self) -> ThreadPoolExecutor:
+        if self._action_executor is None:
+            self._action_executor = ThreadPoolExecutor(
+                max_workers=4,
+                thread_name_prefix="listend-action",
+            )
+        return self._action_executor
+
+    def _execute_ptz_actions(self, actions: tuple[str, ...]) -> list[ActionResult]:
+        timeout = env_float("YATAGARASU_SBERT_MOVE_TIMEOUT_SEC", 8.0)
+        results = self.ptz_worker.execute_many(actions, timeout)
+        if self._frame_capture is not None and any(result.ok for result in results):
+            # 移動前のフレームは使わず、静止見込み以降に取り直したものだけを使う。
+            self._frame_capture.invalidate(self.ptz_worker.motion_until)
+        for result in results:
             if result.ok:
                 logging.info(
                     "SBERT action succeeded action=%s elapsed=%.2fs",
-                    action,
+                    result.action,
                     result.elapsed_sec,
                 )
             else:
                 logging.warning(
                     "SBERT action failed action=%s elapsed=%.2fs stderr=%s",
-                    action,
+                    result.action,
                     result.elapsed_sec,
                     result.stderr,
                 )
-            return result
+        if len(actions) > 1:
+            logging.info(
+                "SBERT PTZ request coalesced %d actions into one worker round trip position=%s",
+                len(actions),
+                self.ptz_worker.position,
+            )
+        return results
+
+    def _frame_capturer(self) -> FrameCapture:
+        if self._frame_capture is None:
+            self._frame_capture = FrameCapture(
+                CaptureSettings.from_env(self.settings.workspace_path)
+            )
+        return self._frame_capture
+
+    def _set_frame_prefetch(self, active: bool) -> None:
+        """Keep a fresh camera frame only while a session is WAKING or ON."""
+        if self._frame_capture is None:
+            if not active or not env_bool_strict("YATAGARASU_FRAME_PREFETCH", False):
+                return
+            if not env_bool_strict("YATAGARASU_CAPTURE_INPROCESS", True):
+                return
+        try:
+            self._frame_capturer().set_prefetch_active(active)
+        except ValueError as exc:
+            logging.warning("frame prefetch disabled: %s", exc)
+
+    def _capture_image(self) -> ActionResult:
+        """Capture in-process; stderr keeps the view script's saved-path line."""
+        started = time.monotonic()
+        try:
+            frame = self._frame_capturer().capture()
+        except (CaptureError, OSError, ValueError) as exc:
+            elapsed = time.monotonic() - started
+            logging.warning(
+                "SBERT action failed action=capture_image elapsed=%.2fs stderr=%s",
+                elapsed,
+                exc,
+            )
+            return ActionResult(
+                action="capture_image",
+                ok=False,
+                stdout="",
+                stderr=str(exc),
+                elapsed_sec=elapsed,
+            )
+        capture = self._frame_capturer()
+        logging.info(
+            "SBERT action succeeded action=capture_image elapsed=%.2fs source=%s "
+            "bytes=%d size=%dx%d quality=%d reused=%s distance=%s "
+            "reuse_hits=%d/%d bytes_total=%d",
+            frame.elapsed_sec,
+            frame.source,
+            frame.size_bytes,
+            frame.width,
+            frame.height,
+            frame.quality,
+            frame.reused,
+            "-" if frame.distance is None else frame.distance,
+            capture.reuse_hits,
+            capture.captures,
+            capture.bytes_total,
+        )
+        return ActionResult(
+            action="capture_image",
+            ok=True,
+            stdout="",
+            stderr=frame.message,
+            elapsed_sec=frame.elapsed_sec,
+        )
+
+    def _memory(self) -> SemanticMemoryClient:
+        if self._memory_client is None:
+            self._memory_client = SemanticMemoryClient(MemorySettings.from_env())
+        return self._memory_client
+
+    def _recall_memory(self, decision: RouterDecision) -> ActionResult:
+        """Same output as recall.sh / recall-context.sh, over a pooled HTTP connection."""
+        started = time.monotonic()
+        timeout = env_float("YATAGARASU_SBERT_RECALL_TIMEOUT_SEC", 8.0)
+        query = self._build_recall_query(decision)
+        try:
+            client = self._memory()
+            if self._is_recent_recall(decision.original_text):
+                context = client.retrieve(
+                    query,
+                    recent_limit=env_int("SEMANTIC_MEMORY_RECENT_LIMIT", 3),
+                    threshold=1.0,
+                    timeout=timeout,
+                )
+                stdout = context.to_yaml()
+                stderr = (
+                    f"{len(context.recent)}件の過去の文脈、"
+                    f"{len(context.related)}件の関連知識を見つけました"
+                )
+            else:
+                limit = client.settings.recall_default_limit
+                local = self._lookup_memory_cache(query, limit)
+                if local is not None:
+                    stdout = json.dumps(local.to_payload(), ensure_ascii=False)
+                    stderr = f"{local.count}件の記憶を見つけました"
+                else:
+                    recalled = client.recall(query, limit=limit, timeout=timeout)
+                    stdout = recalled.to_json()
+                    stderr = f"{recalled.count}件の記憶を見つけました"
+                    self._fill_memory_cache(memory_documents(recalled.payload), "recall")
+        except (SemanticMemoryError, ValueError) as exc:
+            elapsed = time.monotonic() - started
+            logging.warning(
+                "SBERT action failed action=recall_memory elapsed=%.2fs stderr=%s",
+                elapsed,
+                exc,
+            )
+            return ActionResult(
+                action="recall_memory",
+                ok=False,
+                stdout="",
+                stderr=f"エラー: {exc}",
+                elapsed_sec=elapsed,
+            )
+        elapsed = time.monotonic() - started
+        logging.info(
+            "SBERT action succeeded action=recall_memory elapsed=%.2fs in_process=true",
+            elapsed,
+        )
+        return ActionResult(
+            action="recall_memory",
+            ok=True,
+            stdout=stdout.strip(),
+            stderr=stderr,
+            elapsed_sec=elapsed,
+        )
+
+    def _execute_router_action(
+        self, action: str, decision: RouterDecision
+    ) -> ActionResult:
+        if action in PTZ_ACTIONS:
+            return self._execute_ptz_actions((action,))[0]
+        if action == "capture_image" and env_bool_strict("YATAGARASU_CAPTURE_INPROCESS", True):
+            return self._capture_image()
+        if action == "recall_memory" and env_bool_strict("YATAGARASU_MEMORY_INPROCESS", True):
+            return self._recall_memory(decision)
 
         specs = self._router_action_specs(decision)
         spec = specs.get(action)
@@ -2211,6 +3275,14 @@ class ListendService:
             if result.image_path
             else "(画像なし)"
         )
+        observation = self._image_observation
+        if result.image_reused and observation and observation[0] == result.image_path:
+            image_instruction = (
+                "前回の撮影から映像に変化がないため、同じ画像を再利用しています。"
+                "まず以下の前回の観察結果を使って回答し、それで答えられない場合だけ "
+                "view_image Function Tool で上記の絶対パスを読み取ってください。\n"
+                f"前回の観察結果:\n{observation[1]}"
+            )
         recall_text = result.recall_text or "(なし)"
         return f"""以下は SBERT Skill Router による前処理結果です。
 実行済みの操作を再実行しないでください。
@@ -2248,7 +3320,20 @@ Middle判定のIntent候補:
         *,
         memory_text: str | None = None,
         skip_memory_recall: bool = False,
+        observe_image: str | None = None,
+        memory_context: str | None = None,
     ) -> None:
+        if self.settings.dispatch_mode == "inprocess":
+            self._dispatch_inprocess(
+                DispatchRequest(
+                    prompt=text,
+                    memory_prompt=memory_text or "",
+                    skip_memory_recall=skip_memory_recall,
+                    memory_context=memory_context,
+                ),
+                observe_image=observe_image,
+            )
+            return
         argv = shlex.split(self.settings.dispatch_cmd)
         if not argv:
             logging.error("dispatch command is empty")
@@ -2260,6 +3345,101 @@ Middle判定のIntent候補:
             env["YATAGARASU_MEMORY_PROMPT"] = memory_text
         if skip_memory_recall:
             env["YATAGARASU_SKIP_MEMORY_RECALL"] = "true"
+        response_path: Path | None = None
+        if observe_image:
+            fd, name = tempfile.mkstemp(prefix="yatagarasu-response-", suffix=".txt")
+            os.close(fd)
+            response_path = Path(name)
+            env["YATAGARASU_RESPONSE_FILE"] = str(response_path)
+        context_path: Path | None = None
+        if memory_context and not skip_memory_recall:
+            fd, name = tempfile.mkstemp(prefix="yatagarasu-memory-", suffix=".yaml")
+            with os.fdopen(fd, "w", encoding="utf-8") as context_file:
+                context_file.write(memory_context)
+            context_path = Path(name)
+            env["YATAGARASU_MEMORY_CONTEXT_FILE"] = str(context_path)
+        try:
+            self._run_dispatch(argv, text, env)
+        finally:
+            if context_path is not None:
+                context_path.unlink(missing_ok=True)
+            if self._memory_spool_worker is not None:
+                # 会話はspoolへ追加済みなので、次の周期を待たずに送り始める。
+                self._memory_spool_worker.notify()
+            if response_path is not None:
+                self._remember_image_observation(observe_image, response_path)
+
+    def _orchestrator(self) -> DispatchOrchestrator:
+        if self._dispatch_orchestrator is None:
+            settings = replace(
+                DispatchSettings.from_env(self.settings.workspace_path),
+                timeout_sec=self.settings.dispatch_timeout_sec,
+            )
+            memory: SemanticMemoryClient | None = None
+            if settings.memory_enabled:
+                try:
+                    memory = self._memory()
+                except ValueError as exc:
+                    logging.warning("dispatch memory disabled: %s", exc)
+            worker = self._memory_spool_worker
+            self._dispatch_orchestrator = DispatchOrchestrator(
+                settings,
+                memory=memory,
+                spool=worker.spool if worker is not None else None,
+            )
+        return self._dispatch_orchestrator
+
+    def _dispatch_inprocess(self, request: DispatchRequest, *, observe_image: str | None) -> None:
+        """bin/yatagarasu と同じ段階を、段階ごとの所要時間付きでこのプロセス内で行う。"""
+        try:
+            result = self._orchestrator().run(request)
+        except ValueError as exc:
+            logging.error("dispatch failed: %s", exc)
+            return
+        finally:
+            if self._memory_spool_worker is not None:
+                self._memory_spool_worker.notify()
+        if not result.ok:
+            logging.error(
+                "dispatch failed elapsed=%.2fs stages=%s error=%s",
+                result.total_sec,
+                result.format_stages(),
+                result.error,
+            )
+            return
+        if result.memory_warnings:
+            logging.warning(
+                "dispatch memory warning elapsed=%.2fs detail=%s",
+                result.total_sec,
+                " | ".join(result.memory_warnings),
+            )
+        logging.info(
+            "dispatch succeeded elapsed=%.2fs first_audio=%s in_process=true streamed=%s",
+            result.total_sec,
+            "-" if result.first_audio_sec is None else f"{result.first_audio_sec:.2f}s",
+            result.streamed,
+        )
+        if observe_image and result.response.strip():
+            self._image_observation = (
+                observe_image,
+                result.response.strip()[:IMAGE_OBSERVATION_MAX_CHARS],
+            )
+
+    def _remember_image_observation(self, image_path: str, response_path: Path) -> None:
+        try:
+            response = response_path.read_text(encoding="utf-8").strip()
+        except (OSError, UnicodeDecodeError):
+            response = ""
+        finally:
+            # 読めなかった時も一時ファイルは残さない。
+            try:
+                response_path.unlink(missing_ok=True)
+            except OSError as exc:
+                logging.debug("response file cleanup failed: %s", exc)
+        if response:
+            self._image_observation = (image_path, response[:IMAGE_OBSERVATION_MAX_CHARS])
+
+    def _run_dispatch(self, argv: list[str], text: str, env: dict[str, str]) -> None:
         started = time.monotonic()
 
         try:
@@ -2512,6 +3692,24 @@ Middle判定のIntent候補:
             return False
 
 
+def without_actions(decision: RouterDecision, executed: set[str]) -> RouterDecision:
+    """Drop already executed move flags so the final dispatch does not repeat them."""
+    return replace(
+        decision,
+        high_hits=tuple(
+            hit
+            for hit in decision.high_hits
+            if not (hit.category == "move" and hit.intent_id in executed)
+        ),
+        flags=tuple(flag for flag in decision.flags if flag not in executed),
+    )
+
+
+def graph_node_actions(name: str) -> tuple[str, ...]:
+    """Router actions executed by the action graph node ``name``."""
+    return tuple(name.split(PTZ_NODE_SEPARATOR))
+
+
 def setup_logging(level_name: str) -> None:
     level = getattr(logging, level_name.upper(), logging.INFO)
     logging.basicConfig(
@@ -2547,6 +3745,7 @@ def main() -> int:
     logging.info("workspace=%s", settings.workspace_path)
     logging.info("dispatch_cmd=%s", settings.dispatch_cmd)
     logging.info("dispatch_timeout_sec=%.1f", settings.dispatch_timeout_sec)
+    logging.info("dispatch_mode=%s", settings.dispatch_mode)
     logging.info("stt_backend=%s", settings.stt_backend)
     logging.info("stt_language=%s", settings.stt_language)
     if settings.stt_backend == "faster-whisper":
@@ -2558,10 +3757,14 @@ def main() -> int:
         )
     elif settings.stt_backend == "reazonspeech-k2":
         logging.info(
-            "reazon_language=%s reazon_device=%s reazon_precision=%s",
+            (
+                "reazon_language=%s reazon_device=%s reazon_precision=%s "
+                "reazon_decode_workers=%d"
+            ),
             settings.reazon_language,
             settings.reazon_device,
             settings.reazon_precision,
+            settings.reazon_decode_workers,
         )
     logging.info(
         "rtsp_transport=%s low_latency=%s",
@@ -2613,6 +3816,21 @@ def main() -> int:
         settings.segment_end_silence_chunks * settings.chunk_ms,
     )
     logging.info("vad_hangover_chunks=%d", DEFAULT_VAD_HANGOVER_CHUNKS)
+    logging.info(
+        "stt_trim_silence=%s stt_speech_pad_ms=%d",
+        settings.stt_trim_silence,
+        settings.stt_speech_pad_ms,
+    )
+    logging.info(
+        "stt_idle_unload_sec=%.1f stt_rss_budget_mb=%.1f",
+        settings.stt_idle_unload_sec,
+        settings.stt_rss_budget_mb,
+    )
+    logging.info(
+        "speculative_routing=%s speculative_min_score=%.2f",
+        settings.speculative_routing,
+        settings.speculative_min_score,
+    )
     logging.info("min_transcribe_rms_dbfs=%.1f", DEFAULT_MIN_TRANSCRIBE_RMS_DBFS)
     logging.info(
         "min_segment_sec=%.2f off_transcribe_cooldown_sec=%.2f",
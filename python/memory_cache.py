@@ -0,0 +1,332 @@
+"""Local read-through index of SemanticMemory documents.
+
+Every ``recall_memory`` goes over HTTP to the SemanticMemory container, which
+embeds the query with CPU PyTorch before searching. listend already has the
+Router's SBERT model loaded, so ``MemoryVectorCache`` keeps the documents it
+has seen (recall/retrieve responses and saved conversations) together with
+their embeddings from that model, and answers a recall locally when the best
+match clears ``min_score``. Anything less confident falls back to the service.
+
+Rows live in one memory-mapped ``vectors.npy`` per model namespace with a JSON
+index of documents and hit counts next to it, written the same way as
+``embedding_cache.EmbeddingCache``. Additions are written at most once per
+``save_interval_sec`` (and on ``flush()``), so a burst of recalls does not
+rewrite the whole matrix each time. When more than ``capacity`` documents are
+known, the least recalled (then least recently used) ones are evicted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Protocol, Sequence
+
+import numpy as np
+
+from embedding_cache import atomic_write, default_cache_dir
+
+
+INDEX_VERSION = 1
+DEFAULT_CAPACITY = 512
+DEFAULT_MIN_SCORE = 0.85
+# 追加のたびに vectors.npy 全体を書き直さないよう、書き出しはこの間隔にまとめる。
+DEFAULT_SAVE_INTERVAL_SEC = 30.0
+# Ruri v3 は検索用途でクエリと文書に別々の接頭辞を付けて学習されている。
+QUERY_PREFIX = "検索クエリ: "
+DOCUMENT_PREFIX = "検索文書: "
+# SemanticMemory のレスポンスで文書が入っているキー。recent は会話の生ログなので
+# 入れない（今の発話そのものに高得点で一致してしまう）。
+_LIST_KEYS = ("memories", "results", "semantic")
+_TEXT_KEYS = ("document", "main_text", "content", "text")
+
+
+class _Encoder(Protocol):
+    def encode(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+@dataclass
+class CachedMemory:
+    key: str
+    document: str
+    source: str
+    added_at: float
+    last_hit_at: float = 0.0
+    hits: int = 0
+
+
+@dataclass(frozen=True)
+class LocalRecall:
+    memories: tuple[tuple[str, float], ...]
+    best_score: float
+
+    @property
+    def count(self) -> int:
+        return len(self.memories)
+
+    def to_payload(self) -> dict[str, Any]:
+        """Same shape as ``/api/mcp/recall_memory`` so recall.sh consumers keep working."""
+        return {
+            "status": "success",
+            "count": self.count,
+            "memories": [
+                {"document": document, "score": round(score, 3)}
+                for document, score in self.memories
+            ],
+            "source": "local_cache",
+        }
+
+
+def memory_documents(payload: object) -> list[str]:
+    """Documents found in a SemanticMemory recall or retrieve response."""
+    if not isinstance(payload, dict):
+        return []
+    documents = []
+    for list_key in _LIST_KEYS:
+        items = payload.get(list_key)
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            text = _item_text(item)
+            if text:
+                documents.append(text)
+    return documents
+
+
+def _item_text(item: object) -> str:
+    if isinstance(item, str):
+        return item.strip()
+    if not isinstance(item, dict):
+        return ""
+    for key in _TEXT_KEYS:
+        value = item.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+class MemoryVectorCache:
+    def __init__(
+        self,
+        directory: Path,
+        encoder: _Encoder,
+        *,
+        model_name: str,
+        revision: str,
+        capacity: int = DEFAULT_CAPACITY,
+        min_score: float = DEFAULT_MIN_SCORE,
+        save_interval_sec: float = DEFAULT_SAVE_INTERVAL_SEC,
+    ) -> None:
+        self.encoder = encoder
+        self.model_name = model_name
+        self.revision = revision
+        self.capacity = max(1, capacity)
+        self.min_score = min_score
+        self.save_interval_sec = save_interval_sec
+        namespace = hashlib.sha256(f"{model_name}\0{revision}".encode("utf-8")).hexdigest()[:16]
+        self.directory = directory / namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: list[CachedMemory] = []
+        self._vectors: np.ndarray | None = None
+        self._dirty = False
+        # 最初の追加はすぐ書き出す（起動直後に落ちても中身が残るように）。
+        self._next_save_at = 0.0
+        self._load()
+
+    @classmethod
+    def from_env(cls, encoder: _Encoder, *, model_name: str, revision: str) -> "MemoryVectorCache":
+        raw = os.getenv("YATAGARASU_MEMORY_CACHE_DIR", "").strip()
+        directory = Path(raw).expanduser() if raw else default_cache_dir().parent / "memory"
+        capacity = os.getenv("YATAGARASU_MEMORY_CACHE_SIZE", "").strip()
+        min_score = os.getenv("YATAGARASU_MEMORY_CACHE_MIN_SCORE", "").strip()
+        try:
+            return cls(
+                directory,
+                encoder,
+                model_name=model_name,
+                revision=revision,
+                capacity=int(capacity) if capacity else DEFAULT_CAPACITY,
+                min_score=float(min_score) if min_score else DEFAULT_MIN_SCORE,
+            )
+        except ValueError as exc:
+            raise ValueError(f"invalid memory cache setting: {exc}") from exc
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "entries.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.npy"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, document: str) -> str:
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    def observe(self, payload: object, *, source: str) -> int:
+        """Add the documents of a service response; returns how many were new."""
+        return self.add(memory_documents(payload), source=source)
+
+    def add(self, documents: Iterable[str], *, source: str, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            known = {entry.key for entry in self._entries}
+        fresh: dict[str, str] = {}
+        for document in documents:
+            document = document.strip()
+            key = self.key(document)
+            if document and key not in known and key not in fresh:
+                fresh[key] = document
+        if not fresh:
+            return 0
+        # 符号化は数十msかかるので、lookup を待たせないようロックの外で行う。
+        encoded = np.asarray(
+            self.encoder.encode([DOCUMENT_PREFIX + text for text in fresh.values()]),
+            dtype=np.float32,
+        )
+        with self._lock:
+            # 符号化している間に別スレッドが同じ文書を入れていれば、そちらを残す。
+            known = {entry.key for entry in self._entries}
+            rows = [row for row, key in enumerate(fresh) if key not in known]
+            if not rows:
+                return 0
+            items = list(fresh.items())
+            entries = [
+                CachedMemory(key=key, document=text, source=source, added_at=now)
+                for key, text in (items[row] for row in rows)
+            ]
+            vectors = encoded[rows]
+            if self._vectors is not None:
+                if self._vectors.shape[1:] == vectors.shape[1:]:
+                    entries = self._entries + entries
+                    vectors = np.concatenate([self._vectors, vectors])
+                else:
+                    logging.warning(
+                        "memory cache dimension changed %s -> %s; rebuilding",
+                        self._vectors.shape[1:],
+                        vectors.shape[1:],
+                    )
+            self._entries, self._vectors = self._evict(entries, vectors)
+            self._dirty = True
+            if time.monotonic() >= self._next_save_at:
+                self._save()
+            return len(rows)
+
+    def lookup(
+        self,
+        query: str,
+        *,
+        limit: int = 3,
+        now: float | None = None,
+    ) -> LocalRecall | None:
+        """Local answer when the best match clears ``min_score``, else None."""
+        if not self._entries:
+            with self._lock:
+                self.misses += 1
+            return None
+        encoded = np.asarray(self.encoder.encode([QUERY_PREFIX + query]), dtype=np.float32)
+        with self._lock:
+            if not self._entries or self._vectors is None:
+                self.misses += 1
+                return None
+            scores = np.asarray(self._vectors @ encoded[0], dtype=np.float32)
+            order = np.argsort(-scores)[: max(1, limit)]
+            best = float(scores[order[0]])
+            if best < self.min_score:
+                self.misses += 1
+                return None
+            now = time.time() if now is None else now
+            memories = []
+            for row in order:
+                score = float(scores[row])
+                if score < self.min_score:
+                    break
+                entry = self._entries[row]
+                entry.hits += 1
+                entry.last_hit_at = now
+                memories.append((entry.document, score))
+            # 命中回数はメモリ上だけで更新し、次の書き出しか flush() で保存する。
+            self._dirty = True
+            self.hits += 1
+            return LocalRecall(memories=tuple(memories), best_score=best)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _evict(
+        self, entries: list[CachedMemory], vectors: np.ndarray
+    ) -> tuple[list[CachedMemory], np.ndarray]:
+        if len(entries) <= self.capacity:
+            return entries, vectors
+        ranked = sorted(
+            range(len(entries)),
+            key=lambda row: (
+                entries[row].hits,
+                max(entries[row].added_at, entries[row].last_hit_at),
+            ),
+        )
+        keep = sorted(ranked[len(entries) - self.capacity :])
+        return [entries[row] for row in keep], np.asarray(vectors[keep], dtype=np.float32)
+
+    def _load(self) -> None:
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logging.warning("memory cache unreadable; rebuilding: %s", exc)
+            return
+        items = index.get("entries") if isinstance(index, dict) else None
+        try:
+            if (
+                not isinstance(items, list)
+                or index.get("version") != INDEX_VERSION
+                or vectors.ndim != 2
+                or vectors.shape[0] != len(items)
+            ):
+                raise ValueError("row count mismatch")
+            entries = [CachedMemory(**item) for item in items]
+        except (TypeError, ValueError) as exc:
+            logging.warning("memory cache index mismatch; rebuilding: %s", exc)
+            return
+        self._entries, self._vectors = entries, vectors
+
+    def _save(self) -> None:
+        if self._vectors is None:
+            return
+        vectors = self._vectors
+        index = {
+            "version": INDEX_VERSION,
+            "model": self.model_name,
+            "revision": self.revision,
+            "entries": [vars(entry) for entry in self._entries],
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # npy → index の順に置き換える。途中で落ちても行数不一致で再構築される。
+            atomic_write(self.vectors_path, lambda handle: np.save(handle, vectors))
+            atomic_write(
+                self.index_path,
+                lambda handle: handle.write(
+                    json.dumps(index, ensure_ascii=False).encode("utf-8")
+                ),
+            )
+            self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        except OSError as exc:
+            # キャッシュは最適化なので、書けなくても想起はサービス経由で続ける。
+            logging.warning("memory cache write failed: %s", exc)
+            self._vectors = np.asarray(vectors, dtype=np.float32)
+        self._dirty = False
+        self._next_save_at = time.monotonic() + self.save_interval_sec
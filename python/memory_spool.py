@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""Durable write-behind queue for conversation memories.
+
+``bin/yatagarasu`` used to call ``memorize.sh`` after speaking, so the turn
+(and listend's ``subprocess.run``) only ended once SemanticMemory and its
+summariser had accepted the conversation. With ``YATAGARASU_MEMORY_SPOOL``
+set, the launcher appends the conversation to a SQLite spool instead and
+returns. ``MemorySpoolWorker`` (started by listend) drains it in batches over
+one pooled ``SemanticMemoryClient``:
+
+- entries survive restarts; a claimed batch is leased, so a concurrent
+  flusher skips it, and a crashed flusher's entries are resent once the lease
+  expires. Delivery is at-least-once: the lease outlasts SemanticMemory's
+  dedupe window, so a save that was accepted but not marked done can be
+  stored twice
+- a stopping worker releases the entries it has not sent yet, so the next
+  start sends them without waiting for the lease
+- failures are retried with exponential backoff; after ``max_attempts`` the
+  entry is kept as ``failed`` for inspection
+- identical conversations inside the dedupe window are enqueued once
+- ``backlog()`` reports pending/failed counts and the oldest pending age
+
+::
+
+    python memory_spool.py enqueue "[user]...[agent]..."
+    python memory_spool.py flush
+    python memory_spool.py status
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from semantic_memory import (
+    DEFAULT_DEDUP_WINDOW_SEC,
+    MemorySettings,
+    SavedMemory,
+    SemanticMemoryClient,
+    SemanticMemoryError,
+    load_env_file,
+)
+
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_INTERVAL_SEC = 2.0
+DEFAULT_BACKOFF_SEC = 2.0
+DEFAULT_MAX_BACKOFF_SEC = 300.0
+DEFAULT_MAX_ATTEMPTS = 20
+# 取り出したバッチの貸出期間。これを過ぎても完了しなければ他のflusherが再送する。
+DEFAULT_LEASE_SEC = 120.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    main_text TEXT NOT NULL,
+    sub_text TEXT,
+    summarize INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    memory_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS memories_due ON memories (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS memories_key ON memories (key, created_at);
+"""
+
+
+@dataclass(frozen=True)
+class SpoolEntry:
+    id: int
+    main_text: str
+    sub_text: str | None
+    summarize: bool
+    attempts: int
+
+
+@dataclass(frozen=True)
+class Backlog:
+    pending: int
+    failed: int
+    oldest_pending_sec: float | None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "pending": self.pending,
+                "failed": self.failed,
+                "oldest_pending_sec": (
+                    None
+                    if self.oldest_pending_sec is None
+                    else round(self.oldest_pending_sec, 1)
+                ),
+            }
+        )
+
+
+def resolve_spool_path(raw: str) -> Path:
+    """Relative spool paths are relative to the workspace (``YATAGARASU_CWD``)."""
+    path = Path(raw).expanduser()
+    if path.is_absolute():
+        return path
+    workspace = os.getenv("YATAGARASU_CWD", "").strip()
+    return (Path(workspace).expanduser() if workspace else Path.cwd()) / path
+
+
+class MemorySpool:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        dedup_window_sec: float = DEFAULT_DEDUP_WINDOW_SEC,
+        backoff_sec: float = DEFAULT_BACKOFF_SEC,
+        max_backoff_sec: float = DEFAULT_MAX_BACKOFF_SEC,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        lease_sec: float = DEFAULT_LEASE_SEC,
+    ) -> None:
+        self.path = path
+        self.dedup_window_sec = dedup_window_sec
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.max_attempts = max_attempts
+        self.lease_sec = lease_sec
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # enqueueするyatagarasuとflushするlistendが同時に開くのでWALにする。
+        self._db = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(
+        self,
+        main_text: str,
+        *,
+        sub_text: str | None = None,
+        summarize: bool = True,
+        now: float | None = None,
+    ) -> int | None:
+        """Append one memory; returns its row id, or None for a duplicate."""
+        now = time.time() if now is None else now
+        key = hashlib.sha256(
+            json.dumps([main_text, sub_text or "", summarize], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        with self._lock, self._transaction():
+            duplicate = self._db.execute(
+                "SELECT id FROM memories WHERE key = ? AND created_at >= ? AND status != 'failed'",
+                (key, now - self.dedup_window_sec),
+            ).fetchone()
+            if duplicate is not None:
+                return None
+            cursor = self._db.execute(
+                "INSERT INTO memories (key, main_text, sub_text, summarize, created_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, main_text, sub_text, int(summarize), now, now),
+            )
+            return int(cursor.lastrowid)
+
+    def claim(self, limit: int, now: float | None = None) -> list[SpoolEntry]:
+        """Lease up to ``limit`` due entries, oldest first."""
+        now = time.time() if now is None else now
+        with self._lock, self._transaction():
+            rows = self._db.execute(
+                "SELECT id, main_text, sub_text, summarize, attempts FROM memories"
+                " WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE memories SET next_attempt_at = ? WHERE id = ?",
+                [(now + self.lease_sec, row[0]) for row in rows],
+            )
+        return [
+            SpoolEntry(
+                id=row[0],
+                main_text=row[1],
+                sub_text=row[2],
+                summarize=bool(row[3]),
+                attempts=row[4],
+            )
+            for row in rows
+        ]
+
+    def mark_done(self, entry: SpoolEntry, memory_id: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE memories SET status = 'done', memory_id = ?, last_error = NULL"
+                " WHERE id = ?",
+                (memory_id, entry.id),
+            )
+
+    def mark_failed(self, entry: SpoolEntry, error: str, now: float | None = None) -> float | None:
+        """Schedule a retry; returns the delay, or None once the entry is given up."""
+        now = time.time() if now is None else now
+        attempts = entry.attempts + 1
+        if attempts >= self.max_attempts:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE memories SET status = 'failed', attempts = ?, last_error = ?"
+                    " WHERE id = ?",
+                    (attempts, error, entry.id),
+                )
+            return None
+        delay = min(self.max_backoff_sec, self.backoff_sec * 2 ** (attempts - 1))
+        with self._lock:
+            self._db.execute(
+                "UPDATE memories SET attempts = ?, next_attempt_at = ?, last_error = ?"
+                " WHERE id = ?",
+                (attempts, now + delay, error, entry.id),
+            )
+        return delay
+
+    def release(self, entries: list[SpoolEntry], now: float | None = None) -> None:
+        """Return leased entries untouched (e.g. on shutdown)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.executemany(
+                "UPDATE memories SET next_attempt_at = ? WHERE id = ?",
+                [(now, entry.id) for entry in entries],
+            )
+
+    def purge(self, now: float | None = None) -> int:
+        """Drop sent entries once they are outside the dedupe window."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM memories WHERE status = 'done' AND created_at < ?",
+                (now - self.dedup_window_sec,),
+            )
+        return cursor.rowcount
+
+    def backlog(self, now: float | None = None) -> Backlog:
+        now = time.time() if now is None else now
+        with self._lock:
+            pending, oldest = self._db.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM memories WHERE status = 'pending'"
+            ).fetchone()
+            (failed,) = self._db.execute(
+                "SELECT COUNT(*) FROM memories WHERE status = 'failed'"
+            ).fetchone()
+        return Backlog(
+            pending=pending,
+            failed=failed,
+            oldest_pending_sec=None if oldest is None else max(0.0, now - oldest),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection) -> None:
+        self._db = db
+
+    def __enter__(self) -> None:
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, *exc: object) -> None:
+        self._db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+def flush(
+    spool: MemorySpool,
+    client: SemanticMemoryClient,
+    batch_size: int,
+    on_saved: Callable[[SavedMemory], None] | None = None,
+    stop: threading.Event | None = None,
+) -> tuple[int, int]:
+    """Send one batch; returns (sent, failed). Unsent entries are released on ``stop``."""
+    sent = failed = 0
+    entries = spool.claim(batch_size)
+    for index, entry in enumerate(entries):
+        if stop is not None and stop.is_set():
+            spool.release(entries[index:])
+            break
+        try:
+            saved = client.save(
+                entry.main_text, sub_text=entry.sub_text, summarize=entry.summarize
+            )
+        except (SemanticMemoryError, OSError) as exc:
+            # OSError は重複判定用のstate_dir（mkdir/open/flock）から来る。送れなかった扱いにする。
+            failed += 1
+            delay = spool.mark_failed(entry, str(exc))
+            if delay is None:
+                logging.error(
+                    "memory spool gave up entry=%d attempts=%d: %s",
+                    entry.id,
+                    entry.attempts + 1,
+                    exc,
+                )
+            else:
+                logging.warning(
+                    "memory spool save failed entry=%d retry_in=%.0fs: %s",
+                    entry.id,
+                    delay,
+                    exc,
+                )
+            continue
+        except Exception:
+            # 想定外の失敗は呼び出し側で記録する。残りは貸出期限を待たずに再送できるよう返す。
+            spool.release(entries[index:])
+            raise
+        spool.mark_done(entry, saved.id)
+        sent += 1
+        if on_saved is not None:
+            on_saved(saved)
+    return sent, failed
+
+
+class MemorySpoolWorker:
+    """Background flusher; ``notify()`` wakes it right after a turn enqueues."""
+
+    def __init__(
+        self,
+        spool: MemorySpool,
+        client: SemanticMemoryClient,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        interval_sec: float = DEFAULT_INTERVAL_SEC,
+    ) -> None:
+        self.spool = spool
+        self.client = client
+        self.batch_size = batch_size
+        self.interval_sec = interval_sec
+        self.sent_total = 0
+        self.failed_total = 0
+        # listend が memory_cache に保存済みの本文を入れるためのフック。
+        self.on_saved: Callable[[SavedMemory], None] | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="memory-spool", daemon=True
+        )
+
+    @classmethod
+    def from_env(cls) -> "MemorySpoolWorker | None":
+        raw = os.getenv("YATAGARASU_MEMORY_SPOOL", "").strip()
+        if not raw:
+            return None
+        settings = MemorySettings.from_env()
+        spool = MemorySpool(
+            resolve_spool_path(raw),
+            dedup_window_sec=settings.dedup_window_sec,
+            max_attempts=_env_positive_int(
+                "YATAGARASU_MEMORY_SPOOL_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS
+            ),
+        )
+        return cls(
+            spool,
+            SemanticMemoryClient(settings),
+            batch_size=_env_positive_int("YATAGARASU_MEMORY_SPOOL_BATCH", DEFAULT_BATCH_SIZE),
+            interval_sec=_env_positive_float(
+                "YATAGARASU_MEMORY_SPOOL_INTERVAL_SEC", DEFAULT_INTERVAL_SEC
+            ),
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.client.close()
+        self.spool.close()
+
+    def flush_once(self) -> tuple[int, int]:
+        sent, failed = flush(
+            self.spool, self.client, self.batch_size, self.on_saved, stop=self._stop
+        )
+        self.sent_total += sent
+        self.failed_total += failed
+        if sent or failed:
+            self.spool.purge()
+            backlog = self.spool.backlog()
+            logging.info(
+                "memory spool flushed sent=%d failed=%d backlog=%d failed_total=%d oldest_sec=%s",
+                sent,
+                failed,
+                backlog.pending,
+                backlog.failed,
+                "-" if backlog.oldest_pending_sec is None else f"{backlog.oldest_pending_sec:.1f}",
+            )
+        return sent, failed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent, failed = self.flush_once()
+            except sqlite3.Error as exc:
+                logging.warning("memory spool flush failed: %s", exc)
+                sent = failed = 0
+            except Exception:
+                # 想定外の例外でもスレッドを止めない（止まるとlistend再起動まで送られない）。
+                logging.exception("memory spool flush crashed; retrying later")
+                sent = failed = 0
+            # バッチを満杯で送れた時は、待たずに続きを送る。
+            if sent + failed >= self.batch_size and not failed:
+                continue
+            self._wake.wait(self.interval_sec)
+            self._wake.clear()
+
+
+def _env_positive_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer: {raw}") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0: {raw}")
+    return value
+
+
+def _env_positive_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number: {raw}") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0: {raw}")
+    return value
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SemanticMemory write-behind spool")
+    parser.add_argument("--spool", help="spool path (default: YATAGARASU_MEMORY_SPOOL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = commands.add_parser("enqueue", help="queue one memory")
+    enqueue_parser.add_argument("main_text")
+    enqueue_parser.add_argument("--sub")
+    enqueue_parser.add_argument("--no-summarize", action="store_true")
+    commands.add_parser("flush", help="send everything that is due, then exit")
+    commands.add_parser("status", help="print the backlog as JSON")
+    args = parser.parse_args(argv)
+
+    project_root = Path(__file__).resolve().parents[1]
+    workspace = Path(os.getenv("YATAGARASU_CWD", "") or project_root / "workspace")
+    load_env_file(workspace / ".env")
+    raw = args.spool or os.getenv("YATAGARASU_MEMORY_SPOOL", "").strip()
+    if not raw:
+        print("エラー: YATAGARASU_MEMORY_SPOOL が設定されていません", file=sys.stderr)
+        return 1
+    settings = MemorySettings.from_env()
+    spool = MemorySpool(resolve_spool_path(raw), dedup_window_sec=settings.dedup_window_sec)
+    try:
+        if args.command == "enqueue":
+            if not args.main_text:
+                print("エラー: メインテキストが指定されていません", file=sys.stderr)
+                return 1
+            row_id = spool.enqueue(
+                args.main_text, sub_text=args.sub, summarize=not args.no_summarize
+            )
+            if row_id is None:
+                print("記憶は既に保存待ちです", file=sys.stderr)
+            else:
+                print(f"記憶を保存待ちに追加しました (spool ID: {row_id})", file=sys.stderr)
+        elif args.command == "flush":
+            client = SemanticMemoryClient(settings)
+            try:
+                while True:
+                    sent, failed = flush(spool, client, DEFAULT_BATCH_SIZE)
+                    if sent + failed < DEFAULT_BATCH_SIZE or failed:
+                        break
+            finally:
+                client.close()
+            spool.purge()
+        print(spool.backlog().to_json())
+    finally:
+        spool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    raise SystemExit(main())
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""ONNX Runtime sentence embedder for the SBERT Router.
+
+Encodes with an ONNX export of the sentence-transformers model instead of
+loading torch and sentence-transformers. ``export`` writes the transformer
+(fp32 and optionally dynamic int8), tokenizer and pooling config into one
+directory. ``check`` compares the result with the torch embedder::
+
+    python onnx_embedder.py export --model cl-nagoya/ruri-v3-70m --output DIR --int8
+    python onnx_embedder.py check --model cl-nagoya/ruri-v3-70m --onnx-dir DIR
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Protocol, Sequence
+
+import numpy as np
+
+
+FP32_MODEL_NAME = "model.onnx"
+INT8_MODEL_NAME = "model_int8.onnx"
+EXPORT_METADATA_NAME = "export.json"
+# torch出力とのcosine類似度の下限。int8は動的量子化の誤差分だけ緩める。
+FP32_MIN_COSINE = 0.9999
+INT8_MIN_COSINE = 0.99
+DEFAULT_MAX_LENGTH = 128
+
+
+class _Tokenizer(Protocol):
+    def encode_batch(self, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]: ...
+
+
+class _Session(Protocol):
+    def get_inputs(self) -> Sequence[object]: ...
+
+    def run(
+        self,
+        output_names: Sequence[str] | None,
+        input_feed: dict[str, np.ndarray],
+    ) -> Sequence[np.ndarray]: ...
+
+
+@dataclass(frozen=True)
+class ExportMetadata:
+    model_name: str
+    revision: str
+    pooling: str
+    max_length: int
+
+    @classmethod
+    def load(cls, directory: Path) -> "ExportMetadata":
+        payload = json.loads((directory / EXPORT_METADATA_NAME).read_text(encoding="utf-8"))
+        return cls(
+            model_name=str(payload.get("model_name", "")),
+            revision=str(payload.get("revision", "")),
+            pooling=str(payload.get("pooling", "mean")),
+            max_length=int(payload.get("max_length", DEFAULT_MAX_LENGTH)),
+        )
+
+
+class HfJsonTokenizer:
+    """``tokenizer.json`` (ruri-v3 の SentencePiece Unigram を含む) を使う。"""
+
+    def __init__(self, path: Path, *, max_length: int) -> None:
+        try:
+            from tokenizers import Tokenizer
+        except Exception as exc:  # pragma: no cover - environment dependent
+            raise RuntimeError("tokenizers is required for the ONNX embedder") from exc
+        self._tokenizer = Tokenizer.from_file(str(path))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+    def encode_batch(self, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        encodings = self._tokenizer.encode_batch(list(texts))
+        input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.asarray(
+            [encoding.attention_mask for encoding in encodings],
+            dtype=np.int64,
+        )
+        return input_ids, attention_mask
+
+
+class SentencePieceTokenizer:
+    """``tokenizer.model`` を直接使う。BOS/EOS はモデル定義に従って付与する。"""
+
+    def __init__(self, path: Path, *, max_length: int) -> None:
+        try:
+            import sentencepiece
+        except Exception as exc:  # pragma: no cover - environment dependent
+            raise RuntimeError("sentencepiece is required for the ONNX embedder") from exc
+        self._processor = sentencepiece.SentencePieceProcessor(model_file=str(path))
+        self._max_length = max_length
+
+    def encode_batch(self, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        bos = self._processor.bos_id()
+        eos = self._processor.eos_id()
+        pad = max(0, self._processor.pad_id())
+        rows: list[list[int]] = []
+        for text in texts:
+            ids = list(self._processor.encode(text))
+            budget = self._max_length - (bos >= 0) - (eos >= 0)
+            ids = ids[: max(0, budget)]
+            if bos >= 0:
+                ids.insert(0, bos)
+            if eos >= 0:
+                ids.append(eos)
+            rows.append(ids)
+        return pad_token_rows(rows, pad_id=pad)
+
+
+def pad_token_rows(
+    rows: Sequence[Sequence[int]],
+    *,
+    pad_id: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    width = max((len(row) for row in rows), default=0)
+    input_ids = np.full((len(rows), width), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+    for index, row in enumerate(rows):
+        input_ids[index, : len(row)] = row
+        attention_mask[index, : len(row)] = 1
+    return input_ids, attention_mask
+
+
+def pool_embeddings(
+    hidden: np.ndarray,
+    attention_mask: np.ndarray,
+    *,
+    pooling: str,
+    normalize: bool,
+) -> np.ndarray:
+    if pooling == "cls":
+        pooled = hidden[:, 0, :]
+    else:
+        mask = attention_mask[:, :, None].astype(hidden.dtype)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = (hidden * mask).sum(axis=1) / counts
+    pooled = pooled.astype(np.float32)
+    if normalize:
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        pooled = pooled / np.clip(norms, 1e-12, None)
+    return pooled
+
+
+class OnnxEmbedder:
+    normalize = True
+
+    def __init__(
+        self,
+        session: _Session,
+        tokenizer: _Tokenizer,
+        *,
+        pooling: str = "mean",
+        revision: str = "",
+    ) -> None:
+        if pooling not in {"mean", "cls"}:
+            raise ValueError(f"unsupported pooling mode: {pooling}")
+        self._session = session
+        self._tokenizer = tokenizer
+        self._pooling = pooling
+        self._input_names = {str(getattr(item, "name", "")) for item in session.get_inputs()}
+        self.revision = revision
+
+    @classmethod
+    def load(
+        cls,
+        directory: Path,
+        *,
+        int8: bool = True,
+        threads: int = 0,
+    ) -> "OnnxEmbedder":
+        try:
+            import onnxruntime as ort
+        except Exception as exc:  # pragma: no cover - environment dependent
+            raise RuntimeError(
+                "onnxruntime is required for YATAGARASU_SBERT_BACKEND=onnx"
+            ) from exc
+
+        model_path = directory / (INT8_MODEL_NAME if int8 else FP32_MODEL_NAME)
+        if not model_path.is_file() or not (directory / EXPORT_METADATA_NAME).is_file():
+            raise FileNotFoundError(
+                f"ONNX SBERT model not found: {model_path} "
+                "(run: python onnx_embedder.py export --int8 ...)"
+            )
+        metadata = ExportMetadata.load(directory)
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        tokenizer: _Tokenizer
+        if (directory / "tokenizer.json").is_file():
+            tokenizer = HfJsonTokenizer(
+                directory / "tokenizer.json",
+                max_length=metadata.max_length,
+            )
+        else:
+            tokenizer = SentencePieceTokenizer(
+                directory / "tokenizer.model",
+                max_length=metadata.max_length,
+            )
+        logging.info(
+            "loading ONNX SBERT model: %s int8=%s pooling=%s",
+            model_path,
+            int8,
+            metadata.pooling,
+        )
+        return cls(
+            session,
+            tokenizer,
+            pooling=metadata.pooling,
+            revision=f"{metadata.revision}+onnx-{'int8' if int8 else 'fp32'}",
+        )
+
+    def encode(self, texts: Iterable[str]) -> np.ndarray:
+        values = list(texts)
+        if not values:
+            return np.empty((0, 0), dtype=np.float32)
+        input_ids, attention_mask = self._tokenizer.encode_batch(values)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+        feed = {name: value for name, value in feed.items() if name in self._input_names}
+        hidden = self._session.run(None, feed)[0]
+        return pool_embeddings(
+            np.asarray(hidden),
+            attention_mask,
+            pooling=self._pooling,
+            normalize=self.normalize,
+        )
+
+
+def _pooling_mode(model: object) -> str:
+    for module in model:  # type: ignore[attr-defined]
+        config = getattr(module, "get_config_dict", lambda: {})()
+        if config.get("pooling_mode_cls_token"):
+            return "cls"
+        if config.get("pooling_mode_mean_tokens"):
+            return "mean"
+    return "mean"
+
+
+def export_model(
+    model_name: str,
+    output: Path,
+    *,
+    revision: str = "",
+    int8: bool = False,
+    max_length: int = DEFAULT_MAX_LENGTH,
+    opset: int = 17,
+) -> Path:
+    """Export ``model_name`` with torch; only this step needs torch installed."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    from intent_router import resolve_model_revision
+
+    model = SentenceTransformer(model_name, device="cpu", revision=revision or None)
+    transformer = model[0].auto_model
+    transformer.eval()
+    tokenizer = model.tokenizer
+    output.mkdir(parents=True, exist_ok=True)
+
+    sample = tokenizer(["エクスポート確認"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask") if name in sample]
+
+    class _HiddenState(torch.nn.Module):
+        def __init__(self, inner: torch.nn.Module) -> None:
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):  # type: ignore[no-untyped-def]
+            return self.inner(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+            ).last_hidden_state
+
+    fp32_path = output / FP32_MODEL_NAME
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(str(output))
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(fp32_path),
+            str(output / INT8_MODEL_NAME),
+            weight_type=QuantType.QInt8,
+        )
+    metadata = {
+        "model_name": model_name,
+        "revision": revision or resolve_model_revision(model_name),
+        "pooling": _pooling_mode(model),
+        "max_length": max_length,
+    }
+    (output / EXPORT_METADATA_NAME).write_text(
+        json.dumps(metadata, ensure_ascii=False, indent=2) + "\n",
+        encoding="utf-8",
+    )
+    return output
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> dict[str, float]:
+    cosine = np.sum(reference * candidate, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    return {
+        "min_cosine": float(np.min(cosine)),
+        "mean_cosine": float(np.mean(cosine)),
+        "max_abs_diff": float(np.max(np.abs(reference - candidate))),
+    }
+
+
+def _check(args: argparse.Namespace) -> int:
+    from intent_router import (
+        RouterSettings,
+        SentenceTransformerEmbedder,
+        build_intents_from_env,
+    )
+
+    texts = [
+        template
+        for intent in build_intents_from_env(RouterSettings.from_env())
+        for template in intent.templates
+    ] or ["右を向いて", "今何が見える", "この書類を要約して"]
+    reference = SentenceTransformerEmbedder(args.model, "cpu", False, args.revision).encode(texts)
+    status = 0
+    for int8 in (False, True):
+        directory = Path(args.onnx_dir)
+        if not (directory / (INT8_MODEL_NAME if int8 else FP32_MODEL_NAME)).is_file():
+            continue
+        started = time.monotonic()
+        candidate = OnnxEmbedder.load(directory, int8=int8).encode(texts)
+        metrics = compare_embeddings(reference, candidate)
+        limit = INT8_MIN_COSINE if int8 else FP32_MIN_COSINE
+        ok = metrics["min_cosine"] >= limit
+        status = status or (0 if ok else 1)
+        print(
+            json.dumps(
+                {
+                    "variant": "int8" if int8 else "fp32",
+                    "texts": len(texts),
+                    "min_cosine_limit": limit,
+                    "ok": ok,
+                    "elapsed_sec": round(time.monotonic() - started, 3),
+                    **{key: round(value, 6) for key, value in metrics.items()},
+                },
+                ensure_ascii=False,
+            )
+        )
+    return status
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ONNX SBERT embedder tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export a sentence-transformers model")
+    export.add_argument("--model", required=True)
+    export.add_argument("--revision", default="")
+    export.add_argument("--output", required=True)
+    export.add_argument("--int8", action="store_true", help="also write dynamic int8 model")
+    export.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    export.add_argument("--force", action="store_true", help="replace existing output")
+    check = commands.add_parser("check", help="compare ONNX output with torch")
+    check.add_argument("--model", required=True)
+    check.add_argument("--revision", default="")
+    check.add_argument("--onnx-dir", required=True)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    if args.command == "export":
+        output = Path(args.output).expanduser()
+        if output.exists() and any(output.iterdir()):
+            if not args.force:
+                print(f"output is not empty: {output} (use --force)", file=sys.stderr)
+                return 2
+            shutil.rmtree(output)
+        export_model(
+            args.model,
+            output,
+            revision=args.revision,
+            int8=args.int8,
+            max_length=args.max_length,
+        )
+        print(str(output))
+        return 0
+    return _check(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""In-process ONVIF PTZ backend for listend.
+
+The pytapo path (``move-camera/scripts/ptz_worker``) needs a second Python
+runtime and a cloud-style login. This backend talks ONVIF directly from the
+listend process over one keep-alive HTTP connection. Only five operations are
+needed, so the SOAP envelopes are built from fixed templates instead of
+parsing the ONVIF WSDLs; the only per-session discovery is the PTZ service
+address and the media profile token, fetched once on ``connect()``.
+
+    YATAGARASU_PTZ_BACKEND="onvif"
+    YATAGARASU_ONVIF_URL="http://192.168.0.132:2020/onvif/device_service"
+
+Relative moves use ``RelativeMove``; cameras without it can use
+``ContinuousMove`` + ``Stop`` (``YATAGARASU_ONVIF_MOVE_MODE="continuous"``).
+``GetStatus`` is polled so listend waits for the motor to report IDLE instead
+of sleeping for an estimate.
+
+    python onvif_ptz.py status
+    python onvif_ptz.py move 45 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import datetime as dt
+import hashlib
+import http.client
+import logging
+import math
+import os
+import sys
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Iterable
+from xml.sax.saxutils import escape, quoteattr
+
+from ptz_motion import PtzMotionModel
+
+
+DEFAULT_ONVIF_PORT = 2020
+DEFAULT_PAN_DEG_PER_UNIT = 180.0
+DEFAULT_TILT_DEG_PER_UNIT = 90.0
+DEFAULT_CONTINUOUS_SPEED = 0.5
+DEFAULT_TIMEOUT_SEC = 5.0
+DEFAULT_STATUS_POLL_SEC = 0.1
+MOVE_MODES = ("relative", "continuous")
+
+# ptz_worker と同じ相対移動量（度）。キャリブレーションはONVIFに無い。
+RELATIVE_MOVES: dict[str, tuple[float, float]] = {
+    "move_camera_left": (-45.0, 0.0),
+    "move_camera_right": (45.0, 0.0),
+    "move_camera_up": (0.0, 30.0),
+    "move_camera_down": (0.0, -30.0),
+}
+
+NS = {
+    "s": "http://www.w3.org/2003/05/soap-envelope",
+    "tds": "http://www.onvif.org/ver10/device/wsdl",
+    "trt": "http://www.onvif.org/ver10/media/wsdl",
+    "tptz": "http://www.onvif.org/ver20/ptz/wsdl",
+    "tt": "http://www.onvif.org/ver10/schema",
+    "wsse": "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd",
+    "wsu": "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd",
+}
+PASSWORD_DIGEST = (
+    "http://docs.oasis-open.org/wss/2004/01/"
+    "oasis-200401-wss-username-token-profile-1.0#PasswordDigest"
+)
+BASE64_BINARY = (
+    "http://docs.oasis-open.org/wss/2004/01/"
+    "oasis-200401-wss-soap-message-security-1.0#Base64Binary"
+)
+
+
+class OnvifError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class OnvifSettings:
+    url: str
+    username: str
+    password: str
+    move_mode: str = "relative"
+    pan_deg_per_unit: float = DEFAULT_PAN_DEG_PER_UNIT
+    tilt_deg_per_unit: float = DEFAULT_TILT_DEG_PER_UNIT
+    continuous_speed: float = DEFAULT_CONTINUOUS_SPEED
+    timeout_sec: float = DEFAULT_TIMEOUT_SEC
+
+    @classmethod
+    def from_env(cls) -> "OnvifSettings":
+        url = os.getenv("YATAGARASU_ONVIF_URL", "").strip()
+        if not url:
+            host = os.getenv("TAPO_HOST", "192.168.0.132").strip()
+            url = f"http://{host}:{DEFAULT_ONVIF_PORT}/onvif/device_service"
+        move_mode = os.getenv("YATAGARASU_ONVIF_MOVE_MODE", "relative").strip().lower()
+        if move_mode not in MOVE_MODES:
+            raise ValueError(
+                f"YATAGARASU_ONVIF_MOVE_MODE must be one of {', '.join(MOVE_MODES)}: {move_mode}"
+            )
+        return cls(
+            url=url,
+            username=os.getenv("YATAGARASU_ONVIF_USER", "").strip()
+            or os.getenv("TAPO_USER", "admin"),
+            password=os.getenv("YATAGARASU_ONVIF_PASSWORD", "")
+            or os.getenv("TAPO_PASSWORD", ""),
+            move_mode=move_mode,
+            pan_deg_per_unit=_env_positive_float(
+                "YATAGARASU_ONVIF_PAN_DEG_PER_UNIT", DEFAULT_PAN_DEG_PER_UNIT
+            ),
+            tilt_deg_per_unit=_env_positive_float(
+                "YATAGARASU_ONVIF_TILT_DEG_PER_UNIT", DEFAULT_TILT_DEG_PER_UNIT
+            ),
+            continuous_speed=_env_positive_float(
+                "YATAGARASU_ONVIF_CONTINUOUS_SPEED", DEFAULT_CONTINUOUS_SPEED
+            ),
+            timeout_sec=_env_positive_float(
+                "YATAGARASU_ONVIF_TIMEOUT_SEC", DEFAULT_TIMEOUT_SEC
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class PtzStatus:
+    moving: bool | None
+    pan: float | None = None
+    tilt: float | None = None
+
+
+def _position_value(raw: str | None) -> float | None:
+    # 位置が壊れていても静止判定（MoveStatus）は使えるので、位置だけ不明扱いにする。
+    try:
+        value = float(raw or "nan")
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _env_positive_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number: {raw}") from exc
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0: {raw}")
+    return value
+
+
+def coalesce_moves(actions: Iterable[str]) -> tuple[float, float]:
+    """Sum relative moves into one delta; unsupported actions raise ``ValueError``."""
+    x = y = 0.0
+    for action in actions:
+        move = RELATIVE_MOVES.get(action)
+        if move is None:
+            raise ValueError(f"ONVIF backend does not support {action}")
+        x += move[0]
+        y += move[1]
+    return x, y
+
+
+def _clamp_unit(value: float) -> float:
+    return max(-1.0, min(1.0, value))
+
+
+class OnvifPtzClient:
+    """ONVIF PTZ over a persistent HTTP connection with WS-UsernameToken auth."""
+
+    def __init__(
+        self,
+        settings: OnvifSettings,
+        *,
+        motion: PtzMotionModel | None = None,
+    ) -> None:
+        self.settings = settings
+        self.motion = motion or PtzMotionModel()
+        self.ptz_url = ""
+        self.profile_token = ""
+        self._connections: dict[str, http.client.HTTPConnection] = {}
+        # カメラ時計とのずれ。WS-SecurityのCreatedをカメラ時刻に合わせる。
+        self._clock_offset = dt.timedelta(0)
+        # client生成時点を原点にしたpan/tiltの推定値。
+        self.pan = 0.0
+        self.tilt = 0.0
+
+    @classmethod
+    def from_env(cls, motion: PtzMotionModel | None = None) -> "OnvifPtzClient":
+        return cls(OnvifSettings.from_env(), motion=motion)
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.ptz_url and self.profile_token)
+
+    def connect(self) -> None:
+        """Sync the clock, find the PTZ service and pick a PTZ-capable profile."""
+        self._sync_clock()
+        capabilities = self._call(
+            self.settings.url,
+            "<tds:GetCapabilities><tds:Category>All</tds:Category></tds:GetCapabilities>",
+        )
+        ptz_url = capabilities.findtext(".//tt:PTZ/tt:XAddr", default="", namespaces=NS)
+        media_url = capabilities.findtext(".//tt:Media/tt:XAddr", default="", namespaces=NS)
+        if not ptz_url:
+            raise OnvifError("camera does not advertise an ONVIF PTZ service")
+        profiles = self._call(media_url or self.settings.url, "<trt:GetProfiles/>")
+        tokens = [
+            profile.get("token", "")
+            for profile in profiles.iterfind(".//trt:Profiles", NS)
+            if profile.find("tt:PTZConfiguration", NS) is not None
+        ]
+        if not tokens or not tokens[0]:
+            raise OnvifError("no media profile with a PTZ configuration")
+        self.ptz_url = ptz_url
+        self.profile_token = tokens[0]
+        logging.info(
+            "ONVIF PTZ connected: ptz=%s profile=%s mode=%s",
+            self.ptz_url,
+            self.profile_token,
+            self.settings.move_mode,
+        )
+
+    def move(self, x_deg: float, y_deg: float) -> None:
+        self._ensure_connected()
+        if self.settings.move_mode == "continuous":
+            self.continuous_move(x_deg, y_deg)
+        else:
+            self.relative_move(x_deg, y_deg)
+        self.pan += x_deg
+        self.tilt += y_deg
+
+    def relative_move(self, x_deg: float, y_deg: float) -> None:
+        x = _clamp_unit(x_deg / self.settings.pan_deg_per_unit)
+        y = _clamp_unit(y_deg / self.settings.tilt_deg_per_unit)
+        self._ptz_call(
+            "<tptz:RelativeMove>"
+            f"{self._profile_element()}"
+            f'<tptz:Translation><tt:PanTilt x="{x:.6f}" y="{y:.6f}"/></tptz:Translation>'
+            "</tptz:RelativeMove>"
+        )
+
+    def continuous_move(self, x_deg: float, y_deg: float) -> None:
+        """Move at a fixed velocity for the modelled duration, then ``Stop``."""
+        pan_sec = abs(x_deg) / self.motion.pan_deg_per_sec
+        tilt_sec = abs(y_deg) / self.motion.tilt_deg_per_sec
+        duration = max(pan_sec, tilt_sec)
+        if duration <= 0:
+            return
+        # 両軸が同時に止まるよう、短い軸の速度を比例して落とす。
+        speed = self.settings.continuous_speed
+        vx = speed * pan_sec / duration * (1 if x_deg > 0 else -1)
+        vy = speed * tilt_sec / duration * (1 if y_deg > 0 else -1)
+        self._ptz_call(
+            "<tptz:ContinuousMove>"
+            f"{self._profile_element()}"
+            f'<tptz:Velocity><tt:PanTilt x="{vx:.6f}" y="{vy:.6f}"/></tptz:Velocity>'
+            "</tptz:ContinuousMove>"
+        )
+        try:
+            time.sleep(duration)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._ptz_call(
+            "<tptz:Stop>"
+            f"{self._profile_element()}"
+            "<tptz:PanTilt>true</tptz:PanTilt><tptz:Zoom>false</tptz:Zoom>"
+            "</tptz:Stop>"
+        )
+
+    def status(self) -> PtzStatus:
+        self._ensure_connected()
+        root = self._ptz_call(
+            f"<tptz:GetStatus>{self._profile_element()}</tptz:GetStatus>"
+        )
+        move_status = (
+            root.findtext(".//tt:MoveStatus/tt:PanTilt", default="", namespaces=NS)
+            .strip()
+            .upper()
+        )
+        position = root.find(".//tt:Position/tt:PanTilt", NS)
+        pan = tilt = None
+        if position is not None:
+            pan = _position_value(position.get("x"))
+            tilt = _position_value(position.get("y"))
+        moving = {"MOVING": True, "IDLE": False}.get(move_status)
+        return PtzStatus(moving=moving, pan=pan, tilt=tilt)
+
+    def wait_idle(self, *, min_sec: float, max_sec: float) -> float:
+        """Poll ``GetStatus`` until IDLE; returns the seconds waited.
+
+        Some cameras report IDLE for a moment right after accepting a move, so
+        IDLE only counts once MOVING was seen or ``min_sec`` has passed. When
+        the camera never reports a move status, the wait falls back to
+        ``min_sec``.
+        """
+        started = time.monotonic()
+        seen_moving = False
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= max_sec:
+                return elapsed
+            moving = self.status().moving
+            elapsed = time.monotonic() - started
+            if moving is None:
+                time.sleep(max(0.0, min_sec - elapsed))
+                return max(elapsed, min_sec)
+            if moving:
+                seen_moving = True
+            elif seen_moving or elapsed >= min_sec:
+                return elapsed
+            time.sleep(DEFAULT_STATUS_POLL_SEC)
+
+    def execute(self, actions: Iterable[str]) -> dict[str, object]:
+        """Run router PTZ actions; the payload matches ``ptz_worker`` responses."""
+        started = time.monotonic()
+        actions = list(actions)
+        try:
+            x, y = coalesce_moves(actions)
+            self._ensure_connected()
+            if x or y:
+                self.move(x, y)
+                stdout = f"移動しました: x={x:g}, y={y:g}"
+            else:
+                stdout = "移動が相殺されたためカメラは動かしませんでした"
+        except (OnvifError, ValueError) as exc:
+            return {"ok": False, "stderr": str(exc)}
+        if len(actions) > 1:
+            stdout += f"（{len(actions)}件をまとめて実行）"
+        return {
+            "ok": True,
+            "results": [
+                {
+                    "action": action,
+                    "ok": True,
+                    "stdout": stdout,
+                    "x": x,
+                    "y": y,
+                    "coalesced": len(actions),
+                }
+                for action in actions
+            ],
+            "position": {"pan": self.pan, "tilt": self.tilt},
+            "elapsed_sec": round(time.monotonic() - started, 6),
+        }
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def _profile_element(self) -> str:
+        return f"<tptz:ProfileToken>{escape(self.profile_token)}</tptz:ProfileToken>"
+
+    def _ensure_connected(self) -> None:
+        if not self.connected:
+            self.connect()
+
+    def _ptz_call(self, body: str) -> ET.Element:
+        return self._call(self.ptz_url, body)
+
+    def _sync_clock(self) -> None:
+        try:
+            root = self._call(
+                self.settings.url,
+                "<tds:GetSystemDateAndTime/>",
+                authenticate=False,
+            )
+            utc = root.find(".//tt:UTCDateTime", NS)
+            if utc is None:
+                return
+            values = {
+                tag: int(utc.findtext(f".//tt:{tag}", default="0", namespaces=NS))
+                for tag in ("Year", "Month", "Day", "Hour", "Minute", "Second")
+            }
+            camera_now = dt.datetime(
+                values["Year"],
+                values["Month"],
+                values["Day"],
+                values["Hour"],
+                values["Minute"],
+                values["Second"],
+                tzinfo=dt.timezone.utc,
+            )
+        except (OnvifError, ValueError) as exc:
+            logging.debug("ONVIF clock sync skipped: %s", exc)
+            return
+        self._clock_offset = camera_now - dt.datetime.now(dt.timezone.utc)
+
+    def _security_header(self) -> str:
+        nonce = os.urandom(16)
+        created = (
+            (dt.datetime.now(dt.timezone.utc) + self._clock_offset)
+            .replace(microsecond=0)
+            .strftime("%Y-%m-%dT%H:%M:%SZ")
+        )
+        digest = base64.b64encode(
+            hashlib.sha1(nonce + created.encode() + self.settings.password.encode()).digest()
+        ).decode()
+        return (
+            '<wsse:Security s:mustUnderstand="1">'
+            "<wsse:UsernameToken>"
+            f"<wsse:Username>{escape(self.settings.username)}</wsse:Username>"
+            f'<wsse:Password Type="{PASSWORD_DIGEST}">{digest}</wsse:Password>'
+            f'<wsse:Nonce EncodingType="{BASE64_BINARY}">'
+            f"{base64.b64encode(nonce).decode()}</wsse:Nonce>"
+            f"<wsu:Created>{created}</wsu:Created>"
+            "</wsse:UsernameToken>"
+            "</wsse:Security>"
+        )
+
+    def _envelope(self, body: str, *, authenticate: bool) -> bytes:
+        namespaces = " ".join(
+            f"xmlns:{prefix}={quoteattr(uri)}" for prefix, uri in NS.items()
+        )
+        header = f"<s:Header>{self._security_header()}</s:Header>" if authenticate else ""
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?><s:Envelope {namespaces}>'
+            f"{header}<s:Body>{body}</s:Body></s:Envelope>"
+        ).encode("utf-8")
+
+    def _call(self, url: str, body: str, *, authenticate: bool = True) -> ET.Element:
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise OnvifError(f"invalid ONVIF service URL: {url}")
+        payload = self._envelope(body, authenticate=authenticate)
+        headers = {"Content-Type": "application/soap+xml; charset=utf-8"}
+        # 再利用した持続接続がカメラ側で閉じられていた場合だけ、1回だけ張り直す。
+        # タイムアウトなどは要求が届いている可能性があり、移動が二重に実行されるので再送しない。
+        for attempt in range(2):
+            connection = self._connection(parsed)
+            reused = connection.sock is not None
+            try:
+                connection.request("POST", parsed.path or "/", body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as exc:
+                connection.close()
+                self._connections.pop(parsed.netloc, None)
+                unsent = reused and isinstance(
+                    exc, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+                )
+                if attempt == 1 or not unsent:
+                    raise OnvifError(f"ONVIF request to {url} failed: {exc}") from exc
+        try:
+            root = ET.fromstring(data)
+        except ET.ParseError as exc:
+            raise OnvifError(
+                f"invalid ONVIF response from {url} (HTTP {response.status})"
+            ) from exc
+        fault = root.find(".//s:Fault", NS)
+        if fault is not None:
+            reason = fault.find("s:Reason", NS)
+            text = (
+                " ".join(part.strip() for part in reason.itertext() if part.strip())
+                if reason is not None
+                else ""
+            )
+            raise OnvifError(f"ONVIF fault from {url}: {text or 'SOAP fault'}")
+        if response.status >= 400:
+            raise OnvifError(f"ONVIF request to {url} failed: HTTP {response.status}")
+        return root
+
+    def _connection(self, parsed: urllib.parse.SplitResult) -> http.client.HTTPConnection:
+        connection = self._connections.get(parsed.netloc)
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if parsed.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = connection_class(
+                parsed.hostname,
+                parsed.port,
+                timeout=self.settings.timeout_sec,
+            )
+            self._connections[parsed.netloc] = connection
+        return connection
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ONVIF PTZ backend")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="print move status and position")
+    move_parser = commands.add_parser("move", help="relative move in degrees")
+    move_parser.add_argument("x", type=float)
+    move_parser.add_argument("y", type=float)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    client = OnvifPtzClient.from_env(PtzMotionModel.from_env())
+    try:
+        client.connect()
+        if args.command == "move":
+            started = time.monotonic()
+            client.move(args.x, args.y)
+            accepted = time.monotonic() - started
+            waited = client.wait_idle(
+                min_sec=0.0, max_sec=client.motion.move_sec(args.x, args.y) + 2.0
+            )
+            print(f"accepted={accepted:.3f}s idle_after={waited:.3f}s")
+            return 0
+        status = client.status()
+        print(f"moving={status.moving} pan={status.pan} tilt={status.tilt}")
+        return 0
+    except OnvifError as exc:
+        print(f"ONVIF error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
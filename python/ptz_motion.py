@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Movement-duration model for the Tapo PTZ motor.
+
+pytapo's ``moveMotor`` returns as soon as the camera accepts the command, and
+the camera exposes no "motor idle" status. The time until the lens has
+stopped is therefore estimated from the requested angles::
+
+    seconds = base + max(|pan| / pan_speed, |tilt| / tilt_speed)
+
+Pan and tilt run simultaneously, so the slower axis decides. The defaults
+(60°/s pan, 40°/s tilt, 0.25s base) reproduce the 1.0s settle measured for the
+default 45°/30° steps. Other cameras can be calibrated from stopwatch or video
+measurements::
+
+    python ptz_motion.py fit samples.csv     # lines of "x,y,seconds"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+
+DEFAULT_PAN_DEG_PER_SEC = 60.0
+DEFAULT_TILT_DEG_PER_SEC = 40.0
+DEFAULT_MOVE_BASE_SEC = 0.25
+DEFAULT_CALIBRATE_SEC = 20.0
+
+
+def _env_positive_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number: {raw}") from exc
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0: {raw}")
+    return value
+
+
+@dataclass(frozen=True)
+class MotionSample:
+    x: float
+    y: float
+    seconds: float
+
+
+@dataclass(frozen=True)
+class PtzMotionModel:
+    pan_deg_per_sec: float = DEFAULT_PAN_DEG_PER_SEC
+    tilt_deg_per_sec: float = DEFAULT_TILT_DEG_PER_SEC
+    base_sec: float = DEFAULT_MOVE_BASE_SEC
+    calibrate_sec: float = DEFAULT_CALIBRATE_SEC
+
+    @classmethod
+    def from_env(cls) -> "PtzMotionModel":
+        return cls(
+            pan_deg_per_sec=_env_positive_float(
+                "YATAGARASU_PTZ_PAN_DEG_PER_SEC", DEFAULT_PAN_DEG_PER_SEC
+            ),
+            tilt_deg_per_sec=_env_positive_float(
+                "YATAGARASU_PTZ_TILT_DEG_PER_SEC", DEFAULT_TILT_DEG_PER_SEC
+            ),
+            base_sec=_env_positive_float(
+                "YATAGARASU_PTZ_MOVE_BASE_SEC", DEFAULT_MOVE_BASE_SEC
+            ),
+            calibrate_sec=_env_positive_float(
+                "YATAGARASU_PTZ_CALIBRATE_SEC", DEFAULT_CALIBRATE_SEC
+            ),
+        )
+
+    def move_sec(self, x: float, y: float) -> float:
+        if not x and not y:
+            return 0.0
+        pan = abs(x) / self.pan_deg_per_sec if self.pan_deg_per_sec > 0 else 0.0
+        tilt = abs(y) / self.tilt_deg_per_sec if self.tilt_deg_per_sec > 0 else 0.0
+        return self.base_sec + max(pan, tilt)
+
+
+def _fit_axis(points: Sequence[tuple[float, float]]) -> tuple[float, float] | None:
+    """Least-squares ``seconds = base + degrees / speed``; returns (speed, base)."""
+    if not points:
+        return None
+    if len({degrees for degrees, _ in points}) < 2:
+        degrees, seconds = points[0]
+        movement = max(1e-6, seconds - DEFAULT_MOVE_BASE_SEC)
+        return degrees / movement, DEFAULT_MOVE_BASE_SEC
+    count = len(points)
+    mean_x = sum(degrees for degrees, _ in points) / count
+    mean_y = sum(seconds for _, seconds in points) / count
+    covariance = sum((degrees - mean_x) * (seconds - mean_y) for degrees, seconds in points)
+    variance = sum((degrees - mean_x) ** 2 for degrees, _ in points)
+    slope = covariance / variance
+    if slope <= 0:
+        raise ValueError("samples do not get slower with larger angles")
+    return 1.0 / slope, max(0.0, mean_y - slope * mean_x)
+
+
+def fit_motion_model(
+    samples: Sequence[MotionSample],
+    *,
+    calibrate_sec: float = DEFAULT_CALIBRATE_SEC,
+) -> PtzMotionModel:
+    """Fit per-axis speeds from single-axis samples (diagonal samples are ignored)."""
+    pan = _fit_axis([(abs(s.x), s.seconds) for s in samples if s.x and not s.y])
+    tilt = _fit_axis([(abs(s.y), s.seconds) for s in samples if s.y and not s.x])
+    if pan is None and tilt is None:
+        raise ValueError("need at least one pan-only or tilt-only sample")
+    bases = [axis[1] for axis in (pan, tilt) if axis is not None]
+    return PtzMotionModel(
+        pan_deg_per_sec=pan[0] if pan else DEFAULT_PAN_DEG_PER_SEC,
+        tilt_deg_per_sec=tilt[0] if tilt else DEFAULT_TILT_DEG_PER_SEC,
+        base_sec=sum(bases) / len(bases),
+        calibrate_sec=calibrate_sec,
+    )
+
+
+def load_samples(path: Path) -> list[MotionSample]:
+    samples: list[MotionSample] = []
+    with path.open(encoding="utf-8") as handle:
+        for row in csv.reader(handle):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            try:
+                x, y, seconds = (float(value) for value in row[:3])
+            except ValueError as exc:
+                raise ValueError(f"invalid sample row {row}: expected x,y,seconds") from exc
+            samples.append(MotionSample(x=x, y=y, seconds=seconds))
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tapo PTZ movement-duration model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fit_parser = commands.add_parser("fit", help="fit speeds from x,y,seconds samples")
+    fit_parser.add_argument("samples", type=Path)
+    estimate_parser = commands.add_parser("estimate", help="estimate a move duration")
+    estimate_parser.add_argument("x", type=float)
+    estimate_parser.add_argument("y", type=float)
+    args = parser.parse_args()
+
+    if args.command == "estimate":
+        model = PtzMotionModel.from_env()
+        print(f"{model.move_sec(args.x, args.y):.3f}")
+        return 0
+
+    try:
+        model = fit_motion_model(load_samples(args.samples))
+    except (OSError, ValueError) as exc:
+        print(f"fit failed: {exc}", file=sys.stderr)
+        return 1
+    print(f'YATAGARASU_PTZ_PAN_DEG_PER_SEC="{model.pan_deg_per_sec:.1f}"')
+    print(f'YATAGARASU_PTZ_TILT_DEG_PER_SEC="{model.tilt_deg_per_sec:.1f}"')
+    print(f'YATAGARASU_PTZ_MOVE_BASE_SEC="{model.base_sec:.2f}"')
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
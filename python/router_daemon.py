@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""Resident SBERT Router served over a Unix domain socket.
+
+The daemon keeps one ``IntentRouter`` (model and template embeddings) loaded
+and answers JSON lines, one response line per request line::
+
+    {"id": 1, "op": "route", "text": "右を向いて"}
+    {"id": 2, "op": "route_batch", "texts": ["右を向いて", "今何が見える"]}
+    {"id": 3, "op": "settings"}
+    {"id": 4, "op": "encode", "texts": ["猫の名前は？"]}
+
+Requests from concurrent clients that queue up while an ``encode()`` is running
+are merged into the next ``IntentRouter.route_batch`` call, so N clients cost
+one model forward instead of N.
+
+    python router_daemon.py serve
+    python router_daemon.py route "右を向いて何が見える"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+
+from intent_router import (
+    IntentRouter,
+    RouterDecision,
+    RouterSettings,
+    load_env_file,
+    resolve_workspace_path,
+)
+
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_CLIENT_TIMEOUT_SEC = 10.0
+
+
+class RouterDaemonError(RuntimeError):
+    pass
+
+
+def default_socket_path() -> Path:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR", "").strip()
+    if runtime_dir:
+        return Path(runtime_dir) / "yatagarasu" / "router.sock"
+    return Path("/tmp") / f"yatagarasu-router-{os.getuid()}.sock"
+
+
+def socket_path_from_env() -> Path:
+    raw = os.getenv("YATAGARASU_SBERT_ROUTER_SOCKET", "").strip()
+    return Path(raw).expanduser() if raw else default_socket_path()
+
+
+@dataclass
+class _Job:
+    texts: list[str]
+    done: threading.Event = field(default_factory=threading.Event)
+    decisions: list[RouterDecision] = field(default_factory=list)
+    error: BaseException | None = None
+
+
+class RouteBatcher:
+    """Funnel concurrent route requests into shared ``route_batch`` calls."""
+
+    def __init__(
+        self,
+        router: IntentRouter,
+        *,
+        window_sec: float = 0.0,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ) -> None:
+        self.router = router
+        self.window_sec = max(0.0, window_sec)
+        self.max_batch = max(1, max_batch)
+        self.batch_count = 0
+        self.request_count = 0
+        self._jobs: queue.Queue[_Job | None] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="router-batcher",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def route_batch(self, texts: Sequence[str]) -> list[RouterDecision]:
+        job = _Job(texts=list(texts))
+        if not job.texts:
+            return []
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise RouterDaemonError(str(job.error)) from job.error
+        return job.decisions
+
+    def close(self) -> None:
+        self._jobs.put(None)
+        self._thread.join(timeout=5.0)
+
+    def _run(self) -> None:
+        while True:
+            first = self._jobs.get()
+            if first is None:
+                return
+            jobs = [first]
+            size = len(first.texts)
+            deadline = time.monotonic() + self.window_sec
+            stop = False
+            # encode中に溜まった要求はまとめて次の1回で処理する。
+            while size < self.max_batch:
+                try:
+                    job = self._jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                jobs.append(job)
+                size += len(job.texts)
+            self._process(jobs)
+            if stop:
+                return
+
+    def _process(self, jobs: list[_Job]) -> None:
+        texts = [text for job in jobs for text in job.texts]
+        try:
+            decisions = self.router.route_batch(texts)
+        except Exception as exc:
+            logging.exception("SBERT Router batch failed: size=%d", len(texts))
+            for job in jobs:
+                job.error = exc
+                job.done.set()
+            return
+        self.batch_count += 1
+        self.request_count += len(jobs)
+        if len(jobs) > 1:
+            logging.debug("SBERT Router batched requests=%d texts=%d", len(jobs), len(texts))
+        offset = 0
+        for job in jobs:
+            job.decisions = decisions[offset : offset + len(job.texts)]
+            offset += len(job.texts)
+            job.done.set()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "RouterServer"
+
+    def handle(self) -> None:
+        for raw_line in self.rfile:
+            line = raw_line.strip()
+            if not line:
+                continue
+            response = self.server.respond(line)
+            try:
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+class RouterServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, batcher: RouteBatcher) -> None:
+        self.socket_path = socket_path
+        self.batcher = batcher
+        prepare_socket_path(socket_path)
+        super().__init__(str(socket_path), _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def respond(self, line: bytes) -> dict[str, Any]:
+        request_id: object = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            op = request.get("op", "route")
+            if op == "route":
+                decisions = self.batcher.route_batch([str(request.get("text", ""))])
+                return {"id": request_id, "ok": True, "decision": decisions[0].to_json_dict()}
+            if op == "route_batch":
+                texts = request.get("texts")
+                if not isinstance(texts, list):
+                    raise ValueError("texts must be a list")
+                decisions = self.batcher.route_batch([str(text) for text in texts])
+                return {
+                    "id": request_id,
+                    "ok": True,
+                    "decisions": [decision.to_json_dict() for decision in decisions],
+                }
+            if op == "encode":
+                texts = request.get("texts")
+                if not isinstance(texts, list):
+                    raise ValueError("texts must be a list")
+                embeddings = self.batcher.router.encode([str(text) for text in texts])
+                return {"id": request_id, "ok": True, "embeddings": embeddings.tolist()}
+            if op == "settings":
+                return {
+                    "id": request_id,
+                    "ok": True,
+                    "settings": asdict(self.batcher.router.settings),
+                }
+            if op == "ping":
+                return {"id": request_id, "ok": True}
+            raise ValueError(f"unknown op: {op}")
+        except Exception as exc:
+            return {"id": request_id, "ok": False, "error": str(exc)}
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def prepare_socket_path(socket_path: Path) -> None:
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if not socket_path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except OSError:
+        # 前回の異常終了で残ったsocketファイルは片付けて再利用する。
+        socket_path.unlink()
+        return
+    finally:
+        probe.close()
+    raise RouterDaemonError(f"router daemon already listening on {socket_path}")
+
+
+class RouterClient:
+    """Drop-in for ``IntentRouter.route`` backed by a running daemon."""
+
+    def __init__(
+        self,
+        socket_path: Path,
+        *,
+        timeout: float = DEFAULT_CLIENT_TIMEOUT_SEC,
+    ) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader: Any = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._settings: RouterSettings | None = None
+
+    @classmethod
+    def from_env(cls) -> "RouterClient | None":
+        if not RouterSettings.from_env().enabled:
+            logging.info("SBERT Router disabled")
+            return None
+        client = cls(socket_path_from_env())
+        logging.info(
+            "SBERT Router daemon connected: socket=%s model=%s dry_run=%s",
+            client.socket_path,
+            client.settings.model_name,
+            client.settings.dry_run,
+        )
+        return client
+
+    @property
+    def settings(self) -> RouterSettings:
+        if self._settings is None:
+            payload = self._call({"op": "settings"})
+            self._settings = RouterSettings(**payload["settings"])
+        return self._settings
+
+    def ping(self) -> None:
+        self._call({"op": "ping"})
+
+    def route(self, text: str) -> RouterDecision:
+        payload = self._call({"op": "route", "text": text})
+        return RouterDecision.from_json_dict(payload["decision"])
+
+    def route_batch(self, texts: Sequence[str]) -> list[RouterDecision]:
+        payload = self._call({"op": "route_batch", "texts": list(texts)})
+        return [RouterDecision.from_json_dict(item) for item in payload["decisions"]]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        payload = self._call({"op": "encode", "texts": list(texts)})
+        return np.asarray(payload["embeddings"], dtype=np.float32)
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+    def _call(self, request: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            self._next_id += 1
+            request = {"id": self._next_id, **request}
+            line = json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+            # daemon再起動で切れた接続は1回だけ張り直す。タイムアウトは判定が遅いだけなので
+            # 再送せずにすぐ諦める（音声ループを2倍待たせない）。
+            for attempt in range(2):
+                try:
+                    response = self._exchange(line)
+                    break
+                except (ConnectionRefusedError, BrokenPipeError, ConnectionResetError) as exc:
+                    self._disconnect()
+                    if attempt:
+                        raise RouterDaemonError(
+                            f"router daemon unavailable at {self.socket_path}: {exc}"
+                        ) from exc
+                except TimeoutError as exc:
+                    self._disconnect()
+                    raise RouterDaemonError(
+                        f"router daemon timed out after {self.timeout:g}s at {self.socket_path}"
+                    ) from exc
+                except OSError as exc:
+                    self._disconnect()
+                    raise RouterDaemonError(
+                        f"router daemon unavailable at {self.socket_path}: {exc}"
+                    ) from exc
+        if response.get("id") != request["id"]:
+            raise RouterDaemonError("router daemon response id mismatch")
+        if not response.get("ok"):
+            raise RouterDaemonError(str(response.get("error", "unknown error")))
+        return response
+
+    def _exchange(self, line: bytes) -> dict[str, Any]:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(str(self.socket_path))
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+            self._reader = sock.makefile("rb")
+        self._sock.sendall(line)
+        raw = self._reader.readline()
+        if not raw:
+            raise ConnectionResetError("router daemon closed the connection")
+        try:
+            return json.loads(raw)
+        except ValueError as exc:
+            raise RouterDaemonError(f"invalid router daemon response: {exc}") from exc
+
+    def _disconnect(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def serve(socket_path: Path) -> int:
+    router = IntentRouter.from_env()
+    if router is None:
+        logging.error("SBERT Router is disabled or has no intents; daemon not started")
+        return 1
+    window_ms = max(0.0, float(os.getenv("YATAGARASU_SBERT_ROUTER_BATCH_MS", "0") or 0))
+    batcher = RouteBatcher(router, window_sec=window_ms / 1000.0)
+    server = RouterServer(socket_path, batcher)
+    logging.info("SBERT Router daemon listening: socket=%s", socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Yatagarasu SBERT Router daemon")
+    parser.add_argument(
+        "--socket",
+        default="",
+        help="Unix socket path (default: $YATAGARASU_SBERT_ROUTER_SOCKET)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="load the router and serve requests")
+    route_parser = commands.add_parser("route", help="route text via the daemon")
+    route_parser.add_argument("texts", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s.%(msecs)03d %(levelname)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    load_env_file(resolve_workspace_path() / ".env")
+    socket_path = Path(args.socket).expanduser() if args.socket else socket_path_from_env()
+
+    if args.command == "serve":
+        return serve(socket_path)
+
+    client = RouterClient(socket_path)
+    try:
+        decisions = client.route_batch(args.texts)
+    except RouterDaemonError as exc:
+        print(f"router daemon error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    payload: object = [decision.to_json_dict() for decision in decisions]
+    if len(decisions) == 1:
+        payload = decisions[0].to_json_dict()
+    print(json.dumps(payload, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,430 @@
+"""Labelled-corpus evaluation for the SBERT Router.
+
+Reads JSON lines such as::
+
+    {"text": "右を向いて何が見える", "flags": ["move_camera_right", "capture_image"]}
+    {"text": "おはよう", "flags": []}
+
+``flags`` are the router flags the utterance should produce (``[]`` means the
+original text goes to the LLM untouched). An optional ``intents`` list names
+the expected high-hit intent ids for finer-grained scoring. Used by
+``intent_router.py --batch``.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from intent_router import (
+    Embedder,
+    IntentRouter,
+    RouterDecision,
+    RouterSettings,
+    build_intents_from_env,
+)
+
+
+CATEGORIES = ("move", "view", "recall")
+NO_CATEGORY = "none"
+DEFAULT_HIGH_SWEEP = (0.70, 0.74, 0.78, 0.82, 0.86)
+DEFAULT_MIDDLE_SWEEP = (0.60, 0.64, 0.68, 0.72)
+
+
+@dataclass(frozen=True)
+class LabeledUtterance:
+    text: str
+    flags: tuple[str, ...]
+    intents: tuple[str, ...] | None = None
+
+
+@dataclass(frozen=True)
+class LabelScore:
+    label: str
+    tp: int
+    fp: int
+    fn: int
+
+    @property
+    def precision(self) -> float:
+        return self.tp / (self.tp + self.fp) if self.tp + self.fp else 1.0
+
+    @property
+    def recall(self) -> float:
+        return self.tp / (self.tp + self.fn) if self.tp + self.fn else 1.0
+
+    @property
+    def f1(self) -> float:
+        total = self.precision + self.recall
+        return 2 * self.precision * self.recall / total if total else 0.0
+
+
+@dataclass(frozen=True)
+class SweepPoint:
+    high_threshold: float
+    middle_threshold: float
+    precision: float
+    recall: float
+    f1: float
+    exact_match: float
+    middle_rate: float
+
+
+@dataclass(frozen=True)
+class Throughput:
+    utterances: int
+    batch_size: int
+    batch_qps: float
+    single_p50_ms: float
+    single_p95_ms: float
+    single_p99_ms: float
+
+
+@dataclass(frozen=True)
+class EvaluationReport:
+    utterances: int
+    flag_scores: tuple[LabelScore, ...]
+    flag_micro: LabelScore
+    intent_scores: tuple[LabelScore, ...]
+    exact_match: float
+    confusion: dict[str, dict[str, int]]
+    misses: tuple[dict[str, object], ...]
+    throughput: Throughput | None = None
+    sweep: tuple[SweepPoint, ...] = ()
+
+    def to_json_dict(self) -> dict[str, object]:
+        def label_dict(score: LabelScore) -> dict[str, object]:
+            return {
+                **asdict(score),
+                "precision": round(score.precision, 4),
+                "recall": round(score.recall, 4),
+                "f1": round(score.f1, 4),
+            }
+
+        return {
+            "utterances": self.utterances,
+            "flag_scores": [label_dict(score) for score in self.flag_scores],
+            "flag_micro": label_dict(self.flag_micro),
+            "intent_scores": [label_dict(score) for score in self.intent_scores],
+            "exact_match": round(self.exact_match, 4),
+            "confusion": self.confusion,
+            "misses": list(self.misses),
+            "throughput": asdict(self.throughput) if self.throughput else None,
+            "sweep": [asdict(point) for point in self.sweep],
+        }
+
+
+class MemoEmbedder:
+    """Embedder wrapper that encodes each distinct text only once."""
+
+    def __init__(self, embedder: Embedder) -> None:
+        self.embedder = embedder
+        self._rows: dict[str, np.ndarray] = {}
+
+    def encode(self, texts: Iterable[str]) -> np.ndarray:
+        values = list(texts)
+        missing = list(dict.fromkeys(text for text in values if text not in self._rows))
+        if missing:
+            encoded = np.asarray(self.embedder.encode(missing), dtype=np.float32)
+            self._rows.update(zip(missing, encoded))
+        if not values:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([self._rows[text] for text in values])
+
+
+def load_corpus(path: Path) -> list[LabeledUtterance]:
+    corpus: list[LabeledUtterance] = []
+    for line_no, raw_line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            payload = json.loads(line)
+            text = payload["text"]
+            flags = payload["flags"]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"{path}:{line_no}: expected {{text, flags}}: {exc}") from exc
+        if not isinstance(text, str) or not isinstance(flags, list):
+            raise ValueError(f"{path}:{line_no}: text must be a string and flags a list")
+        intents = payload.get("intents")
+        corpus.append(
+            LabeledUtterance(
+                text=text,
+                flags=tuple(str(flag) for flag in flags),
+                intents=None if intents is None else tuple(str(item) for item in intents),
+            )
+        )
+    return corpus
+
+
+def category_of_flag(flag: str) -> str:
+    if flag.startswith("move_camera_"):
+        return "move"
+    if flag == "capture_image":
+        return "view"
+    if flag == "recall_memory":
+        return "recall"
+    return flag
+
+
+def score_labels(
+    expected: Sequence[Iterable[str]],
+    predicted: Sequence[Iterable[str]],
+) -> tuple[LabelScore, ...]:
+    counts: dict[str, list[int]] = {}
+    for wanted, got in zip(expected, predicted):
+        wanted_set, got_set = set(wanted), set(got)
+        for label in wanted_set | got_set:
+            row = counts.setdefault(label, [0, 0, 0])
+            if label in wanted_set and label in got_set:
+                row[0] += 1
+            elif label in got_set:
+                row[1] += 1
+            else:
+                row[2] += 1
+    return tuple(
+        LabelScore(label=label, tp=tp, fp=fp, fn=fn)
+        for label, (tp, fp, fn) in sorted(counts.items())
+    )
+
+
+def micro_average(scores: Iterable[LabelScore]) -> LabelScore:
+    tp = fp = fn = 0
+    for score in scores:
+        tp, fp, fn = tp + score.tp, fp + score.fp, fn + score.fn
+    return LabelScore(label="micro", tp=tp, fp=fp, fn=fn)
+
+
+def confusion_matrix(
+    expected: Sequence[Iterable[str]],
+    predicted: Sequence[Iterable[str]],
+) -> dict[str, dict[str, int]]:
+    """Count (expected category, predicted category) pairs per utterance."""
+    labels = (*CATEGORIES, NO_CATEGORY)
+    matrix = {row: {column: 0 for column in labels} for row in labels}
+    for wanted, got in zip(expected, predicted):
+        rows = {category_of_flag(flag) for flag in wanted} & set(CATEGORIES) or {NO_CATEGORY}
+        columns = {category_of_flag(flag) for flag in got} & set(CATEGORIES) or {
+            NO_CATEGORY
+        }
+        for row in rows:
+            for column in columns:
+                matrix[row][column] += 1
+    return matrix
+
+
+def route_in_batches(
+    router: IntentRouter,
+    texts: Sequence[str],
+    batch_size: int,
+) -> tuple[list[RouterDecision], float]:
+    decisions: list[RouterDecision] = []
+    started = time.perf_counter()
+    for offset in range(0, len(texts), max(1, batch_size)):
+        decisions.extend(router.route_batch(texts[offset : offset + max(1, batch_size)]))
+    return decisions, time.perf_counter() - started
+
+
+def measure_throughput(
+    router: IntentRouter,
+    texts: Sequence[str],
+    batch_size: int,
+) -> Throughput:
+    if not texts:
+        return Throughput(0, batch_size, 0.0, 0.0, 0.0, 0.0)
+    router.route(texts[0])
+    _, elapsed = route_in_batches(router, texts, batch_size)
+    latencies: list[float] = []
+    for text in texts:
+        started = time.perf_counter()
+        router.route(text)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    percentiles = np.percentile(latencies, [50, 95, 99])
+    return Throughput(
+        utterances=len(texts),
+        batch_size=batch_size,
+        batch_qps=round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+        single_p50_ms=round(float(percentiles[0]), 3),
+        single_p95_ms=round(float(percentiles[1]), 3),
+        single_p99_ms=round(float(percentiles[2]), 3),
+    )
+
+
+def evaluate(
+    router: IntentRouter,
+    corpus: Sequence[LabeledUtterance],
+    *,
+    batch_size: int = 32,
+) -> EvaluationReport:
+    decisions, _ = route_in_batches(router, [item.text for item in corpus], batch_size)
+    expected = [item.flags for item in corpus]
+    predicted = [decision.flags for decision in decisions]
+    flag_scores = score_labels(expected, predicted)
+    labelled = [
+        (item.intents, tuple(hit.intent_id for hit in decision.high_hits))
+        for item, decision in zip(corpus, decisions)
+        if item.intents is not None
+    ]
+    misses = tuple(
+        {
+            "text": item.text,
+            "expected": list(item.flags),
+            "predicted": list(decision.flags),
+            "top": [
+                f"{hit.intent_id}:{hit.score:.3f}" for hit in decision.top_hits[:3]
+            ],
+        }
+        for item, decision in zip(corpus, decisions)
+        if set(item.flags) != set(decision.flags)
+    )
+    return EvaluationReport(
+        utterances=len(corpus),
+        flag_scores=flag_scores,
+        flag_micro=micro_average(flag_scores),
+        intent_scores=score_labels(
+            [wanted for wanted, _ in labelled],
+            [got for _, got in labelled],
+        ),
+        exact_match=(len(corpus) - len(misses)) / len(corpus) if corpus else 1.0,
+        confusion=confusion_matrix(expected, predicted),
+        misses=misses,
+    )
+
+
+def threshold_sweep(
+    settings: RouterSettings,
+    corpus: Sequence[LabeledUtterance],
+    embedder: Embedder,
+    *,
+    highs: Sequence[float] = DEFAULT_HIGH_SWEEP,
+    middles: Sequence[float] = DEFAULT_MIDDLE_SWEEP,
+) -> tuple[SweepPoint, ...]:
+    # 閾値はintent定義に焼き込まれるため組ごとにRouterを作り直す。
+    # 埋め込みはMemoEmbedderで1回だけ計算するので、各組はscore計算のみ。
+    memo = embedder if isinstance(embedder, MemoEmbedder) else MemoEmbedder(embedder)
+    texts = [item.text for item in corpus]
+    expected = [item.flags for item in corpus]
+    points: list[SweepPoint] = []
+    for high in highs:
+        for middle in middles:
+            if middle >= high:
+                continue
+            swept = replace(settings, high_threshold=high, middle_threshold=middle)
+            router = IntentRouter(swept, build_intents_from_env(swept), memo)
+            decisions = router.route_batch(texts)
+            scores = score_labels(expected, [decision.flags for decision in decisions])
+            total = micro_average(scores)
+            points.append(
+                SweepPoint(
+                    high_threshold=high,
+                    middle_threshold=middle,
+                    precision=round(total.precision, 4),
+                    recall=round(total.recall, 4),
+                    f1=round(total.f1, 4),
+                    exact_match=round(
+                        sum(
+                            set(wanted) == set(decision.flags)
+                            for wanted, decision in zip(expected, decisions)
+                        )
+                        / max(1, len(texts)),
+                        4,
+                    ),
+                    middle_rate=round(
+                        sum(bool(decision.middle_hits) for decision in decisions)
+                        / max(1, len(texts)),
+                        4,
+                    ),
+                )
+            )
+    return tuple(points)
+
+
+def format_report(report: EvaluationReport) -> str:
+    lines = [f"utterances: {report.utterances}  exact_match: {report.exact_match:.3f}", ""]
+    lines.append(f"{'flag':28} {'tp':>4} {'fp':>4} {'fn':>4} {'prec':>6} {'recall':>6} {'f1':>6}")
+    for score in (*report.flag_scores, report.flag_micro):
+        lines.append(
+            f"{score.label:28} {score.tp:>4} {score.fp:>4} {score.fn:>4} "
+            f"{score.precision:>6.3f} {score.recall:>6.3f} {score.f1:>6.3f}"
+        )
+    if report.intent_scores:
+        lines.extend(["", f"{'intent':36} {'prec':>6} {'recall':>6} {'f1':>6}"])
+        for score in report.intent_scores:
+            lines.append(
+                f"{score.label:36} {score.precision:>6.3f} {score.recall:>6.3f} {score.f1:>6.3f}"
+            )
+    labels = (*CATEGORIES, NO_CATEGORY)
+    lines.extend(["", "confusion (rows=expected, cols=predicted)"])
+    lines.append(" " * 8 + "".join(f"{label:>8}" for label in labels))
+    for row in labels:
+        lines.append(
+            f"{row:8}" + "".join(f"{report.confusion[row][column]:>8}" for column in labels)
+        )
+    if report.throughput is not None:
+        throughput = report.throughput
+        lines.extend(
+            [
+                "",
+                f"batch qps: {throughput.batch_qps} (batch_size={throughput.batch_size})  "
+                f"single route ms p50={throughput.single_p50_ms} "
+                f"p95={throughput.single_p95_ms} p99={throughput.single_p99_ms}",
+            ]
+        )
+    if report.sweep:
+        best = max(report.sweep, key=lambda point: (point.f1, point.exact_match))
+        lines.extend(
+            ["", f"{'high':>6} {'middle':>6} {'prec':>6} {'recall':>6} {'f1':>6} {'exact':>6} {'mid%':>6}"]
+        )
+        for point in report.sweep:
+            marker = " *" if point is best else ""
+            lines.append(
+                f"{point.high_threshold:>6.2f} {point.middle_threshold:>6.2f} "
+                f"{point.precision:>6.3f} {point.recall:>6.3f} {point.f1:>6.3f} "
+                f"{point.exact_match:>6.3f} {point.middle_rate:>6.3f}{marker}"
+            )
+    if report.misses:
+        lines.extend(["", "misses:"])
+        for miss in report.misses:
+            lines.append(
+                f"  {miss['text']}: expected={miss['expected']} "
+                f"predicted={miss['predicted']} top={miss['top']}"
+            )
+    return "\n".join(lines)
+
+
+def run_batch(
+    path: Path,
+    settings: RouterSettings,
+    embedder: Embedder,
+    router: IntentRouter,
+    *,
+    batch_size: int = 32,
+    sweep: bool = False,
+    min_f1: float = 0.0,
+    as_json: bool = False,
+) -> int:
+    corpus = load_corpus(path)
+    report = evaluate(router, corpus, batch_size=batch_size)
+    report = replace(
+        report,
+        throughput=measure_throughput(router, [item.text for item in corpus], batch_size),
+        sweep=threshold_sweep(settings, corpus, embedder) if sweep else (),
+    )
+    if as_json:
+        print(json.dumps(report.to_json_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+    # 回帰ゲート: micro F1 が下回ったら非0で終了する。
+    if report.flag_micro.f1 < min_f1:
+        print(
+            f"flag micro F1 {report.flag_micro.f1:.3f} < required {min_f1:.3f}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
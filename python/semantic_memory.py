@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""SemanticMemory API client shared by listend and ``bin/yatagarasu``.
+
+The ``recall`` / ``recall-context`` / ``memorize`` shell scripts fork ``jq``
+several times and ``curl`` once per call, and a single voice turn goes
+through them two or three times. This module makes the same three requests
+from Python:
+
+- ``retrieve()`` → ``POST /retrieve`` (recent history + related knowledge)
+- ``recall()``   → ``POST /mcp/recall_memory``
+- ``save()``     → ``POST /save``
+
+Connections are kept alive in a small pool, every call has a timeout, and
+reads are retried with backoff. ``save()`` is only retried when the request
+cannot have reached the server, and identical saves inside
+``YATAGARASU_MEMORIZE_DEDUP_WINDOW_SEC`` return the first ID like
+``memorize.sh``.
+
+The CLI prints the same output as the scripts (standard library only, so the
+system ``python3`` is enough)::
+
+    python semantic_memory.py context "猫について"
+    python semantic_memory.py recall "WiFi" --limit 5
+    python semantic_memory.py save "ユーザーは猫を飼っている"
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import http.client
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+DEFAULT_API_URL = "http://localhost:6001/api"
+DEFAULT_TIMEOUT_SEC = 30.0
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SEC = 0.2
+DEFAULT_RECENT_LIMIT = 3
+DEFAULT_RECALL_LIMIT = 3
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_DEDUP_WINDOW_SEC = 60
+POOL_SIZE = 4
+# これらのステータスは一時的な失敗として読み取り要求を再試行する。
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class SemanticMemoryError(RuntimeError):
+    pass
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer: {raw}") from exc
+    if value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}: {raw}")
+    return value
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number: {raw}") from exc
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0: {raw}")
+    return value
+
+
+@dataclass(frozen=True)
+class MemorySettings:
+    api_url: str = DEFAULT_API_URL
+    timeout_sec: float = DEFAULT_TIMEOUT_SEC
+    retries: int = DEFAULT_RETRIES
+    retry_backoff_sec: float = DEFAULT_RETRY_BACKOFF_SEC
+    recent_limit: int = DEFAULT_RECENT_LIMIT
+    recall_limit: int = DEFAULT_RECALL_LIMIT
+    recall_default_limit: int = DEFAULT_RECALL_LIMIT
+    threshold: float = DEFAULT_THRESHOLD
+    dedup_window_sec: int = DEFAULT_DEDUP_WINDOW_SEC
+    state_dir: Path = Path(tempfile.gettempdir()) / "yatagarasu-memorize"
+
+    @classmethod
+    def from_env(cls) -> "MemorySettings":
+        """Read the variables the recall/memorize scripts use."""
+        state_dir = os.getenv("YATAGARASU_MEMORIZE_STATE_DIR", "").strip()
+        return cls(
+            api_url=os.getenv("SEMANTIC_MEMORY_API_URL", "").strip() or DEFAULT_API_URL,
+            timeout_sec=_env_float("SEMANTIC_MEMORY_TIMEOUT_SEC", DEFAULT_TIMEOUT_SEC)
+            or DEFAULT_TIMEOUT_SEC,
+            retries=_env_int("SEMANTIC_MEMORY_RETRIES", DEFAULT_RETRIES),
+            retry_backoff_sec=_env_float(
+                "SEMANTIC_MEMORY_RETRY_BACKOFF_SEC", DEFAULT_RETRY_BACKOFF_SEC
+            ),
+            recent_limit=_env_int("SEMANTIC_MEMORY_RECENT_LIMIT", DEFAULT_RECENT_LIMIT),
+            recall_limit=_env_int("SEMANTIC_MEMORY_RECALL_LIMIT", DEFAULT_RECALL_LIMIT),
+            recall_default_limit=_env_int(
+                "SEMANTIC_MEMORY_RECALL_DEFAULT_LIMIT", DEFAULT_RECALL_LIMIT
+            ),
+            threshold=_env_float("SEMANTIC_MEMORY_RECALL_THRESHOLD", DEFAULT_THRESHOLD),
+            dedup_window_sec=_env_int(
+                "YATAGARASU_MEMORIZE_DEDUP_WINDOW_SEC", DEFAULT_DEDUP_WINDOW_SEC
+            ),
+            state_dir=(
+                Path(state_dir).expanduser()
+                if state_dir
+                else Path(tempfile.gettempdir()) / "yatagarasu-memorize"
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class RelatedMemory:
+    score: float
+    document: str
+
+
+@dataclass(frozen=True)
+class MemoryContext:
+    recent: tuple[str, ...]
+    related: tuple[RelatedMemory, ...]
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "MemoryContext":
+        return cls(
+            recent=tuple(
+                str(item.get("main_text") or "")
+                for item in payload.get("recent") or ()
+                if isinstance(item, dict)
+            ),
+            related=tuple(
+                RelatedMemory(
+                    score=_as_float(item.get("score")),
+                    document=str(item.get("document") or ""),
+                )
+                for item in payload.get("semantic") or ()
+                if isinstance(item, dict)
+            ),
+        )
+
+    def to_yaml(self) -> str:
+        """The ``memory_context`` block printed by ``recall-context.sh``."""
+        lines = ["memory_context:", "  recent_history: |"]
+        lines.extend(_block_items(self.recent))
+        lines.append("  related_knowledge: |")
+        lines.extend(
+            _block_items(
+                f"[{math.floor(item.score * 100)}] {item.document}" for item in self.related
+            )
+        )
+        return "\n".join(lines) + "\n"
+
+
+@dataclass(frozen=True)
+class RecallResult:
+    count: int
+    payload: dict[str, Any]
+
+    def to_json(self) -> str:
+        return json.dumps(self.payload, ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class SavedMemory:
+    id: int
+    duplicate: bool = False
+    # 保存された本文。要約される場合はAPIが返した時だけ入る。
+    document: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.id, "status": "saved"})
+
+
+def _as_float(value: object) -> float:
+    try:
+        return float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _block_items(items) -> list[str]:
+    lines = []
+    for item in items:
+        first, *rest = str(item).splitlines() or [""]
+        lines.append(f"    - {first}")
+        # 改行を含む記憶もYAMLブロックの字下げを崩さない。
+        lines.extend(f"      {line}" for line in rest)
+    return lines or ["    (なし)"]
+
+
+class SemanticMemoryClient:
+    """Thread-safe client; keeps up to ``POOL_SIZE`` idle keep-alive connections."""
+
+    def __init__(self, settings: MemorySettings) -> None:
+        self.settings = settings
+        parsed = urllib.parse.urlsplit(settings.api_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"invalid SemanticMemory API URL: {settings.api_url}")
+        self._parsed = parsed
+        self._base_path = parsed.path.rstrip("/")
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    @classmethod
+    def from_env(cls) -> "SemanticMemoryClient":
+        return cls(MemorySettings.from_env())
+
+    def retrieve(
+        self,
+        query: str,
+        *,
+        recent_limit: int | None = None,
+        recall_limit: int | None = None,
+        threshold: float | None = None,
+        timeout: float | None = None,
+    ) -> MemoryContext:
+        settings = self.settings
+        payload = self._post(
+            "/retrieve",
+            {
+                "query": query,
+                "threshold": settings.threshold if threshold is None else threshold,
+                "limit": settings.recall_limit if recall_limit is None else recall_limit,
+                "recent_limit": (
+                    settings.recent_limit if recent_limit is None else recent_limit
+                ),
+            },
+            timeout=timeout,
+        )
+        return MemoryContext.from_payload(payload)
+
+    def recall(
+        self,
+        query: str,
+        *,
+        limit: int | None = None,
+        threshold: float | None = None,
+        timeout: float | None = None,
+    ) -> RecallResult:
+        settings = self.settings
+        payload = self._post(
+            "/mcp/recall_memory",
+            {
+                "query": query,
+                "limit": settings.recall_default_limit if limit is None else limit,
+                "threshold": settings.threshold if threshold is None else threshold,
+            },
+            timeout=timeout,
+        )
+        if payload.get("status") != "success":
+            raise SemanticMemoryError("不明なレスポンス")
+        return RecallResult(count=int(payload.get("count") or 0), payload=payload)
+
+    def save(
+        self,
+        main_text: str,
+        *,
+        sub_text: str | None = None,
+        summarize: bool = True,
+        timeout: float | None = None,
+    ) -> SavedMemory:
+        body: dict[str, Any] = {"main_text": main_text}
+        if sub_text:
+            body["sub_text"] = sub_text
+        body["summarize"] = summarize
+        with self._save_cache(body) as cache:
+            cached = cache.read()
+            if cached is not None:
+                return SavedMemory(id=cached, duplicate=True)
+            payload = self._post("/save", body, timeout=timeout, idempotent=False)
+            if payload.get("status") != "saved":
+                raise SemanticMemoryError("不明なレスポンス")
+            memory_id = payload.get("id")
+            if isinstance(memory_id, bool) or not isinstance(memory_id, int) or memory_id < 0:
+                raise SemanticMemoryError("SemanticMemory API returned an invalid saved ID")
+            cache.write(memory_id)
+            document = payload.get("document") or payload.get("summary")
+            if not isinstance(document, str):
+                document = "" if summarize else main_text
+            return SavedMemory(id=memory_id, document=document)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _save_cache(self, body: dict[str, Any]) -> "_SaveCache":
+        key = hashlib.sha256(
+            f"{self.settings.api_url}\0{json.dumps(body, sort_keys=True)}".encode("utf-8")
+        ).hexdigest()
+        return _SaveCache(
+            self.settings.state_dir / key, self.settings.dedup_window_sec
+        )
+
+    def _post(
+        self,
+        path: str,
+        body: dict[str, Any],
+        *,
+        timeout: float | None,
+        idempotent: bool = True,
+    ) -> dict[str, Any]:
+        timeout = self.settings.timeout_sec if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        attempts = 1 + self.settings.retries
+        for attempt in range(attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SemanticMemoryError(
+                    f"SemanticMemory API request timed out after {timeout:.1f}s"
+                )
+            try:
+                status, raw = self._request(path, data, remaining)
+            except _RetryableError as exc:
+                if not (idempotent or exc.unsent) or attempt == attempts - 1:
+                    raise SemanticMemoryError(
+                        f"SemanticMemory API request failed: {exc.__cause__}"
+                    ) from exc
+            else:
+                if status in RETRY_STATUSES and idempotent and attempt < attempts - 1:
+                    logging.debug("SemanticMemory %s returned HTTP %d; retrying", path, status)
+                else:
+                    return _parse_response(status, raw)
+            time.sleep(min(self.settings.retry_backoff_sec * 2**attempt, max(0.0, remaining)))
+        raise SemanticMemoryError("SemanticMemory API request failed")
+
+    def _request(self, path: str, data: bytes, timeout: float) -> tuple[int, bytes]:
+        connection, reused = self._acquire()
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        try:
+            connection.request(
+                "POST",
+                self._base_path + path,
+                body=data,
+                headers={"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            raw = response.read()
+        except (http.client.HTTPException, OSError) as exc:
+            connection.close()
+            # 接続拒否と、再利用した接続が既に閉じられていた場合はサーバーに届いていない。
+            unsent = isinstance(exc, ConnectionRefusedError) or (
+                reused
+                and isinstance(
+                    exc,
+                    (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError),
+                )
+            )
+            raise _RetryableError(unsent) from exc
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, raw
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            self.requests += 1
+            if self._idle:
+                return self._idle.pop(), True
+            self.connections_opened += 1
+        parsed = self._parsed
+        connection_class = (
+            http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        )
+        return (
+            connection_class(parsed.hostname, parsed.port, timeout=self.settings.timeout_sec),
+            False,
+        )
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < POOL_SIZE:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+class _RetryableError(Exception):
+    def __init__(self, unsent: bool) -> None:
+        super().__init__("connection failed")
+        self.unsent = unsent
+
+
+class _SaveCache:
+    """``memorize.sh`` compatible dedup: one lock file and ``<saved_at> <id>`` per request."""
+
+    def __init__(self, stem: Path, window_sec: int) -> None:
+        self.lock_path = stem.with_suffix(".lock")
+        self.cache_path = stem.with_suffix(".saved")
+        self.window_sec = window_sec
+        self._fd: int | None = None
+
+    def __enter__(self) -> "_SaveCache":
+        old_umask = os.umask(0o077)
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.lock_path, os.O_WRONLY | os.O_CREAT, 0o600)
+        finally:
+            os.umask(old_umask)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def read(self) -> int | None:
+        try:
+            saved_at, memory_id = self.cache_path.read_text().split()
+            saved_at_sec, cached_id = int(saved_at), int(memory_id)
+        except (OSError, ValueError):
+            return None
+        now = int(time.time())
+        if saved_at_sec <= now <= saved_at_sec + self.window_sec:
+            return cached_id
+        return None
+
+    def write(self, memory_id: int) -> None:
+        temp = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}")
+        temp.write_text(f"{int(time.time())} {memory_id}\n")
+        temp.replace(self.cache_path)
+
+
+def _parse_response(status: int, raw: bytes) -> dict[str, Any]:
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        payload = None
+    if isinstance(payload, dict) and payload.get("error"):
+        raise SemanticMemoryError(str(payload["error"]))
+    if status >= 400:
+        # 応答本文は記憶内容を含み得るので、エラーにはステータスだけを載せる。
+        raise SemanticMemoryError(f"SemanticMemory API request failed: HTTP {status}")
+    if not isinstance(payload, dict):
+        raise SemanticMemoryError("不明なレスポンス")
+    return payload
+
+
+def load_env_file(env_path: Path) -> None:
+    if not env_path.exists():
+        return
+    for raw_line in env_path.read_text(encoding="utf-8").splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.strip()
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
+            value = value[1:-1]
+        if key and key not in os.environ:
+            os.environ[key] = value
+
+
+def _load_default_env() -> None:
+    """workspace/.env を優先し、無ければプロジェクト直下の .env を読む（既存の環境変数が優先）。"""
+    project_root = Path(__file__).resolve().parents[1]
+    workspace = Path(os.getenv("YATAGARASU_CWD", "") or project_root / "workspace")
+    for env_path in (workspace / ".env", project_root / ".env"):
+        if env_path.is_file():
+            load_env_file(env_path)
+            return
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SemanticMemory API client")
+    commands = parser.add_subparsers(dest="command", required=True)
+    context_parser = commands.add_parser("context", help="recent history + related knowledge (YAML)")
+    context_parser.add_argument("query")
+    context_parser.add_argument("--recent-limit", type=int)
+    context_parser.add_argument("--recall-limit", type=int)
+    context_parser.add_argument("--threshold", type=float)
+    recall_parser = commands.add_parser("recall", help="semantic recall (JSON)")
+    recall_parser.add_argument("query")
+    recall_parser.add_argument("--limit", type=int)
+    recall_parser.add_argument("--threshold", type=float)
+    save_parser = commands.add_parser("save", help="save one memory")
+    save_parser.add_argument("main_text")
+    save_parser.add_argument("--sub")
+    save_parser.add_argument("--no-summarize", action="store_true")
+    args = parser.parse_args(argv)
+
+    _load_default_env()
+    try:
+        client = SemanticMemoryClient.from_env()
+    except ValueError as exc:
+        print(f"エラー: {exc}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "context":
+            if not args.query:
+                print("エラー: 検索クエリが指定されていません", file=sys.stderr)
+                return 1
+            context = client.retrieve(
+                args.query,
+                recent_limit=args.recent_limit,
+                recall_limit=args.recall_limit,
+                threshold=args.threshold,
+            )
+            sys.stdout.write(context.to_yaml())
+            print(
+                f"{len(context.recent)}件の過去の文脈、{len(context.related)}件の関連知識を見つけました",
+                file=sys.stderr,
+            )
+        elif args.command == "recall":
+            if not args.query:
+                print("エラー: 検索クエリが指定されていません", file=sys.stderr)
+                return 1
+            result = client.recall(args.query, limit=args.limit, threshold=args.threshold)
+            print(f"{result.count}件の記憶を見つけました", file=sys.stderr)
+            print(result.to_json())
+        else:
+            if not args.main_text:
+                print("エラー: メインテキストが指定されていません", file=sys.stderr)
+                return 1
+            saved = client.save(
+                args.main_text, sub_text=args.sub, summarize=not args.no_summarize
+            )
+            if saved.duplicate:
+                print(f"記憶は既に保存済みです (ID: {saved.id})", file=sys.stderr)
+            else:
+                print(f"記憶を保存しました (ID: {saved.id})", file=sys.stderr)
+            print(saved.to_json())
+    except SemanticMemoryError as exc:
+        print(f"エラー: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
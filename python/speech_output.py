@@ -0,0 +1,253 @@
+"""In-process ``zunda --stdout | tapovoice`` for agent replies.
+
+``bin/zunda`` splits the text into phrases, runs ``curl`` twice per phrase
+against VOICEVOX (up to four in parallel), joins the WAVs with ``ffmpeg`` and
+pipes the result to ``bin/tapovoice``. ``VoicevoxClient`` does the same over a
+small pool of keep-alive connections and joins the 16-bit PCM with ``wave``,
+so only ``tapovoice`` is still a process. Phrase splitting and the silence
+between phrases match ``zunda`` so replies sound the same.
+"""
+
+from __future__ import annotations
+
+import http.client
+import io
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import urllib.parse
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Sequence
+
+
+DEFAULT_SAMPLING_RATE = 8000
+DEFAULT_PHRASE_INTERVAL_SEC = 0.5
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT_SEC = 30.0
+POOL_SIZE = 4
+# zunda の parted_sentence と同じ区切り（半角スペースでは切らない）。
+_PHRASE_SPLIT = re.compile(r"[、。:：　\r\n]+")
+_PHRASE_LEADING = re.compile(r"^[\ufeff\s。、:： 　.]+")
+# 文末記号の連続（閉じ括弧まで含める）。ストリーミング発話はここで区切る。
+_SENTENCE_END = re.compile(r"[。．！？!?\n]+[」』）)]*")
+
+
+class SpeechError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class VoiceSettings:
+    engine_url: str = "http://127.0.0.1:50021"
+    speaker: str = "68"
+    sampling_rate: int = DEFAULT_SAMPLING_RATE
+    phrase_interval_sec: float = DEFAULT_PHRASE_INTERVAL_SEC
+    workers: int = DEFAULT_WORKERS
+    timeout_sec: float = DEFAULT_TIMEOUT_SEC
+
+    @classmethod
+    def from_env(cls, speaker: str | None = None) -> "VoiceSettings":
+        host = os.getenv("VOICEVOX_ENGINE_HOST", "").strip() or "127.0.0.1"
+        port = os.getenv("VOICEVOX_ENGINE_PORT", "").strip() or "50021"
+        return cls(
+            engine_url=f"http://{host}:{port}",
+            speaker=speaker or os.getenv("SPEAKER_ID", "").strip() or "68",
+        )
+
+
+def split_phrases(text: str) -> list[str]:
+    """Phrases in speaking order, split where ``zunda`` inserts a pause."""
+    phrases = []
+    for part in _PHRASE_SPLIT.split(text):
+        phrase = _PHRASE_LEADING.sub("", part).strip()
+        if phrase:
+            phrases.append(phrase)
+    return phrases
+
+
+class SentenceSplitter:
+    """Cuts streamed reply text into sentences as soon as each one is complete.
+
+    A terminator at the very end of the buffer is held back until more text
+    arrives (or ``flush``), so "！？" split across two deltas stays together.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if match.end() == len(self._buffer):
+                break
+            sentences.append(self._buffer[start : match.end()])
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return [sentence for sentence in sentences if split_phrases(sentence)]
+
+    def flush(self) -> list[str]:
+        rest, self._buffer = self._buffer, ""
+        return [rest] if split_phrases(rest) else []
+
+
+def concat_wav(chunks: Sequence[bytes], interval_sec: float) -> bytes:
+    """Join mono PCM WAVs with ``interval_sec`` of silence after each one."""
+    if not chunks:
+        raise SpeechError("no audio to join")
+    # 書き込み側を開く前に全部読む（途中で例外を投げると writer の close が別の例外で上書きする）。
+    decoded = []
+    for chunk in chunks:
+        try:
+            with wave.open(io.BytesIO(chunk), "rb") as reader:
+                decoded.append((reader.getparams(), reader.readframes(reader.getnframes())))
+        except (wave.Error, EOFError) as exc:
+            raise SpeechError(f"invalid WAV from VOICEVOX: {exc}") from exc
+    params = decoded[0][0]
+    for current, _ in decoded[1:]:
+        if current[:3] != params[:3]:
+            raise SpeechError(f"mismatched WAV format: {current[:3]} != {params[:3]}")
+    silence = b"\0" * (int(params.framerate * interval_sec) * params.sampwidth * params.nchannels)
+    output = io.BytesIO()
+    with wave.open(output, "wb") as writer:
+        writer.setparams(params)
+        for _, frames in decoded:
+            writer.writeframes(frames)
+            writer.writeframes(silence)
+    return output.getvalue()
+
+
+def wav_duration(data: bytes) -> float:
+    try:
+        with wave.open(io.BytesIO(data), "rb") as reader:
+            return reader.getnframes() / float(reader.getframerate() or 1)
+    except (wave.Error, EOFError) as exc:
+        raise SpeechError(f"invalid WAV: {exc}") from exc
+
+
+class VoicevoxClient:
+    """Thread-safe VOICEVOX client; ``synthesize`` is audio_query + synthesis."""
+
+    def __init__(self, settings: VoiceSettings) -> None:
+        self.settings = settings
+        parsed = urllib.parse.urlsplit(settings.engine_url)
+        if parsed.scheme != "http" or not parsed.hostname:
+            raise ValueError(f"invalid VOICEVOX engine URL: {settings.engine_url}")
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.connections_opened = 0
+
+    def synthesize(self, text: str) -> bytes:
+        speaker = self.settings.speaker
+        try:
+            query = json.loads(
+                self._post(
+                    "/audio_query?" + urllib.parse.urlencode({"text": text, "speaker": speaker}),
+                    b"",
+                )
+            )
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise SpeechError(f"VOICEVOX audio_query returned invalid JSON: {exc}") from exc
+        if not isinstance(query, dict):
+            raise SpeechError("VOICEVOX audio_query returned invalid JSON")
+        query["outputSamplingRate"] = self.settings.sampling_rate
+        return self._post(
+            "/synthesis?" + urllib.parse.urlencode({"speaker": speaker}),
+            json.dumps(query).encode("utf-8"),
+        )
+
+    def synthesize_all(self, phrases: Sequence[str]) -> list[bytes]:
+        """Synthesize phrases in parallel (like ``zunda -m``), keeping their order."""
+        if len(phrases) <= 1:
+            return [self.synthesize(phrase) for phrase in phrases]
+        return list(self._pool().map(self.synthesize, phrases))
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for connection in idle:
+            connection.close()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self.settings.workers),
+                    thread_name_prefix="voicevox",
+                )
+            return self._executor
+
+    def _post(self, path: str, body: bytes) -> bytes:
+        # 再利用した接続がサーバー側で閉じられていた場合だけ、新しい接続で1回やり直す。
+        for attempt in range(2):
+            connection, reused = self._acquire()
+            try:
+                connection.request(
+                    "POST", path, body=body, headers={"Content-Type": "application/json"}
+                )
+                response = connection.getresponse()
+                raw = response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                connection.close()
+                if reused and attempt == 0 and isinstance(
+                    exc, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+                ):
+                    continue
+                raise SpeechError(f"VOICEVOX request failed: {exc}") from exc
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            if response.status != 200:
+                raise SpeechError(f"VOICEVOX {path.split('?')[0]} returned HTTP {response.status}")
+            return raw
+        raise SpeechError("VOICEVOX request failed")
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.connections_opened += 1
+        return (
+            http.client.HTTPConnection(
+                self._host, self._port, timeout=self.settings.timeout_sec
+            ),
+            False,
+        )
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < POOL_SIZE:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+def play_wav(command: Sequence[str], data: bytes, *, timeout: float) -> None:
+    """Hand one WAV to ``tapovoice`` (stdin), which posts it to go2rtc for the camera speaker."""
+    try:
+        result = subprocess.run(
+            list(command),
+            input=data,
+            capture_output=True,
+            timeout=timeout,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise SpeechError(f"tapovoice failed: {exc}") from exc
+    if result.returncode != 0:
+        detail = (result.stderr or b"").decode("utf-8", errors="ignore").strip()
+        raise SpeechError(f"tapovoice failed rc={result.returncode}: {detail}")
+    logging.debug("tapovoice accepted %.1fs of audio", wav_duration(data))
@@ -0,0 +1,112 @@
+"""Per-chunk VAD probability helpers for STT segments.
+
+listend already evaluates Silero VAD once per audio chunk. These helpers reuse
+those probabilities to decide which part of a finalized segment is worth
+sending to the STT backend.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+
+@dataclass(frozen=True)
+class SpeechSpan:
+    start_chunk: int
+    end_chunk: int
+    total_chunks: int
+
+    @property
+    def kept_chunks(self) -> int:
+        return self.end_chunk - self.start_chunk
+
+    @property
+    def trimmed_chunks(self) -> int:
+        return self.total_chunks - self.kept_chunks
+
+
+def find_speech_span(
+    probabilities: Sequence[float],
+    *,
+    threshold: float,
+    pad_chunks: int,
+) -> SpeechSpan:
+    """Return the chunk range from the first to the last voiced chunk.
+
+    ``pad_chunks`` chunks are kept on both sides so word onsets and releases
+    that VAD scores below the threshold still reach the recognizer. When no
+    chunk reaches the threshold the whole segment is kept unchanged.
+    """
+    if pad_chunks < 0:
+        raise ValueError("pad_chunks must not be negative")
+    total = len(probabilities)
+    voiced = [
+        index
+        for index, probability in enumerate(probabilities)
+        if probability >= threshold
+    ]
+    if not voiced:
+        return SpeechSpan(0, total, total)
+    return SpeechSpan(
+        start_chunk=max(0, voiced[0] - pad_chunks),
+        end_chunk=min(total, voiced[-1] + 1 + pad_chunks),
+        total_chunks=total,
+    )
+
+
+def crop_to_span(raw_audio: bytes, span: SpeechSpan) -> bytes:
+    """Cut ``raw_audio`` made of ``span.total_chunks`` equal chunks."""
+    if span.total_chunks <= 0 or span.trimmed_chunks == 0:
+        return raw_audio
+    chunk_bytes, remainder = divmod(len(raw_audio), span.total_chunks)
+    if remainder or chunk_bytes <= 0:
+        return raw_audio
+    return raw_audio[span.start_chunk * chunk_bytes : span.end_chunk * chunk_bytes]
+
+
+def plan_split_ranges(
+    probabilities: Sequence[float],
+    *,
+    total_samples: int,
+    chunk_samples: int,
+    max_samples: int,
+    search_chunks: int,
+) -> tuple[tuple[int, int], ...]:
+    """Split ``total_samples`` into ranges no longer than ``max_samples``.
+
+    Each cut is placed in the middle of the least voiced chunk among the last
+    ``search_chunks`` chunks before the hard limit, so long dictations are not
+    cut inside a word. When probabilities do not describe the audio (or the
+    window is empty) the hard limit is used as before.
+    """
+    if max_samples <= 0 or total_samples <= max_samples:
+        return ((0, total_samples),) if total_samples > 0 else ()
+    aligned = (
+        chunk_samples > 0
+        and len(probabilities) * chunk_samples == total_samples
+    )
+    ranges: list[tuple[int, int]] = []
+    start = 0
+    while total_samples - start > max_samples:
+        end = start + max_samples
+        if aligned:
+            limit_chunk = end // chunk_samples
+            first_chunk = max(
+                -(-start // chunk_samples),
+                limit_chunk - max(1, search_chunks),
+            )
+            candidates = range(first_chunk, limit_chunk)
+            if len(candidates) > 0:
+                # 同点なら後方を選び、1区間をできるだけ長く保つ。
+                best = min(
+                    candidates,
+                    key=lambda index: (probabilities[index], -index),
+                )
+                end = best * chunk_samples + chunk_samples // 2
+        if end <= start:
+            end = start + max_samples
+        ranges.append((start, end))
+        start = end
+    ranges.append((start, total_samples))
+    return tuple(ranges)
@@ -0,0 +1,100 @@
+"""Parallel startup phases for listend.
+
+Model loads are independent of each other, so they run concurrently and each
+consumer waits only for the phase it needs: audio ingest for VAD and wake,
+the first transcription for STT, the first dispatch for the router.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable
+
+
+class StartupError(RuntimeError):
+    """A required startup phase failed."""
+
+
+class StartupTasks:
+    def __init__(self, *, max_workers: int = 4) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="listend-startup",
+        )
+        self._futures: dict[str, Future[object]] = {}
+        self._elapsed: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+    def submit(
+        self,
+        name: str,
+        load: Callable[[], object],
+        *,
+        after: Iterable[str] = (),
+    ) -> None:
+        dependencies = tuple(after)
+        unknown = [dependency for dependency in dependencies if dependency not in self._futures]
+        if unknown:
+            raise KeyError(f"unknown startup dependency: {', '.join(unknown)}")
+        if name in self._futures:
+            raise ValueError(f"startup phase already submitted: {name}")
+        self._futures[name] = self._executor.submit(
+            self._run_phase,
+            name,
+            load,
+            dependencies,
+        )
+
+    def ready(self, name: str) -> bool:
+        return self._futures[name].done()
+
+    def wait(self, *names: str) -> None:
+        """Block until the phases finish; raise ``StartupError`` on failure."""
+        for name in names:
+            future = self._futures[name]
+            if not future.done():
+                logging.info("startup waiting for phase=%s", name)
+            try:
+                future.result()
+            except Exception as exc:
+                raise StartupError(f"startup phase {name} failed: {exc}") from exc
+
+    @property
+    def started_at(self) -> float:
+        return self._started_at
+
+    def elapsed_sec(self, name: str) -> float | None:
+        with self._lock:
+            return self._elapsed.get(name)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_phase(
+        self,
+        name: str,
+        load: Callable[[], object],
+        dependencies: tuple[str, ...],
+    ) -> object:
+        if dependencies:
+            self.wait(*dependencies)
+        started_at = time.monotonic()
+        try:
+            result = load()
+        except Exception:
+            logging.exception("startup phase=%s failed", name)
+            raise
+        finished_at = time.monotonic()
+        with self._lock:
+            self._elapsed[name] = finished_at - started_at
+        logging.info(
+            "startup phase=%s elapsed_ms=%.1f since_start_ms=%.1f",
+            name,
+            (finished_at - started_at) * 1000.0,
+            (finished_at - self._started_at) * 1000.0,
+        )
+        return result
@@ -0,0 +1,218 @@
+"""STT model lifetime management for listend.
+
+In ``livekit`` wake mode the STT model is only needed after a wake word, yet
+it stays loaded through hours of OFF. ``SttModelManager`` unloads it after an
+idle period, reloads it in the background on wake candidates, and keeps it
+resident once a reload turns out too slow to finish before command input. The
+first load is not judged: at startup it competes with the VAD, wake and router
+loads and is much slower than a later reload.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+
+def read_rss_mb() -> float | None:
+    """Return the resident set size of this process in MiB (Linux only)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            fields = handle.read().split()
+        return int(fields[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _release_freed_memory() -> None:
+    # glibc は解放済みヒープをすぐOSへ返さないため、unload直後に明示的に返却する。
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        return
+
+
+class SttModelManager:
+    def __init__(
+        self,
+        loader: Callable[[], object],
+        *,
+        name: str,
+        idle_unload_sec: float = 0.0,
+        rss_budget_mb: float = 0.0,
+        reload_deadline_sec: float = 0.0,
+        rss_check_interval_sec: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        rss_reader: Callable[[], float | None] = read_rss_mb,
+    ) -> None:
+        self._loader = loader
+        self._name = name
+        self._idle_unload_sec = max(0.0, idle_unload_sec)
+        self._rss_budget_mb = max(0.0, rss_budget_mb)
+        self._reload_deadline_sec = reload_deadline_sec
+        self._rss_check_interval_sec = rss_check_interval_sec
+        self._clock = clock
+        self._rss_reader = rss_reader
+        self._lock = threading.Lock()
+        self._model: object | None = None
+        self._loading: threading.Thread | None = None
+        self._last_used_at = clock()
+        self._last_rss_check_at: float | None = None
+        self._pinned = False
+        self.load_count = 0
+        self.unload_count = 0
+        self.last_load_sec: float | None = None
+
+    @property
+    def unload_enabled(self) -> bool:
+        return (self._idle_unload_sec > 0.0 or self._rss_budget_mb > 0.0) and not self._pinned
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def pinned(self) -> bool:
+        return self._pinned
+
+    @property
+    def status(self) -> str:
+        if self._model is not None:
+            return "pinned" if self._pinned else "loaded"
+        loading = self._loading
+        if loading is not None and loading.is_alive():
+            return "loading"
+        return "unloaded"
+
+    def acquire(self, reason: str = "transcribe") -> object:
+        """Return the model, loading it synchronously when it is absent."""
+        model = self._model
+        if model is None:
+            with self._lock:
+                model = self._model
+                if model is None:
+                    model = self._load_locked(reason)
+        self._last_used_at = self._clock()
+        return model
+
+    def preload(self, reason: str) -> None:
+        """Start loading in the background unless the model is ready."""
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            if self._loading is not None and self._loading.is_alive():
+                return
+            self._loading = threading.Thread(
+                target=self._preload_worker,
+                args=(reason,),
+                name="stt-model-preload",
+                daemon=True,
+            )
+            self._loading.start()
+
+    def maybe_unload(self, *, now: float) -> bool:
+        """Unload when idle too long or over the RSS budget.
+
+        Call only while STT is not expected (OFF state).
+        """
+        if not self.unload_enabled or self._model is None:
+            return False
+        # RSS予算はアイドル解放（0 = 常駐）とは独立に判定する。
+        idle_sec = now - self._last_used_at
+        if self._idle_unload_sec > 0.0 and idle_sec >= self._idle_unload_sec:
+            return self._unload("idle", idle_sec=idle_sec)
+        if self._rss_budget_mb <= 0.0:
+            return False
+        if (
+            self._last_rss_check_at is not None
+            and now - self._last_rss_check_at < self._rss_check_interval_sec
+        ):
+            return False
+        self._last_rss_check_at = now
+        rss_mb = self._rss_reader()
+        if rss_mb is None or rss_mb <= self._rss_budget_mb:
+            return False
+        return self._unload("rss_budget", idle_sec=idle_sec)
+
+    def _preload_worker(self, reason: str) -> None:
+        try:
+            with self._lock:
+                if self._model is None:
+                    self._load_locked(reason)
+        except Exception as exc:
+            # 実際の文字起こし時に acquire() が再試行し、失敗をそこで扱う。
+            logging.warning("stt model preload failed model=%s: %s", self._name, exc)
+
+    def _load_locked(self, reason: str) -> object:
+        reload = self.load_count > 0
+        started_at = time.monotonic()
+        model = self._loader()
+        elapsed = time.monotonic() - started_at
+        self._model = model
+        self._last_used_at = self._clock()
+        self.load_count += 1
+        self.last_load_sec = elapsed
+        rss_mb = self._rss_reader()
+        logging.info(
+            "stt model loaded model=%s reason=%s elapsed_ms=%.1f rss_mb=%s",
+            self._name,
+            reason,
+            elapsed * 1000.0,
+            "n/a" if rss_mb is None else f"{rss_mb:.1f}",
+        )
+        if (
+            reload
+            and self.unload_enabled
+            and self._reload_deadline_sec > 0.0
+            and elapsed > self._reload_deadline_sec
+        ):
+            self._pinned = True
+            logging.warning(
+                (
+                    "stt model kept resident: load_ms=%.1f exceeds "
+                    "wake prompt window_ms=%.1f"
+                ),
+                elapsed * 1000.0,
+                self._reload_deadline_sec * 1000.0,
+            )
+        if (
+            self._rss_budget_mb > 0.0
+            and rss_mb is not None
+            and rss_mb > self._rss_budget_mb
+        ):
+            logging.warning(
+                "rss over budget with stt model loaded rss_mb=%.1f budget_mb=%.1f",
+                rss_mb,
+                self._rss_budget_mb,
+            )
+        return model
+
+    def _unload(self, reason: str, *, idle_sec: float) -> bool:
+        with self._lock:
+            if self._model is None:
+                return False
+            rss_before = self._rss_reader()
+            self._model = None
+            self.unload_count += 1
+        gc.collect()
+        _release_freed_memory()
+        rss_after = self._rss_reader()
+        logging.info(
+            (
+                "stt model unloaded model=%s reason=%s idle_sec=%.1f "
+                "rss_before_mb=%s rss_after_mb=%s"
+            ),
+            self._name,
+            reason,
+            idle_sec,
+            "n/a" if rss_before is None else f"{rss_before:.1f}",
+            "n/a" if rss_after is None else f"{rss_after:.1f}",
+        )
+        return True
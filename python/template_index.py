@@ -0,0 +1,173 @@
+"""Template similarity indexes for the SBERT Router.
+
+``ExactTemplateIndex`` is the dense matmul the router always used.
+``IvfTemplateIndex`` is an inverted-file index over the normalised template
+matrix: spherical k-means centroids partition the templates, and a query only
+scores the ``nprobe`` closest partitions. Both return one score per template
+(``-inf`` for rows the IVF index did not visit) so ``IntentRouter`` keeps the
+same per-intent reduction and ``route()`` contract.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Protocol, Sequence
+
+import numpy as np
+
+
+class TemplateIndex(Protocol):
+    def scores(self, query: np.ndarray) -> np.ndarray: ...
+
+    def sync(self, keys: Sequence[str], embeddings: np.ndarray) -> None: ...
+
+
+class ExactTemplateIndex:
+    def __init__(self, keys: Sequence[str], embeddings: np.ndarray) -> None:
+        self.sync(keys, embeddings)
+
+    def sync(self, keys: Sequence[str], embeddings: np.ndarray) -> None:
+        self._embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        return np.matmul(self._embeddings, query)
+
+
+def spherical_kmeans(
+    embeddings: np.ndarray,
+    clusters: int,
+    *,
+    iterations: int = 10,
+    seed: int = 0,
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    count = embeddings.shape[0]
+    clusters = max(1, min(clusters, count))
+    centroids = embeddings[rng.choice(count, size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(embeddings @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, embeddings)
+        sizes = np.bincount(assignment, minlength=clusters)
+        empty = np.flatnonzero(sizes == 0)
+        if empty.size:
+            # 空クラスタは任意の行で埋め直し、分割数を保つ。
+            sums[empty] = embeddings[rng.choice(count, size=empty.size, replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.clip(norms, 1e-12, None)
+    return centroids.astype(np.float32)
+
+
+class IvfTemplateIndex:
+    def __init__(
+        self,
+        keys: Sequence[str],
+        embeddings: np.ndarray,
+        *,
+        nprobe: int = 8,
+        nlist: int | None = None,
+        retrain_ratio: float = 0.25,
+        seed: int = 0,
+    ) -> None:
+        if nprobe <= 0:
+            raise ValueError("nprobe must be greater than zero")
+        self.nprobe = nprobe
+        self._nlist = nlist
+        self._retrain_ratio = retrain_ratio
+        self._seed = seed
+        self._centroids = np.empty((0, 0), dtype=np.float32)
+        self._trained_size = 0
+        self._drift = 0
+        self._assignment: dict[str, int] = {}
+        self._size = 0
+        self.retrain_count = 0
+        self.sync(keys, embeddings)
+
+    @property
+    def nlist(self) -> int:
+        return int(self._centroids.shape[0])
+
+    def sync(self, keys: Sequence[str], embeddings: np.ndarray) -> None:
+        """Adopt a new template set, reusing centroids when the change is small.
+
+        Rows whose key was already indexed keep their partition; new rows are
+        assigned to the nearest existing centroid. Centroids are retrained
+        only when the template set drifted by more than ``retrain_ratio``.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        keys = list(keys)
+        if matrix.shape[0] != len(keys):
+            raise ValueError("keys and embeddings must have the same length")
+        if matrix.shape[0] == 0:
+            self._assignment = {}
+            self._size = 0
+            return
+        previous = self._assignment
+        key_set = set(keys)
+        changed = sum(1 for key in keys if key not in previous) + sum(
+            1 for key in previous if key not in key_set
+        )
+        # 学習後の累積変更量で判定し、小さな追加の積み重ねでも偏りを放置しない。
+        self._drift += changed
+        if (
+            self._centroids.size == 0
+            or self._centroids.shape[1] != matrix.shape[1]
+            or self._drift > self._retrain_ratio * max(1, self._trained_size)
+        ):
+            self._train(matrix)
+            assignment = np.argmax(matrix @ self._centroids.T, axis=1)
+        else:
+            assignment = np.empty(len(keys), dtype=np.intp)
+            new_rows = [index for index, key in enumerate(keys) if key not in previous]
+            for index, key in enumerate(keys):
+                if key in previous:
+                    assignment[index] = previous[key]
+            if new_rows:
+                assignment[new_rows] = np.argmax(
+                    matrix[new_rows] @ self._centroids.T,
+                    axis=1,
+                )
+            logging.info(
+                "SBERT IVF index synced: added=%d removed=%d templates=%d",
+                len(new_rows),
+                changed - len(new_rows),
+                len(keys),
+            )
+        self._assignment = {key: int(cluster) for key, cluster in zip(keys, assignment)}
+        self._layout(matrix, np.asarray(assignment, dtype=np.intp))
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        full = np.full(self._size, -np.inf, dtype=np.float32)
+        if self._size == 0:
+            return full
+        centroid_scores = self._centroids @ query
+        probes = min(self.nprobe, self.nlist)
+        if probes < self.nlist:
+            selected = np.argpartition(centroid_scores, -probes)[-probes:]
+        else:
+            selected = np.arange(self.nlist)
+        for cluster in selected:
+            start, end = self._offsets[cluster], self._offsets[cluster + 1]
+            if start == end:
+                continue
+            full[self._rows[start:end]] = self._packed[start:end] @ query
+        return full
+
+    def _train(self, matrix: np.ndarray) -> None:
+        count = matrix.shape[0]
+        nlist = self._nlist or max(1, round(math.sqrt(count)))
+        self._centroids = spherical_kmeans(matrix, nlist, seed=self._seed)
+        self._trained_size = count
+        self._drift = 0
+        self.retrain_count += 1
+        logging.info("SBERT IVF index trained: templates=%d nlist=%d", count, self.nlist)
+
+    def _layout(self, matrix: np.ndarray, assignment: np.ndarray) -> None:
+        # partition ごとに行を連続配置し、探索時にコピーなしの slice で計算する。
+        self._size = matrix.shape[0]
+        order = np.argsort(assignment, kind="stable")
+        self._rows = order.astype(np.intp)
+        self._packed = np.ascontiguousarray(matrix[order])
+        sizes = np.bincount(assignment, minlength=max(1, self.nlist))
+        self._offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.intp)
@@ -0,0 +1,67 @@
+"""Aho-Corasick multi-pattern matcher for SBERT Router gate terms.
+
+Gate terms are normalised once when the router is built; each query is then
+scanned a single time regardless of how many intents or terms exist.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Sequence
+
+
+class TermMatcher:
+    def __init__(self, terms: Sequence[str]) -> None:
+        self.terms = tuple(terms)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # 各状態で終端する (term id, term長)。fail遷移先の出力も併合済み。
+        self._output: list[list[tuple[int, int]]] = [[]]
+        self._empty_terms = tuple(
+            term_id for term_id, term in enumerate(self.terms) if not term
+        )
+        for term_id, term in enumerate(self.terms):
+            if term:
+                self._insert(term_id, term)
+        self._build_failure_links()
+
+    def first_positions(self, text: str) -> dict[int, int]:
+        """Return ``{term id: first start index}`` for every term found in ``text``."""
+        found = {term_id: 0 for term_id in self._empty_terms}
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for term_id, length in self._output[state]:
+                start = index - length + 1
+                current = found.get(term_id)
+                if current is None or start < current:
+                    found[term_id] = start
+        return found
+
+    def _insert(self, term_id: int, term: str) -> None:
+        state = 0
+        for ch in term:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((term_id, len(term)))
+
+    def _build_failure_links(self) -> None:
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
@@ -0,0 +1,69 @@
+"""Minimal SemanticMemory API server for tests."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MemoryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), MemoryHandler)
+        self.requests: list[tuple[str, dict]] = []
+        self.connections = 0
+        self.delay_sec = 0.0
+        # path -> 先頭から順に返す (status, body)。尽きたら最後のものを返し続ける。
+        self.responses: dict[str, list[tuple[int, dict]]] = {
+            "/api/retrieve": [
+                (
+                    200,
+                    {
+                        "recent": [{"main_text": "直前の会話"}, {"main_text": "一行目\n二行目"}],
+                        "semantic": [{"score": 0.834, "document": "猫を飼っている"}],
+                    },
+                )
+            ],
+            "/api/mcp/recall_memory": [(200, {"status": "success", "count": 1, "memories": []})],
+            "/api/save": [(200, {"status": "saved", "id": 42})],
+        }
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api"
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class MemoryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: MemoryServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        self.server.requests.append((self.path, json.loads(self.rfile.read(length))))
+        time.sleep(self.server.delay_sec)
+        queue = self.server.responses[self.path]
+        status, body = queue.pop(0) if len(queue) > 1 else queue[0]
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
@@ -0,0 +1,174 @@
+"""Minimal ONVIF device/media/PTZ SOAP server for tests and benchmarks."""
+
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import hashlib
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from onvif_ptz import NS
+
+
+ENVELOPE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<s:Envelope xmlns:s="{s}" xmlns:tds="{tds}" xmlns:trt="{trt}" '
+    'xmlns:tptz="{tptz}" xmlns:tt="{tt}"><s:Body>{{body}}</s:Body></s:Envelope>'
+).format(**NS)
+
+
+class StubOnvifServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        *,
+        username: str = "camera",
+        password: str = "secret",
+        moving_polls: int = 2,
+        report_status: bool = True,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), StubOnvifHandler)
+        self.username = username
+        self.password = password
+        self.moving_polls = moving_polls
+        self.report_status = report_status
+        self.calls: list[str] = []
+        self.moves: list[tuple[str, float, float]] = []
+        self.connections = 0
+        # 移動要求を受け付けた後、応答を返すまで止まる秒数（読み取りタイムアウトの再現用）。
+        self.stall_moves_sec = 0.0
+        # GetStatus が返す Position/PanTilt の属性（壊れた値の再現用に差し替える）。
+        self.position_attrs = 'x="0.25" y="0"'
+        self._moving_left = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/onvif/device_service"
+
+    def __enter__(self) -> "StubOnvifServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def respond(self, root: ET.Element) -> tuple[int, str]:
+        body = root.find("s:Body", NS)
+        operation = body[0] if body is not None and len(body) else None
+        if operation is None:
+            return 400, fault("missing operation")
+        name = operation.tag.split("}")[-1]
+        with self._lock:
+            self.calls.append(name)
+            if name != "GetSystemDateAndTime" and not self._authorized(root):
+                return 400, fault("Sender not authorized")
+            return 200, self._operation(name, operation)
+
+    def _authorized(self, root: ET.Element) -> bool:
+        token = root.find(".//wsse:UsernameToken", NS)
+        if token is None:
+            return False
+        nonce = base64.b64decode(token.findtext("wsse:Nonce", "", NS))
+        created = token.findtext("wsu:Created", "", NS)
+        expected = base64.b64encode(
+            hashlib.sha1(nonce + created.encode() + self.password.encode()).digest()
+        ).decode()
+        return (
+            token.findtext("wsse:Username", "", NS) == self.username
+            and token.findtext("wsse:Password", "", NS) == expected
+        )
+
+    def _operation(self, name: str, operation: ET.Element) -> str:
+        base = f"http://127.0.0.1:{self.server_address[1]}/onvif"
+        if name == "GetSystemDateAndTime":
+            now = dt.datetime.now(dt.timezone.utc)
+            return (
+                "<tds:GetSystemDateAndTimeResponse><tds:SystemDateAndTime><tt:UTCDateTime>"
+                f"<tt:Time><tt:Hour>{now.hour}</tt:Hour><tt:Minute>{now.minute}</tt:Minute>"
+                f"<tt:Second>{now.second}</tt:Second></tt:Time>"
+                f"<tt:Date><tt:Year>{now.year}</tt:Year><tt:Month>{now.month}</tt:Month>"
+                f"<tt:Day>{now.day}</tt:Day></tt:Date>"
+                "</tt:UTCDateTime></tds:SystemDateAndTime></tds:GetSystemDateAndTimeResponse>"
+            )
+        if name == "GetCapabilities":
+            return (
+                "<tds:GetCapabilitiesResponse><tds:Capabilities>"
+                f"<tt:Media><tt:XAddr>{base}/media</tt:XAddr></tt:Media>"
+                f"<tt:PTZ><tt:XAddr>{base}/ptz</tt:XAddr></tt:PTZ>"
+                "</tds:Capabilities></tds:GetCapabilitiesResponse>"
+            )
+        if name == "GetProfiles":
+            return (
+                "<trt:GetProfilesResponse>"
+                '<trt:Profiles token="nopt"><tt:Name>sub</tt:Name></trt:Profiles>'
+                '<trt:Profiles token="main"><tt:Name>main</tt:Name>'
+                '<tt:PTZConfiguration token="ptz0"/></trt:Profiles>'
+                "</trt:GetProfilesResponse>"
+            )
+        if name in ("RelativeMove", "ContinuousMove"):
+            pan_tilt = operation.find(".//tt:PanTilt", NS)
+            assert operation.findtext("tptz:ProfileToken", "", NS) == "main"
+            self.moves.append(
+                (name, float(pan_tilt.get("x", "0")), float(pan_tilt.get("y", "0")))
+            )
+            self._moving_left = self.moving_polls
+            return f"<tptz:{name}Response/>"
+        if name == "Stop":
+            self._moving_left = 0
+            return "<tptz:StopResponse/>"
+        if name == "GetStatus":
+            state = "MOVING" if self._moving_left > 0 else "IDLE"
+            self._moving_left = max(0, self._moving_left - 1)
+            move_status = (
+                f"<tt:MoveStatus><tt:PanTilt>{state}</tt:PanTilt></tt:MoveStatus>"
+                if self.report_status
+                else ""
+            )
+            return (
+                "<tptz:GetStatusResponse><tptz:PTZStatus>"
+                f"<tt:Position><tt:PanTilt {self.position_attrs}/></tt:Position>"
+                f"{move_status}</tptz:PTZStatus></tptz:GetStatusResponse>"
+            )
+        return fault(f"unsupported operation {name}")
+
+
+class StubOnvifHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: StubOnvifServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        status, body = self.server.respond(ET.fromstring(self.rfile.read(length)))
+        if self.server.stall_moves_sec and self.server.calls[-1] in ("RelativeMove", "ContinuousMove"):
+            time.sleep(self.server.stall_moves_sec)
+        data = ENVELOPE.format(body=body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/soap+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def fault(reason: str) -> str:
+    return (
+        "<s:Fault><s:Code><s:Value>s:Sender</s:Value></s:Code>"
+        f'<s:Reason><s:Text xml:lang="en">{reason}</s:Text></s:Reason></s:Fault>'
+    )
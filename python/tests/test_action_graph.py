@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from action_graph import ActionNode, run_action_graph
+from intent_router import IntentRouter, build_intents_from_env
+from listend import ActionResult, PtzWorker
+from ptz_motion import PtzMotionModel
+from test_intent_router import KeywordEmbedder, settings
+from test_listend_wake_flow import new_service
+
+
+def test_independent_nodes_overlap_and_dependencies_keep_order() -> None:
+    events: list[str] = []
+    lock = threading.Lock()
+
+    def step(name: str, sleep_sec: float):
+        def run() -> str:
+            with lock:
+                events.append(f"start:{name}")
+            time.sleep(sleep_sec)
+            with lock:
+                events.append(f"end:{name}")
+            return name
+
+        return run
+
+    nodes = [
+        ActionNode("move", step("move", 0.05), timeout_sec=1.0),
+        ActionNode("capture", step("capture", 0.05), timeout_sec=1.0, after=("move",)),
+        ActionNode("recall", step("recall", 0.08), timeout_sec=1.0),
+    ]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sequential = run_action_graph(nodes, executor)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        parallel = run_action_graph(nodes, executor)
+
+    assert sequential.outcomes["capture"].result == "capture"
+    assert events.index("end:move") < events.index("start:capture")
+    assert parallel.elapsed_sec < parallel.sequential_sec
+    assert parallel.critical_path in {("move", "capture"), ("recall",)}
+
+
+def test_failures_and_timeouts_are_reported_per_node() -> None:
+    release = threading.Event()
+
+    def boom() -> str:
+        raise RuntimeError("ptz offline")
+
+    nodes = [
+        ActionNode("move", boom, timeout_sec=1.0),
+        ActionNode("capture", lambda: "image", timeout_sec=1.0, after=("move",)),
+        ActionNode("recall", lambda: release.wait(2.0) and "late", timeout_sec=0.05),
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        graph = run_action_graph(nodes, executor, timeout_grace_sec=0.0)
+        release.set()
+
+    assert graph.outcomes["move"].error == "ptz offline"
+    assert graph.outcomes["capture"].result == "image"
+    assert graph.outcomes["recall"].error == "timed out after 0.1s"
+
+
+def test_invalid_graphs_are_rejected() -> None:
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError, match="unknown action"):
+            run_action_graph([ActionNode("a", lambda: 1, 1.0, ("b",))], executor)
+        with pytest.raises(ValueError, match="cycle"):
+            run_action_graph(
+                [
+                    ActionNode("a", lambda: 1, 1.0, ("b",)),
+                    ActionNode("b", lambda: 1, 1.0, ("a",)),
+                ],
+                executor,
+            )
+
+
+def test_router_recall_runs_alongside_move_and_capture() -> None:
+    service, _, _ = new_service()
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    service.startup = SimpleNamespace(wait=lambda *names: None)
+    service.session_text_chunks = []
+    service.ptz_worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+    service.ptz_worker.motion = PtzMotionModel(pan_deg_per_sec=1500.0, base_sec=0.0)
+    router = IntentRouter(settings(), build_intents_from_env(settings()), KeywordEmbedder())
+    decision = router.route("右を向いて何が見える覚えてる")
+    assert decision.flags == ("move_camera_right", "capture_image", "recall_memory")
+    started: dict[str, float] = {}
+    finished: dict[str, float] = {}
+
+    def fake_action(action, decision):
+        started[action] = time.monotonic()
+        time.sleep(0.05)
+        finished[action] = time.monotonic()
+        stderr = "画像を保存しました: /tmp/x.jpg (1x1)" if action == "capture_image" else ""
+        return ActionResult(action, True, "memo" if action == "recall_memory" else "", stderr, 0.05)
+
+    def fake_moves(actions, timeout):
+        results = [fake_action(action, decision) for action in actions]
+        service.ptz_worker._record_motion(
+            service.ptz_worker._motion_estimate_sec(actions[-1], {"x": 45, "y": 0})
+        )
+        return results
+
+    service._execute_router_action = fake_action
+    service.ptz_worker.execute_many = fake_moves
+    result = service._execute_router_decision(decision)
+
+    assert [item.action for item in result.executed_actions] == list(decision.flags)
+    assert result.recall_text == "memo"
+    assert result.image_path == "/tmp/x.jpg"
+    assert started["recall_memory"] < finished["move_camera_right"]
+    assert started["capture_image"] >= finished["move_camera_right"] + 0.025
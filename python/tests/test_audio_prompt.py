@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import wave
 from pathlib import Path
 
 import audio_prompt
-from audio_prompt import PromptStatus, TapovoiceFilePromptPlayer
+from audio_prompt import PromptStatus, TapovoiceFilePromptPlayer, audio_duration_sec
 
 
 class FakeProcess:
@@ -71,3 +72,21 @@ def test_prompt_player_times_out(monkeypatch, tmp_path: Path) -> None:
 
     assert player.poll(now=3.0) is PromptStatus.TIMED_OUT
     assert killed
+
+
+def test_prompt_duration_reads_wav_and_probes_mp3(tmp_path: Path) -> None:
+    wav_path = tmp_path / "hai.wav"
+    with wave.open(str(wav_path), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(16000)
+        writer.writeframes(b"\0\0" * 8000)
+    mp3_path = tmp_path / "hai.mp3"
+    mp3_path.write_bytes(b"ID3 not a wav")
+    ffprobe = tmp_path / "ffprobe"
+    ffprobe.write_text("#!/bin/sh\necho 0.672000\n", encoding="utf-8")
+    ffprobe.chmod(0o755)
+
+    assert audio_duration_sec(wav_path, ffprobe_bin="/nonexistent/ffprobe") == 0.5
+    assert audio_duration_sec(mp3_path, ffprobe_bin=str(ffprobe)) == 0.672
+    assert audio_duration_sec(mp3_path, ffprobe_bin=str(tmp_path / "missing")) is None
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+import dispatch_orchestrator
+from dispatch_orchestrator import (
+    AgentEngine,
+    AgentStream,
+    DispatchOrchestrator,
+    DispatchRequest,
+    DispatchSettings,
+    agent_argv,
+    build_prompt,
+    resolve_engine,
+)
+from memory_stub import MemoryServer
+from semantic_memory import MemorySettings, SemanticMemoryClient
+from speech_output import VoicevoxClient, VoiceSettings, wav_duration
+from voicevox_stub import VoicevoxServer
+
+
+def write_executable(path: Path, content: str) -> None:
+    path.write_text(content)
+    path.chmod(0o755)
+
+
+FAKE_CODEX = """#!/bin/bash
+printf '%s\\n' "$@" > "$CODEX_ARGS_CAPTURE"
+output_file=""
+while [[ $# -gt 0 ]]; do
+    if [[ "$1" == "-o" ]]; then
+        output_file="$2"
+        shift 2
+    else
+        shift
+    fi
+done
+printf '晴れです。傘はいりません\\n' > "$output_file"
+"""
+
+
+@pytest.fixture
+def memory_server():
+    server = MemoryServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+@pytest.fixture
+def voicevox():
+    server = VoicevoxServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+@pytest.fixture
+def app(tmp_path: Path):
+    """bin/ with a recording tapovoice, a PATH with a fake codex and an empty HOME."""
+    bin_dir = tmp_path / "bin"
+    fake_path = tmp_path / "fake-path"
+    workspace = tmp_path / "workspace"
+    home = tmp_path / "home"
+    for directory in (bin_dir, fake_path, workspace, home):
+        directory.mkdir()
+    write_executable(bin_dir / "tapovoice", f"#!/bin/bash\ncat >> {tmp_path / 'played.wav'}\n")
+    write_executable(bin_dir / "zunda", f"#!/bin/bash\ncat > {tmp_path / 'zunda.txt'}\n")
+    write_executable(fake_path / "codex", FAKE_CODEX)
+    env = {
+        "HOME": str(home),
+        "PATH": f"{fake_path}:{os.environ['PATH']}",
+        "TMPDIR": str(tmp_path),
+        "CODEX_ARGS_CAPTURE": str(tmp_path / "args.txt"),
+        "YATAGARASU_SKIP_MEMORY_RECALL": "true",
+    }
+    resolve_engine.cache_clear()
+    yield tmp_path, DispatchSettings(cwd=workspace, bin_dir=bin_dir, engine="codex"), env
+    resolve_engine.cache_clear()
+
+
+def orchestrator_for(settings, memory_server, voicevox, tmp_path) -> DispatchOrchestrator:
+    memory = None
+    if memory_server is not None:
+        memory = SemanticMemoryClient(
+            MemorySettings(
+                api_url=memory_server.api_url,
+                timeout_sec=2.0,
+                retries=0,
+                state_dir=tmp_path / "memorize-state",
+            )
+        )
+    return DispatchOrchestrator(
+        settings,
+        memory=memory,
+        voice=VoicevoxClient(VoiceSettings(engine_url=voicevox.engine_url)),
+    )
+
+
+def test_codex_arguments_match_bin_yatagarasu() -> None:
+    settings = DispatchSettings(
+        cwd=Path("/work"),
+        bin_dir=Path("/app/bin"),
+        model="haiku",
+        codex_profile="local",
+        codex_reasoning_effort="turbo",
+    )
+    argv, warnings = agent_argv(
+        settings, AgentEngine("codex", Path("/x/codex")), "こんにちは", Path("/tmp/out.txt")
+    )
+
+    assert argv == [
+        "/x/codex", "exec", "-C", "/work", "--sandbox", "workspace-write",
+        "--color", "never", "--profile", "local", "-o", "/tmp/out.txt", "こんにちは",
+    ]
+    assert len(warnings) == 2
+    assert "haiku" in warnings[0]
+
+    bypass = DispatchSettings(
+        cwd=Path("/work"), bin_dir=Path("/app/bin"), model="gpt-5",
+        codex_bypass_sandbox=True, codex_reasoning_effort="low",
+    )
+    argv, warnings = agent_argv(bypass, AgentEngine("codex", Path("/x/codex")), "p")
+    assert argv == [
+        "/x/codex", "exec", "-C", "/work", "--dangerously-bypass-approvals-and-sandbox",
+        "--color", "never", "-c", 'model_reasoning_effort="low"', "-m", "gpt-5", "p",
+    ]
+    assert warnings == []
+
+
+def test_claude_defaults_to_haiku() -> None:
+    settings = DispatchSettings(cwd=Path("/work"), bin_dir=Path("/app/bin"))
+    argv, _ = agent_argv(settings, AgentEngine("claude", Path("/x/claude")), "p")
+
+    assert argv[:5] == ["/x/claude", "-p", "p", "--model", "haiku"]
+    assert "--output-format" not in argv
+
+
+def test_streaming_asks_for_json_events() -> None:
+    settings = DispatchSettings(cwd=Path("/work"), bin_dir=Path("/app/bin"))
+    codex, _ = agent_argv(settings, AgentEngine("codex", Path("/x/codex")), "p", stream=True)
+    claude, _ = agent_argv(settings, AgentEngine("claude", Path("/x/claude")), "p", stream=True)
+
+    assert codex[-2:] == ["--json", "p"]
+    assert claude[-4:] == ["--output-format", "stream-json", "--verbose", "--include-partial-messages"]
+
+
+def test_codex_events_yield_each_agent_message() -> None:
+    stream = AgentStream("codex")
+    lines = [
+        '{"type":"thread.started","thread_id":"t"}',
+        '{"type":"item.completed","item":{"type":"reasoning","text":"考え中"}}',
+        '{"type":"item.completed","item":{"type":"agent_message","text":"調べます。"}}',
+        "not json",
+        '{"type":"item.completed","item":{"type":"agent_message","text":"晴れです。"}}',
+    ]
+
+    assert [stream.feed(line) for line in lines] == ["", "", "調べます。", "", "\n晴れです。"]
+    assert stream.text == "調べます。\n晴れです。"
+
+    legacy = AgentStream("codex")
+    for line in (
+        '{"msg":{"type":"agent_message_delta","delta":"晴れ"}}',
+        '{"msg":{"type":"agent_message_delta","delta":"です。"}}',
+        '{"msg":{"type":"agent_message","message":"晴れです。"}}',
+    ):
+        legacy.feed(line)
+    assert legacy.text == "晴れです。"
+
+
+def test_claude_partial_messages_are_not_spoken_twice() -> None:
+    stream = AgentStream("claude")
+    delta = '{"type":"stream_event","event":{"type":"content_block_delta","delta":{"type":"text_delta","text":"%s"}}}'
+    spoken = [
+        stream.feed(delta % "晴れ"),
+        stream.feed(delta % "です。"),
+        stream.feed('{"type":"assistant","message":{"content":[{"type":"text","text":"晴れです。"}]}}'),
+        stream.feed('{"type":"assistant","message":{"content":[{"type":"text","text":"以上です。"}]}}'),
+        stream.feed('{"type":"result","subtype":"success","is_error":false,"result":"以上です。"}'),
+    ]
+
+    assert spoken == ["晴れ", "です。", "", "\n以上です。", ""]
+    assert (stream.text, stream.final, stream.error) == ("晴れです。\n以上です。", "以上です。", "")
+    stream.feed('{"type":"result","subtype":"error_max_turns","is_error":true}')
+    assert stream.error == "error_max_turns"
+
+
+def test_memory_context_is_prepended_like_bin_yatagarasu() -> None:
+    assert build_prompt("天気は？", "  \n") == "天気は？"
+    prompt = build_prompt("天気は？", "recent:\n- 昨日は雨\n")
+
+    assert prompt.startswith("\n以下は過去の会話の記憶と関連知識です。")
+    assert prompt.endswith("recent:\n- 昨日は雨\n\n---\n現在のプロンプト: 天気は？")
+
+
+def test_engine_resolution_is_cached_and_finds_nvm_codex(tmp_path: Path) -> None:
+    codex = tmp_path / ".nvm" / "versions" / "node" / "v22.0.0" / "bin" / "codex"
+    codex.parent.mkdir(parents=True)
+    write_executable(codex, "#!/bin/bash\n")
+    resolve_engine.cache_clear()
+    try:
+        first = resolve_engine("auto", str(tmp_path / "empty"), str(tmp_path))
+        second = resolve_engine("auto", str(tmp_path / "empty"), str(tmp_path))
+        info = resolve_engine.cache_info()
+    finally:
+        resolve_engine.cache_clear()
+
+    assert first == second == AgentEngine("codex", codex)
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_turn_speaks_reply_and_saves_while_recording_stages(app, memory_server, voicevox) -> None:
+    tmp_path, settings, env = app
+    orchestrator = orchestrator_for(settings, memory_server, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(
+            DispatchRequest(prompt="制御プロンプト", memory_prompt="明日の天気は？"), env
+        )
+    finally:
+        orchestrator.close()
+        orchestrator.memory.close()
+
+    assert result.ok, result.error
+    assert result.response == "晴れです。傘はいりません"
+    assert set(result.stages) == {
+        "engine", "memory_context", "agent", "synthesis", "playback", "memory_save"
+    }
+    args = (tmp_path / "args.txt").read_text().splitlines()
+    assert args[:4] == ["exec", "-C", str(settings.cwd), "--sandbox"]
+    assert "以下は過去の会話の記憶と関連知識です。" in (tmp_path / "args.txt").read_text()
+    assert "現在のプロンプト: 制御プロンプト" in args[-1]
+    # 2フレーズ＋それぞれの後の0.5秒の無音を1つのWAVで渡す。
+    played = (tmp_path / "played.wav").read_bytes()
+    assert wav_duration(played) == pytest.approx(0.05 * len("晴れです傘はいりません") + 1.0)
+    paths = [path for path, _ in memory_server.requests]
+    assert paths == ["/api/retrieve", "/api/save"]
+    assert memory_server.requests[0][1]["query"] == "明日の天気は？"
+    assert memory_server.requests[1][1]["main_text"] == (
+        "[user]明日の天気は？\n[agent]晴れです。傘はいりません"
+    )
+
+
+def test_prefetched_context_skips_retrieve(app, memory_server, voicevox) -> None:
+    tmp_path, settings, env = app
+    orchestrator = orchestrator_for(settings, memory_server, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(
+            DispatchRequest(prompt="天気は？", memory_context="semantic:\n- 先取り済み\n"), env
+        )
+    finally:
+        orchestrator.close()
+        orchestrator.memory.close()
+
+    assert result.ok
+    assert "memory_context" not in result.stages
+    assert "先取り済み" in (tmp_path / "args.txt").read_text()
+    assert [path for path, _ in memory_server.requests] == ["/api/save"]
+
+
+def test_agent_failure_is_reported_without_saving(app, memory_server, voicevox) -> None:
+    tmp_path, settings, env = app
+    write_executable(
+        Path(env["PATH"].split(":")[0]) / "codex", "#!/bin/bash\necho 'quota exceeded' >&2\nexit 3\n"
+    )
+    orchestrator = orchestrator_for(settings, memory_server, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(DispatchRequest(prompt="天気は？", skip_memory_recall=True), env)
+    finally:
+        orchestrator.close()
+        orchestrator.memory.close()
+
+    assert not result.ok
+    assert "rc=3" in result.error and "quota exceeded" in result.error
+    assert memory_server.requests == []
+    assert not (tmp_path / "played.wav").exists()
+
+
+def test_synthesis_failure_falls_back_to_zunda(app, voicevox) -> None:
+    tmp_path, settings, env = app
+    voicevox.fail_status = 503
+    orchestrator = orchestrator_for(settings, None, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(DispatchRequest(prompt="天気は？"), env)
+    finally:
+        orchestrator.close()
+
+    assert result.ok
+    assert (tmp_path / "zunda.txt").read_text() == "晴れです。傘はいりません\n"
+    assert "memory_save" not in result.stages
+
+
+def test_non_wav_synthesis_falls_back_to_zunda_while_streaming(app, voicevox) -> None:
+    tmp_path, settings, env = app
+    write_executable(Path(env["PATH"].split(":")[0]) / "codex", STREAMING_CODEX)
+    voicevox.garbage_path = "/synthesis"
+    orchestrator = orchestrator_for(replace(settings, tts_streaming=True), None, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(DispatchRequest(prompt="天気は？", skip_memory_recall=True), env)
+    finally:
+        orchestrator.close()
+
+    # 読み上げスレッドは壊れた音声で止まらず、最後の文まで zunda で話す。
+    assert result.ok, result.error
+    assert (tmp_path / "zunda.txt").read_text() == "いりません\n"
+
+
+def test_cli_prints_stage_timings(app, voicevox, monkeypatch, capsys) -> None:
+    tmp_path, settings, env = app
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("YATAGARASU_CWD", str(settings.cwd))
+    monkeypatch.setenv("YATAGARASU_ENGINE", "codex")
+    monkeypatch.setenv("YATAGARASU_MEMORY_ENABLED", "false")
+    monkeypatch.setenv("VOICEVOX_ENGINE_PORT", str(voicevox.server_address[1]))
+    zunda, tapovoice = settings.zunda_cmd, settings.tapovoice_cmd
+    monkeypatch.setattr(DispatchSettings, "zunda_cmd", property(lambda self: zunda))
+    monkeypatch.setattr(DispatchSettings, "tapovoice_cmd", property(lambda self: tapovoice))
+
+    assert dispatch_orchestrator.main(["--timings", "天気は？"]) == 0
+
+    timings = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert timings["ok"] is True and timings["engine"] == "codex"
+    assert set(timings["stages_ms"]) == {"engine", "agent", "synthesis", "playback"}
+    assert (tmp_path / "played.wav").exists()
+
+
+STREAMING_CODEX = """#!/bin/bash
+printf '%s\\n' "$@" > "$CODEX_ARGS_CAPTURE"
+echo '{"type":"thread.started","thread_id":"t"}'
+echo '{"type":"item.completed","item":{"type":"agent_message","text":"晴れです。傘は"}}'
+sleep 0.6
+echo '{"type":"item.completed","item":{"type":"agent_message","text":"いりません"}}'
+"""
+
+
+def test_streamed_turn_speaks_first_sentence_before_the_agent_finishes(
+    app, memory_server, voicevox
+) -> None:
+    tmp_path, settings, env = app
+    write_executable(Path(env["PATH"].split(":")[0]) / "codex", STREAMING_CODEX)
+    write_executable(
+        settings.tapovoice_cmd,
+        f"#!/bin/bash\ndate +%s.%N >> {tmp_path / 'played-at.txt'}\n"
+        f"cat > {tmp_path}/played-$(date +%s%N).wav\n",
+    )
+    orchestrator = orchestrator_for(
+        replace(settings, tts_streaming=True), memory_server, voicevox, tmp_path
+    )
+    try:
+        result = orchestrator.run(DispatchRequest(prompt="天気は？", skip_memory_recall=True), env)
+    finally:
+        orchestrator.close()
+        orchestrator.memory.close()
+
+    assert result.ok, result.error
+    assert result.streamed
+    assert "--json" in (tmp_path / "args.txt").read_text().splitlines()
+    assert result.response == "晴れです。傘は\nいりません"
+    # 1文目はエージェントの終了（0.6秒後）を待たずに再生される。
+    assert result.first_audio_sec is not None
+    assert result.first_audio_sec < 0.5 < result.stages["agent"]
+    assert result.first_audio_sec < result.total_sec
+    # 発言の切れ目も文の区切りとして扱う。
+    played = sorted(tmp_path.glob("played-*.wav"))
+    assert [wav_duration(path.read_bytes()) for path in played] == pytest.approx(
+        [0.05 * 4 + 0.5, 0.05 * 2 + 0.5, 0.05 * 5 + 0.5]
+    )
+    # tapovoice はすぐ戻るので、次の文は前の文の長さだけ待ってから渡す。
+    started = [float(line) for line in (tmp_path / "played-at.txt").read_text().split()]
+    assert started[1] - started[0] >= 0.7
+    assert started[2] - started[1] >= 0.6
+    assert memory_server.requests[-1][1]["main_text"] == "[user]天気は？\n[agent]晴れです。傘は\nいりません"
+
+
+def test_streamed_failure_stops_speaking(app, voicevox) -> None:
+    tmp_path, settings, env = app
+    write_executable(
+        Path(env["PATH"].split(":")[0]) / "codex",
+        "#!/bin/bash\n"
+        """echo '{"type":"item.completed","item":{"type":"agent_message","text":"途中まで。"}}'\n"""
+        "echo 'rate limited' >&2\nexit 2\n",
+    )
+    orchestrator = orchestrator_for(replace(settings, tts_streaming=True), None, voicevox, tmp_path)
+    try:
+        result = orchestrator.run(DispatchRequest(prompt="天気は？"), env)
+    finally:
+        orchestrator.close()
+
+    assert not result.ok and result.streamed
+    assert "rc=2" in result.error and "rate limited" in result.error
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from intent_router import IntentRouter, build_intents_from_env
+from test_intent_router import KeywordEmbedder, settings
+
+
+class CountingEmbedder(KeywordEmbedder):
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, texts):
+        values = list(texts)
+        self.encoded.extend(values)
+        return super().encode(values)
+
+
+def new_cache(tmp_path, *, revision: str = "rev1") -> EmbeddingCache:
+    return EmbeddingCache(tmp_path, model_name="fake", revision=revision)
+
+
+def test_second_start_encodes_only_new_templates(tmp_path) -> None:
+    first = CountingEmbedder()
+    expected = new_cache(tmp_path).encode(first, ["右を向いて", "左を向いて"])
+
+    second = CountingEmbedder()
+    cache = new_cache(tmp_path)
+    embeddings = cache.encode(second, ["左を向いて", "右を向いて", "書類を要約"])
+
+    assert second.encoded == ["書類を要約"]
+    assert (cache.hits, cache.misses) == (2, 1)
+    np.testing.assert_allclose(embeddings[0], expected[1])
+    np.testing.assert_allclose(embeddings[1], expected[0])
+
+
+def test_revision_change_invalidates_entries(tmp_path) -> None:
+    new_cache(tmp_path, revision="rev1").encode(CountingEmbedder(), ["右を向いて"])
+
+    embedder = CountingEmbedder()
+    new_cache(tmp_path, revision="rev2").encode(embedder, ["右を向いて"])
+
+    assert embedder.encoded == ["右を向いて"]
+
+
+def test_corrupt_index_is_rebuilt(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    cache.encode(CountingEmbedder(), ["右を向いて"])
+    cache.index_path.write_text(json.dumps({"version": 1, "keys": []}), encoding="utf-8")
+
+    embedder = CountingEmbedder()
+    embeddings = new_cache(tmp_path).encode(embedder, ["右を向いて"])
+
+    assert embedder.encoded == ["右を向いて"]
+    assert embeddings.shape == (1, len(KeywordEmbedder.features))
+
+
+def test_router_with_cache_matches_uncached_scores(tmp_path) -> None:
+    s = settings()
+    intents = build_intents_from_env(s)
+    cached = IntentRouter(s, intents, CountingEmbedder(), embedding_cache=new_cache(tmp_path))
+    warm_embedder = CountingEmbedder()
+    warm = IntentRouter(s, intents, warm_embedder, embedding_cache=new_cache(tmp_path))
+    plain = IntentRouter(s, intents, KeywordEmbedder())
+
+    assert warm_embedder.encoded == []
+    for text in ("右を向いて", "書類を要約して", "何が見える"):
+        assert warm.route(text) == plain.route(text) == cached.route(text)
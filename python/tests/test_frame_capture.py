@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import io
+import os
+import sys
+import threading
+import time
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import frame_capture
+from frame_capture import (
+    CaptureError,
+    CaptureSettings,
+    FrameCapture,
+    FramePrefetcher,
+    RenderedFrame,
+    dhash,
+    encode_jpeg,
+    ffmpeg_qscale,
+    fit_jpeg_budget,
+    hamming_distance,
+    letterbox_jpeg,
+    render_frame,
+)
+from test_listend_wake_flow import new_service
+
+
+def jpeg(width: int, height: int, color=(200, 40, 40)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+def scene(width: int, height: int, *, flip: bool = False, seed: int = 0) -> bytes:
+    """Left-to-right gradient (mirrored when ``flip``) with a little noise."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 255, width, dtype=np.float32)
+    if flip:
+        ramp = ramp[::-1]
+    pixels = np.repeat(ramp[None, :, None], height, axis=0).repeat(3, axis=2)
+    pixels = np.clip(pixels + rng.normal(0, 20, pixels.shape), 0, 255).astype(np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, "JPEG", quality=95)
+    return output.getvalue()
+
+
+class FrameServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, body: bytes, status: int = 200) -> None:
+        super().__init__(("127.0.0.1", 0), FrameHandler)
+        self.body = body
+        self.status = status
+        self.paths: list[str] = []
+        self.connections = 0
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+
+
+class FrameHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FrameServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self) -> None:
+        self.server.paths.append(self.path)
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def settings_for(server: FrameServer, tmp_path: Path) -> CaptureSettings:
+    return CaptureSettings(
+        host="127.0.0.1",
+        api_port=server.server_address[1],
+        stream="cam 1",
+        media_dir=tmp_path / "media",
+        timeout_sec=2.0,
+    )
+
+
+def test_letterbox_fits_wide_frame_with_black_bars() -> None:
+    output = Image.open(io.BytesIO(letterbox_jpeg(jpeg(1280, 720), 640, 480, 85)))
+
+    assert output.size == (640, 480)
+    assert max(output.getpixel((320, 10))) < 16
+    assert output.getpixel((320, 240))[0] > 150
+
+
+def test_dhash_ignores_noise_but_not_scene_changes() -> None:
+    base = dhash(scene(640, 480, seed=1))
+
+    assert base is not None
+    assert hamming_distance(base, dhash(scene(640, 480, seed=2))) <= 10
+    assert hamming_distance(base, dhash(scene(640, 480, flip=True))) > 100
+
+
+def test_missing_pillow_falls_back_to_ffmpeg_with_one_warning(monkeypatch, caplog) -> None:
+    monkeypatch.setitem(sys.modules, "PIL", None)
+    monkeypatch.setattr(frame_capture, "_pillow_warned", False)
+    calls = []
+    monkeypatch.setattr(
+        frame_capture,
+        "_letterbox_with_ffmpeg",
+        lambda data, width, height, quality: calls.append((width, height)) or data,
+    )
+    caplog.set_level("WARNING")
+
+    assert letterbox_jpeg(b"jpeg", 640, 480, 85) == b"jpeg"
+    assert dhash(b"jpeg") is None
+
+    assert calls == [(640, 480)]
+    assert caplog.text.count("Pillowがない") == 1
+
+
+def test_budget_lowers_quality_before_resolution() -> None:
+    frame = render_frame(scene(1280, 960), 640, 480, 85)
+    data = frame.data
+
+    unchanged = fit_jpeg_budget(frame, 640, 480, 85, len(data))
+    by_quality = fit_jpeg_budget(frame, 640, 480, 85, len(data) * 2 // 3)
+    tiny = fit_jpeg_budget(frame, 640, 480, 85, 1)
+
+    assert unchanged.data is data and unchanged.quality == 85
+    assert (by_quality.width, by_quality.height) == (640, 480)
+    assert by_quality.quality < 85
+    assert len(by_quality.data) <= len(data) * 2 // 3
+    # 候補は保存済みJPEGの再エンコードではなく、元の画素を1回エンコードしたもの。
+    assert by_quality.data == encode_jpeg(frame.image, by_quality.quality)
+    assert by_quality.data != letterbox_jpeg(data, 640, 480, by_quality.quality)
+    assert (tiny.width, tiny.height) == (320, 240)
+    assert Image.open(io.BytesIO(tiny.data)).size == (320, 240)
+
+
+def test_capture_reuses_previous_file_for_unchanged_scene(tmp_path) -> None:
+    server = FrameServer(scene(1280, 720, seed=1))
+    capture = FrameCapture(settings_for(server, tmp_path))
+    try:
+        first = capture.capture(Path("first.jpg"))
+        fresh = capture.capture()
+        server.body = scene(1280, 720, seed=2)
+        reused = capture.capture()
+        server.body = scene(1280, 720, flip=True)
+        changed = capture.capture()
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+
+    # 名前付きの保存は再利用の基準にしない。
+    assert fresh.path != first.path and not fresh.reused
+    assert reused.reused and reused.path == fresh.path
+    assert reused.message.endswith("前回と同じ画像を再利用しました")
+    assert not changed.reused and changed.path.exists()
+    assert (capture.captures, capture.reuse_hits) == (4, 1)
+    assert capture.bytes_total == first.size_bytes + fresh.size_bytes + changed.size_bytes
+
+
+def test_capture_reuse_expires_after_ttl(tmp_path) -> None:
+    server = FrameServer(scene(640, 480))
+    capture = FrameCapture(replace(settings_for(server, tmp_path), reuse_ttl_sec=0.01))
+    try:
+        capture.capture()
+        time.sleep(0.05)
+        second = capture.capture()
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+
+    assert not second.reused
+
+
+def test_capture_reuses_one_go2rtc_connection(tmp_path) -> None:
+    server = FrameServer(jpeg(1920, 1080))
+    capture = FrameCapture(settings_for(server, tmp_path))
+    try:
+        first = capture.capture()
+        second = capture.capture(Path("named.jpg"))
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+
+    assert server.paths == ["/api/frame.jpeg?src=cam+1"] * 2
+    assert server.connections == 1
+    assert first.source == "frame_api"
+    assert first.message == f"画像を保存しました: {first.path} (640x480)"
+    assert second.path == tmp_path / "media" / "named.jpg"
+    assert Image.open(second.path).size == (640, 480)
+
+
+def test_frame_api_failure_falls_back_to_persistent_rtsp_decoder(
+    tmp_path, monkeypatch
+) -> None:
+    frame = jpeg(64, 48, (10, 200, 10))
+    frame_file = tmp_path / "frame.jpg"
+    frame_file.write_bytes(frame)
+    fake_bin = tmp_path / "bin"
+    fake_bin.mkdir()
+    starts = tmp_path / "starts"
+    ffmpeg = fake_bin / "ffmpeg"
+    ffmpeg.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        f"open({str(starts)!r}, 'a').write(' '.join(sys.argv[1:]) + '\\n')\n"
+        f"data = open({str(frame_file)!r}, 'rb').read()\n"
+        "for _ in range(200):\n"
+        "    sys.stdout.buffer.write(data); sys.stdout.buffer.flush(); time.sleep(0.02)\n",
+        encoding="utf-8",
+    )
+    ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{fake_bin}{os.pathsep}{os.environ['PATH']}")
+    server = FrameServer(b"not found", status=404)
+    capture = FrameCapture(settings_for(server, tmp_path))
+    try:
+        first = capture.capture()
+        second = capture.capture()
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+
+    assert (first.source, second.source) == ("rtsp", "rtsp")
+    saved = Image.open(first.path)
+    assert saved.size == (640, 480)
+    assert saved.getpixel((320, 240))[1] > 150
+    lines = starts.read_text().splitlines()
+    assert len(lines) == 1
+    assert "rtsp://127.0.0.1:8554/cam 1?video" in lines[0]
+    # Pillowで1回だけエンコードするので、ffmpegからはほぼ無劣化で受け取る。
+    assert f"-q:v {ffmpeg_qscale(100)}" in lines[0]
+
+
+def test_frame_api_disabled_reports_missing_decoder(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("PATH", str(tmp_path))
+    server = FrameServer(jpeg(32, 32))
+    capture = FrameCapture(replace(settings_for(server, tmp_path), frame_api_enabled=False))
+    try:
+        with pytest.raises(CaptureError, match="ffmpeg start failed"):
+            capture.capture()
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+    assert server.paths == []
+
+
+def test_settings_follow_capture_script_env(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("GO2RTC_FRAME_API_ENABLED", "false")
+    monkeypatch.setenv("WIDTH", "320")
+    monkeypatch.setenv("QUALITY", "101")
+    with pytest.raises(ValueError, match="QUALITY"):
+        CaptureSettings.from_env(tmp_path)
+    monkeypatch.setenv("QUALITY", "70")
+    monkeypatch.setenv("YATAGARASU_CAPTURE_MAX_BYTES", "0")
+    monkeypatch.setenv("YATAGARASU_CAPTURE_REUSE", "false")
+
+    settings = CaptureSettings.from_env(tmp_path)
+
+    assert not settings.frame_api_enabled
+    assert (settings.width, settings.height, settings.quality) == (320, 480, 70)
+    assert settings.media_dir == tmp_path / "media"
+    assert settings.max_bytes == 0 and not settings.reuse_enabled
+    assert ffmpeg_qscale(100) == 2 and ffmpeg_qscale(1) == 31
+
+
+class CountingFetch:
+    def __init__(self, fail: bool = False) -> None:
+        self.calls: list[float] = []
+        self.fail = fail
+
+    def __call__(self) -> RenderedFrame:
+        self.calls.append(time.monotonic())
+        if self.fail:
+            raise CaptureError("go2rtc down")
+        return RenderedFrame(f"frame-{len(self.calls)}".encode())
+
+
+def test_prefetcher_serves_cached_frame_only_while_active() -> None:
+    fetch = CountingFetch()
+    prefetcher = FramePrefetcher(fetch, interval_sec=10.0, max_age_sec=10.0)
+    try:
+        assert prefetcher.latest(0.5) is None
+        prefetcher.set_active(True)
+        first = prefetcher.latest(1.0)
+        second = prefetcher.latest(1.0)
+        prefetcher.set_active(False)
+        inactive = prefetcher.latest(0.5)
+    finally:
+        prefetcher.close()
+
+    assert first is second and first.data == b"frame-1"
+    assert inactive is None
+    assert len(fetch.calls) == 1
+    assert (prefetcher.hits, prefetcher.misses) == (2, 0)
+
+
+def test_prefetcher_waits_for_post_move_frame() -> None:
+    fetch = CountingFetch()
+    prefetcher = FramePrefetcher(fetch, interval_sec=10.0, max_age_sec=10.0)
+    try:
+        prefetcher.set_active(True)
+        assert prefetcher.latest(1.0).data == b"frame-1"
+        settled_at = time.monotonic() + 0.1
+        prefetcher.invalidate(settled_at)
+        frame = prefetcher.latest(1.0)
+    finally:
+        prefetcher.close()
+
+    assert frame.data == b"frame-2"
+    assert fetch.calls[-1] >= settled_at
+
+
+def test_prefetcher_miss_returns_without_waiting_for_timeout() -> None:
+    prefetcher = FramePrefetcher(CountingFetch(fail=True), interval_sec=10.0)
+    try:
+        prefetcher.set_active(True)
+        started = time.monotonic()
+        assert prefetcher.latest(5.0) is None
+    finally:
+        prefetcher.close()
+
+    assert time.monotonic() - started < 1.0
+    assert prefetcher.misses == 1
+
+
+def test_capture_uses_prefetched_frame(tmp_path) -> None:
+    server = FrameServer(jpeg(1280, 720))
+    capture = FrameCapture(replace(settings_for(server, tmp_path), prefetch_enabled=True))
+    try:
+        capture.set_prefetch_active(True)
+        frame = capture.capture()
+    finally:
+        capture.close()
+        server.shutdown()
+        server.server_close()
+
+    assert frame.source == "prefetch"
+    assert Image.open(frame.path).size == (640, 480)
+    assert len(server.paths) == 1
+
+
+def test_listend_prefetches_only_during_session(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("YATAGARASU_FRAME_PREFETCH", "true")
+    monkeypatch.setenv("GO2RTC_API_PORT", "9")
+    service, _, _ = new_service()
+    service.settings.workspace_path = tmp_path
+
+    service._set_frame_prefetch(True)
+    prefetcher = service._frame_capture.prefetcher
+    try:
+        assert prefetcher is not None and prefetcher.active
+        service._set_frame_prefetch(False)
+        assert not prefetcher.active
+    finally:
+        service._frame_capture.close()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from benchmarks.importtime_report import build_report, measure, parse_importtime
+
+
+# 開発機でのcold importは200ms前後。CIの揺れを見込んで余裕を持たせる。
+IMPORT_BUDGET_MS = float(os.getenv("LISTEND_IMPORT_BUDGET_MS", "800"))
+
+
+def test_parse_importtime_tracks_nesting_and_cumulative_time() -> None:
+    stderr = "\n".join(
+        (
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   numpy._core",
+            "import time:       300 |        420 | numpy",
+            "import time:        50 |        470 | listend",
+        )
+    )
+
+    records = parse_importtime(stderr)
+    report = build_report("listend", records, top=1)
+
+    assert [record.depth for record in records] == [1, 0, 0]
+    assert report.total_ms == pytest.approx(0.47)
+    assert report.slowest[0].module == "numpy"
+
+
+@pytest.mark.parametrize("entry", ["listend", "intent_router"])
+def test_entry_point_cold_import_skips_model_stacks(entry: str) -> None:
+    report = measure(entry)
+
+    assert report.heavy_modules == ()
+    assert report.total_ms < IMPORT_BUDGET_MS
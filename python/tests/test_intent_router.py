@@ -7,6 +7,9 @@ from intent_router import (
     RouterSettings,
     build_intents_from_env,
     flags_from_hits,
+    gate_matches,
+    normalize_for_gate,
+    order_index_for_intent,
 )
 
 
@@ -144,3 +147,50 @@ def test_document_summary_translation_prefers_composite_intent():
     assert "view_document_translate" not in high_ids
     assert decision.flags == ("capture_image",)
     assert decision.requires_llm is True
+
+
+def reference_best_hits(r: IntentRouter, text: str):
+    """定義をそのまま辿る、ベクトル化前の判定。"""
+    gated_text = normalize_for_gate(text)
+    scores = np.matmul(r._template_embeddings, r.embedder.encode([text])[0])
+    best = {}
+    for entry, score_value in zip(r.entries, scores):
+        if not gate_matches(
+            gated_text,
+            entry.intent.gate_terms,
+            entry.intent.gate_required_groups,
+        ):
+            continue
+        score = float(score_value)
+        current = best.get(entry.intent.intent_id)
+        if current is None or score > current[1]:
+            best[entry.intent.intent_id] = (entry, score)
+    return sorted(
+        (
+            entry.intent.intent_id,
+            round(score, 6),
+            entry.template,
+            order_index_for_intent(gated_text, entry.intent),
+        )
+        for entry, score in best.values()
+        if score >= r.settings.middle_threshold
+    )
+
+
+def test_vectorised_scoring_matches_per_template_reference():
+    r = router()
+    for text in (
+        "右を向いて何が見える",
+        "左の書類を要約して和訳して",
+        "前に話したこと覚えてる",
+        "上、下、右、左",
+        "カメラを初期化して",
+        "こんにちは",
+    ):
+        scores = np.matmul(r._template_embeddings, r.embedder.encode([text])[0])
+        actual = sorted(
+            (hit.intent_id, hit.score, hit.matched_template, hit.order_index)
+            for hit in r._best_hits_by_intent(scores, text)
+        )
+
+        assert actual == reference_best_hits(r, text)
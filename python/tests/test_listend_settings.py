@@ -29,6 +29,11 @@ WAKE_ENV_NAMES = (
     "LISTEND_WAKE_PROMPT_AUDIO",
     "LISTEND_WAKE_PROMPT_GUARD_SEC",
     "LISTEND_WAKE_PROMPT_TIMEOUT_SEC",
+    "LISTEND_STT_TRIM_SILENCE",
+    "LISTEND_STT_SPEECH_PAD_MS",
+    "LISTEND_REAZON_DECODE_WORKERS",
+    "LISTEND_STT_IDLE_UNLOAD_SEC",
+    "LISTEND_STT_RSS_BUDGET_MB",
 )
 
 
@@ -144,3 +149,55 @@ def test_active_lookahead_mode_is_supported(
     settings = ListendSettings.from_env()
 
     assert settings.wake.lookahead_mode == "active"
+
+
+def test_stt_silence_trim_is_enabled_by_default(
+    monkeypatch,
+    tmp_path: Path,
+) -> None:
+    configure_minimal_env(monkeypatch, tmp_path)
+
+    settings = ListendSettings.from_env()
+
+    assert settings.stt_trim_silence is True
+    assert settings.stt_speech_pad_ms == 240
+    assert settings.stt_idle_unload_sec == 0.0
+    assert settings.stt_rss_budget_mb == 0.0
+
+
+def test_stt_speech_pad_rejects_negative_values(
+    monkeypatch,
+    tmp_path: Path,
+) -> None:
+    configure_minimal_env(monkeypatch, tmp_path)
+    monkeypatch.setenv("LISTEND_STT_SPEECH_PAD_MS", "-80")
+
+    with pytest.raises(ValueError, match="LISTEND_STT_SPEECH_PAD_MS"):
+        ListendSettings.from_env()
+
+
+def test_reazon_decode_workers_must_be_positive(
+    monkeypatch,
+    tmp_path: Path,
+) -> None:
+    configure_minimal_env(monkeypatch, tmp_path)
+    monkeypatch.setenv("LISTEND_REAZON_DECODE_WORKERS", "0")
+
+    with pytest.raises(ValueError, match="LISTEND_REAZON_DECODE_WORKERS"):
+        ListendSettings.from_env()
+
+
+def test_speculative_routing_is_opt_in(
+    monkeypatch,
+    tmp_path: Path,
+) -> None:
+    configure_minimal_env(monkeypatch, tmp_path)
+
+    assert ListendSettings.from_env().speculative_routing is False
+
+    monkeypatch.setenv("LISTEND_SPECULATIVE_ROUTING", "true")
+    monkeypatch.setenv("LISTEND_SPECULATIVE_MIN_SCORE", "0.9")
+    settings = ListendSettings.from_env()
+
+    assert settings.speculative_routing is True
+    assert settings.speculative_min_score == 0.9
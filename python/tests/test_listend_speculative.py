@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+from intent_router import IntentRouter, build_intents_from_env
+from listend import ActionResult, ListendService, without_actions
+from test_intent_router import KeywordEmbedder, settings
+from test_listend_wake_flow import new_service
+
+
+def speculative_service(*, dry_run: bool = False) -> tuple[ListendService, list[str]]:
+    service, _, _ = new_service()
+    service.settings.stop_words = ("おやすみ",)
+    service.settings.speculative_routing = True
+    service.settings.speculative_min_score = 0.85
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    service.speculative_runs = 0
+    service.speculative_saved_ms_total = 0.0
+    service.startup = SimpleNamespace(ready=lambda name: True, wait=lambda *names: None)
+    router_settings = replace(settings(), dry_run=dry_run)
+    service.intent_router = IntentRouter(
+        router_settings,
+        build_intents_from_env(router_settings),
+        KeywordEmbedder(),
+    )
+    executed: list[str] = []
+    lock = threading.Lock()
+
+    def fake_action(action, decision):
+        with lock:
+            executed.append(action)
+        return ActionResult(action=action, ok=True, stdout="", stderr="", elapsed_sec=0.1)
+
+    service._execute_router_action = fake_action
+    service.session.on_stt_wake(1.0)
+    return service, executed
+
+
+def test_speculative_move_runs_once_and_completes_without_llm() -> None:
+    service, executed = speculative_service()
+
+    service._route_speculatively("右を向いて")
+    prepared = service._prepare_dispatch("右を向いて")
+
+    assert prepared is None
+    assert executed == ["move_camera_right"]
+    assert service.speculative_runs == 1
+    assert service._speculative_moves == []
+
+
+def test_final_dispatch_only_runs_remaining_actions() -> None:
+    service, executed = speculative_service()
+
+    service._route_speculatively("右を向いて")
+    prepared = service._prepare_dispatch("右を向いて 何が見える")
+
+    assert executed == ["move_camera_right", "capture_image"]
+    assert prepared is not None
+    assert "- move_camera_right: success" in prepared.text
+
+
+def test_repeated_move_in_a_later_segment_runs_again() -> None:
+    service, executed = speculative_service()
+
+    service._route_speculatively("右を向いて")
+    service._route_speculatively("右を向いて")
+    prepared = service._prepare_dispatch("右を向いて 右を向いて")
+
+    assert prepared is None
+    assert executed == ["move_camera_right", "move_camera_right"]
+
+
+def test_saved_time_is_counted_once_per_session_and_only_for_successes() -> None:
+    service, executed = speculative_service()
+
+    def slow_action(action, decision):
+        time.sleep(0.05)
+        executed.append(action)
+        return ActionResult(action=action, ok=True, stdout="", stderr="", elapsed_sec=0.05)
+
+    service._execute_router_action = slow_action
+    service._route_speculatively("右を向いて")
+    service._route_speculatively("右を向いて")
+    time.sleep(0.3)
+    service._prepare_dispatch("右を向いて")
+
+    # 2回分の待ち時間（約0.6秒）ではなく、終了前に済んでいた移動の時間（約0.1秒）。
+    assert service.speculative_runs == 1
+    assert 80.0 <= service.speculative_saved_ms_total <= 250.0
+
+    service._execute_router_action = lambda action, decision: ActionResult(
+        action=action, ok=False, stdout="", stderr="busy", elapsed_sec=0.0
+    )
+    service._route_speculatively("右を向いて")
+    time.sleep(0.05)
+    saved = service.speculative_saved_ms_total
+    service._prepare_dispatch("右を向いて")
+
+    assert service.speculative_runs == 2
+    assert service.speculative_saved_ms_total == saved
+
+
+def test_speculation_is_skipped_for_veto_words_and_unsafe_decisions() -> None:
+    service, executed = speculative_service()
+
+    service._route_speculatively("右じゃなくて左を向いて")
+    service._route_speculatively("何が見える")
+    service.settings.speculative_min_score = 1.01
+    service._route_speculatively("右を向いて")
+
+    assert service._speculative_moves == []
+    assert executed == []
+
+
+def test_speculation_is_disabled_for_dry_run_router() -> None:
+    service, executed = speculative_service(dry_run=True)
+
+    service._route_speculatively("右を向いて")
+
+    assert service._speculative_moves == []
+    assert executed == []
+
+
+def test_without_actions_keeps_non_move_hits() -> None:
+    router = IntentRouter(settings(), build_intents_from_env(settings()), KeywordEmbedder())
+    decision = router.route("右を向いて何が見える")
+
+    remaining = without_actions(decision, {"move_camera_right"})
+
+    assert remaining.flags == ("capture_image",)
+    assert [hit.category for hit in remaining.high_hits] == ["view"]
@@ -5,8 +5,10 @@ from pathlib import Path
 from types import SimpleNamespace
 
 import numpy as np
+import pytest
 
 from audio_prompt import PromptStatus
+from dispatch_orchestrator import DispatchRequest, DispatchResult
 from listen_state import ListenSession, ListenState, SessionAction, SessionDecision
 from listend import ListendService, RouterExecutionResult
 from wake_latency import WakeLatencyTracker
@@ -20,6 +22,7 @@ class FakeWakeBackend:
         self.feed_count = 0
         self.reset_count = 0
         self.detection: WakeDetection | None = None
+        self.wake_candidate_active = False
 
     def feed_audio(self, pcm, *, has_speech: bool, now: float) -> None:
         del pcm, has_speech, now
@@ -63,6 +66,7 @@ def new_service() -> tuple[ListendService, FakeWakeBackend, FakePromptPlayer]:
             prompt_audio_path=SimpleNamespace(),
         ),
         wake_suppression_sec=0.0,
+        dispatch_mode="process",
     )
     service.session = ListenSession(
         prompt_guard_sec=0.8,
@@ -72,6 +76,17 @@ def new_service() -> tuple[ListendService, FakeWakeBackend, FakePromptPlayer]:
     service.in_segment = False
     service.trailing_silence_chunks = 0
     service.segment_buffer = bytearray()
+    service.segment_vad_probs = []
+    service._speculative_moves = []
+    service._speculative_executor = None
+    service._action_executor = None
+    service._frame_capture = None
+    service._image_observation = None
+    service._memory_client = None
+    service._memory_executor = None
+    service._memory_spool_worker = None
+    service._memory_cache = None
+    service._dispatch_orchestrator = None
     service.vad_hangover_remaining = 0
     service.session_text_chunks = []
     service.wake_ack_pending = False
@@ -88,6 +103,7 @@ def new_service() -> tuple[ListendService, FakeWakeBackend, FakePromptPlayer]:
     backend = FakeWakeBackend()
     prompt = FakePromptPlayer()
     service.wake_backend = backend
+    service.stt_models = None
     service.wake_activity_gate = WakeActivityGate(-50.0)
     service.prompt_player = prompt
     return service, backend, prompt
@@ -215,6 +231,73 @@ def test_router_control_prompt_requires_view_image_for_captured_image() -> None:
     assert "追加指示」に記載されていない依頼を実行または予告しない" in prompt
 
 
+def test_router_control_prompt_reuses_observation_for_unchanged_image() -> None:
+    service, _, _ = new_service()
+    image = "/tmp/yatagarasu-workspace/media/capture.jpg"
+    service._image_observation = (image, "机の上に赤いマグカップがあります。")
+    decision = SimpleNamespace(
+        original_text="今何が見えてる",
+        middle_hits=(),
+        llm_instructions=("撮影画像に見えるものを説明してください。",),
+    )
+    result = RouterExecutionResult(
+        completed_without_llm=False,
+        executed_actions=(),
+        image_path=image,
+        recall_text=None,
+        errors=(),
+        image_reused=True,
+    )
+
+    prompt = service._build_router_control_prompt(decision, result)
+
+    assert "必ず view_image Function Tool" not in prompt
+    assert "同じ画像を再利用しています" in prompt
+    assert "机の上に赤いマグカップがあります。" in prompt
+
+
+def test_dispatch_remembers_response_for_new_image(monkeypatch) -> None:
+    service, _, _ = new_service()
+    service.settings.dispatch_cmd = "/bin/fake-dispatch"
+    service.settings.dispatch_timeout_sec = 10.0
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    captured = {}
+
+    def fake_run(argv, **kwargs):
+        response = Path(kwargs["env"]["YATAGARASU_RESPONSE_FILE"])
+        captured["response"] = response
+        response.write_text("窓の外に木が見えます。\n", encoding="utf-8")
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr("listend.subprocess.run", fake_run)
+
+    service._dispatch("制御プロンプト", observe_image="/tmp/capture.jpg")
+
+    assert service._image_observation == ("/tmp/capture.jpg", "窓の外に木が見えます。")
+    assert not captured["response"].exists()
+
+
+def test_dispatch_removes_unreadable_response_file(monkeypatch) -> None:
+    service, _, _ = new_service()
+    service.settings.dispatch_cmd = "/bin/fake-dispatch"
+    service.settings.dispatch_timeout_sec = 10.0
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    captured = {}
+
+    def fake_run(argv, **kwargs):
+        response = Path(kwargs["env"]["YATAGARASU_RESPONSE_FILE"])
+        captured["response"] = response
+        response.write_bytes(b"\xff\xfe broken")
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr("listend.subprocess.run", fake_run)
+
+    service._dispatch("制御プロンプト", observe_image="/tmp/capture.jpg")
+
+    assert service._image_observation is None
+    assert not captured["response"].exists()
+
+
 def test_dispatch_logs_only_tagged_memory_warnings(monkeypatch, caplog) -> None:
     service, _, _ = new_service()
     service.settings.dispatch_cmd = "/bin/fake-dispatch"
@@ -240,6 +323,45 @@ def test_dispatch_logs_only_tagged_memory_warnings(monkeypatch, caplog) -> None:
     assert "種ちゃん" not in caplog.text
 
 
+def test_inprocess_dispatch_uses_orchestrator_and_remembers_image(monkeypatch) -> None:
+    service, _, _ = new_service()
+    service.settings.dispatch_mode = "inprocess"
+    requests = []
+
+    class FakeOrchestrator:
+        def run(self, request):
+            requests.append(request)
+            return DispatchResult(
+                ok=True,
+                response="窓の外に木が見えます。\n",
+                engine="codex",
+                stages={"agent": 1.0},
+                total_sec=1.2,
+            )
+
+    service._dispatch_orchestrator = FakeOrchestrator()
+    monkeypatch.setattr(
+        "listend.subprocess.run",
+        lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("bin/yatagarasu must not run")),
+    )
+
+    service._dispatch(
+        "制御プロンプト",
+        memory_text="何が見える？",
+        observe_image="/tmp/capture.jpg",
+        memory_context="recent: []\n",
+    )
+
+    assert requests == [
+        DispatchRequest(
+            prompt="制御プロンプト",
+            memory_prompt="何が見える？",
+            memory_context="recent: []\n",
+        )
+    ]
+    assert service._image_observation == ("/tmp/capture.jpg", "窓の外に木が見えます。")
+
+
 def test_recent_recall_uses_recent_context_instead_of_semantic_only() -> None:
     service, _, _ = new_service()
     service.settings.workspace_path = Path("/opt/yatagarasu/workspace")
@@ -260,3 +382,111 @@ def test_topic_recall_keeps_semantic_recall_skill() -> None:
     argv, _ = service._router_action_specs(decision)["recall_memory"]
 
     assert argv[0].endswith("/workspace/.codex/skills/recall/scripts/recall.sh")
+
+
+def test_finalize_segment_sends_only_speech_span_to_stt() -> None:
+    service, _, _ = new_service()
+    service.settings.stt_trim_silence = True
+    service.settings.stt_speech_pad_ms = 80
+    service.settings.chunk_ms = 80
+    service.settings.vad_threshold = 0.5
+    service.settings.sample_rate = 16_000
+    service.settings.channels = 1
+    service.settings.min_segment_sec = 0.0
+    service.settings.off_transcribe_cooldown_sec = 0.0
+    service.stt_input_sec_total = 0.0
+    service.stt_trimmed_sec_total = 0.0
+    voiced = np.full(1_280, 3_000, dtype=np.int16).tobytes()
+    silence = np.zeros(1_280, dtype=np.int16).tobytes()
+    service.segment_buffer.extend(voiced * 2 + silence * 6)
+    service.segment_vad_probs.extend((0.9, 0.8, 0.3, 0.2, 0.1, 0.0, 0.0, 0.0))
+    captured = []
+    service._transcribe = lambda raw, probs: captured.append((raw, probs)) or ""
+
+    service._finalize_segment()
+
+    assert captured == [(voiced * 2 + silence, (0.9, 0.8, 0.3))]
+    assert service.segment_vad_probs == []
+    assert round(service.stt_trimmed_sec_total, 2) == 0.40
+
+
+def test_long_reazonspeech_segment_splits_at_vad_gap_and_keeps_order() -> None:
+    service, _, _ = new_service()
+    service.settings.sample_rate = 10
+    service.settings.chunk_ms = 1_000
+    service.settings.reazon_decode_workers = 2
+    service._reazon_executor = None
+    # 35秒: 24秒目がVADの谷なので、28秒の上限ではなく谷の中央で切る。
+    probs = tuple(0.05 if index == 24 else 0.9 for index in range(35))
+    audio = np.arange(350, dtype=np.int16)
+
+    service._run_reazonspeech_transcribe = lambda chunk: f"len{len(chunk)}"
+    try:
+        text = service._transcribe_reazonspeech(audio.tobytes(), probs)
+    finally:
+        if service._reazon_executor is not None:
+            service._reazon_executor.shutdown()
+
+    assert text == "len245 len105"
+
+
+class RecordingSttModels:
+    def __init__(self) -> None:
+        self.preloads: list[str] = []
+        self.unload_checks = 0
+
+    def preload(self, reason: str) -> None:
+        self.preloads.append(reason)
+
+    def maybe_unload(self, *, now: float) -> bool:
+        del now
+        self.unload_checks += 1
+        return False
+
+
+def test_stt_reload_window_measures_mp3_prompt_with_ffprobe(tmp_path) -> None:
+    service, _, _ = new_service()
+    ffprobe = tmp_path / "ffprobe"
+    ffprobe.write_text("#!/bin/sh\necho 0.7\n", encoding="utf-8")
+    ffprobe.chmod(0o755)
+    prompt = tmp_path / "wake_prompt_hai.mp3"
+    prompt.write_bytes(b"ID3")
+    service.settings.ffmpeg_bin = str(tmp_path / "ffmpeg")
+    service.settings.wake = SimpleNamespace(prompt_audio_path=prompt, prompt_guard_sec=0.8)
+
+    assert service._wake_prompt_window_sec() == pytest.approx(1.5)
+
+
+def test_livekit_wake_candidate_preloads_stt_instead_of_unloading(
+    monkeypatch,
+) -> None:
+    service, backend, _ = new_service()
+    models = RecordingSttModels()
+    service.stt_models = models
+    monkeypatch.setattr("listend.time.monotonic", lambda: 1.0)
+
+    service._process_chunk(np.ones(1_280, dtype=np.int16).tobytes())
+    backend.wake_candidate_active = True
+    service._process_chunk(np.ones(1_280, dtype=np.int16).tobytes())
+
+    assert models.unload_checks == 1
+    assert models.preloads == ["wake candidate"]
+
+
+def test_wake_detection_preloads_stt_during_prompt(monkeypatch) -> None:
+    service, backend, _ = new_service()
+    models = RecordingSttModels()
+    service.stt_models = models
+    backend.detection = WakeDetection(
+        model_name="nee_yatagarasu",
+        score=0.8,
+        threshold=0.6,
+        detected_at=1.0,
+    )
+    monkeypatch.setattr("listend.time.monotonic", lambda: 1.0)
+
+    service._process_chunk(np.ones(1_280, dtype=np.int16).tobytes())
+
+    assert service.state is ListenState.WAKING
+    assert models.preloads == ["wake detected"]
+    assert models.unload_checks == 0
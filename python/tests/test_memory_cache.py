@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import memory_cache
+from memory_cache import MemoryVectorCache, memory_documents
+from memory_stub import MemoryServer
+from test_listend_wake_flow import new_service
+
+
+class BigramEncoder:
+    """文字bigramのハッシュ。接頭辞（検索クエリ: など）は落として比べる。"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        rows = np.zeros((len(texts), 128), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = text.split(": ", 1)[-1]
+            for pair in zip(text, text[1:]):
+                rows[row, zlib.crc32("".join(pair).encode("utf-8")) % 128] += 1.0
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        return rows / np.maximum(norms, 1e-6)
+
+
+def new_cache(tmp_path: Path, **overrides) -> MemoryVectorCache:
+    options = {"model_name": "bigram", "revision": "1", "min_score": 0.6, **overrides}
+    return MemoryVectorCache(tmp_path / "memory", BigramEncoder(), **options)
+
+
+def test_documents_are_read_from_recall_and_retrieve_payloads() -> None:
+    assert memory_documents(
+        {
+            "memories": [{"document": "猫の名前はミケ"}, {"content": " 犬も飼っている "}],
+            "semantic": [{"score": 0.8, "document": "好物は鮭"}],
+            "recent": [{"main_text": "[user]猫の名前は？"}],
+        }
+    ) == ["猫の名前はミケ", "犬も飼っている", "好物は鮭"]
+    assert memory_documents(["not", "a", "payload"]) == []
+
+
+def test_confident_match_is_answered_locally(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    cache.observe(
+        {"memories": [{"document": "猫の名前はミケ"}, {"document": "明日は歯医者"}]},
+        source="recall",
+    )
+
+    local = cache.lookup("猫の名前はミケだっけ")
+    missed = cache.lookup("今日の天気を教えて")
+
+    assert local is not None and missed is None
+    payload = local.to_payload()
+    assert (payload["status"], payload["count"], payload["source"]) == (
+        "success",
+        1,
+        "local_cache",
+    )
+    assert payload["memories"][0]["document"] == "猫の名前はミケ"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_known_documents_are_not_encoded_again(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    assert cache.add(["猫の名前はミケ", "猫の名前はミケ"], source="recall") == 1
+    assert cache.add(["猫の名前はミケ"], source="retrieve") == 0
+    assert cache.encoder.calls == 1
+
+
+def test_entries_and_hits_survive_reopen(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    cache.add(["猫の名前はミケ"], source="save", now=100.0)
+    cache.lookup("猫の名前はミケ", now=200.0)
+    cache.flush()
+
+    reopened = new_cache(tmp_path)
+    other_model = new_cache(tmp_path, revision="2")
+
+    assert len(reopened) == 1 and len(other_model) == 0
+    assert reopened.lookup("猫の名前はミケ") is not None
+    entry = json.loads(reopened.index_path.read_text(encoding="utf-8"))["entries"][0]
+    assert (entry["source"], entry["hits"], entry["last_hit_at"]) == ("save", 1, 200.0)
+
+
+def test_corrupt_index_is_rebuilt(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    cache.add(["猫の名前はミケ", "明日は歯医者"], source="recall")
+    cache.flush()
+    cache.index_path.write_text(json.dumps({"version": 1, "entries": []}), encoding="utf-8")
+
+    assert len(new_cache(tmp_path)) == 0
+
+
+def test_least_recalled_documents_are_evicted(tmp_path) -> None:
+    cache = new_cache(tmp_path, capacity=2)
+    cache.add(["猫の名前はミケ"], source="recall", now=1.0)
+    cache.add(["明日は歯医者"], source="recall", now=2.0)
+    cache.lookup("猫の名前はミケ", now=3.0)
+    cache.add(["好物は鮭の塩焼き"], source="recall", now=4.0)
+
+    assert len(cache) == 2
+    assert cache.lookup("明日は歯医者") is None
+    assert cache.lookup("猫の名前はミケ") is not None
+
+
+def test_additions_are_written_in_batches(tmp_path, monkeypatch) -> None:
+    written: list[str] = []
+    real_write = memory_cache.atomic_write
+    monkeypatch.setattr(
+        memory_cache,
+        "atomic_write",
+        lambda path, write: (written.append(path.name), real_write(path, write)),
+    )
+    cache = new_cache(tmp_path)
+    cache.add(["猫の名前はミケ"], source="recall")
+    cache.add(["明日は歯医者"], source="recall")
+    cache.add(["好物は鮭の塩焼き"], source="save")
+
+    # 最初の1回だけ書き、残りは flush() でまとめて書く。
+    assert written == ["vectors.npy", "entries.json"]
+    cache.flush()
+    assert written.count("vectors.npy") == 2
+    assert len(new_cache(tmp_path)) == 3
+
+
+def test_lookup_is_not_blocked_while_documents_are_encoded(tmp_path) -> None:
+    cache = new_cache(tmp_path)
+    cache.add(["猫の名前はミケ"], source="recall")
+    encoding = threading.Event()
+    release = threading.Event()
+    encode = cache.encoder.encode
+
+    def slow_encode(texts):
+        if texts[0].startswith("検索文書: "):
+            encoding.set()
+            release.wait(timeout=5.0)
+        return encode(texts)
+
+    cache.encoder.encode = slow_encode
+    adder = threading.Thread(target=cache.add, args=(["明日は歯医者"],), kwargs={"source": "recall"})
+    adder.start()
+    try:
+        assert encoding.wait(timeout=5.0)
+        started = time.monotonic()
+        assert cache.lookup("猫の名前はミケ") is not None
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+        adder.join()
+    assert len(cache) == 2
+
+
+@pytest.fixture
+def server():
+    server = MemoryServer()
+    server.responses["/api/mcp/recall_memory"] = [
+        (
+            200,
+            {
+                "status": "success",
+                "count": 1,
+                "memories": [{"document": "飼い猫の名前はミケ", "score": 0.91}],
+            },
+        )
+    ]
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+def test_listend_answers_repeat_recall_from_cache(server, monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("SEMANTIC_MEMORY_API_URL", server.api_url)
+    service, _, _ = new_service()
+    service.settings.workspace_path = Path("/nonexistent/workspace")
+    service._memory_cache = new_cache(tmp_path, min_score=0.3)
+    decision = SimpleNamespace(original_text="飼い猫の名前を覚えてる？")
+
+    try:
+        remote = service._recall_memory(decision)
+        # 取得結果の埋め込みはmemory用のpoolで後から入る。
+        service._memory_pool().submit(lambda: None).result(timeout=5.0)
+        local = service._recall_memory(decision)
+    finally:
+        service._memory_executor.shutdown()
+        service._memory_client.close()
+
+    assert remote.ok and json.loads(remote.stdout).get("source") is None
+    assert local.ok and json.loads(local.stdout)["source"] == "local_cache"
+    assert local.stderr == "1件の記憶を見つけました"
+    assert [path for path, _ in server.requests] == ["/api/mcp/recall_memory"]
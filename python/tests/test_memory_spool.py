@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from memory_spool import MemorySpool, MemorySpoolWorker, flush
+from memory_stub import MemoryServer
+from semantic_memory import MemorySettings, SemanticMemoryClient
+
+
+@pytest.fixture
+def server():
+    server = MemoryServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+def client_for(server: MemoryServer, tmp_path) -> SemanticMemoryClient:
+    return SemanticMemoryClient(
+        MemorySettings(
+            api_url=server.api_url,
+            timeout_sec=2.0,
+            retries=0,
+            state_dir=tmp_path / "memorize-state",
+        )
+    )
+
+
+def test_entries_survive_reopen_and_duplicates_are_dropped(tmp_path) -> None:
+    path = tmp_path / "spool.sqlite3"
+    spool = MemorySpool(path)
+    first = spool.enqueue("[user]猫\n[agent]かわいいね", now=100.0)
+    duplicate = spool.enqueue("[user]猫\n[agent]かわいいね", now=110.0)
+    spool.close()
+
+    reopened = MemorySpool(path)
+    later = reopened.enqueue("[user]猫\n[agent]かわいいね", now=200.0)
+    backlog = reopened.backlog(now=200.0)
+    reopened.close()
+
+    assert first is not None and duplicate is None
+    assert later is not None
+    assert (backlog.pending, backlog.failed, backlog.oldest_pending_sec) == (2, 0, 100.0)
+
+
+def test_claimed_batch_is_leased_until_done_or_expired(tmp_path) -> None:
+    spool = MemorySpool(tmp_path / "spool.sqlite3", lease_sec=30.0)
+    spool.enqueue("a", now=0.0)
+    spool.enqueue("b", now=0.0)
+
+    batch = spool.claim(10, now=1.0)
+    assert [entry.main_text for entry in batch] == ["a", "b"]
+    assert spool.claim(10, now=2.0) == []
+    spool.mark_done(batch[0], 7)
+    # 完了しなかったものは貸出期限の後に再び取り出される。
+    assert [entry.main_text for entry in spool.claim(10, now=40.0)] == ["b"]
+    spool.close()
+
+
+def test_failures_back_off_then_give_up(tmp_path) -> None:
+    spool = MemorySpool(
+        tmp_path / "spool.sqlite3", backoff_sec=2.0, max_backoff_sec=5.0, max_attempts=3
+    )
+    spool.enqueue("a", now=0.0)
+
+    delays = []
+    for now in (0.0, 10.0, 20.0):
+        (entry,) = spool.claim(1, now=now)
+        delays.append(spool.mark_failed(entry, "HTTP 500", now=now))
+
+    assert delays == [2.0, 4.0, None]
+    backlog = spool.backlog(now=30.0)
+    assert (backlog.pending, backlog.failed) == (0, 1)
+    spool.close()
+
+
+def test_flush_sends_batch_over_one_connection(server, tmp_path) -> None:
+    spool = MemorySpool(tmp_path / "spool.sqlite3")
+    for index in range(3):
+        spool.enqueue(f"会話 {index}")
+    client = client_for(server, tmp_path)
+    try:
+        sent, failed = flush(spool, client, batch_size=16)
+    finally:
+        client.close()
+
+    assert (sent, failed) == (3, 0)
+    assert spool.backlog().pending == 0
+    assert [body["main_text"] for _, body in server.requests] == ["会話 0", "会話 1", "会話 2"]
+    assert server.connections == 1
+    spool.close()
+
+
+def test_flush_reports_stored_documents(server, tmp_path) -> None:
+    server.responses["/api/save"] = [
+        (200, {"status": "saved", "id": 7, "summary": "ユーザーは猫を飼っている"}),
+        (200, {"status": "saved", "id": 8}),
+        (200, {"status": "saved", "id": 9}),
+    ]
+    spool = MemorySpool(tmp_path / "spool.sqlite3")
+    spool.enqueue("[user]猫を飼ってるよ\n[agent]いいね")
+    spool.enqueue("要約されて本文が返らない")
+    spool.enqueue("そのまま保存する", summarize=False)
+    saved = []
+    client = client_for(server, tmp_path)
+    try:
+        flush(spool, client, batch_size=16, on_saved=saved.append)
+    finally:
+        client.close()
+        spool.close()
+
+    assert [(item.id, item.document) for item in saved] == [
+        (7, "ユーザーは猫を飼っている"),
+        (8, ""),
+        (9, "そのまま保存する"),
+    ]
+
+
+def test_stopping_flush_releases_unsent_entries(server, tmp_path) -> None:
+    spool = MemorySpool(tmp_path / "spool.sqlite3")
+    for text in ("a", "b", "c"):
+        spool.enqueue(text)
+    stop = threading.Event()
+    client = client_for(server, tmp_path)
+    try:
+        # 1件送ったところで停止要求が来る。
+        sent, failed = flush(spool, client, batch_size=16, on_saved=lambda _: stop.set(), stop=stop)
+        remaining = [entry.main_text for entry in spool.claim(16)]
+    finally:
+        client.close()
+        spool.close()
+
+    assert (sent, failed) == (1, 0)
+    assert len(server.requests) == 1
+    # 貸出期限を待たずに次の起動で送れる。
+    assert remaining == ["b", "c"]
+
+
+def test_worker_retries_until_server_accepts(server, tmp_path) -> None:
+    server.responses["/api/save"].insert(0, (500, {"detail": "summariser down"}))
+    spool = MemorySpool(tmp_path / "spool.sqlite3", backoff_sec=0.05)
+    spool.enqueue("あとで保存する")
+    worker = MemorySpoolWorker(spool, client_for(server, tmp_path), interval_sec=0.02)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while worker.sent_total == 0 and time.monotonic() < deadline:
+            worker.notify()
+            time.sleep(0.02)
+        backlog = spool.backlog()
+    finally:
+        worker.stop()
+
+    assert (worker.sent_total, worker.failed_total) == (1, 1)
+    assert backlog.pending == 0
+    assert len(server.requests) == 2
+
+
+def test_state_dir_errors_are_retried_like_save_failures(server, tmp_path) -> None:
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("", encoding="utf-8")
+    spool = MemorySpool(tmp_path / "spool.sqlite3")
+    spool.enqueue("あとで保存する")
+    client = SemanticMemoryClient(
+        MemorySettings(api_url=server.api_url, timeout_sec=2.0, retries=0, state_dir=blocker / "x")
+    )
+    try:
+        sent, failed = flush(spool, client, batch_size=16)
+        backlog = spool.backlog()
+    finally:
+        client.close()
+        spool.close()
+
+    assert (sent, failed) == (0, 1)
+    assert backlog.pending == 1
+
+
+def test_worker_survives_unexpected_errors(server, tmp_path, caplog) -> None:
+    spool = MemorySpool(tmp_path / "spool.sqlite3")
+    spool.enqueue("あとで保存する")
+    worker = MemorySpoolWorker(spool, client_for(server, tmp_path), interval_sec=0.02)
+    save = worker.client.save
+    calls = []
+
+    def flaky_save(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("unexpected")
+        return save(*args, **kwargs)
+
+    worker.client.save = flaky_save
+    worker.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while worker.sent_total == 0 and time.monotonic() < deadline:
+            worker.notify()
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+
+    # 1回目の失敗で貸し出しは解除され、スレッドは生きたまま次の周期で送る。
+    assert worker.sent_total == 1
+    assert len(calls) == 2
+    assert "memory spool flush crashed" in caplog.text
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import intent_router
+from onnx_embedder import OnnxEmbedder, compare_embeddings, pad_token_rows, pool_embeddings
+from test_intent_router import settings
+
+
+class FakeTokenizer:
+    def encode_batch(self, texts):
+        return pad_token_rows([[1] * len(text) for text in texts], pad_id=0)
+
+
+class FakeSession:
+    def __init__(self, names=("input_ids", "attention_mask")) -> None:
+        self.names = names
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.names]
+
+    def run(self, output_names, input_feed):
+        del output_names
+        self.feeds.append(input_feed)
+        batch, width = input_feed["input_ids"].shape
+        hidden = np.zeros((batch, width, 2), dtype=np.float32)
+        hidden[:, :, 0] = np.arange(width, dtype=np.float32) + 1.0
+        hidden[:, :, 1] = 1.0
+        return [hidden]
+
+
+def test_mean_pooling_ignores_padding_tokens() -> None:
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    pooled = pool_embeddings(hidden, mask, pooling="mean", normalize=False)
+
+    np.testing.assert_allclose(pooled, [[2.0, 0.0]])
+
+
+def test_onnx_embedder_outputs_normalized_rows_per_text() -> None:
+    session = FakeSession(("input_ids", "attention_mask", "token_type_ids"))
+    embedder = OnnxEmbedder(session, FakeTokenizer(), pooling="mean")
+
+    embeddings = embedder.encode(["右", "右を向いて"])
+
+    assert embeddings.shape == (2, 2)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0], rtol=1e-6)
+    # 短い文はpaddingを平均に含めないため、長い文と異なるベクトルになる。
+    assert not np.allclose(embeddings[0], embeddings[1])
+    assert set(session.feeds[0]) == {"input_ids", "attention_mask", "token_type_ids"}
+
+
+def test_onnx_embedder_feeds_only_declared_inputs() -> None:
+    session = FakeSession(("input_ids",))
+
+    OnnxEmbedder(session, FakeTokenizer()).encode(["左"])
+
+    assert set(session.feeds[0]) == {"input_ids"}
+
+
+def test_compare_embeddings_reports_cosine_tolerance() -> None:
+    reference = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    candidate = np.array([[0.99, 0.01], [0.0, 1.0]], dtype=np.float32)
+
+    metrics = compare_embeddings(reference, candidate)
+
+    assert 0.999 < metrics["min_cosine"] < 1.0
+    assert metrics["max_abs_diff"] == pytest.approx(0.01)
+
+
+def test_router_builds_onnx_embedder_from_export_dir(monkeypatch, tmp_path) -> None:
+    loaded = {}
+
+    def fake_load(directory, *, int8):
+        loaded.update(directory=directory, int8=int8)
+        return "embedder"
+
+    monkeypatch.setattr(OnnxEmbedder, "load", staticmethod(fake_load))
+    s = replace(settings(), backend="onnx", cache_dir=str(tmp_path))
+
+    assert intent_router.build_embedder(s) == "embedder"
+    assert loaded == {"directory": tmp_path / "onnx" / "fake", "int8": True}
+
+
+def test_router_rejects_unknown_backend() -> None:
+    with pytest.raises(ValueError, match="YATAGARASU_SBERT_BACKEND"):
+        intent_router.build_embedder(replace(settings(), backend="tflite"))
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from listend import PtzWorker
+from onvif_ptz import OnvifError, OnvifPtzClient, OnvifSettings, coalesce_moves
+from onvif_stub import StubOnvifServer
+from ptz_motion import PtzMotionModel
+
+
+def client_for(server: StubOnvifServer, **overrides) -> OnvifPtzClient:
+    settings = OnvifSettings(url=server.url, username="camera", password="secret")
+    fields = {**settings.__dict__, **overrides}
+    return OnvifPtzClient(
+        OnvifSettings(**fields),
+        motion=PtzMotionModel(pan_deg_per_sec=900.0, tilt_deg_per_sec=600.0, base_sec=0.0),
+    )
+
+
+def test_connect_discovers_ptz_profile_and_reuses_one_connection() -> None:
+    with StubOnvifServer() as server:
+        client = client_for(server)
+        try:
+            client.connect()
+            client.move(45, 30)
+            client.move(-90, 0)
+        finally:
+            client.close()
+
+    assert client.profile_token == "main"
+    assert client.ptz_url.endswith("/onvif/ptz")
+    assert server.calls == [
+        "GetSystemDateAndTime",
+        "GetCapabilities",
+        "GetProfiles",
+        "RelativeMove",
+        "RelativeMove",
+    ]
+    assert server.moves == [
+        ("RelativeMove", pytest.approx(0.25), pytest.approx(1 / 3)),
+        ("RelativeMove", pytest.approx(-0.5), 0.0),
+    ]
+    assert server.connections == 1
+    assert (client.pan, client.tilt) == (-45.0, 30.0)
+
+
+def test_wrong_password_surfaces_soap_fault() -> None:
+    with StubOnvifServer() as server:
+        client = client_for(server, password="wrong")
+        with pytest.raises(OnvifError, match="Sender not authorized"):
+            client.connect()
+        client.close()
+
+
+def test_move_is_not_resent_when_the_camera_stalls_after_accepting_it() -> None:
+    with StubOnvifServer() as server:
+        client = client_for(server, timeout_sec=0.2)
+        try:
+            client.connect()
+            server.stall_moves_sec = 0.5
+            with pytest.raises(OnvifError, match="timed out"):
+                client.move(45, 0)
+        finally:
+            client.close()
+
+    assert server.calls.count("RelativeMove") == 1
+    assert len(server.moves) == 1
+
+
+def test_continuous_mode_stops_after_modelled_duration() -> None:
+    with StubOnvifServer() as server:
+        client = client_for(server, move_mode="continuous", continuous_speed=0.8)
+        try:
+            client.connect()
+            client.move(45, 15)
+        finally:
+            client.close()
+
+    assert server.calls[-2:] == ["ContinuousMove", "Stop"]
+    _, vx, vy = server.moves[0]
+    # pan 45°/900 = 0.05s, tilt 15°/600 = 0.025s → tilt速度は半分
+    assert vx == pytest.approx(0.8)
+    assert vy == pytest.approx(0.4)
+
+
+def test_wait_idle_polls_status_until_idle() -> None:
+    with StubOnvifServer(moving_polls=2) as server:
+        client = client_for(server)
+        try:
+            client.move(45, 0)
+            waited = client.wait_idle(min_sec=5.0, max_sec=10.0)
+        finally:
+            client.close()
+
+    assert server.calls.count("GetStatus") == 3
+    assert waited < 1.0
+
+
+def test_wait_idle_falls_back_to_estimate_without_move_status() -> None:
+    with StubOnvifServer(report_status=False) as server:
+        client = client_for(server)
+        try:
+            client.move(45, 0)
+            waited = client.wait_idle(min_sec=0.05, max_sec=1.0)
+        finally:
+            client.close()
+
+    assert server.calls.count("GetStatus") == 1
+    assert waited == pytest.approx(0.05, abs=0.04)
+
+
+def test_malformed_position_is_reported_as_unknown() -> None:
+    with StubOnvifServer(moving_polls=1) as server:
+        server.position_attrs = 'x="n/a" y=""'
+        client = client_for(server)
+        try:
+            client.move(45, 0)
+            status = client.status()
+            waited = client.wait_idle(min_sec=0.0, max_sec=1.0)
+        finally:
+            client.close()
+
+    # 位置だけ不明にし、静止待ちは MoveStatus で続ける。
+    assert (status.moving, status.pan, status.tilt) == (True, None, None)
+    assert waited < 1.0
+
+
+def test_coalesce_rejects_calibrate() -> None:
+    assert coalesce_moves(["move_camera_right", "move_camera_up", "move_camera_left"]) == (0.0, 30.0)
+    with pytest.raises(ValueError, match="move_camera_calibrate"):
+        coalesce_moves(["move_camera_calibrate"])
+
+
+def test_ptz_worker_uses_onvif_backend_for_moves(monkeypatch) -> None:
+    with StubOnvifServer(moving_polls=1) as server:
+        monkeypatch.setenv("YATAGARASU_PTZ_BACKEND", "onvif")
+        monkeypatch.setenv("YATAGARASU_ONVIF_URL", server.url)
+        monkeypatch.setenv("YATAGARASU_ONVIF_USER", "camera")
+        monkeypatch.setenv("YATAGARASU_ONVIF_PASSWORD", "secret")
+        worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+        try:
+            assert worker.start(2.0)
+            results = worker.execute_many(("move_camera_right", "move_camera_up"), 2.0)
+            worker.wait_for_motion()
+            calibrate = worker.execute("move_camera_calibrate", 2.0)
+        finally:
+            worker.stop()
+
+    assert [result.ok for result in results] == [True, True]
+    assert "2件をまとめて実行" in results[0].stdout
+    assert worker.position == (45.0, 30.0)
+    assert server.calls.count("RelativeMove") == 1
+    assert "GetStatus" in server.calls
+    # キャリブレーションはONVIFに無いのでpytapo workerへ回る。
+    assert not calibrate.ok
+    assert calibrate.stderr == "PTZ worker is not available"
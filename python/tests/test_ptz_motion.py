@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from listend import PtzWorker
+from ptz_motion import MotionSample, PtzMotionModel, fit_motion_model, load_samples
+
+
+def test_default_model_matches_measured_one_second_settle() -> None:
+    model = PtzMotionModel()
+
+    assert model.move_sec(45, 0) == pytest.approx(1.0)
+    assert model.move_sec(0, -30) == pytest.approx(1.0)
+    assert model.move_sec(45, 30) == pytest.approx(1.0)
+    assert model.move_sec(90, 0) == pytest.approx(1.75)
+    assert model.move_sec(0, 0) == 0.0
+
+
+def test_fit_recovers_axis_speeds_and_base(tmp_path) -> None:
+    path = tmp_path / "samples.csv"
+    path.write_text(
+        "# x,y,seconds\n45,0,0.8\n90,0,1.4\n0,30,0.95\n0,-60,1.7\n45,30,1.0\n",
+        encoding="utf-8",
+    )
+
+    model = fit_motion_model(load_samples(path))
+
+    assert model.pan_deg_per_sec == pytest.approx(75.0)
+    assert model.tilt_deg_per_sec == pytest.approx(40.0)
+    assert model.base_sec == pytest.approx((0.2 + 0.2) / 2)
+
+
+def test_fit_rejects_samples_without_single_axis_moves() -> None:
+    with pytest.raises(ValueError, match="pan-only or tilt-only"):
+        fit_motion_model([MotionSample(45, 30, 1.0)])
+
+
+def test_ptz_worker_waits_for_estimated_motion(monkeypatch) -> None:
+    monkeypatch.setenv("YATAGARASU_PTZ_PAN_DEG_PER_SEC", "90")
+    monkeypatch.setenv("YATAGARASU_PTZ_MOVE_BASE_SEC", "0.1")
+    monkeypatch.setenv("YATAGARASU_SBERT_MOVE_SETTLE_SEC", "1.0")
+    worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+    clock = iter([10.0, 10.2])
+    monkeypatch.setattr("listend.time.monotonic", lambda: next(clock))
+    slept: list[float] = []
+    monkeypatch.setattr("listend.time.sleep", slept.append)
+
+    worker._record_motion(worker._motion_estimate_sec("move_camera_right", {"x": 45, "y": 0}))
+
+    assert worker.last_motion_sec == pytest.approx(0.6)
+    assert worker.wait_for_motion() == pytest.approx(0.4)
+    assert slept == [pytest.approx(0.4)]
+
+
+def test_ptz_worker_falls_back_to_fixed_settle(monkeypatch) -> None:
+    monkeypatch.setenv("YATAGARASU_SBERT_MOVE_SETTLE_SEC", "0.7")
+    worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+
+    assert worker._motion_estimate_sec("move_camera_left", {"ok": True}) == 0.7
+    assert worker._motion_estimate_sec("move_camera_calibrate", {}) == 20.0
+
+    monkeypatch.setenv("YATAGARASU_PTZ_MOTION_MODEL", "false")
+    worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+    assert worker._motion_estimate_sec("move_camera_left", {"x": -45, "y": 0}) == 0.7
+
+
+def test_batch_sets_one_motion_estimate_covering_calibration(monkeypatch) -> None:
+    monkeypatch.setenv("YATAGARASU_PTZ_PAN_DEG_PER_SEC", "90")
+    monkeypatch.setenv("YATAGARASU_PTZ_TILT_DEG_PER_SEC", "60")
+    monkeypatch.setenv("YATAGARASU_PTZ_MOVE_BASE_SEC", "0.1")
+    worker = PtzWorker(Path("/nonexistent"), Path("/tmp"))
+    monkeypatch.setattr("listend.time.monotonic", lambda: 100.0)
+    move = {"ok": True, "x": 90, "y": 30, "coalesced": 2}
+
+    worker._payload_results(
+        ("move_camera_calibrate", "move_camera_right", "move_camera_right"),
+        {
+            "ok": True,
+            "results": [
+                {"action": "move_camera_calibrate", "ok": True},
+                {"action": "move_camera_right", **move},
+            ],
+        },
+        0.1,
+    )
+
+    # キャリブレーション20秒の後に、まとめた1回分の移動（90°/90 + 0.1）。
+    assert worker.last_motion_sec == pytest.approx(20.0 + 1.1)
+    assert worker.motion_until == pytest.approx(121.1)
+
+    worker._payload_results(
+        ("move_camera_up",),
+        {"ok": True, "action": "move_camera_up", "x": 0, "y": 30, "coalesced": 1},
+        0.1,
+    )
+    # 後の短い移動で、先のキャリブレーションの待ちを縮めない。
+    assert worker.motion_until == pytest.approx(121.1)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+from intent_router import IntentRouter, build_intents_from_env
+from listend import ActionResult, PtzWorker
+from test_intent_router import KeywordEmbedder, settings
+from test_listend_wake_flow import new_service
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+WORKER_SCRIPT = (
+    PROJECT_ROOT / "workspace" / ".codex" / "skills" / "move-camera" / "scripts" / "ptz_worker"
+)
+
+FAKE_PYTAPO = """
+import json, os
+
+class Tapo:
+    def __init__(self, host, user, password):
+        pass
+
+    def _log(self, *call):
+        with open(os.environ["FAKE_TAPO_LOG"], "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(call) + "\\n")
+
+    def moveMotor(self, x, y):
+        self._log("move", x, y)
+        return {"error_code": 0}
+
+    def calibrateMotor(self):
+        self._log("calibrate")
+        return {"error_code": 0}
+"""
+
+
+def fake_worker(tmp_path: Path, monkeypatch) -> tuple[PtzWorker, Path]:
+    package = tmp_path / "fake-site" / "pytapo"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text(FAKE_PYTAPO, encoding="utf-8")
+    log = tmp_path / "tapo.log"
+    monkeypatch.setenv("PYTHONPATH", str(package.parent))
+    monkeypatch.setenv("FAKE_TAPO_LOG", str(log))
+    monkeypatch.setenv("TAPO_PASSWORD", "secret")
+    worker = PtzWorker(tmp_path, tmp_path)
+    worker.python = Path(sys.executable)
+    worker.script = WORKER_SCRIPT
+    return worker, log
+
+
+def tapo_calls(log: Path) -> list[list[object]]:
+    return [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+
+
+def test_adjacent_moves_are_coalesced_into_one_tapo_call(tmp_path, monkeypatch) -> None:
+    worker, log = fake_worker(tmp_path, monkeypatch)
+    try:
+        results = worker.execute_many(
+            ("move_camera_right", "move_camera_right", "move_camera_up"), 5.0
+        )
+        cancelled = worker.execute_many(("move_camera_left", "move_camera_right"), 5.0)
+    finally:
+        worker.stop()
+
+    assert [result.ok for result in results] == [True, True, True]
+    assert "3件をまとめて実行" in results[0].stdout
+    assert cancelled[0].ok and "相殺" in cancelled[0].stdout
+    assert tapo_calls(log) == [["move", 90, 30]]
+    assert worker.position == (90.0, 30.0)
+    assert worker.last_motion_sec == 0.0
+
+
+def test_calibrate_splits_batches_and_resets_position(tmp_path, monkeypatch) -> None:
+    worker, log = fake_worker(tmp_path, monkeypatch)
+    try:
+        results = worker.execute_many(
+            ("move_camera_left", "move_camera_calibrate", "move_camera_down"), 5.0
+        )
+        unsupported = worker.execute_many(("move_camera_left", "zoom_in"), 5.0)
+        single = worker.execute("move_camera_up", 5.0)
+    finally:
+        worker.stop()
+
+    assert all(result.ok for result in results)
+    assert tapo_calls(log) == [["move", -45, 0], ["calibrate"], ["move", 0, -30], ["move", 0, 30]]
+    assert [result.ok for result in unsupported] == [False, False]
+    assert "unsupported action: zoom_in" in unsupported[0].stderr
+    assert single.ok and single.stdout == "移動しました: x=0, y=30"
+    assert worker.position == (0.0, 0.0)
+
+
+def test_absolute_move_uses_tracked_position(tmp_path, monkeypatch) -> None:
+    worker, log = fake_worker(tmp_path, monkeypatch)
+    try:
+        worker.execute_many(("move_camera_right", "move_camera_up"), 5.0)
+        assert worker._ensure_started(5.0)
+        assert worker.proc is not None and worker.proc.stdin is not None
+        # 応答は読み取りスレッドがidで届けるので、待ち受けを登録してから送る。
+        answer: Future[dict[str, object]] = Future()
+        worker._pending["abs"] = answer
+        worker.proc.stdin.write(
+            json.dumps({"id": "abs", "action": "move_camera_to", "pan": 0, "tilt": 0}) + "\n"
+        )
+        worker.proc.stdin.flush()
+        payload = answer.result(timeout=5.0)
+    finally:
+        worker.stop()
+
+    assert payload["id"] == "abs"
+    assert payload["position"] == {"pan": 0.0, "tilt": 0.0}
+    assert tapo_calls(log) == [["move", 45, 30], ["move", -45.0, -30.0]]
+
+
+def test_requests_are_pipelined_and_answered_by_id(tmp_path, monkeypatch) -> None:
+    worker, _ = fake_worker(tmp_path, monkeypatch)
+    worker.script = tmp_path / "slow_worker"
+    # 要求を全部読んでから、逆順（と、どの要求でもないid）で答えるworker。
+    worker.script.write_text(
+        "import json, sys, time\n"
+        "print(json.dumps({'type': 'ready', 'ok': True}), flush=True)\n"
+        "requests = [json.loads(sys.stdin.readline()) for _ in range(2)]\n"
+        "print(json.dumps({'id': 999, 'ok': True}), flush=True)\n"
+        "for request in reversed(requests):\n"
+        "    action = request['actions'][0]\n"
+        "    print(json.dumps({'id': request['id'], 'ok': True, 'action': action,\n"
+        "                      'stdout': action}), flush=True)\n"
+        "sys.stdin.readline()\n",
+        encoding="utf-8",
+    )
+    assert worker._ensure_started(5.0)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(worker.execute, "move_camera_left", 5.0)
+        time.sleep(0.05)
+        second = pool.submit(worker.execute, "move_camera_right", 5.0)
+        results = [first.result(), second.result()]
+    worker.stop()
+
+    # 1件目の応答を待たずに2件目を送れている（workerは2件読むまで答えない）。
+    assert [(result.ok, result.stdout) for result in results] == [
+        (True, "move_camera_left"),
+        (True, "move_camera_right"),
+    ]
+
+
+def test_router_graph_sends_all_moves_in_one_request() -> None:
+    service, _, _ = new_service()
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    service.startup = SimpleNamespace(wait=lambda *names: None)
+    router = IntentRouter(settings(), build_intents_from_env(settings()), KeywordEmbedder())
+    decision = router.route("右上を向いて何が見える")
+    assert decision.flags[-1] == "capture_image"
+    moves = [flag for flag in decision.flags if flag != "capture_image"]
+    assert len(moves) == 2
+    requests: list[tuple[str, ...]] = []
+
+    def fake_moves(actions, timeout):
+        requests.append(tuple(actions))
+        return [ActionResult(action, True, "", "", 0.01) for action in actions]
+
+    service.ptz_worker = SimpleNamespace(
+        execute_many=fake_moves,
+        wait_for_motion=lambda: 0.0,
+        last_motion_sec=0.0,
+        position=None,
+    )
+    service._execute_router_action = lambda action, decision: ActionResult(
+        action, True, "", "画像を保存しました: /tmp/x.jpg (1x1)", 0.01
+    )
+
+    result = service._execute_router_decision(decision)
+
+    assert requests == [tuple(moves)]
+    assert [item.action for item in result.executed_actions] == list(decision.flags)
+    assert result.image_path == "/tmp/x.jpg"
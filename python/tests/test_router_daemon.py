@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from intent_router import IntentRouter, build_intents_from_env
+from listend import ListendService
+from router_daemon import (
+    RouteBatcher,
+    RouterClient,
+    RouterDaemonError,
+    RouterServer,
+)
+from test_intent_router import KeywordEmbedder, settings
+
+
+class GatedEmbedder(KeywordEmbedder):
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.gate.set()
+        self.batch_sizes: list[int] = []
+
+    def encode(self, texts):
+        texts = list(texts)
+        self.batch_sizes.append(len(texts))
+        self.gate.wait(timeout=5.0)
+        return super().encode(texts)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    embedder = GatedEmbedder()
+    router = IntentRouter(settings(), build_intents_from_env(settings()), embedder)
+    batcher = RouteBatcher(router)
+    server = RouterServer(tmp_path / "router.sock", batcher)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield SimpleNamespace(
+        router=router,
+        embedder=embedder,
+        batcher=batcher,
+        server=server,
+        socket_path=tmp_path / "router.sock",
+    )
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+def test_client_matches_in_process_router(daemon) -> None:
+    client = RouterClient(daemon.socket_path)
+    try:
+        assert client.settings == daemon.router.settings
+        for text in ("右を向いて何が見える", "書類を要約して", ""):
+            assert client.route(text) == daemon.router.route(text)
+        assert client.route_batch(["左を向いて", "覚えて"]) == daemon.router.route_batch(
+            ["左を向いて", "覚えて"]
+        )
+    finally:
+        client.close()
+
+
+def test_client_encodes_with_daemon_model(daemon) -> None:
+    client = RouterClient(daemon.socket_path)
+    try:
+        encoded = client.encode(["右を向いて", "書類を要約して"])
+    finally:
+        client.close()
+
+    assert encoded.dtype == np.float32
+    assert np.allclose(encoded, daemon.router.encode(["右を向いて", "書類を要約して"]))
+
+
+def test_concurrent_clients_share_one_encode(daemon) -> None:
+    daemon.embedder.gate.clear()
+    daemon.embedder.batch_sizes.clear()
+    results: dict[int, list[str]] = {}
+
+    def worker(index: int, text: str) -> None:
+        client = RouterClient(daemon.socket_path)
+        try:
+            results[index] = list(client.route(text).flags)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(0, "右を向いて"))]
+    threads[0].start()
+    deadline = time.monotonic() + 5.0
+    while not daemon.embedder.batch_sizes and time.monotonic() < deadline:
+        time.sleep(0.005)
+    for index, text in enumerate(("左を向いて", "上を向いて", "下を向いて"), start=1):
+        thread = threading.Thread(target=worker, args=(index, text))
+        thread.start()
+        threads.append(thread)
+    while daemon.batcher._jobs.qsize() < 3 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    daemon.embedder.gate.set()
+    for thread in threads:
+        thread.join(timeout=5.0)
+
+    assert daemon.embedder.batch_sizes == [1, 3]
+    assert results == {
+        0: ["move_camera_right"],
+        1: ["move_camera_left"],
+        2: ["move_camera_up"],
+        3: ["move_camera_down"],
+    }
+
+
+def test_daemon_reports_request_errors(daemon) -> None:
+    client = RouterClient(daemon.socket_path)
+    try:
+        with pytest.raises(RouterDaemonError, match="unknown op"):
+            client._call({"op": "reload"})
+        assert client.route("右を向いて").flags == ("move_camera_right",)
+    finally:
+        client.close()
+
+
+def test_client_raises_when_daemon_is_missing(tmp_path) -> None:
+    client = RouterClient(tmp_path / "missing.sock", timeout=0.5)
+
+    with pytest.raises(RouterDaemonError, match="unavailable"):
+        client.route("右を向いて")
+
+
+def test_client_does_not_resend_after_timeout(tmp_path) -> None:
+    path = tmp_path / "slow.sock"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen()
+    received: list[bytes] = []
+
+    def accept_and_stall() -> None:
+        # 要求は受け取るが答えない（判定中のdaemonを模す）。
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            received.append(conn.recv(4096))
+
+    threading.Thread(target=accept_and_stall, daemon=True).start()
+    client = RouterClient(path, timeout=0.3)
+    try:
+        started = time.monotonic()
+        with pytest.raises(RouterDaemonError, match="timed out"):
+            client.route("右を向いて")
+        elapsed = time.monotonic() - started
+    finally:
+        client.close()
+        listener.close()
+
+    assert elapsed < 0.55
+    assert len(received) == 1
+
+
+def test_server_replaces_stale_socket_but_not_live_one(tmp_path, daemon) -> None:
+    stale = tmp_path / "stale.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(stale))
+    sock.close()
+
+    server = RouterServer(stale, daemon.batcher)
+    server.server_close()
+    assert not stale.exists()
+
+    with pytest.raises(RouterDaemonError, match="already listening"):
+        RouterServer(daemon.socket_path, daemon.batcher)
+
+
+def test_listend_falls_back_to_in_process_router(monkeypatch, tmp_path, caplog) -> None:
+    monkeypatch.setenv("YATAGARASU_SBERT_ROUTER_ENABLED", "true")
+    monkeypatch.setenv("YATAGARASU_SBERT_ROUTER_SOCKET", str(tmp_path / "none.sock"))
+    monkeypatch.setattr(IntentRouter, "from_env", classmethod(lambda cls: "local"))
+    service = object.__new__(ListendService)
+
+    with caplog.at_level(logging.WARNING):
+        assert service._init_intent_router() == "local"
+    assert "loading in-process" in caplog.text
+
+
+def test_listend_dispatches_original_text_when_daemon_fails() -> None:
+    class BrokenClient:
+        def route(self, text):
+            raise RouterDaemonError("gone")
+
+    service = object.__new__(ListendService)
+    service.startup = SimpleNamespace(wait=lambda *names: None)
+    service.intent_router = BrokenClient()
+
+    prepared = service._prepare_dispatch("右を向いて")
+
+    assert prepared is not None
+    assert prepared.text == "右を向いて"
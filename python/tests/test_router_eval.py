@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from intent_router import IntentRouter, build_intents_from_env
+from router_eval import (
+    LabeledUtterance,
+    MemoEmbedder,
+    confusion_matrix,
+    evaluate,
+    format_report,
+    load_corpus,
+    micro_average,
+    run_batch,
+    score_labels,
+    threshold_sweep,
+)
+from test_intent_router import KeywordEmbedder, settings
+
+
+SAMPLE_CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "router_corpus.jsonl"
+
+
+class CountingEmbedder(KeywordEmbedder):
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, texts):
+        texts = list(texts)
+        self.encoded.extend(texts)
+        return super().encode(texts)
+
+
+def test_score_labels_counts_multi_label_hits() -> None:
+    scores = {
+        score.label: score
+        for score in score_labels(
+            [("move_camera_right", "capture_image"), (), ("recall_memory",)],
+            [("move_camera_right",), ("capture_image",), ("recall_memory",)],
+        )
+    }
+
+    assert (scores["move_camera_right"].tp, scores["move_camera_right"].fp) == (1, 0)
+    assert (scores["capture_image"].fp, scores["capture_image"].fn) == (1, 1)
+    assert scores["capture_image"].precision == 0.0
+    assert scores["recall_memory"].f1 == 1.0
+    total = micro_average(scores.values())
+    assert (total.tp, total.fp, total.fn) == (2, 1, 1)
+
+
+def test_confusion_matrix_maps_flags_to_categories() -> None:
+    matrix = confusion_matrix(
+        [("move_camera_left",), ("capture_image",), ()],
+        [("move_camera_left", "capture_image"), ("recall_memory",), ()],
+    )
+
+    assert matrix["move"]["move"] == 1
+    assert matrix["move"]["view"] == 1
+    assert matrix["view"]["recall"] == 1
+    assert matrix["none"]["none"] == 1
+
+
+def test_load_corpus_reports_bad_lines(tmp_path) -> None:
+    path = tmp_path / "corpus.jsonl"
+    path.write_text('{"text": "右", "flags": []}\n{"text": "左"}\n', encoding="utf-8")
+
+    with pytest.raises(ValueError, match=":2:"):
+        load_corpus(path)
+
+
+def test_sample_corpus_is_well_formed() -> None:
+    corpus = load_corpus(SAMPLE_CORPUS)
+
+    assert len(corpus) >= 30
+    assert {flag for item in corpus for flag in item.flags} >= {
+        "move_camera_right",
+        "capture_image",
+        "recall_memory",
+    }
+    assert any(not item.flags for item in corpus)
+
+
+def test_evaluate_reports_misses_and_intent_scores() -> None:
+    router = IntentRouter(settings(), build_intents_from_env(settings()), KeywordEmbedder())
+    corpus = [
+        LabeledUtterance("右を向いて", ("move_camera_right",), ("move_camera_right",)),
+        LabeledUtterance("左を向いて", ("move_camera_left",)),
+        LabeledUtterance("こんにちは", ("capture_image",)),
+    ]
+
+    report = evaluate(router, corpus, batch_size=2)
+
+    assert report.utterances == 3
+    assert [miss["text"] for miss in report.misses] == ["こんにちは"]
+    assert report.exact_match == pytest.approx(2 / 3)
+    assert [score.label for score in report.intent_scores] == ["move_camera_right"]
+    assert "confusion" in format_report(report)
+
+
+def test_threshold_sweep_encodes_each_text_once() -> None:
+    embedder = CountingEmbedder()
+    corpus = [
+        LabeledUtterance("右を向いて", ("move_camera_right",)),
+        LabeledUtterance("こんにちは", ()),
+    ]
+
+    points = threshold_sweep(
+        settings(),
+        corpus,
+        MemoEmbedder(embedder),
+        highs=(0.3, 0.5),
+        middles=(0.2, 0.4, 0.6),
+    )
+
+    assert [(point.high_threshold, point.middle_threshold) for point in points] == [
+        (0.3, 0.2),
+        (0.5, 0.2),
+        (0.5, 0.4),
+    ]
+    assert len(embedder.encoded) == len(set(embedder.encoded))
+    assert all(point.f1 == 1.0 for point in points)
+
+
+def test_run_batch_gates_on_min_f1(tmp_path, capsys) -> None:
+    path = tmp_path / "corpus.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps(row, ensure_ascii=False)
+            for row in (
+                {"text": "右を向いて", "flags": ["move_camera_right"]},
+                {"text": "こんにちは", "flags": ["capture_image"]},
+            )
+        ),
+        encoding="utf-8",
+    )
+    embedder = KeywordEmbedder()
+    router = IntentRouter(settings(), build_intents_from_env(settings()), embedder)
+
+    assert run_batch(path, settings(), embedder, router, min_f1=0.5) == 0
+    assert run_batch(path, settings(), embedder, router, min_f1=0.9, as_json=True) == 1
+    captured = capsys.readouterr()
+    assert '"batch_qps"' in captured.out
+    assert "required 0.900" in captured.err
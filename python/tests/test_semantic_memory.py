@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import semantic_memory
+from listend import PreparedDispatch
+from memory_stub import MemoryServer
+from semantic_memory import (
+    MemoryContext,
+    MemorySettings,
+    SemanticMemoryClient,
+    SemanticMemoryError,
+)
+from test_listend_wake_flow import new_service
+
+
+@pytest.fixture
+def server():
+    server = MemoryServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+def client_for(server: MemoryServer, tmp_path: Path, **overrides) -> SemanticMemoryClient:
+    settings = MemorySettings(
+        api_url=server.api_url,
+        timeout_sec=2.0,
+        retry_backoff_sec=0.01,
+        state_dir=tmp_path / "memorize-state",
+    )
+    return SemanticMemoryClient(replace(settings, **overrides))
+
+
+def test_context_yaml_matches_recall_context_script() -> None:
+    context = MemoryContext.from_payload(
+        {
+            "recent": [{"main_text": "直前の会話"}],
+            "semantic": [{"score": "0.834", "document": "猫を飼っている"}],
+        }
+    )
+
+    assert context.to_yaml() == (
+        "memory_context:\n"
+        "  recent_history: |\n"
+        "    - 直前の会話\n"
+        "  related_knowledge: |\n"
+        "    - [83] 猫を飼っている\n"
+    )
+    assert "(なし)" in MemoryContext.from_payload({}).to_yaml()
+
+
+def test_calls_share_one_keep_alive_connection(server, tmp_path) -> None:
+    client = client_for(server, tmp_path)
+    try:
+        context = client.retrieve("猫", recent_limit=5, threshold=1.0)
+        recalled = client.recall("猫")
+        saved = client.save("ユーザーは猫を飼っている")
+    finally:
+        client.close()
+
+    assert context.recent == ("直前の会話", "一行目\n二行目")
+    assert "      二行目" in context.to_yaml()
+    assert recalled.count == 1
+    assert saved.id == 42 and not saved.duplicate
+    assert server.connections == 1
+    assert server.requests[0] == (
+        "/api/retrieve",
+        {"query": "猫", "threshold": 1.0, "limit": 3, "recent_limit": 5},
+    )
+
+
+def test_reads_retry_unavailable_server_but_saves_do_not(server, tmp_path) -> None:
+    server.responses["/api/retrieve"].insert(0, (503, {"detail": "warming up"}))
+    server.responses["/api/save"].insert(0, (503, {"detail": "warming up"}))
+    client = client_for(server, tmp_path)
+    try:
+        context = client.retrieve("猫")
+        with pytest.raises(SemanticMemoryError, match="HTTP 503"):
+            client.save("一度だけ送る")
+    finally:
+        client.close()
+
+    paths = [path for path, _ in server.requests]
+    assert paths == ["/api/retrieve", "/api/retrieve", "/api/save"]
+    assert context.related[0].document == "猫を飼っている"
+
+
+def test_connection_refused_is_retried_then_reported(tmp_path) -> None:
+    client = SemanticMemoryClient(
+        MemorySettings(api_url="http://127.0.0.1:9/api", timeout_sec=1.0, retry_backoff_sec=0.0)
+    )
+
+    with pytest.raises(SemanticMemoryError, match="request failed"):
+        client.recall("猫")
+    assert client.requests == 3
+
+
+def test_identical_saves_return_first_id(server, tmp_path) -> None:
+    client = client_for(server, tmp_path)
+    try:
+        first = client.save("同じ内容")
+        second = client.save("同じ内容")
+        other = client.save("同じ内容", summarize=False)
+    finally:
+        client.close()
+
+    assert (first.id, second.id, second.duplicate) == (42, 42, True)
+    assert not other.duplicate
+    assert [path for path, _ in server.requests] == ["/api/save", "/api/save"]
+
+
+def test_api_error_field_is_surfaced(server, tmp_path) -> None:
+    server.responses["/api/mcp/recall_memory"] = [(200, {"error": "index missing"})]
+    client = client_for(server, tmp_path)
+    try:
+        with pytest.raises(SemanticMemoryError, match="index missing"):
+            client.recall("猫")
+    finally:
+        client.close()
+
+
+def test_cli_prints_script_compatible_output(server, tmp_path, monkeypatch, capsys) -> None:
+    monkeypatch.setenv("YATAGARASU_CWD", str(tmp_path))
+    (tmp_path / ".env").write_text('SEMANTIC_MEMORY_API_URL="http://from-file.invalid/api"\n')
+    monkeypatch.setenv("SEMANTIC_MEMORY_API_URL", server.api_url)
+    monkeypatch.setenv("YATAGARASU_MEMORIZE_STATE_DIR", str(tmp_path / "state"))
+
+    assert semantic_memory.main(["context", "さっきの話"]) == 0
+    assert semantic_memory.main(["save", "保存する"]) == 0
+    captured = capsys.readouterr()
+
+    assert captured.out.startswith("memory_context:\n  recent_history: |\n    - 直前の会話\n")
+    assert captured.out.rstrip().endswith('{"id": 42, "status": "saved"}')
+    assert "2件の過去の文脈、1件の関連知識を見つけました" in captured.err
+    assert "記憶を保存しました (ID: 42)" in captured.err
+
+
+def test_listend_recall_runs_in_process(server, monkeypatch) -> None:
+    monkeypatch.setenv("SEMANTIC_MEMORY_API_URL", server.api_url)
+    service, _, _ = new_service()
+    service.settings.workspace_path = Path("/nonexistent/workspace")
+
+    recent = service._execute_router_action(
+        "recall_memory", SimpleNamespace(original_text="さっき何の話をしてたっけ")
+    )
+    semantic = service._execute_router_action(
+        "recall_memory", SimpleNamespace(original_text="私の猫の名前を覚えてる？")
+    )
+    service._memory_client.close()
+
+    assert recent.ok and recent.stdout.startswith("memory_context:")
+    assert semantic.ok and json.loads(semantic.stdout)["count"] == 1
+    assert [path for path, _ in server.requests] == ["/api/retrieve", "/api/mcp/recall_memory"]
+    assert server.connections == 1
+
+
+def dispatch_service(server: MemoryServer, monkeypatch, prepared: PreparedDispatch):
+    monkeypatch.setenv("SEMANTIC_MEMORY_API_URL", server.api_url)
+    service, _, _ = new_service()
+    service.settings.dispatch_cmd = "/bin/fake-dispatch"
+    service.settings.dispatch_timeout_sec = 10.0
+    service.settings.workspace_path = Path("/tmp/yatagarasu-workspace")
+    service.session_text_chunks = ["猫の話の続き"]
+
+    def prepare(text):
+        time.sleep(0.3)
+        return prepared
+
+    service._prepare_dispatch = prepare
+    service._play_wake_ack = lambda: True
+    captured = {}
+
+    def fake_run(argv, **kwargs):
+        path = kwargs["env"].get("YATAGARASU_MEMORY_CONTEXT_FILE")
+        captured["context"] = Path(path).read_text(encoding="utf-8") if path else None
+        captured["path"] = path
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr("listend.subprocess.run", fake_run)
+    return service, captured
+
+
+def test_memory_context_is_prefetched_while_routing(server, monkeypatch) -> None:
+    server.delay_sec = 0.3
+    service, captured = dispatch_service(
+        server, monkeypatch, PreparedDispatch(text="制御プロンプト")
+    )
+    try:
+        started = time.monotonic()
+        assert service._dispatch_session("test")
+        elapsed = time.monotonic() - started
+    finally:
+        service._memory_executor.shutdown()
+        service._memory_client.close()
+
+    # 取得（0.3s）とルーティング（0.3s）が重なっている。
+    assert elapsed < 0.55
+    assert server.requests[0] == (
+        "/api/retrieve",
+        {"query": "猫の話の続き", "threshold": 0.7, "limit": 3, "recent_limit": 3},
+    )
+    assert captured["context"].startswith("memory_context:\n  recent_history: |\n")
+    assert not Path(captured["path"]).exists()
+
+
+def test_prefetched_memory_is_not_passed_when_recall_is_skipped(server, monkeypatch) -> None:
+    service, captured = dispatch_service(
+        server,
+        monkeypatch,
+        PreparedDispatch(text="画像を確認", skip_memory_recall=True),
+    )
+    try:
+        service._dispatch_session("test")
+    finally:
+        service._memory_executor.shutdown()
+        service._memory_client.close()
+
+    assert captured["context"] is None
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import io
+import wave
+
+import pytest
+
+from speech_output import (
+    SentenceSplitter,
+    SpeechError,
+    VoicevoxClient,
+    VoiceSettings,
+    concat_wav,
+    split_phrases,
+    wav_duration,
+)
+from voicevox_stub import VoicevoxServer, tone_wav
+
+
+@pytest.fixture
+def server():
+    server = VoicevoxServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+def test_phrases_are_split_like_zunda() -> None:
+    assert split_phrases("こんにちは、ずんだもんです。\r\n\n。今日は: いい天気　だね. ok") == [
+        "こんにちは",
+        "ずんだもんです",
+        "今日は",
+        "いい天気",
+        "だね. ok",
+    ]
+    assert split_phrases("、。\n") == []
+
+
+def test_streamed_text_is_cut_at_complete_sentences() -> None:
+    splitter = SentenceSplitter()
+
+    assert splitter.feed("こんにちは。今日は") == ["こんにちは。"]
+    # 文末記号が届いた直後はまだ切らない（次の差分で「？」が続くかもしれない）。
+    assert splitter.feed("晴れ！") == []
+    assert splitter.feed("？「よし」。\n\n- 次") == ["今日は晴れ！？", "「よし」。\n\n"]
+    assert splitter.feed("です") == []
+    assert splitter.flush() == ["- 次です"]
+    assert splitter.feed("。\n") == [] and splitter.flush() == []
+
+
+def test_concat_appends_silence_after_every_phrase() -> None:
+    audio = concat_wav([tone_wav("あい", 8000), tone_wav("う", 8000)], 0.5)
+
+    assert wav_duration(audio) == pytest.approx(0.15 + 2 * 0.5)
+    with wave.open(io.BytesIO(audio), "rb") as reader:
+        assert (reader.getframerate(), reader.getnchannels(), reader.getsampwidth()) == (8000, 1, 2)
+    with pytest.raises(SpeechError, match="mismatched"):
+        concat_wav([tone_wav("あ", 8000), tone_wav("い", 16000)], 0.5)
+
+
+def test_phrases_are_synthesized_in_order_over_pooled_connections(server) -> None:
+    server.delay_sec = 0.02
+    client = VoicevoxClient(VoiceSettings(engine_url=server.engine_url, speaker="3", workers=2))
+    try:
+        chunks = client.synthesize_all(["あ", "いい", "ううう", "ええ"])
+        again = client.synthesize("お")
+    finally:
+        client.close()
+
+    assert [wav_duration(chunk) for chunk in chunks] == pytest.approx([0.05, 0.1, 0.15, 0.1])
+    assert wav_duration(again) == pytest.approx(0.05)
+    assert server.connections == client.connections_opened <= 2
+    queried = [params for path, params in server.requests if path == "/audio_query"]
+    # 並列なので到着順は不定。
+    assert sorted(params["text"] for params in queried) == ["あ", "いい", "ううう", "ええ", "お"]
+    assert all(params["speaker"] == "3" for params in queried)
+    with wave.open(io.BytesIO(again), "rb") as reader:
+        assert reader.getframerate() == 8000
+
+
+def test_engine_errors_are_reported(server) -> None:
+    server.fail_status = 500
+    client = VoicevoxClient(VoiceSettings(engine_url=server.engine_url))
+    try:
+        with pytest.raises(SpeechError, match="HTTP 500"):
+            client.synthesize("あ")
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("path", ["/audio_query", "/synthesis"])
+def test_non_wav_success_bodies_are_reported(server, path) -> None:
+    server.garbage_path = path
+    client = VoicevoxClient(VoiceSettings(engine_url=server.engine_url))
+    try:
+        with pytest.raises(SpeechError, match="invalid"):
+            concat_wav(client.synthesize_all(["あ", "い"]), 0.1)
+        with pytest.raises(SpeechError, match="invalid WAV"):
+            wav_duration(b"<html>engine is busy</html>")
+    finally:
+        client.close()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+
+from speech_span import SpeechSpan, crop_to_span, find_speech_span, plan_split_ranges
+
+
+def test_span_drops_hangover_and_trailing_silence() -> None:
+    probs = (0.9, 0.8, 0.2, 0.1, 0.05, 0.1, 0.0, 0.0)
+
+    span = find_speech_span(probs, threshold=0.5, pad_chunks=1)
+
+    assert span == SpeechSpan(start_chunk=0, end_chunk=3, total_chunks=8)
+    assert span.trimmed_chunks == 5
+
+
+def test_span_pads_both_sides_within_bounds() -> None:
+    probs = (0.1, 0.1, 0.7, 0.1, 0.6, 0.1, 0.1)
+
+    span = find_speech_span(probs, threshold=0.5, pad_chunks=1)
+
+    assert (span.start_chunk, span.end_chunk) == (1, 6)
+
+
+def test_span_keeps_whole_segment_without_voiced_chunks() -> None:
+    span = find_speech_span((0.1, 0.2), threshold=0.5, pad_chunks=0)
+
+    assert span.trimmed_chunks == 0
+
+
+def test_span_rejects_negative_padding() -> None:
+    with pytest.raises(ValueError):
+        find_speech_span((0.9,), threshold=0.5, pad_chunks=-1)
+
+
+def test_crop_to_span_cuts_equal_chunks() -> None:
+    raw = b"aabbccdd"
+
+    assert crop_to_span(raw, SpeechSpan(1, 3, 4)) == b"bbcc"
+
+
+def test_crop_to_span_keeps_audio_when_chunks_are_uneven() -> None:
+    raw = b"aabbccd"
+
+    assert crop_to_span(raw, SpeechSpan(1, 3, 4)) == raw
+
+
+def test_split_ranges_cut_inside_lowest_vad_chunk_before_limit() -> None:
+    probs = [0.9] * 10
+    probs[6] = 0.1
+
+    ranges = plan_split_ranges(
+        probs,
+        total_samples=100,
+        chunk_samples=10,
+        max_samples=80,
+        search_chunks=4,
+    )
+
+    assert ranges == ((0, 65), (65, 100))
+
+
+def test_split_ranges_fall_back_to_hard_limit_without_probabilities() -> None:
+    ranges = plan_split_ranges(
+        (),
+        total_samples=250,
+        chunk_samples=10,
+        max_samples=100,
+        search_chunks=4,
+    )
+
+    assert ranges == ((0, 100), (100, 200), (200, 250))
+
+
+def test_split_ranges_keep_short_audio_whole() -> None:
+    assert plan_split_ranges(
+        (0.9,) * 5,
+        total_samples=50,
+        chunk_samples=10,
+        max_samples=80,
+        search_chunks=4,
+    ) == ((0, 50),)
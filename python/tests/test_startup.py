@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from startup import StartupError, StartupTasks
+
+
+def test_phases_load_concurrently_and_report_elapsed() -> None:
+    tasks = StartupTasks(max_workers=2)
+    barrier = threading.Barrier(2, timeout=2.0)
+    try:
+        tasks.submit("vad", barrier.wait)
+        tasks.submit("stt", barrier.wait)
+
+        tasks.wait("vad", "stt")
+
+        assert tasks.ready("vad") and tasks.ready("stt")
+        assert tasks.elapsed_sec("vad") is not None
+    finally:
+        tasks.shutdown()
+
+
+def test_dependent_phase_starts_after_its_dependency() -> None:
+    tasks = StartupTasks()
+    order: list[str] = []
+    release = threading.Event()
+
+    def load_router() -> None:
+        release.wait(timeout=2.0)
+        order.append("router")
+
+    try:
+        tasks.submit("router", load_router)
+        tasks.submit("ptz", lambda: order.append("ptz"), after=("router",))
+        assert not tasks.ready("ptz")
+
+        release.set()
+        tasks.wait("ptz")
+
+        assert order == ["router", "ptz"]
+    finally:
+        tasks.shutdown()
+
+
+def test_failed_phase_raises_startup_error_for_waiters() -> None:
+    tasks = StartupTasks()
+
+    def load_wake() -> None:
+        raise FileNotFoundError("wake model missing")
+
+    try:
+        tasks.submit("wake", load_wake)
+        tasks.submit("dependent", lambda: None, after=("wake",))
+
+        with pytest.raises(StartupError, match="wake model missing"):
+            tasks.wait("wake")
+        with pytest.raises(StartupError, match="wake"):
+            tasks.wait("dependent")
+    finally:
+        tasks.shutdown()
+
+
+def test_unknown_dependency_is_rejected() -> None:
+    tasks = StartupTasks()
+    try:
+        with pytest.raises(KeyError, match="router"):
+            tasks.submit("ptz", lambda: None, after=("router",))
+    finally:
+        tasks.shutdown()
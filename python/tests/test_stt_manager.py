@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import pytest
+
+from stt_manager import SttModelManager
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_manager(**kwargs) -> tuple[SttModelManager, list[object], FakeClock]:
+    loaded: list[object] = []
+    clock = FakeClock()
+
+    def loader() -> object:
+        model = object()
+        loaded.append(model)
+        return model
+
+    kwargs.setdefault("rss_reader", lambda: 100.0)
+    manager = SttModelManager(loader, name="fake", clock=clock, **kwargs)
+    return manager, loaded, clock
+
+
+def test_idle_model_is_unloaded_and_reloaded_on_acquire() -> None:
+    manager, loaded, clock = new_manager(idle_unload_sec=60.0)
+    first = manager.acquire("startup")
+
+    clock.now = 59.0
+    assert manager.maybe_unload(now=clock.now) is False
+    clock.now = 60.0
+    assert manager.maybe_unload(now=clock.now) is True
+    assert manager.status == "unloaded"
+
+    second = manager.acquire()
+    assert second is not first
+    assert len(loaded) == 2
+    assert manager.unload_count == 1
+
+
+def test_unload_is_disabled_by_default() -> None:
+    manager, _, clock = new_manager()
+    manager.acquire("startup")
+
+    clock.now = 10_000.0
+
+    assert manager.maybe_unload(now=clock.now) is False
+    assert manager.loaded is True
+
+
+def test_rss_budget_unloads_before_idle_timeout() -> None:
+    manager, _, clock = new_manager(
+        idle_unload_sec=600.0,
+        rss_budget_mb=80.0,
+    )
+    manager.acquire("startup")
+
+    clock.now = 1.0
+
+    assert manager.maybe_unload(now=clock.now) is True
+    assert manager.loaded is False
+
+
+def test_rss_budget_applies_without_idle_timeout() -> None:
+    rss = [60.0]
+    manager, _, clock = new_manager(
+        rss_budget_mb=80.0, rss_check_interval_sec=0.0, rss_reader=lambda: rss[0]
+    )
+    manager.acquire("startup")
+
+    clock.now = 10_000.0
+    assert manager.maybe_unload(now=clock.now) is False
+    rss[0] = 120.0
+    assert manager.maybe_unload(now=clock.now) is True
+    assert manager.loaded is False
+
+
+def test_slow_reload_pins_model_resident(monkeypatch) -> None:
+    # 起動時の読込（0→2.5秒）は他の読込と競合するので判定に使わない。
+    ticks = iter((0.0, 2.5, 10.0, 12.0))
+    monkeypatch.setattr("stt_manager.time.monotonic", lambda: next(ticks))
+    manager, _, clock = new_manager(
+        idle_unload_sec=1.0,
+        reload_deadline_sec=1.4,
+    )
+
+    manager.acquire("startup")
+    assert manager.pinned is False
+    clock.now = 100.0
+    assert manager.maybe_unload(now=clock.now) is True
+
+    manager.acquire("wake")
+    clock.now = 200.0
+
+    assert manager.pinned is True
+    assert manager.status == "pinned"
+    assert manager.maybe_unload(now=clock.now) is False
+
+
+def test_fast_reload_keeps_unloading(monkeypatch) -> None:
+    ticks = iter((0.0, 2.5, 10.0, 10.5))
+    monkeypatch.setattr("stt_manager.time.monotonic", lambda: next(ticks))
+    manager, loaded, clock = new_manager(rss_budget_mb=50.0, reload_deadline_sec=1.4)
+
+    manager.acquire("startup")
+    clock.now = 10.0
+    assert manager.maybe_unload(now=clock.now) is True
+    manager.acquire("wake")
+    clock.now = 20.0
+
+    assert manager.pinned is False
+    assert manager.maybe_unload(now=clock.now) is True
+    assert len(loaded) == 2
+
+
+def test_preload_loads_in_background_once() -> None:
+    manager, loaded, _ = new_manager(idle_unload_sec=1.0)
+
+    manager.preload("wake candidate")
+    manager.preload("wake detected")
+    manager._loading.join(timeout=2.0)
+    model = manager.acquire()
+
+    assert loaded == [model]
+    assert manager.load_count == 1
+
+
+def test_acquire_propagates_loader_failure() -> None:
+    def loader() -> object:
+        raise RuntimeError("model missing")
+
+    manager = SttModelManager(loader, name="broken", rss_reader=lambda: None)
+
+    with pytest.raises(RuntimeError, match="model missing"):
+        manager.acquire()
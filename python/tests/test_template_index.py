@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from intent_router import IntentRouter, build_intents_from_env
+from template_index import ExactTemplateIndex, IvfTemplateIndex
+from test_intent_router import KeywordEmbedder, settings
+
+
+def clustered_embeddings(count: int, *, dim: int = 16, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, dim))
+    rows = centers[rng.integers(0, 8, size=count)] + 0.1 * rng.normal(size=(count, dim))
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_with_all_lists_probed_equals_exact_scores() -> None:
+    embeddings = clustered_embeddings(200)
+    keys = [f"t{index}" for index in range(200)]
+    query = embeddings[17]
+
+    ivf = IvfTemplateIndex(keys, embeddings, nprobe=10_000)
+
+    np.testing.assert_allclose(
+        ivf.scores(query),
+        ExactTemplateIndex(keys, embeddings).scores(query),
+        rtol=1e-6,
+    )
+
+
+def test_ivf_finds_nearest_template_when_probing_few_lists() -> None:
+    embeddings = clustered_embeddings(400)
+    keys = [f"t{index}" for index in range(400)]
+    ivf = IvfTemplateIndex(keys, embeddings, nprobe=2)
+
+    for row in (0, 99, 250):
+        scores = ivf.scores(embeddings[row])
+        assert int(np.argmax(scores)) == row
+        assert np.isneginf(scores).any()
+
+
+def test_ivf_sync_assigns_new_templates_without_retraining() -> None:
+    embeddings = clustered_embeddings(300)
+    keys = [f"t{index}" for index in range(300)]
+    ivf = IvfTemplateIndex(keys, embeddings, nprobe=3)
+    extra = clustered_embeddings(5, seed=9)
+
+    ivf.sync(keys + [f"n{index}" for index in range(5)], np.vstack([embeddings, extra]))
+
+    assert ivf.retrain_count == 1
+    assert int(np.argmax(ivf.scores(extra[2]))) == 302
+
+    ivf.sync([f"n{index}" for index in range(300)], clustered_embeddings(300, seed=11))
+    assert ivf.retrain_count == 2
+
+
+def test_router_ivf_index_keeps_route_contract() -> None:
+    s = replace(settings(), index="ivf", ivf_nprobe=64, ivf_min_templates=1)
+    intents = build_intents_from_env(s)
+    ivf_router = IntentRouter(s, intents, KeywordEmbedder())
+    exact_router = IntentRouter(settings(), intents, KeywordEmbedder())
+
+    for text in ("右を向いて何が見える", "書類を要約して", "こんにちは"):
+        assert ivf_router.route(text) == exact_router.route(text)
+
+
+def test_router_update_intents_syncs_index() -> None:
+    s = replace(settings(), index="ivf", ivf_min_templates=1)
+    intents = build_intents_from_env(s)
+    router = IntentRouter(s, intents[:3], KeywordEmbedder())
+
+    router.update_intents(intents)
+
+    assert len(router.entries) == sum(len(intent.templates) for intent in intents)
+    assert "move_camera_right" in router.route("右を向いて").flags
+
+
+def test_router_rejects_unknown_index() -> None:
+    with pytest.raises(ValueError, match="YATAGARASU_SBERT_INDEX"):
+        IntentRouter(replace(settings(), index="hnsw"), (), KeywordEmbedder())
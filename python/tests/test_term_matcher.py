@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from term_matcher import TermMatcher
+
+
+def test_reports_first_start_of_each_term_in_one_scan() -> None:
+    matcher = TermMatcher(("右", "見え", "右を向", "えて"))
+
+    positions = matcher.first_positions("右を向いて何が見えて右")
+
+    assert positions == {0: 0, 1: 7, 2: 0, 3: 8}
+
+
+def test_overlapping_suffix_terms_follow_failure_links() -> None:
+    matcher = TermMatcher(("he", "she", "hers", "his"))
+
+    assert matcher.first_positions("ushers") == {0: 2, 1: 1, 2: 2}
+
+
+def test_empty_term_always_matches_at_start() -> None:
+    matcher = TermMatcher(("", "左"))
+
+    assert matcher.first_positions("こんにちは") == {0: 0}
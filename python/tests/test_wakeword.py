@@ -678,3 +678,42 @@ def test_active_lookahead_requests_probe_when_score_starts_rising() -> None:
         assert submitted[1]["captured_at"] == 1.3
     finally:
         backend.close()
+
+
+def test_livekit_backend_reports_candidate_until_reset() -> None:
+    predicted = threading.Event()
+
+    def predictor(audio: np.ndarray) -> dict[str, float]:
+        del audio
+        predicted.set()
+        return {"nee_yatagarasu": 0.3}
+
+    backend = LiveKitWakeBackend(
+        model_path=None,  # type: ignore[arg-type]
+        threshold=0.6,
+        early_threshold=0.2,
+        debounce_sec=2.0,
+        active_interval_sec=0.16,
+        idle_interval_sec=1.0,
+        speech_hold_sec=2.0,
+        warmup_sec=0.0,
+        predictor=predictor,
+    )
+    try:
+        assert backend.wake_candidate_active is False
+        backend.feed_audio(
+            np.ones(1_280, dtype=np.int16),
+            has_speech=True,
+            now=1.0,
+        )
+        assert predicted.wait(timeout=1.0)
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline and not backend.wake_candidate_active:
+            backend.poll(now=1.1)
+            threading.Event().wait(0.01)
+        assert backend.wake_candidate_active is True
+
+        backend.reset_audio()
+        assert backend.wake_candidate_active is False
+    finally:
+        backend.close()
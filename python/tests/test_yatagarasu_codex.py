@@ -1,6 +1,7 @@
 import json
 import os
 import shutil
+import sqlite3
 import subprocess
 import threading
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
@@ -239,6 +240,133 @@ printf 'image-response' > "$output_file"
     assert not recall_called.exists()
 
 
+def test_prefetched_memory_context_file_replaces_recall(tmp_path: Path) -> None:
+    app_root = tmp_path / "app"
+    bin_dir = app_root / "bin"
+    workspace = app_root / "workspace"
+    fake_path = tmp_path / "fake-path"
+    bin_dir.mkdir(parents=True)
+    workspace.mkdir()
+    fake_path.mkdir()
+
+    shutil.copy2(PROJECT_ROOT / "bin" / "yatagarasu", bin_dir / "yatagarasu")
+    write_executable(bin_dir / "zunda", "#!/bin/bash\ncat\n")
+    write_executable(bin_dir / "tapovoice", "#!/bin/bash\ncat >/dev/null\n")
+    write_executable(
+        bin_dir / "recall-context.sh",
+        "#!/bin/bash\ntouch \"$RECALL_CALLED\"\nprintf 'must-not-be-used\\n'\n",
+    )
+    write_executable(bin_dir / "memorize.sh", "#!/bin/bash\nexit 0\n")
+    write_executable(
+        fake_path / "codex",
+        """#!/bin/bash
+last=""
+output_file=""
+while [[ $# -gt 0 ]]; do
+    last="$1"
+    if [[ "$1" == "-o" ]]; then
+        output_file="$2"
+        shift 2
+    else
+        shift
+    fi
+done
+printf '%s' "$last" > "$PROMPT_CAPTURE"
+printf 'ok' > "$output_file"
+""",
+    )
+
+    context_file = tmp_path / "memory.yaml"
+    context_file.write_text("memory_context:\n  recent_history: |\n    - 先行取得した文脈\n")
+    recall_called = tmp_path / "recall-called"
+    prompt_capture = tmp_path / "prompt.txt"
+    env = os.environ.copy()
+    env.update(
+        {
+            "PATH": f"{fake_path}:{env['PATH']}",
+            "YATAGARASU_ENGINE": "codex",
+            "YATAGARASU_MEMORY_ENABLED": "true",
+            "YATAGARASU_MEMORY_CONTEXT_FILE": str(context_file),
+            "RECALL_CALLED": str(recall_called),
+            "PROMPT_CAPTURE": str(prompt_capture),
+        }
+    )
+
+    subprocess.run(
+        [str(bin_dir / "yatagarasu"), "続きを話して"],
+        cwd=workspace,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert not recall_called.exists()
+    assert "先行取得した文脈" in prompt_capture.read_text()
+
+
+def test_conversation_is_spooled_instead_of_saved_synchronously(tmp_path: Path) -> None:
+    app_root = tmp_path / "app"
+    bin_dir = app_root / "bin"
+    python_dir = app_root / "python"
+    workspace = app_root / "workspace"
+    fake_path = tmp_path / "fake-path"
+    bin_dir.mkdir(parents=True)
+    python_dir.mkdir()
+    workspace.mkdir()
+    fake_path.mkdir()
+
+    shutil.copy2(PROJECT_ROOT / "bin" / "yatagarasu", bin_dir / "yatagarasu")
+    for module in ("semantic_memory.py", "memory_spool.py"):
+        shutil.copy2(PROJECT_ROOT / "python" / module, python_dir / module)
+    write_executable(bin_dir / "zunda", "#!/bin/bash\ncat\n")
+    write_executable(bin_dir / "tapovoice", "#!/bin/bash\ncat >/dev/null\n")
+    write_executable(bin_dir / "memorize.sh", "#!/bin/bash\ntouch \"$MEMORIZE_CALLED\"\n")
+    write_executable(
+        fake_path / "codex",
+        """#!/bin/bash
+output_file=""
+while [[ $# -gt 0 ]]; do
+    if [[ "$1" == "-o" ]]; then
+        output_file="$2"
+        shift 2
+    else
+        shift
+    fi
+done
+printf 'agent-response' > "$output_file"
+""",
+    )
+
+    memorize_called = tmp_path / "memorize-called"
+    spool = tmp_path / "spool.sqlite3"
+    env = os.environ.copy()
+    env.update(
+        {
+            "PATH": f"{fake_path}:{env['PATH']}",
+            "YATAGARASU_ENGINE": "codex",
+            "YATAGARASU_MEMORY_ENABLED": "true",
+            "YATAGARASU_SKIP_MEMORY_RECALL": "true",
+            "YATAGARASU_MEMORY_SPOOL": str(spool),
+            "MEMORIZE_CALLED": str(memorize_called),
+        }
+    )
+
+    subprocess.run(
+        [str(bin_dir / "yatagarasu"), "こんにちは"],
+        cwd=workspace,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert not memorize_called.exists()
+    with sqlite3.connect(spool) as db:
+        rows = db.execute("SELECT main_text, status FROM memories").fetchall()
+    assert rows == [("[user]こんにちは\n[agent]agent-response", "pending")]
+
+
 def test_recall_context_accepts_preloaded_systemd_environment(
     tmp_path: Path,
 ) -> None:
@@ -615,3 +743,32 @@ def test_search_skill_returns_bounded_structured_json() -> None:
     finally:
         server.shutdown()
         thread.join()
+
+
+def test_tts_streaming_hands_the_turn_to_the_python_orchestrator(tmp_path: Path) -> None:
+    app_root = tmp_path / "app"
+    bin_dir = app_root / "bin"
+    python_dir = app_root / "python"
+    workspace = app_root / "workspace"
+    for directory in (bin_dir, python_dir, workspace):
+        directory.mkdir(parents=True)
+    launcher = bin_dir / "yatagarasu"
+    shutil.copy2(PROJECT_ROOT / "bin" / "yatagarasu", launcher)
+    capture = tmp_path / "orchestrator-args.txt"
+    (python_dir / "dispatch_orchestrator.py").write_text(
+        "import sys\n"
+        f"open({str(capture)!r}, 'w').write('\\n'.join(sys.argv[1:]))\n"
+    )
+    env = os.environ.copy()
+    env.update({"YATAGARASU_TTS_STREAMING": "true", "YATAGARASU_ENGINE": "codex"})
+
+    subprocess.run(
+        [str(launcher), "-m", "gpt-5", "天気は？"],
+        cwd=workspace,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert capture.read_text().splitlines() == ["-m", "gpt-5", "天気は？"]
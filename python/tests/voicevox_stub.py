@@ -0,0 +1,87 @@
+"""Minimal VOICEVOX engine for tests: one 16-bit mono WAV per phrase."""
+
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+import urllib.parse
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def tone_wav(text: str, rate: int) -> bytes:
+    """文字数×0.05秒の波形。中身は文字コードなので順番を確かめられる。"""
+    frames = b"".join(
+        int(ord(char) % 32000).to_bytes(2, "little", signed=True) * int(rate * 0.05)
+        for char in text
+    )
+    output = io.BytesIO()
+    with wave.open(output, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(frames)
+    return output.getvalue()
+
+
+class VoicevoxServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), VoicevoxHandler)
+        self.requests: list[tuple[str, dict[str, str]]] = []
+        self.connections = 0
+        self.delay_sec = 0.0
+        self.fail_status: int | None = None
+        # HTTP 200 のまま壊れた本文を返すパス（"/audio_query" か "/synthesis"）。
+        self.garbage_path: str | None = None
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+
+    @property
+    def engine_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class VoicevoxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: VoicevoxServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self) -> None:
+        parsed = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        self.server.requests.append((parsed.path, params))
+        time.sleep(self.server.delay_sec)
+        if self.server.fail_status is not None:
+            self._send(self.server.fail_status, b'{"detail": "engine error"}', "application/json")
+        elif parsed.path == self.server.garbage_path:
+            self._send(200, b"<html>engine is busy</html>", "text/html")
+        elif parsed.path == "/audio_query":
+            query = {"text": params["text"], "speedScale": 1.0, "outputSamplingRate": 24000}
+            self._send(200, json.dumps(query).encode("utf-8"), "application/json")
+        else:
+            query = json.loads(body)
+            self._send(200, tone_wav(query["text"], query["outputSamplingRate"]), "audio/wav")
+
+    def _send(self, status: int, data: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
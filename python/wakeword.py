@@ -148,6 +148,9 @@ class WakeBackend(Protocol):
     @property
     def dropped_count(self) -> int: ...
 
+    @property
+    def wake_candidate_active(self) -> bool: ...
+
     def feed_audio(
         self,
         pcm: Int16Array,
@@ -661,6 +664,14 @@ class LiveKitWakeBackend:
     def inference_count(self) -> int:
         return self._worker.completed_count
 
+    @property
+    def wake_candidate_active(self) -> bool:
+        """early_threshold到達中、またはscore起点の先読み結果を保持中。"""
+        return (
+            self._first_candidate_at is not None
+            or self._lookahead_probe is not None
+        )
+
     def feed_audio(
         self,
         pcm: Int16Array,
@@ -1073,6 +1084,10 @@ class SttWakeBackend:
     def dropped_count(self) -> int:
         return 0
 
+    @property
+    def wake_candidate_active(self) -> bool:
+        return False
+
     def feed_audio(
         self,
         pcm: Int16Array,